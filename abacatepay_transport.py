@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Transporte HTTP Compartilhado do AbacatePay
+O SDK abre um requests.Session novo a cada chamada (nova conexão TCP + TLS
+por requisição). Aqui os clientes do SDK são reaproveitados com um transporte
+único por processo: sessão keep-alive com pool de conexões limitado por host
+(requests/urllib3) ou, com ABACATE_HTTP2=true e o pacote h2 instalado, um
+httpx.Client com HTTP/2 (várias requisições multiplexadas por conexão)
+
+HTTP/1.1 pipelining não é usado: requests/urllib3 e httpx não o suportam e
+proxies/servidores costumam desativá-lo; o HTTP/2 cobre o mesmo caso.
+
+Para asyncio, AsyncPooledTransport faz o mesmo com um httpx.AsyncClient (o
+cliente assíncrono do SDK também abre um AsyncClient novo por chamada).
+"""
+
+import importlib.util
+import os
+import threading
+from typing import Any, Dict, Optional, Union
+
+import httpx
+import requests
+from abacatepay.billings import BillingAsyncClient, BillingClient
+from abacatepay.constants import BASE_URL as SDK_BASE_URL, USER_AGENT
+from abacatepay.coupons import CouponAsyncClient, CouponClient
+from abacatepay.customers import CustomerAsyncClient, CustomerClient
+from abacatepay.pixQrCode import PixQrCodeAsyncClient, PixQrCodeClient
+from abacatepay.utils.exceptions import APIConnectionError, APITimeoutError, raise_for_status
+from requests.adapters import HTTPAdapter
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+ABACATE_API_BASE_URL = os.getenv('ABACATE_API_BASE_URL', SDK_BASE_URL).rstrip('/')
+ABACATE_HTTP_POOL_SIZE = int(os.getenv('ABACATE_HTTP_POOL_SIZE', '20'))  # conexões por host
+ABACATE_HTTP_POOL_HOSTS = int(os.getenv('ABACATE_HTTP_POOL_HOSTS', '4'))  # hosts com pool próprio
+ABACATE_HTTP_TIMEOUT = float(os.getenv('ABACATE_HTTP_TIMEOUT', '30'))
+ABACATE_HTTP2 = os.getenv('ABACATE_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+# "true", "false" ou caminho de um bundle de CAs (ex.: servidor TLS local de testes)
+_verify = os.getenv('ABACATE_HTTP_VERIFY', 'true')
+ABACATE_HTTP_VERIFY: Union[bool, str] = {'true': True, 'false': False}.get(_verify.lower(), _verify)
+
+Response = Union[requests.Response, httpx.Response]
+
+
+def _h2_available() -> bool:
+    """Pacote h2 instalado (o httpx só negocia HTTP/2 com ele)"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class PooledTransport:
+    """Cliente HTTP keep-alive compartilhado entre threads"""
+
+    def __init__(
+        self,
+        pool_size: int = ABACATE_HTTP_POOL_SIZE,
+        pool_hosts: int = ABACATE_HTTP_POOL_HOSTS,
+        timeout: float = ABACATE_HTTP_TIMEOUT,
+        http2: bool = ABACATE_HTTP2,
+        verify: Union[bool, str] = ABACATE_HTTP_VERIFY,
+        base_url: str = ABACATE_API_BASE_URL
+    ):
+        """
+        Args:
+            pool_size: Máximo de conexões abertas por host (chamadas além disso aguardam uma livre)
+            pool_hosts: Quantidade de hosts com pool mantido
+            timeout: Timeout por requisição em segundos
+            http2: Usar httpx com HTTP/2 (requer o pacote h2; senão, HTTP/1.1 keep-alive)
+            verify: Verificação TLS (True, False ou bundle de CAs)
+            base_url: URL base da API; substitui a URL fixa do SDK
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.base_url = base_url.rstrip('/')
+        self.verify = verify
+        self.http2 = http2 and _h2_available()
+        self._requests = 0
+        self._lock = threading.Lock()
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                verify=verify,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=pool_size * pool_hosts, max_keepalive_connections=pool_size)
+            )
+        else:
+            self._session = requests.Session()
+            self._adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, pool_block=True)
+            self._session.mount('https://', self._adapter)
+            self._session.mount('http://', self._adapter)
+
+    @property
+    def protocol(self) -> str:
+        return "HTTP/2" if self.http2 else "HTTP/1.1"
+
+    def resolve(self, url: str) -> str:
+        """Troca a URL base do SDK pela configurada (ABACATE_API_BASE_URL)"""
+        if self.base_url != SDK_BASE_URL and url.startswith(SDK_BASE_URL):
+            return self.base_url + url[len(SDK_BASE_URL):]
+        return url
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        """Executa uma requisição reaproveitando conexões abertas"""
+        with self._lock:
+            self._requests += 1
+        url = self.resolve(url)
+        if self.http2:
+            return self._client.request(method, url, **kwargs)
+        # verify por requisição: session.verify perde para REQUESTS_CA_BUNDLE do ambiente
+        return self._session.request(method, url, timeout=self.timeout, verify=self.verify, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"protocol": self.protocol, "pool_size": self.pool_size, "requests": self._requests}
+
+    def close(self) -> None:
+        if self.http2:
+            self._client.close()
+        else:
+            self._session.close()
+
+
+class _PooledClientMixin:
+    """Substitui BaseClient._request do SDK para usar o PooledTransport"""
+
+    def __init__(self, api_key: str, transport: Optional[PooledTransport] = None):
+        super().__init__(api_key)
+        self._api_key = api_key
+        self._transport = transport
+
+    def _request(self, url: str, method: str = 'GET', **kwargs: Any) -> Response:
+        headers = {'Authorization': f'Bearer {self._api_key}', 'User-Agent': USER_AGENT}
+        # Sem transporte fixo, usa o do processo atual (clientes criados antes de um fork continuam válidos)
+        transport = self._transport or get_transport()
+        try:
+            response = transport.request(method, url, headers=headers, **kwargs)
+        except (requests.exceptions.Timeout, httpx.TimeoutException):
+            raise APITimeoutError(request=requests.Request(method, url))
+        except (requests.exceptions.ConnectionError, httpx.RequestError):
+            raise APIConnectionError(message='Connection error.', request=requests.Request(method, url))
+        raise_for_status(response)
+        return response
+
+
+class PooledPixQrCodeClient(_PooledClientMixin, PixQrCodeClient):
+    pass
+
+
+class PooledBillingClient(_PooledClientMixin, BillingClient):
+    pass
+
+
+class PooledCustomerClient(_PooledClientMixin, CustomerClient):
+    pass
+
+
+class PooledCouponClient(_PooledClientMixin, CouponClient):
+    pass
+
+
+class PooledAbacatePay:
+    """Mesma interface de abacatepay.AbacatePay(api_key), sobre um transporte compartilhado"""
+
+    def __init__(self, api_key: str, transport: Optional[PooledTransport] = None):
+        """
+        Args:
+            api_key: Chave da API AbacatePay
+            transport: Transporte dedicado (padrão: o compartilhado do processo, via get_transport)
+        """
+        self.billing = PooledBillingClient(api_key, transport)
+        self.customers = PooledCustomerClient(api_key, transport)
+        self.coupons = PooledCouponClient(api_key, transport)
+        self.pixQrCode = PooledPixQrCodeClient(api_key, transport)
+
+
+class AsyncPooledTransport:
+    """
+    httpx.AsyncClient keep-alive compartilhado pelas corrotinas de um event loop
+
+    O pool do httpcore percorre todas as requisições pendentes x conexões a
+    cada evento (custo quadrático com centenas de conexões), então o pool é
+    dividido em clientes de até ASYNC_SHARD_SIZE conexões e cada requisição vai
+    para o cliente com menos requisições em andamento.
+    """
+
+    ASYNC_SHARD_SIZE = 8
+
+    def __init__(
+        self,
+        pool_size: int = ABACATE_HTTP_POOL_SIZE,
+        timeout: float = ABACATE_HTTP_TIMEOUT,
+        http2: bool = ABACATE_HTTP2,
+        verify: Union[bool, str] = ABACATE_HTTP_VERIFY,
+        base_url: str = ABACATE_API_BASE_URL
+    ):
+        """
+        Args:
+            pool_size: Máximo de conexões abertas (requisições além disso aguardam uma livre)
+            timeout: Timeout por requisição em segundos
+            http2: Usar HTTP/2 (requer o pacote h2)
+            verify: Verificação TLS (True, False ou bundle de CAs)
+            base_url: URL base da API; substitui a URL fixa do SDK
+        """
+        self.pool_size = pool_size
+        self.base_url = base_url.rstrip('/')
+        self.http2 = http2 and _h2_available()
+        self._requests = 0
+
+        shards = max(1, -(-pool_size // self.ASYNC_SHARD_SIZE))
+        per_shard = -(-pool_size // shards)
+        self._clients = [
+            httpx.AsyncClient(
+                http2=self.http2,
+                verify=verify,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard)
+            )
+            for _ in range(shards)
+        ]
+        self._in_flight = [0] * shards
+
+    @property
+    def protocol(self) -> str:
+        return "HTTP/2" if self.http2 else "HTTP/1.1"
+
+    def resolve(self, url: str) -> str:
+        """Troca a URL base do SDK pela configurada (ABACATE_API_BASE_URL)"""
+        if self.base_url != SDK_BASE_URL and url.startswith(SDK_BASE_URL):
+            return self.base_url + url[len(SDK_BASE_URL):]
+        return url
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        # Só o event loop do transporte chama request: contadores sem lock
+        self._requests += 1
+        shard = min(range(len(self._clients)), key=self._in_flight.__getitem__)
+        self._in_flight[shard] += 1
+        try:
+            return await self._clients[shard].request(method, self.resolve(url), **kwargs)
+        finally:
+            self._in_flight[shard] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "protocol": self.protocol,
+            "pool_size": self.pool_size,
+            "shards": len(self._clients),
+            "in_flight": sum(self._in_flight),
+            "requests": self._requests
+        }
+
+    async def aclose(self) -> None:
+        for client in self._clients:
+            await client.aclose()
+
+
+class _AsyncPooledClientMixin:
+    """Substitui BaseAsyncClient._request do SDK para usar o AsyncPooledTransport"""
+
+    def __init__(self, api_key: str, transport: AsyncPooledTransport):
+        super().__init__(api_key)
+        self._api_key = api_key
+        self._transport = transport
+
+    async def _request(self, url: str, method: str = 'GET', **kwargs: Any) -> httpx.Response:
+        headers = {'Authorization': f'Bearer {self._api_key}', 'User-Agent': USER_AGENT}
+        try:
+            response = await self._transport.request(method, url, headers=headers, **kwargs)
+        except httpx.TimeoutException:
+            raise APITimeoutError(request=httpx.Request(method, url))
+        except httpx.RequestError:
+            raise APIConnectionError(message='Connection error.', request=httpx.Request(method, url))
+        raise_for_status(response)
+        return response
+
+
+class PooledPixQrCodeAsyncClient(_AsyncPooledClientMixin, PixQrCodeAsyncClient):
+    pass
+
+
+class PooledBillingAsyncClient(_AsyncPooledClientMixin, BillingAsyncClient):
+    pass
+
+
+class PooledCustomerAsyncClient(_AsyncPooledClientMixin, CustomerAsyncClient):
+    pass
+
+
+class PooledCouponAsyncClient(_AsyncPooledClientMixin, CouponAsyncClient):
+    pass
+
+
+class PooledAbacatePayAsync:
+    """Mesma interface de abacatepay.AbacatePay(api_key, async_mode=True), com conexões reaproveitadas"""
+
+    def __init__(self, api_key: str, transport: Optional[AsyncPooledTransport] = None):
+        """
+        Args:
+            api_key: Chave da API AbacatePay
+            transport: Transporte assíncrono (padrão: um novo, deste cliente)
+
+        O httpx.AsyncClient fica preso ao event loop em que é usado: crie o
+        cliente dentro do loop e feche com aclose() ao terminar.
+        """
+        self.transport = transport or AsyncPooledTransport()
+        self.billing = PooledBillingAsyncClient(api_key, self.transport)
+        self.customers = PooledCustomerAsyncClient(api_key, self.transport)
+        self.coupons = PooledCouponAsyncClient(api_key, self.transport)
+        self.pixQrCode = PooledPixQrCodeAsyncClient(api_key, self.transport)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+_transport: Optional[PooledTransport] = None
+_transport_pid: Optional[int] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> PooledTransport:
+    """Transporte do processo (recriado após fork: sockets não são compartilhados entre processos)"""
+    global _transport, _transport_pid
+    with _transport_lock:
+        if _transport is None or _transport_pid != os.getpid():
+            _transport = PooledTransport()
+            _transport_pid = os.getpid()
+        return _transport
+
+
+def create_client(api_key: str) -> PooledAbacatePay:
+    """
+    Cliente AbacatePay com conexões reaproveitadas
+
+    Args:
+        api_key: Chave da API AbacatePay
+
+    Returns:
+        Cliente com .pixQrCode, .billing, .customers e .coupons do SDK
+    """
+    return PooledAbacatePay(api_key)
+
+
+def create_async_client(api_key: str, pool_size: int = ABACATE_HTTP_POOL_SIZE) -> PooledAbacatePayAsync:
+    """
+    Cliente AbacatePay assíncrono com conexões reaproveitadas
+
+    Args:
+        api_key: Chave da API AbacatePay
+        pool_size: Máximo de conexões abertas
+
+    Returns:
+        Cliente com corrotinas em .pixQrCode, .billing, .customers e .coupons
+    """
+    return PooledAbacatePayAsync(api_key, AsyncPooledTransport(pool_size=pool_size))
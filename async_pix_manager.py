@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Gerenciador de PIX Assíncrono
+Variante asyncio do PrescrevaMePixManager: create/check/simulate/monitor como
+corrotinas sobre o cliente assíncrono do SDK (httpx com conexões
+reaproveitadas), com concorrência limitada por semáforo e timeout por chamada,
+para criar e acompanhar milhares de PIX em um único processo
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from abacatepay.customers import CustomerMetadata
+from abacatepay.pixQrCode import PixQrCodeIn
+
+from abacatepay_transport import create_async_client
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from dotenv_cache import load_env
+from metrics import API_REJECTED, API_REQUEST_SECONDS, note_pix_created, observe_final_status
+from payment_monitor import TERMINAL_STATUSES, to_timestamp
+from pix_manager import (
+    API_KEY, PIX_EXPIRATION, PRODUCT_NAME, PRODUCT_PRICE, api_breaker, api_error_details, call_outcome,
+    is_upstream_failure
+)
+from polling_policy import FixedIntervalPolicy, PollingPolicy
+from status_cache import PixStatusCache, status_cache as shared_status_cache
+from structured_logging import setup_logging
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+ASYNC_PIX_CONCURRENCY = int(os.getenv('ASYNC_PIX_CONCURRENCY', '100'))  # chamadas simultâneas à API
+ASYNC_PIX_TIMEOUT = float(os.getenv('ASYNC_PIX_TIMEOUT', '15'))  # segundos por chamada
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPrescrevaMePixManager:
+    """
+    Gerenciador de pagamentos PIX para asyncio
+
+    Os resultados têm o mesmo formato do PrescrevaMePixManager. Use um
+    gerenciador por event loop e feche com `aclose()` (ou `async with`).
+    """
+
+    def __init__(
+        self,
+        api_key: str = API_KEY,
+        client: Optional[Any] = None,
+        status_cache: Optional[PixStatusCache] = None,
+        max_concurrency: int = ASYNC_PIX_CONCURRENCY,
+        timeout: float = ASYNC_PIX_TIMEOUT,
+        verbose: bool = False,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Args:
+            api_key: Chave da API AbacatePay
+            client: Cliente assíncrono já construído (padrão: create_async_client)
+            status_cache: Cache de status (padrão: cache compartilhado do processo)
+            max_concurrency: Máximo de chamadas simultâneas à API (também o tamanho do pool)
+            timeout: Timeout padrão de cada chamada em segundos
+            verbose: Logar cada operação em INFO (padrão: DEBUG; com milhares de PIX, só os erros aparecem)
+            breaker: Circuit breaker das chamadas (padrão: api_breaker, o mesmo do gerenciador síncrono)
+        """
+        self._owns_client = client is None
+        self.client = client if client is not None else create_async_client(api_key, pool_size=max_concurrency)
+        self.status_cache = status_cache if status_cache is not None else shared_status_cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.verbose = verbose
+        self.breaker = breaker if breaker is not None else api_breaker
+        self.log_prefix = "🌵 PrescrevaMe PIX Async"
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._calls = 0
+        self._timeouts = 0
+        self._errors = 0
+
+    async def __aenter__(self) -> "AsyncPrescrevaMePixManager":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Fecha as conexões do cliente criado por este gerenciador"""
+        if self._owns_client:
+            await self.client.aclose()
+
+    def _log(self, message: str, **fields: Any) -> None:
+        """Operações normais saem em INFO só com verbose (com milhares de PIX, em DEBUG)"""
+        level = logging.INFO if self.verbose else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, message, extra=fields)
+
+    def _error(self, action: str, error: Exception) -> Dict[str, Any]:
+        self._errors += 1
+        logger.warning("❌ Erro ao %s: %s", action, error, extra={"error_type": type(error).__name__})
+        return {
+            "success": False,
+            "error": str(error),
+            **api_error_details(error)
+        }
+
+    async def _call(self, operation: str, factory: Callable[[], Awaitable[Any]], timeout: Optional[float]) -> Any:
+        """Executa uma chamada à API respeitando o limite de concorrência, o timeout e o circuit breaker"""
+        timeout = self.timeout if timeout is None else timeout
+        async with self._semaphore:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                API_REJECTED.inc(operation=operation, reason="circuit_open")
+                raise
+            self._in_flight += 1
+            self._calls += 1
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(factory(), timeout)
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+                self.breaker.record_failure()
+                API_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome="upstream_error")
+                raise asyncio.TimeoutError(f"Tempo limite da chamada ({timeout:g}s)")
+            except Exception as e:
+                if is_upstream_failure(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                API_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome=call_outcome(e))
+                raise
+            finally:
+                self._in_flight -= 1
+            API_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome="success")
+            self.breaker.record_success()
+            return result
+
+    async def create_pix_payment(
+        self,
+        customer_name: str,
+        customer_email: str,
+        customer_phone: str,
+        customer_cpf: str,
+        amount: int = PRODUCT_PRICE,
+        description: str = PRODUCT_NAME,
+        expires_in: int = PIX_EXPIRATION,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Cria um novo pagamento PIX
+
+        Args:
+            customer_name: Nome completo do cliente
+            customer_email: Email do cliente
+            customer_phone: Telefone do cliente (formato: +55 11 99999-9999)
+            customer_cpf: CPF do cliente (apenas números)
+            amount: Valor em centavos (padrão: R$ 347,00)
+            description: Descrição do pagamento
+            expires_in: Tempo de expiração em segundos
+            timeout: Timeout desta chamada (padrão: o do gerenciador)
+
+        Returns:
+            Dict com informações do PIX criado
+        """
+        try:
+            pix_data = PixQrCodeIn(
+                amount=amount,
+                expires_in=expires_in,
+                description=description,
+                customer=CustomerMetadata(
+                    name=customer_name,
+                    email=customer_email,
+                    cellphone=customer_phone,
+                    tax_id=customer_cpf
+                )
+            )
+            pix_result = await self._call("create", lambda: self.client.pixQrCode.create(pix_data), timeout)
+            note_pix_created(pix_result.id, to_timestamp(pix_result.created_at))
+            self._log("✅ PIX criado", pix_id=pix_result.id, amount=amount)
+
+            return {
+                "success": True,
+                "pix_id": pix_result.id,
+                "amount": pix_result.amount,
+                "status": pix_result.status,
+                "brcode": pix_result.brcode,
+                "brcode_base64": pix_result.brcode_base64,
+                "expires_at": pix_result.expires_at,
+                "created_at": pix_result.created_at,
+                "dev_mode": pix_result.dev_mode
+            }
+
+        except Exception as e:
+            return self._error("criar PIX", e)
+
+    async def check_payment_status(
+        self,
+        pix_id: str,
+        use_cache: bool = True,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Verifica o status de um pagamento PIX
+
+        Args:
+            pix_id: ID do PIX a ser verificado
+            use_cache: Se True, responde do cache quando houver entrada válida
+            timeout: Timeout desta chamada (padrão: o do gerenciador)
+
+        Returns:
+            Dict com status do pagamento ("cached": True quando veio do cache)
+        """
+        if use_cache:
+            cached = self.status_cache.get(pix_id)
+            if cached is not None:
+                return cached
+
+        try:
+            status_result = await self._call("check", lambda: self.client.pixQrCode.check(pix_id), timeout)
+            self._log("📊 Status consultado", pix_id=pix_id, status=status_result.status)
+
+            result = {
+                "success": True,
+                "status": status_result.status,
+                "expires_at": status_result.expires_at,
+                "is_paid": status_result.status == "PAID",
+                "is_expired": status_result.status == "EXPIRED"
+            }
+            self.status_cache.put(pix_id, result)
+            return result
+
+        except Exception as e:
+            return self._error("verificar status", e)
+
+    async def simulate_payment(
+        self,
+        pix_id: str,
+        metadata: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Simula um pagamento (apenas para desenvolvimento)
+
+        Args:
+            pix_id: ID do PIX a ser simulado
+            metadata: Metadados adicionais para simulação
+            timeout: Timeout desta chamada (padrão: o do gerenciador)
+
+        Returns:
+            Dict com resultado da simulação
+        """
+        try:
+            simulation_result = await self._call(
+                "simulate", lambda: self.client.pixQrCode.simulate(pix_id, metadata or {}), timeout
+            )
+            self._log("🧪 Pagamento simulado", pix_id=pix_id, status=simulation_result.status)
+            self.status_cache.invalidate(pix_id)
+
+            return {
+                "success": True,
+                "status": simulation_result.status,
+                "simulated": True
+            }
+
+        except Exception as e:
+            return self._error("simular pagamento", e)
+
+    async def monitor_payment(
+        self,
+        pix_id: str,
+        max_attempts: int = 100,
+        interval: float = 5,
+        policy: Optional[PollingPolicy] = None,
+        expires_at: Any = None,
+        settled_lookup: Optional[Callable[[str], Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Monitora um pagamento até ser confirmado ou expirado
+
+        Args:
+            pix_id: ID do PIX a ser monitorado
+            max_attempts: Número máximo de tentativas
+            interval: Intervalo entre verificações em segundos (usado só sem `policy`)
+            policy: Política de polling (ex.: AdaptivePollingPolicy)
+            expires_at: Expiração do PIX; se omitida, usa a informada pela API
+            settled_lookup: Função pix_id -> status final já recebido por webhook
+
+        Returns:
+            Dict com resultado final do monitoramento
+        """
+        policy = policy or FixedIntervalPolicy(interval)
+        created_at = time.time()
+        deadline = to_timestamp(expires_at)
+        self._log("👀 Iniciando monitoramento", pix_id=pix_id, policy=type(policy).__name__)
+
+        for attempt in range(1, max_attempts + 1):
+            settled = settled_lookup(pix_id) if settled_lookup else None
+            if settled in TERMINAL_STATUSES:
+                return {
+                    "success": True,
+                    "status": settled,
+                    "attempts": attempt - 1,
+                    "final_status": settled,
+                    "source": "webhook"
+                }
+
+            status_result = await self.check_payment_status(pix_id)
+            now = time.time()
+
+            if status_result["success"]:
+                status = status_result["status"]
+                if status in TERMINAL_STATUSES:
+                    observe_final_status(pix_id, status, "polling")
+                    self._log("🏁 Status final", pix_id=pix_id, status=status)
+                    return {
+                        "success": True,
+                        "status": status,
+                        "attempts": attempt,
+                        "final_status": status
+                    }
+                if deadline is None:
+                    deadline = to_timestamp(status_result.get("expires_at"))
+
+            # Erros também esperam o próximo check (e o Retry-After), para não martelar a API
+            next_check = policy.next_check_at(attempt, created_at, now, deadline)
+            if next_check is not None and not status_result["success"] and status_result.get("retry_after"):
+                next_check = max(next_check, now + status_result["retry_after"])
+            if next_check is None:
+                return {
+                    "success": True,
+                    "status": "EXPIRED",
+                    "attempts": attempt,
+                    "final_status": "EXPIRED"
+                }
+            await asyncio.sleep(max(0.0, next_check - now))
+
+        logger.warning("⏰ Tempo limite do monitoramento", extra={"pix_id": pix_id, "attempts": max_attempts})
+        return {
+            "success": False,
+            "error": "Tempo limite atingido",
+            "attempts": max_attempts
+        }
+
+    async def monitor_payments(
+        self,
+        pix_ids: Union[Iterable[str], Dict[str, Any]],
+        interval: float = 5,
+        timeout: Optional[float] = None,
+        policy: Optional[PollingPolicy] = None,
+        settled_lookup: Optional[Callable[[str], Optional[str]]] = None,
+        max_attempts: int = 100
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Monitora vários pagamentos ao mesmo tempo (uma corrotina por PIX; as
+        chamadas à API continuam limitadas por max_concurrency)
+
+        Args:
+            pix_ids: IDs dos PIX, ou dict {pix_id: expires_at}
+            interval: Intervalo entre verificações do mesmo PIX em segundos
+            timeout: Tempo máximo total em segundos (None = até todos finalizarem)
+            policy: Política de polling (padrão: intervalo fixo de `interval`)
+            settled_lookup: Função pix_id -> status final já recebido por webhook
+                (padrão: estados finais do status_cache)
+            max_attempts: Número máximo de tentativas por PIX
+
+        Returns:
+            Dict {pix_id: resultado} no mesmo formato de monitor_payment
+        """
+        expirations = pix_ids if isinstance(pix_ids, dict) else dict.fromkeys(pix_ids)
+        lookup = settled_lookup or self.status_cache.settled_status
+        results: Dict[str, Dict[str, Any]] = {}
+
+        async def monitor(pix_id: str, expires_at: Any) -> None:
+            result = await self.monitor_payment(
+                pix_id, max_attempts=max_attempts, interval=interval, policy=policy,
+                expires_at=expires_at, settled_lookup=lookup
+            )
+            results[pix_id] = {"pix_id": pix_id, **result}
+
+        logger.info("👀 Monitorando %d PIX em lote", len(expirations))
+        tasks = [asyncio.ensure_future(monitor(pix_id, expires_at)) for pix_id, expires_at in expirations.items()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for pix_id in expirations:
+            results.setdefault(pix_id, {
+                "pix_id": pix_id,
+                "success": False,
+                "error": "Tempo limite atingido"
+            })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Chamadas feitas, em andamento, timeouts, erros e estado do circuit breaker"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "calls": self._calls,
+            "timeouts": self._timeouts,
+            "errors": self._errors,
+            "circuit_breaker": self.breaker.stats()
+        }
+
+
+async def _demo(count: int, simulate: bool) -> None:
+    async with AsyncPrescrevaMePixManager() as manager:
+        start = time.perf_counter()
+        created = await asyncio.gather(*(
+            manager.create_pix_payment(
+                customer_name=f"Cliente Teste {i}",
+                customer_email=f"cliente{i}@exemplo.com",
+                customer_phone="+55 11 99999-9999",
+                customer_cpf="11144477735"
+            )
+            for i in range(count)
+        ))
+        pix_ids = {r["pix_id"]: r["expires_at"] for r in created if r["success"]}
+        print(f"✅ {len(pix_ids)}/{count} PIX criados em {time.perf_counter() - start:.2f}s")
+
+        if simulate:
+            await asyncio.gather(*(manager.simulate_payment(pix_id) for pix_id in pix_ids))
+
+        results = await manager.monitor_payments(pix_ids, interval=2, timeout=60)
+        statuses: Dict[str, int] = {}
+        for result in results.values():
+            status = result.get("status", "TIMEOUT")
+            statuses[status] = statuses.get(status, 0) + 1
+        print(f"🏁 Status finais: {statuses}")
+        print(f"📊 {manager.stats()}")
+
+
+def main():
+    """Cria e acompanha vários PIX de teste em paralelo"""
+    parser = argparse.ArgumentParser(description="Gerenciador de PIX assíncrono")
+    parser.add_argument("--count", type=int, default=10, help="Quantidade de PIX de teste")
+    parser.add_argument("--simulate", action="store_true", help="Simular o pagamento (modo desenvolvimento)")
+    args = parser.parse_args()
+
+    setup_logging()
+    print("🌵 PrescrevaMe Premium - Gerenciador de PIX Assíncrono")
+    print("=" * 50)
+    asyncio.run(_demo(args.count, args.simulate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+PrescrevaMe Premium - Benchmarks
+Medições de desempenho dos componentes Python contra um AbacatePay falso local
+
+Execute a partir da raiz do projeto, por exemplo:
+    python3 -m benchmarks.bench_daemon
+    python3 -m benchmarks.suite --output resultados.json   # todos os cenários, em JSON
+"""
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Gerenciador Assíncrono
+Cria e consulta milhares de PIX contra o AbacatePay falso via HTTP local
+(com latência artificial) usando o AsyncPrescrevaMePixManager e, para
+comparação, o PrescrevaMePixManager em um pool de threads de mesmo tamanho.
+Depois acompanha --monitor PIX pendentes ao mesmo tempo com monitor_payments
+(uma corrotina por PIX) enquanto parte deles é paga
+
+Latências do asyncio incluem a espera pelo semáforo (todas as chamadas são
+disparadas de uma vez); no cenário com threads a fila fica no executor.
+
+Uso:
+    python3 -m benchmarks.bench_async [--pix 2000] [--concurrency 200] [--latency 0.05] [--monitor 5000]
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from abacatepay_transport import AsyncPooledTransport, PooledAbacatePay, PooledAbacatePayAsync, PooledTransport
+from async_pix_manager import AsyncPrescrevaMePixManager
+from benchmarks.common import print_summary, quiet, summarize
+from benchmarks.fake_abacatepay import FakeAbacatePayServer
+from pix_manager import PrescrevaMePixManager
+from rate_limiter import TokenBucket
+from status_cache import PixStatusCache
+
+CUSTOMER = {
+    "customer_name": "Cliente Benchmark",
+    "customer_email": "bench@exemplo.com",
+    "customer_phone": "+55 11 99999-9999",
+    "customer_cpf": "11144477735"
+}
+
+
+def timed(fn):
+    """Envolve fn para registrar a latência de cada chamada em `latencies`"""
+    latencies = []
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper, latencies
+
+
+def atimed(fn):
+    latencies = []
+
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper, latencies
+
+
+def run_threads(base_url: str, pix: int, concurrency: int):
+    transport = PooledTransport(pool_size=concurrency, base_url=base_url)
+    manager = PrescrevaMePixManager(client=PooledAbacatePay("bench_key", transport), status_cache=PixStatusCache(ttl=0),
+                                    rate_limiter=TokenBucket(0))
+    create, create_lat = timed(manager.create_pix_payment)
+    check, check_lat = timed(manager.check_payment_status)
+
+    start = time.perf_counter()
+    with quiet(), ThreadPoolExecutor(concurrency) as pool:
+        created = list(pool.map(lambda _: create(**CUSTOMER), range(pix)))
+        list(pool.map(lambda r: check(r["pix_id"], use_cache=False), [r for r in created if r["success"]]))
+    duration = time.perf_counter() - start
+    transport.close()
+    return create_lat, check_lat, duration, sum(r["success"] for r in created)
+
+
+async def run_async(base_url: str, pix: int, concurrency: int):
+    client = PooledAbacatePayAsync("bench_key", AsyncPooledTransport(pool_size=concurrency, base_url=base_url))
+    async with AsyncPrescrevaMePixManager(
+        client=client, status_cache=PixStatusCache(ttl=0), max_concurrency=concurrency
+    ) as manager:
+        create, create_lat = atimed(manager.create_pix_payment)
+        check, check_lat = atimed(manager.check_payment_status)
+
+        start = time.perf_counter()
+        created = await asyncio.gather(*(create(**CUSTOMER) for _ in range(pix)))
+        await asyncio.gather(*(check(r["pix_id"], use_cache=False) for r in created if r["success"]))
+        duration = time.perf_counter() - start
+    await client.aclose()
+    return create_lat, check_lat, duration, sum(r["success"] for r in created)
+
+
+async def run_monitor(server: FakeAbacatePayServer, pix: int, concurrency: int, window: float):
+    """Acompanha `pix` PIX pendentes; ~70% são pagos ao longo da janela e o resto expira"""
+    rng = random.Random(42)
+    now = time.time()
+    pix_ids = {f"pix_async_{i}": now + window for i in range(pix)}
+    payments = sorted((rng.uniform(0, window), pix_id) for pix_id in pix_ids if rng.random() < 0.7)
+
+    def pay():
+        for delay, pix_id in payments:
+            wait = now + delay - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            server.store.set_status(pix_id, "PAID")
+
+    client = PooledAbacatePayAsync("bench_key", AsyncPooledTransport(pool_size=concurrency, base_url=server.base_url))
+    async with AsyncPrescrevaMePixManager(
+        client=client, status_cache=PixStatusCache(ttl=0), max_concurrency=concurrency
+    ) as manager:
+        threading.Thread(target=pay, daemon=True).start()
+        start = time.perf_counter()
+        results = await manager.monitor_payments(pix_ids, interval=window / 10, timeout=window * 3, max_attempts=1000)
+        duration = time.perf_counter() - start
+        stats = manager.stats()
+    await client.aclose()
+
+    outcomes = {}
+    for result in results.values():
+        status = result.get("status", "TIMEOUT")
+        outcomes[status] = outcomes.get(status, 0) + 1
+    return outcomes, duration, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do gerenciador de PIX assíncrono")
+    parser.add_argument("--pix", type=int, default=2000, help="PIX criados e consultados por cenário")
+    parser.add_argument("--concurrency", type=int, default=200, help="Chamadas simultâneas")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência artificial da API falsa (s)")
+    parser.add_argument("--monitor", type=int, default=5000, help="PIX acompanhados no cenário de monitoramento")
+    parser.add_argument("--window", type=float, default=10.0, help="Janela até a expiração no monitoramento (s)")
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark Gerenciador Assíncrono")
+    print("=" * 70)
+    print(f"   {args.pix} PIX, concorrência {args.concurrency}, latência da API {args.latency * 1000:.0f}ms")
+
+    scenarios = [
+        ("threads", lambda url: run_threads(url, args.pix, args.concurrency)),
+        ("asyncio", lambda url: asyncio.run(run_async(url, args.pix, args.concurrency))),
+    ]
+    for label, scenario in scenarios:
+        with FakeAbacatePayServer(latency=args.latency) as server:
+            create_lat, check_lat, duration, created = scenario(server.base_url)
+            print(f"\n   🔁 {label}: {created}/{args.pix} criados, {2 * args.pix / duration:.0f} chamadas/s, "
+                  f"{server.connections} conexões")
+            print_summary("create", summarize(create_lat))
+            print_summary("check", summarize(check_lat))
+
+    if args.monitor:
+        with FakeAbacatePayServer(latency=args.latency) as server:
+            with quiet():
+                outcomes, duration, stats = asyncio.run(run_monitor(server, args.monitor, args.concurrency, args.window))
+        print(f"\n   👀 monitor_payments: {args.monitor} PIX em {duration:.1f}s (janela {args.window:g}s)")
+        print(f"   Status finais: {outcomes}")
+        print(f"   Chamadas: {stats['calls']}  timeouts: {stats['timeouts']}  erros: {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Circuit Breaker
+Clientes consultam status em ritmo constante contra o AbacatePay falso via
+HTTP; no meio da execução a API passa a responder 503 só depois de
+--outage-latency segundos (upstream degradado) e depois volta. Compara o
+PrescrevaMePixManager com o circuit breaker e com ele desligado (limiar
+inalcançável): requisições que chegaram à API durante a falha, latência
+vista pelos clientes e tempo até voltar a ter respostas boas.
+
+Uso:
+    python3 -m benchmarks.bench_breaker [--clients 16] [--outage 4] [--outage-latency 0.5]
+"""
+
+import argparse
+import threading
+import time
+
+from abacatepay_transport import PooledAbacatePay, PooledTransport
+from benchmarks.common import print_summary, quiet, summarize
+from benchmarks.fake_abacatepay import FakeAbacatePayServer
+from circuit_breaker import CircuitBreaker
+from pix_manager import PrescrevaMePixManager
+from rate_limiter import TokenBucket
+from status_cache import PixStatusCache
+
+
+def run(label: str, breaker: CircuitBreaker, args) -> None:
+    with FakeAbacatePayServer(latency=args.latency) as server:
+        transport = PooledTransport(pool_size=args.clients, base_url=server.base_url)
+        manager = PrescrevaMePixManager(
+            client=PooledAbacatePay("bench_key", transport),
+            status_cache=PixStatusCache(ttl=0),
+            breaker=breaker,
+            rate_limiter=TokenBucket(0)
+        )
+        phases = {"antes": [], "falha": [], "depois": []}
+        first_ok_after = []
+        outage_start = args.warmup
+        outage_end = args.warmup + args.outage
+        stop = threading.Event()
+        start = time.perf_counter()
+
+        def client(index: int) -> None:
+            while not stop.is_set():
+                began = time.perf_counter()
+                result = manager.check_payment_status(f"pix_breaker_{index}", use_cache=False)
+                elapsed = time.perf_counter() - began
+                offset = began - start
+                phase = "antes" if offset < outage_start else "falha" if offset < outage_end else "depois"
+                phases[phase].append(elapsed)
+                if phase == "depois" and result["success"] and not first_ok_after:
+                    first_ok_after.append(time.perf_counter() - start - outage_end)
+                time.sleep(args.think)
+
+        with quiet():
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            time.sleep(outage_start)
+            server.outage = args.outage_latency
+            time.sleep(args.outage)
+            server.outage = 0.0
+            time.sleep(args.recovery)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        transport.close()
+
+        stats = manager.api_stats()
+        recovered = f"{first_ok_after[0]:.2f}s" if first_ok_after else "não recuperou"
+        print(f"\n   🔁 {label}: {server.outage_hits} requisições chegaram à API durante a falha, "
+              f"{stats['circuit_breaker']['rejected']} recusadas localmente, {stats['retries']} novas tentativas")
+        for phase, latencies in phases.items():
+            print_summary(f"check ({phase})", summarize(latencies))
+        print(f"   Primeira resposta boa após a volta da API: {recovered}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do circuit breaker das chamadas ao AbacatePay")
+    parser.add_argument("--clients", type=int, default=16, help="Threads consultando status")
+    parser.add_argument("--think", type=float, default=0.05, help="Pausa de cada cliente entre consultas (s)")
+    parser.add_argument("--latency", type=float, default=0.01, help="Latência normal da API falsa (s)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos com a API saudável antes da falha")
+    parser.add_argument("--outage", type=float, default=4.0, help="Duração da falha (s)")
+    parser.add_argument("--outage-latency", type=float, default=0.5, help="Tempo até cada 503 durante a falha (s)")
+    parser.add_argument("--recovery", type=float, default=3.0, help="Segundos medidos após a volta da API")
+    parser.add_argument("--reset", type=float, default=1.0, help="Segundos com o circuito aberto antes do teste")
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark Circuit Breaker")
+    print("=" * 70)
+    print(f"   {args.clients} clientes, falha de {args.outage:g}s com 503 após {args.outage_latency * 1000:.0f}ms")
+
+    run("sem breaker", CircuitBreaker("bench", failure_threshold=10 ** 9), args)
+    run("com breaker", CircuitBreaker("bench", failure_threshold=5, reset_timeout=args.reset), args)
+
+
+if __name__ == "__main__":
+    main()
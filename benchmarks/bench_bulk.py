@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Teste de Ponta a Ponta da Criação em Lote
+Roda `pix_bulk.py` contra o AbacatePay falso (com limite de taxa que devolve
+429), mata o processo no meio do lote com SIGKILL, retoma e confere que
+nenhum cliente recebeu duas cobranças
+
+Uso:
+    python3 -m benchmarks.bench_bulk [--customers 2000] [--rate 300] [--api-rate 200]
+"""
+
+import argparse
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fake_abacatepay import FakeAbacatePayServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_customers(path: str, count: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["nome", "email", "telefone", "cpf"])
+        for i in range(count):
+            writer.writerow([f"Cliente {i}", f"cliente{i}@exemplo.com", "+55 11 99999-9999", f"{i:011d}"])
+
+
+def output_statuses(path: str) -> Counter:
+    statuses = Counter()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    statuses[json.loads(line)["status"]] += 1
+    return statuses
+
+
+def run_bulk(base_url: str, csv_path: str, output: str, args, kill_after: int = 0, extra=()):
+    """Executa o pix_bulk.py; com kill_after, envia SIGKILL quando a saída tiver essa quantidade de linhas"""
+    env = dict(os.environ, ABACATE_API_BASE_URL=base_url, ABACATE_API_KEY="bench_key")
+    command = [sys.executable, os.path.join(REPO_ROOT, "pix_bulk.py"), csv_path, "--output", output,
+               "--workers", str(args.workers), "--rate", str(args.rate), *extra]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(output),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if kill_after:
+        while process.poll() is None and sum(output_statuses(output).values()) < kill_after:
+            time.sleep(0.05)
+        process.send_signal(signal.SIGKILL)
+    process.wait()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de ponta a ponta da criação de PIX em lote")
+    parser.add_argument("--customers", type=int, default=2000, help="Clientes no CSV")
+    parser.add_argument("--workers", type=int, default=16, help="Criações simultâneas")
+    parser.add_argument("--rate", type=float, default=300, help="Limite do cliente (criações/s)")
+    parser.add_argument("--api-rate", type=float, default=200, help="Limite da API falsa (req/s, acima disso 429)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latência artificial da API falsa (s)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pix_bulk_bench_")
+    csv_path = os.path.join(workdir, "clientes.csv")
+    output = os.path.join(workdir, "resultados.jsonl")
+    write_customers(csv_path, args.customers)
+
+    print("🌵 PrescrevaMe Premium - Criação de PIX em Lote (ponta a ponta)")
+    print("=" * 70)
+
+    with FakeAbacatePayServer(latency=args.latency, rate_limit=args.api_rate) as server:
+        killed_at = args.customers * 2 // 5
+        first = run_bulk(server.base_url, csv_path, output, args, kill_after=killed_at)
+        after_kill = output_statuses(output)
+        print(f"   1ª execução: SIGKILL após {sum(after_kill.values())} itens ({first:.1f}s) {dict(after_kill)}")
+
+        second = run_bulk(server.base_url, csv_path, output, args)
+        after_resume = output_statuses(output)
+        resumed = after_resume - after_kill
+        print(f"   Retomada:    {sum(resumed.values())} itens ({second:.1f}s) {dict(resumed)}")
+
+        with server.store._lock:
+            emails = Counter(record.get("customer_email") for record in server.store._store.values())
+        duplicated = sum(1 for count in emails.values() if count > 1)
+        uncertain = resumed.get("uncertain", 0)
+        print(f"\n   Cobranças criadas na API:  {server.store.calls['create']} para {len(emails)} clientes")
+        print(f"   Clientes cobrados 2 vezes: {duplicated}")
+        print(f"   Incertos (morreram em voo, aguardam conferência): {uncertain}")
+        print(f"   Respostas 429 da API:      {server.rate_limited}")
+        print(f"   Vazão da retomada:         {resumed.get('created', 0) / second:.0f} PIX/s")
+
+        # Cada incerto pode ou não ter virado cobrança: o lote nunca os reenvia sozinho
+        ok = duplicated == 0 and args.customers - uncertain <= len(emails) <= args.customers
+        if uncertain:
+            third = run_bulk(server.base_url, csv_path, output, args, extra=("--retry-uncertain",))
+            retried = output_statuses(output) - after_resume
+            with server.store._lock:
+                emails = Counter(record.get("customer_email") for record in server.store._store.values())
+            print(f"   --retry-uncertain: {dict(retried)} ({third:.1f}s), "
+                  f"{sum(1 for count in emails.values() if count > 1)} clientes passaram a ter 2 cobranças")
+
+    print(f"\n   {'✅' if ok else '❌'} Nenhuma cobrança duplicada sem --retry-uncertain "
+          f"({len(emails)}/{args.customers} clientes cobrados ao final)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
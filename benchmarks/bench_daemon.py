@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Daemon PIX
+Compara a latência p50/p99 de check via daemon aquecido contra o caminho
+exec (um interpretador novo por chamada, como PythonIntegration::executePython)
+
+Uso:
+    python3 -m benchmarks.bench_daemon [--calls 2000] [--exec-calls 30]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import print_summary, quiet, summarize
+from benchmarks.fake_abacatepay import FakeAbacatePay
+from pix_daemon import PixDaemon, PixDaemonClient, create_server
+from pix_manager import PrescrevaMePixManager
+from rate_limiter import TokenBucket
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Reproduz o custo do caminho exec: interpretador + imports + cliente novo por chamada
+EXEC_SNIPPET = (
+    "import sys\n"
+    "from benchmarks.fake_abacatepay import FakeAbacatePay\n"
+    "from pix_manager import PrescrevaMePixManager\n"
+    "PrescrevaMePixManager(client=FakeAbacatePay()).check_payment_status(sys.argv[1])\n"
+)
+
+
+def bench_daemon(calls: int, latency: float):
+    """Mede check via daemon em socket Unix com conexão persistente"""
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="pix_daemon_"), "pix.sock")
+    manager = PrescrevaMePixManager(client=FakeAbacatePay(latency=latency), rate_limiter=TokenBucket(0))
+    server = create_server(PixDaemon(manager), socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    latencies = []
+    try:
+        with quiet(), PixDaemonClient(socket_path) as client:
+            client.ping()
+            for i in range(calls):
+                start = time.perf_counter()
+                client.check_payment_status(f"pix_bench_{i}")
+                latencies.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.unlink(socket_path)
+    return latencies
+
+
+def bench_exec(calls: int):
+    """Mede check via um novo processo Python por chamada"""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", EXEC_SNIPPET, f"pix_bench_{i}"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark daemon PIX vs exec")
+    parser.add_argument("--calls", type=int, default=2000, help="Chamadas via daemon")
+    parser.add_argument("--exec-calls", type=int, default=30, help="Chamadas via exec")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência simulada da API (s)")
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark Daemon PIX")
+    print("=" * 70)
+
+    daemon_stats = summarize(bench_daemon(args.calls, args.latency))
+    exec_stats = summarize(bench_exec(args.exec_calls))
+
+    print_summary("daemon (socket Unix)", daemon_stats)
+    print_summary("exec (python3 por chamada)", exec_stats)
+    if daemon_stats["p50_ms"]:
+        print(f"\n⚡ Ganho p50: {exec_stats['p50_ms'] / daemon_stats['p50_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark da Deduplicação de Webhooks
+Mede o custo de reservar/registrar eventos novos e de identificar duplicatas
+pelo LRU em memória e pelo índice SQLite (após um "reinício"), e reproduz um
+fluxo com reenvios para conferir a taxa de duplicatas
+
+Uso:
+    python3 -m benchmarks.bench_dedup [--events 20000] [--duplicates 0.2]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from webhook_dedup import WebhookDeduplicator, event_key
+
+
+def notification(i: int) -> dict:
+    return {"type": "pix.paid", "data": {"id": f"pix_char_{i:010d}", "amount": 34700}}
+
+
+def timed_each(fn, items):
+    """Latências (µs) de fn(item) para cada item"""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return latencies
+
+
+def describe(label: str, latencies) -> None:
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"   {label:<36} p50={p50:9.1f}µs  p99={p99:9.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da deduplicação de webhooks")
+    parser.add_argument("--events", type=int, default=20000, help="Eventos distintos")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Fração de reenvios no fluxo")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="pix_dedup_bench_"), "dedup.db")
+    keys = [event_key(notification(i)) for i in range(args.events)]
+
+    print("🌵 PrescrevaMe Premium - Benchmark Deduplicação")
+    print("=" * 70)
+
+    dedup = WebhookDeduplicator(path)
+
+    def process_new(key):
+        if dedup.claim(key):
+            dedup.commit(key)
+
+    describe("evento novo (claim + commit)", timed_each(process_new, keys))
+    describe("duplicata no LRU", timed_each(dedup.claim, keys))
+
+    restarted = WebhookDeduplicator(path)
+    describe("duplicata no SQLite (após reinício)", timed_each(restarted.claim, keys))
+
+    # Fluxo com reenvios do provedor: parte dos eventos chega de novo logo depois
+    rng = random.Random(42)
+    replay = WebhookDeduplicator(os.path.join(os.path.dirname(path), "replay.db"))
+    stream = []
+    for i in range(args.events):
+        stream.append(notification(args.events + i))
+        if rng.random() < args.duplicates / (1 - args.duplicates):
+            stream.append(notification(args.events + rng.randint(max(0, i - 50), i)))
+    processed = 0
+    for data in stream:
+        key = event_key(data)
+        if replay.claim(key):
+            replay.commit(key)
+            processed += 1
+
+    stats = replay.stats()
+    print(f"\n   Fluxo: {len(stream)} notificações, {processed} processadas")
+    print(f"   Taxa de duplicatas: {stats['duplicate_rate']:.1%} "
+          f"(LRU {stats['lru_hits']}, SQLite {stats['store_hits']}, em processamento {stats['in_flight_hits']})")
+
+
+if __name__ == "__main__":
+    main()
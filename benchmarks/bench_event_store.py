@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Armazenamento de Eventos
+Compara a vazão de escrita e a latência de consultas de relatório do
+PaymentEventStore (SQLite/WAL) contra o payment_logs.json (JSONL)
+
+Uso:
+    python3 -m benchmarks.bench_event_store [--events 1000000] [--appends 20000]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_events, write_jsonl
+from payment_store import PaymentEventStore
+
+
+def timed(fn, repeat: int = 5):
+    """Menor tempo (s) de `repeat` execuções e o último resultado"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_writes(workdir: str, appends: int):
+    """Um evento por chamada, como o webhook faz"""
+    events = list(synthetic_events(appends, seed=1))
+
+    jsonl_path = os.path.join(workdir, "append.json")
+    start = time.perf_counter()
+    for event in events:
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    jsonl_rate = appends / (time.perf_counter() - start)
+
+    store = PaymentEventStore(os.path.join(workdir, "append.db"))
+    start = time.perf_counter()
+    for event in events:
+        store.append(event)
+    sqlite_rate = appends / (time.perf_counter() - start)
+    return jsonl_rate, sqlite_rate
+
+
+def scan_jsonl(path: str, predicate):
+    """Equivalente ao caminho atual: re-parse de todo o arquivo a cada relatório"""
+    matches = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                log = json.loads(line)
+                if predicate(log):
+                    matches.append(log)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do armazenamento de eventos")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Eventos no histórico")
+    parser.add_argument("--appends", type=int, default=20000, help="Escritas unitárias medidas")
+    parser.add_argument("--jsonl-scans", type=int, default=1, help="Repetições das varreduras JSONL")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pix_store_bench_")
+    print("🌵 PrescrevaMe Premium - Benchmark Event Store")
+    print("=" * 70)
+
+    jsonl_rate, sqlite_rate = bench_writes(workdir, args.appends)
+    print(f"📝 Escrita unitária ({args.appends} eventos)")
+    print(f"   JSONL (open/append por evento): {jsonl_rate:10.0f} eventos/s")
+    print(f"   SQLite WAL (append):            {sqlite_rate:10.0f} eventos/s")
+
+    jsonl_path = os.path.join(workdir, "history.json")
+    write_jsonl(jsonl_path, args.events)
+    store = PaymentEventStore(os.path.join(workdir, "history.db"))
+    start = time.perf_counter()
+    imported = store.import_jsonl(jsonl_path)["imported"]
+    import_time = time.perf_counter() - start
+    print(f"\n📥 Importação de {imported} eventos: {import_time:.1f}s ({imported / import_time:.0f} eventos/s)")
+
+    # Evento do meio do histórico como alvo das consultas pontuais
+    probe = next(itertools.islice(synthetic_events(args.events), args.events // 2, None))
+    pix_id, tax_id, day = probe["pix_id"], probe["customer"]["tax_id"], probe["timestamp"][:10]
+
+    queries = [
+        ("status de um pix_id", lambda: store.latest_status(pix_id),
+         lambda: scan_jsonl(jsonl_path, lambda l: l.get("pix_id") == pix_id)),
+        ("eventos de um CPF", lambda: list(store.iter_events(tax_id=tax_id)),
+         lambda: scan_jsonl(jsonl_path, lambda l: l.get("customer", {}).get("tax_id") == tax_id)),
+        ("eventos de um dia", lambda: list(store.iter_events(since=day, until=day + "T99")),
+         lambda: scan_jsonl(jsonl_path, lambda l: l.get("timestamp", "").startswith(day))),
+        ("contagem por status", store.count_by_status,
+         lambda: scan_jsonl(jsonl_path, lambda l: False)),
+        ("receita total", store.revenue,
+         lambda: scan_jsonl(jsonl_path, lambda l: l.get("status") == "PAID")),
+    ]
+
+    print(f"\n🔎 Consultas de relatório com {args.events} eventos")
+    print(f"   {'consulta':<24}{'SQLite':>14}{'JSONL':>14}{'ganho':>10}")
+    for label, store_query, jsonl_query in queries:
+        store_time, _ = timed(store_query)
+        jsonl_time, _ = timed(jsonl_query, repeat=args.jsonl_scans)
+        print(f"   {label:<24}{store_time * 1000:>12.2f}ms{jsonl_time * 1000:>12.0f}ms{jsonl_time / store_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Logging
+Mede o custo, na thread que processa o webhook, de registrar um pagamento
+confirmado: o formato antigo (basicConfig com FileHandler + StreamHandler,
+quatro linhas com f-string, escrita síncrona) contra o logging estruturado
+(um registro JSON enfileirado para a thread de escrita). Várias threads logam
+ao mesmo tempo, como os workers da fila de webhooks; o stderr vai para
+/dev/null nos dois cenários.
+
+Uso:
+    python3 -m benchmarks.bench_logging [--events 20000] [--threads 8]
+"""
+
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from logging.handlers import QueueListener
+
+from benchmarks.common import print_summary, summarize
+from structured_logging import DeferredQueueHandler, JsonFormatter, RotatingLogFileHandler
+
+PIX = {"id": "pix_char_0000000001", "amount": 34700, "customer": {"name": "Cliente Benchmark"}}
+
+
+def legacy_logger(path: str, devnull) -> logging.Logger:
+    logger = logging.getLogger("bench.legacy")
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    for handler in (logging.FileHandler(path), logging.StreamHandler(devnull)):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def legacy_event(logger: logging.Logger, pix_data: dict) -> None:
+    log_prefix = "🔔 PrescrevaMe Webhook"
+    logger.info(f"{log_prefix} 🎉 Pagamento confirmado!")
+    logger.info(f"   PIX ID: {pix_data['id']}")
+    logger.info(f"   Valor: R$ {pix_data['amount']/100:.2f}")
+    logger.info(f"   Cliente: {pix_data['customer'].get('name', 'N/A')}")
+
+
+def structured_logger(path: str, devnull):
+    logger = logging.getLogger("bench.structured")
+    targets = [RotatingLogFileHandler(path, max_bytes=0, when=""), logging.StreamHandler(devnull)]
+    for target in targets:
+        target.setFormatter(JsonFormatter())
+    handler = DeferredQueueHandler(queue.Queue(100000))
+    listener = QueueListener(handler.queue, *targets)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, listener, handler
+
+
+def structured_event(logger: logging.Logger, pix_data: dict) -> None:
+    logger.info("🎉 Pagamento confirmado", extra={
+        "pix_id": pix_data["id"],
+        "amount": pix_data["amount"],
+        "customer": pix_data["customer"].get("name", "N/A")
+    })
+
+
+def run(logger: logging.Logger, event, events: int, threads: int):
+    """Latência de cada evento na thread que loga e vazão total"""
+    per_thread = events // threads
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index: int) -> None:
+        samples = latencies[index]
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            event(logger, PIX)
+            samples.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    duration = time.perf_counter() - start
+    return [sample for samples in latencies for sample in samples], duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do logging no caminho do webhook")
+    parser.add_argument("--events", type=int, default=20000, help="Pagamentos confirmados logados")
+    parser.add_argument("--threads", type=int, default=8, help="Threads logando ao mesmo tempo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pix_logging_bench_")
+    devnull = open(os.devnull, "w")
+
+    print("🌵 PrescrevaMe Premium - Benchmark Logging")
+    print("=" * 70)
+    print(f"   {args.events} eventos em {args.threads} threads")
+
+    legacy_path = os.path.join(workdir, "legacy.log")
+    latencies, duration = run(legacy_logger(legacy_path, devnull), legacy_event, args.events, args.threads)
+    print(f"\n   📝 basicConfig síncrono (4 linhas/evento): {args.events / duration:,.0f} eventos/s, "
+          f"{os.path.getsize(legacy_path) / 1024:.0f} KiB")
+    print_summary("custo na thread do webhook", summarize(latencies))
+
+    structured_path = os.path.join(workdir, "structured.log")
+    logger, listener, handler = structured_logger(structured_path, devnull)
+    listener.start()
+    latencies, duration = run(logger, structured_event, args.events, args.threads)
+    flush_start = time.perf_counter()
+    listener.stop()
+    drained = time.perf_counter() - flush_start
+    with open(structured_path, encoding="utf-8") as file:
+        written = sum(1 for _ in file)
+    print(f"\n   🧾 JSON via fila (1 registro/evento): {args.events / duration:,.0f} eventos/s, "
+          f"{os.path.getsize(structured_path) / 1024:.0f} KiB, fila drenada em {drained * 1000:.0f}ms")
+    print_summary("custo na thread do webhook", summarize(latencies))
+    print(f"   Registros gravados: {written}/{args.events // args.threads * args.threads} "
+          f"(descartados por fila cheia: {handler.dropped})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Monitor em Lote
+Acompanha milhares de PIX pendentes contra o AbacatePay falso via HTTP local
+e mede vazão (checks/s) e atraso de agendamento
+
+Uso:
+    python3 -m benchmarks.bench_monitor [--pix 2000] [--workers 32] [--interval 0.2]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import quiet
+from benchmarks.fake_abacatepay import FakeAbacatePayHTTP, FakeAbacatePayServer
+from payment_monitor import PaymentMonitor
+from pix_manager import PrescrevaMePixManager
+from rate_limiter import TokenBucket
+from status_cache import PixStatusCache
+
+
+def run(pix_count: int, workers: int, interval: float, window: float, latency: float, seed: int = 42):
+    rng = random.Random(seed)
+    with FakeAbacatePayServer(latency=latency) as server:
+        # TTL 0: todo check de PIX pendente vai à API (mede o monitor, não o cache)
+        manager = PrescrevaMePixManager(client=FakeAbacatePayHTTP(server.base_url), status_cache=PixStatusCache(ttl=0),
+                                        rate_limiter=TokenBucket(0))
+        monitor = PaymentMonitor(manager, max_workers=workers, interval=interval)
+
+        now = time.time()
+        pix_ids = [f"pix_bench_{i}" for i in range(pix_count)]
+        for pix_id in pix_ids:
+            # Todos expiram ao fim da janela; ~70% pagam em algum momento antes disso
+            monitor.add(pix_id, expires_at=now + window)
+
+        payments = sorted(
+            (rng.expovariate(3.0 / window), pix_id)
+            for pix_id in pix_ids if rng.random() < 0.7
+        )
+
+        def pay():
+            for delay, pix_id in payments:
+                wait = now + delay - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                server.store.set_status(pix_id, "PAID")
+
+        payer = threading.Thread(target=pay, daemon=True)
+        with quiet():
+            monitor.start()
+            payer.start()
+            monitor.wait_idle(timeout=window * 3)
+            monitor.stop()
+
+        outcomes = {}
+        for result in monitor.results():
+            outcomes[result.get("status", "TIMEOUT")] = outcomes.get(result.get("status", "TIMEOUT"), 0) + 1
+        return monitor.stats(), outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do monitor de PIX em lote")
+    parser.add_argument("--pix", type=int, default=2000, help="PIX pendentes simultâneos")
+    parser.add_argument("--workers", type=int, default=32, help="Checks simultâneos")
+    parser.add_argument("--interval", type=float, default=0.2, help="Intervalo entre checks (s)")
+    parser.add_argument("--window", type=float, default=5.0, help="Janela até expirar (s)")
+    parser.add_argument("--latency", type=float, default=0.002, help="Latência simulada da API (s)")
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark Monitor em Lote")
+    print("=" * 70)
+    stats, outcomes = run(args.pix, args.workers, args.interval, args.window, args.latency)
+
+    print(f"   PIX acompanhados:   {args.pix}")
+    print(f"   Checks realizados:  {stats['checks']} ({stats['check_errors']} erros)")
+    print(f"   Vazão:              {stats['checks_per_sec']:.0f} checks/s")
+    print(f"   Atraso agendamento: p50={stats['lag_p50_ms']:.2f}ms  p99={stats['lag_p99_ms']:.2f}ms  max={stats['lag_max_ms']:.2f}ms")
+    print(f"   Resultados:         {outcomes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Pool Pré-fork
+Compara a vazão de `check` (uma conexão por chamada, como o
+PythonIntegration do PHP) com vários clientes simultâneos em:
+
+    daemon        pix_daemon.py: um processo, uma thread por conexão
+    pool x1       pix_prefork.py com um worker (um GIL, até --threads conexões)
+    pool xN       pix_prefork.py com N workers (padrão: PIX_POOL_WORKERS_PER_CORE x núcleos)
+
+O AbacatePay falso roda em outro processo, com latência configurável, e o
+SDK real faz as chamadas HTTP. Também mostra a memória proporcional (PSS)
+de cada configuração: as páginas compartilhadas por copy-on-write entre os
+workers contam uma vez só.
+
+Uso:
+    python3 -m benchmarks.bench_prefork [--calls 3000] [--concurrency 32] [--latency 0.02] [--workers N] [--threads 16]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.common import print_summary, summarize
+from pix_daemon import PixDaemonClient
+from pix_prefork import PIX_POOL_THREADS, default_workers
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FAKE_SERVER_SNIPPET = (
+    "import sys, time\n"
+    "from benchmarks.fake_abacatepay import FakeAbacatePayServer\n"
+    "server = FakeAbacatePayServer(latency=float(sys.argv[1])).start()\n"
+    "print(server.base_url, flush=True)\n"
+    "time.sleep(86400)\n"
+)
+
+
+def _children(pid: int) -> List[int]:
+    """PIDs filhos de `pid` (workers do pool)"""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # O nome do processo vem entre parênteses e pode conter espaços
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _pss_mb(pids: List[int]) -> float:
+    """Soma da memória proporcional (PSS): páginas compartilhadas divididas entre os processos"""
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def _start(command: List[str], socket_path: str, env: Dict[str, str]) -> subprocess.Popen:
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if os.path.exists(socket_path):
+            try:
+                with PixDaemonClient(socket_path, timeout=5) as client:
+                    client.ping()
+                return process
+            except OSError:
+                pass
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"Servidor não respondeu: {' '.join(command)}")
+
+
+def _load(socket_path: str, calls: int, concurrency: int, prefix: str) -> Tuple[List[float], float, int]:
+    """Dispara `calls` checks com `concurrency` clientes, uma conexão por chamada"""
+    def one(i: int) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        with PixDaemonClient(socket_path) as client:
+            result = client.check_payment_status(f"{prefix}_{i}")
+        return time.perf_counter() - start, bool(result.get("success"))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(calls)))
+    duration = time.perf_counter() - start
+    return [latency for latency, _ in outcomes], duration, sum(1 for _, ok in outcomes if not ok)
+
+
+def run_config(label: str, command: List[str], socket_path: str, env: Dict[str, str], args) -> Dict[str, float]:
+    process = _start(command, socket_path, env)
+    try:
+        # Aquecimento: primeiras chamadas de cada processo (conexões HTTP, caches do pydantic)
+        _load(socket_path, min(200, args.calls), args.concurrency, f"warm_{label}")
+        latencies, duration, errors = _load(socket_path, args.calls, args.concurrency, f"pix_{label}")
+        pss = _pss_mb([process.pid, *_children(process.pid)])
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    stats = summarize(latencies)
+    throughput = args.calls / duration if duration > 0 else 0.0
+    print_summary(f"{label} ({throughput:,.0f} req/s)", stats)
+    print(f"   {'':<28} erros={errors}  PSS total={pss:.0f} MiB")
+    return {"throughput": throughput, "pss_mb": pss, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool pré-fork x daemon de um processo")
+    parser.add_argument("--calls", type=int, default=3000, help="Chamadas medidas por configuração")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes simultâneos (PHP-FPM)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latência simulada da API (s)")
+    parser.add_argument("--workers", type=int, default=0, help="Workers do pool (0 = padrão por núcleos)")
+    parser.add_argument("--threads", type=int, default=PIX_POOL_THREADS, help="Threads por worker do pool")
+    args = parser.parse_args()
+    workers = args.workers or default_workers()
+
+    fake = subprocess.Popen(
+        [sys.executable, "-c", FAKE_SERVER_SNIPPET, str(args.latency)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True
+    )
+    workdir = tempfile.mkdtemp(prefix="pix_prefork_bench_")
+    try:
+        base_url = fake.stdout.readline().strip()
+        env = dict(
+            os.environ,
+            ABACATE_API_BASE_URL=base_url,
+            ABACATE_API_KEY="bench_key",
+            ABACATE_RATE_LIMIT="0",
+            PIX_STATUS_CACHE_DIR="",
+            PIX_POOL_MAX_REQUESTS="0",
+            LOG_LEVEL="WARNING",
+            TRACE_SAMPLE_RATE="0",
+            METRICS_PORT="0"
+        )
+
+        print("🌵 PrescrevaMe Premium - Benchmark Pool Pré-fork")
+        print("=" * 70)
+        print(f"   {args.calls} checks, {args.concurrency} clientes, API com {args.latency * 1000:.0f} ms, "
+              f"{os.cpu_count()} núcleos")
+        results = {}
+        configs = [
+            ("daemon", [sys.executable, "pix_daemon.py"]),
+            ("pool x1", [sys.executable, "pix_prefork.py", "--workers", "1", "--threads", str(args.threads)]),
+            (f"pool x{workers}", [sys.executable, "pix_prefork.py", "--workers", str(workers), "--threads", str(args.threads)]),
+        ]
+        for index, (label, command) in enumerate(configs):
+            socket_path = os.path.join(workdir, f"pix_{index}.sock")
+            results[label] = run_config(label, [*command, "--socket", socket_path], socket_path, env, args)
+
+        baseline = results["daemon"]["throughput"]
+        pool = results[f"pool x{workers}"]["throughput"]
+        if baseline:
+            print(f"\n⚡ Pool x{workers}: {pool / baseline:.2f}x a vazão do daemon de um processo")
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Status por Push
+Abre N conexões SSE ociosas (um pix_id cada) contra um status_push.py em
+subprocesso, mede a memória do servidor com todas paradas e então publica o
+pagamento de cada PIX pelo socket de datagramas (como os workers do webhook),
+medindo o tempo até cada navegador receber o evento.
+
+Uso:
+    python3 -m benchmarks.bench_push [--connections 10000] [--publish-rate 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import print_summary, summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class _SseClient(asyncio.Protocol):
+    """Navegador mínimo: guarda quando o evento "status" chegou"""
+
+    def __init__(self, opened: asyncio.Future, received: dict, pix_id: str):
+        self.opened = opened
+        self.received = received
+        self.pix_id = pix_id
+        self.buffer = b""
+
+    def connection_made(self, transport):
+        transport.write(f"GET /events/{self.pix_id} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+
+    def data_received(self, data):
+        self.buffer += data
+        if not self.opened.done() and b"retry:" in self.buffer:
+            self.opened.set_result(True)
+        if b"event: status" in self.buffer and self.pix_id not in self.received:
+            self.received[self.pix_id] = time.perf_counter()
+
+    def connection_lost(self, exc):
+        if not self.opened.done():
+            self.opened.set_result(False)
+
+
+async def run(connections: int, port: int, socket_path: str, publish_rate: float, server_pid: int) -> None:
+    loop = asyncio.get_running_loop()
+    received: dict = {}
+    transports = []
+    opened_ok = 0
+    start = time.perf_counter()
+    for offset in range(0, connections, 500):
+        batch = []
+        for i in range(offset, min(offset + 500, connections)):
+            opened = loop.create_future()
+            pix_id = f"pix_push_{i:07d}"
+            transport, _ = await loop.create_connection(lambda: _SseClient(opened, received, pix_id), "127.0.0.1", port)
+            transports.append(transport)
+            batch.append(opened)
+        opened_ok += sum(await asyncio.gather(*batch))
+    connect_s = time.perf_counter() - start
+
+    await asyncio.sleep(2)
+    idle_rss = _rss_mb(server_pid)
+    print(f"   Conexões SSE abertas: {opened_ok}/{connections} em {connect_s:.1f}s")
+    print(f"   RSS do servidor com todas ociosas: {idle_rss:.0f} MiB ({idle_rss * 1024 / max(opened_ok, 1):.1f} KiB/conexão)")
+
+    # Publica como os workers do webhook (um datagrama por PIX) e mede até a entrega
+    sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    published = {}
+    interval = 1.0 / publish_rate if publish_rate > 0 else 0.0
+    next_send = time.perf_counter()
+    for i in range(opened_ok):
+        pix_id = f"pix_push_{i:07d}"
+        event = {"pix_id": pix_id, "status": "PAID", "final": True, "timestamp": time.time()}
+        published[pix_id] = time.perf_counter()
+        sender.sendto(json.dumps(event).encode(), socket_path)
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif i % 200 == 0:
+            await asyncio.sleep(0)
+
+    deadline = time.perf_counter() + 30
+    while len(received) < opened_ok and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    latencies = [received[pix_id] - sent for pix_id, sent in published.items() if pix_id in received]
+    print(f"   Eventos entregues: {len(latencies)}/{opened_ok}")
+    print_summary("webhook → navegador", summarize(latencies))
+    for transport in transports:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do status por push (SSE)")
+    parser.add_argument("--connections", type=int, default=10000, help="Conexões SSE ociosas")
+    parser.add_argument("--publish-rate", type=float, default=2000, help="Eventos publicados por segundo (0 = sem limite)")
+    parser.add_argument("--port", type=int, default=5711, help="Porta do servidor de push")
+    args = parser.parse_args()
+
+    # Cada conexão usa um descritor aqui e outro no servidor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.connections + 100 > hard:
+        args.connections = hard - 100
+        print(f"⚠️ Limite de arquivos abertos ({hard}): usando {args.connections} conexões")
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="pix_push_"), "push.sock")
+    env = dict(os.environ, PUSH_PORT=str(args.port), PUSH_SOCKET=socket_path, PUSH_HEARTBEAT="15",
+               PIX_STATUS_CACHE_DIR="", METRICS_PORT="0")
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "status_push.py"), "--host", "127.0.0.1", "--port", str(args.port), "--socket", socket_path],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        print("🌵 PrescrevaMe Premium - Benchmark Status por Push")
+        print("=" * 70)
+        print(f"   Servidor vazio: {_rss_mb(server.pid):.0f} MiB")
+        asyncio.run(run(args.connections, args.port, socket_path, args.publish_rate, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
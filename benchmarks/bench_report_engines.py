@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark dos Motores de Relatório
+Compara tempo e pico de memória (RSS) do motor python (run_reports, um
+incremento de dicionário por evento) com o colunar (run_columnar_reports,
+pandas/Arrow) e confere que os relatórios são idênticos, inclusive na ordem
+das chaves.
+
+Cada motor roda em um subprocesso próprio para que o pico de RSS de um não
+contamine o outro.
+
+Uso:
+    python3 -m benchmarks.bench_report_engines [--events 1000000] [--file payment_logs.json] [--with-csv]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_reports import _max_rss_mb
+from benchmarks.synthetic import write_jsonl
+
+
+def run_engine(engine: str, log_file: str, csv_file: str) -> dict:
+    """Executa um motor no processo atual (chamado pelo subprocesso)"""
+    from transaction_report import TransactionReporter
+
+    reporter = TransactionReporter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        if engine == "columnar":
+            reports = reporter.run_columnar_reports(csv_file or None, backend="jsonl", log_file=log_file)
+        else:
+            reports = reporter.run_reports(reporter.iter_payment_logs(log_file), csv_file or None)
+    wall = time.perf_counter() - start
+
+    # Sem sort_keys: a ordem das chaves faz parte da saída
+    output = json.dumps([reports["events"], reports["summary"], reports["prescreva_me"]], ensure_ascii=False)
+    return {
+        "engine": engine,
+        "events": reports["events"],
+        "wall_s": wall,
+        "max_rss_mb": _max_rss_mb(),
+        "reports_digest": hashlib.sha256(output.encode("utf-8")).hexdigest()[:16]
+    }
+
+
+def spawn(engine: str, log_file: str, csv_file: str = "") -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_report_engines", "--engine", engine, "--file", log_file, "--csv", csv_file],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de relatório (python x colunar)")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Eventos sintéticos (se --file não existir)")
+    parser.add_argument("--file", default=None, help="payment_logs.json existente (ou destino do sintético)")
+    parser.add_argument("--with-csv", action="store_true", help="Gravar também o CSV detalhado (exige leitura linha a linha)")
+    parser.add_argument("--csv", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--engine", choices=("python", "columnar"), default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        print(json.dumps(run_engine(args.engine, args.file, args.csv)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="pix_engines_bench_")
+    log_file = args.file or os.path.join(workdir, "payment_logs.json")
+    if not os.path.exists(log_file):
+        print(f"📝 Gerando {args.events} eventos sintéticos em {log_file}...")
+        write_jsonl(log_file, args.events)
+
+    print("🌵 PrescrevaMe Premium - Benchmark Motores de Relatório")
+    print("=" * 70)
+    print(f"   Arquivo: {log_file} ({os.path.getsize(log_file) / 1024**2:.0f} MiB, CSV: {'sim' if args.with_csv else 'não'})")
+    print(f"   {'motor':<12}{'tempo':>10}{'pico RSS':>14}")
+
+    results = []
+    for engine in ("python", "columnar"):
+        csv_file = os.path.join(workdir, f"{engine}.csv") if args.with_csv else ""
+        result = spawn(engine, log_file, csv_file)
+        results.append(result)
+        print(f"   {engine:<12}{result['wall_s']:>9.2f}s{result['max_rss_mb']:>11.0f}MiB")
+
+    python, columnar = results
+    print(f"\n   Tempo: {python['wall_s'] / columnar['wall_s']:.2f}x  "
+          f"Memória: {columnar['max_rss_mb'] / python['max_rss_mb']:.1f}x a do motor python")
+    identical = python["reports_digest"] == columnar["reports_digest"]
+    if args.with_csv:
+        with open(os.path.join(workdir, "python.csv"), "rb") as a, open(os.path.join(workdir, "columnar.csv"), "rb") as b:
+            identical = identical and a.read() == b.read()
+    print(f"   Saídas idênticas: {'✅' if identical else '❌'}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark dos Relatórios
+Compara pico de memória (RSS) e tempo do relatório materializado (lista com
+todos os logs + relatórios separados, como o main() fazia) com a passada
+única em streaming de TransactionReporter.run_reports
+
+Cada modo roda em um subprocesso próprio para que o pico de RSS de um não
+contamine o outro.
+
+Uso:
+    python3 -m benchmarks.bench_reports [--events 2000000] [--file payment_logs.json]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_jsonl
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def run_mode(mode: str, log_file: str, csv_file: str) -> dict:
+    """Executa um modo no processo atual (chamado pelo subprocesso)"""
+    from transaction_report import TransactionReporter
+
+    reporter = TransactionReporter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        if mode == "legacy":
+            logs = reporter.load_payment_logs(log_file)
+            summary = reporter.generate_summary_report(logs)
+            detailed = reporter.generate_detailed_report(logs)
+            prescreva = reporter.generate_prescreva_me_report(logs)
+            reporter.export_to_csv(detailed, csv_file)
+        else:
+            reports = reporter.run_reports(reporter.iter_payment_logs(log_file), csv_file)
+            summary, prescreva = reports["summary"], reports["prescreva_me"]
+    wall = time.perf_counter() - start
+
+    with open(csv_file, "rb") as f:
+        csv_digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    return {
+        "mode": mode,
+        "wall_s": wall,
+        "max_rss_mb": _max_rss_mb(),
+        "reports_digest": _digest(summary, prescreva),
+        "csv_digest": csv_digest
+    }
+
+
+def spawn(mode: str, log_file: str, csv_file: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_reports", "--mode", mode, "--file", log_file, "--csv", csv_file],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos relatórios de transações")
+    parser.add_argument("--events", type=int, default=2_000_000, help="Eventos sintéticos (se --file não existir)")
+    parser.add_argument("--file", default=None, help="payment_logs.json existente (ou destino do sintético)")
+    parser.add_argument("--csv", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=("legacy", "streaming"), default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.file, args.csv)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="pix_reports_bench_")
+    log_file = args.file or os.path.join(workdir, "payment_logs.json")
+    if not os.path.exists(log_file):
+        print(f"📝 Gerando {args.events} eventos sintéticos em {log_file}...")
+        write_jsonl(log_file, args.events)
+
+    print("🌵 PrescrevaMe Premium - Benchmark Relatórios")
+    print("=" * 70)
+    print(f"   Arquivo: {log_file} ({os.path.getsize(log_file) / 1024**3:.2f} GiB)")
+    print(f"   {'modo':<12}{'tempo':>10}{'pico RSS':>14}")
+
+    results = []
+    for mode in ("legacy", "streaming"):
+        result = spawn(mode, log_file, os.path.join(workdir, f"{mode}.csv"))
+        results.append(result)
+        print(f"   {mode:<12}{result['wall_s']:>9.1f}s{result['max_rss_mb']:>11.0f}MiB")
+
+    legacy, streaming = results
+    print(f"\n   Memória: {legacy['max_rss_mb'] / streaming['max_rss_mb']:.1f}x menor  "
+          f"Tempo: {legacy['wall_s'] / streaming['wall_s']:.2f}x")
+    identical = legacy["reports_digest"] == streaming["reports_digest"] and legacy["csv_digest"] == streaming["csv_digest"]
+    print(f"   Saídas idênticas: {'✅' if identical else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
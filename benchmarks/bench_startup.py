@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark de Inicialização
+O PHP executa os scripts Python por requisição, então a importação dos
+módulos entra na latência de cada chamada. Mede, com `python -X importtime`,
+o tempo de importação do pix_manager e a execução completa de
+`pix_manager.py check` respondida pelo cache de status (sem rede), e falha
+se o orçamento for estourado ou se o caminho da consulta importar módulos
+pesados que ele não usa (SDK, Flask, clientes HTTP).
+
+Uso:
+    python3 -m benchmarks.bench_startup [--runs 15] [--budget-ms 50]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIX_ID = "pix_startup_bench"
+
+# Módulos que `pix_manager.py check` com cache não deve importar
+FORBIDDEN_MODULES = ("abacatepay", "flask", "httpx", "requests", "pydantic", "pandas")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Linhas de `-X importtime`
+
+    Returns:
+        (módulo, tempo próprio em µs, tempo acumulado em µs, profundidade) na ordem do relatório
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = head.split(":", 1)[1]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def import_time_us(env: Dict[str, str], module: str = "pix_manager") -> Tuple[int, List[Tuple[str, int]]]:
+    """Tempo acumulado de `import module` e os imports diretos mais caros"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=env["BENCH_WORKDIR"], env=env, capture_output=True, text=True, check=True
+    ).stderr
+    entries = parse_importtime(stderr)
+    total = next(cumulative for name, _, cumulative, depth in entries if name == module and depth == 0)
+    # Filhos diretos do módulo: profundidade 1 entre o início do seu bloco e a sua linha
+    end = next(i for i, (name, _, _, depth) in enumerate(entries) if name == module and depth == 0)
+    start = end
+    while start > 0 and entries[start - 1][3] > 0:
+        start -= 1
+    children = [(name, cumulative) for name, _, cumulative, depth in entries[start:end] if depth == 1]
+    return total, sorted(children, key=lambda child: -child[1])
+
+
+def run_check(env: Dict[str, str], importtime: bool = False) -> Tuple[float, List[str], Dict]:
+    """Executa `pix_manager.py check` uma vez: (segundos, módulos importados se `importtime`, resultado JSON)"""
+    flags = ["-X", "importtime"] if importtime else []
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *flags, os.path.join(REPO_ROOT, "pix_manager.py"), "check", PIX_ID],
+        cwd=env["BENCH_WORKDIR"], env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    modules = [name for name, _, _, _ in parse_importtime(completed.stderr)]
+    result = json.loads(completed.stdout.strip().splitlines()[-1]) if completed.stdout.strip() else {}
+    return wall, modules, result
+
+
+def interpreter_wall(env: Dict[str, str]) -> float:
+    """Tempo de `python -c pass` (piso de qualquer execução)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=env["BENCH_WORKDIR"], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def measure(runs: int = 15) -> Dict[str, Any]:
+    """
+    Mede a inicialização em um diretório temporário (cache de status com o PIX já pago)
+
+    Returns:
+        Dict com medianas em ms e a lista de módulos proibidos importados
+    """
+    workdir = tempfile.mkdtemp(prefix="pix_startup_bench_")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+        PIX_STATUS_CACHE_DIR=os.path.join(workdir, "status_cache"),
+        TRACE_SAMPLE_RATE="0",
+        BENCH_WORKDIR=workdir
+    )
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    try:
+        subprocess.run(
+            [sys.executable, "-c", f"from status_cache import status_cache; status_cache.set_status({PIX_ID!r}, 'PAID')"],
+            cwd=workdir, env=env, check=True
+        )
+        # Aquecimento: bytecode (.pyc) e cache do .env já gravados, como em produção
+        run_check(env)
+        _, modules, result = run_check(env, importtime=True)
+        forbidden = sorted({name.split(".")[0] for name in modules} & set(FORBIDDEN_MODULES))
+
+        imports, walls, baseline = [], [], []
+        children: List[Tuple[str, int]] = []
+        for _ in range(runs):
+            total, children = import_time_us(env)
+            imports.append(total / 1000)
+            wall, _, result = run_check(env)
+            walls.append(wall * 1000)
+            baseline.append(interpreter_wall(env) * 1000)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "import_pix_manager_ms": statistics.median(imports),
+        "check_wall_ms": statistics.median(walls),
+        "interpreter_wall_ms": statistics.median(baseline),
+        "check_over_interpreter_ms": statistics.median(walls) - statistics.median(baseline),
+        "check_cached": bool(result.get("cached")),
+        "forbidden_imports": forbidden,
+        "top_imports": [(name, cumulative / 1000) for name, cumulative in children[:8]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de inicialização de pix_manager.py check")
+    parser.add_argument("--runs", type=int, default=15, help="Execuções medidas (mediana)")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Orçamento para importar o pix_manager")
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark de Inicialização")
+    print("=" * 70)
+    result = measure(args.runs)
+    print(f"   import pix_manager:              {result['import_pix_manager_ms']:7.1f} ms (orçamento {args.budget_ms:.0f} ms)")
+    print(f"   pix_manager.py check (cache):    {result['check_wall_ms']:7.1f} ms")
+    print(f"   python -c pass:                  {result['interpreter_wall_ms']:7.1f} ms")
+    print("   Imports diretos mais caros:")
+    for name, cumulative_ms in result["top_imports"]:
+        print(f"      {name:<28}{cumulative_ms:7.1f} ms")
+
+    failures = []
+    if not result["check_cached"]:
+        failures.append("a consulta não foi respondida pelo cache de status")
+    if result["forbidden_imports"]:
+        failures.append(f"check importou {', '.join(result['forbidden_imports'])}")
+    if result["import_pix_manager_ms"] > args.budget_ms:
+        failures.append(f"import do pix_manager acima do orçamento ({result['import_pix_manager_ms']:.1f} ms)")
+    if failures:
+        for failure in failures:
+            print(f"   ❌ {failure}")
+        sys.exit(1)
+    print("   ✅ Dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
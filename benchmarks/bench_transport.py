@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Transporte HTTP
+Compara o padrão do SDK (requests.Session novo a cada chamada: TCP + TLS a
+cada requisição) com o PooledTransport compartilhado, contra o AbacatePay
+falso servido em HTTPS local com certificado autoassinado
+
+Uso:
+    python3 -m benchmarks.bench_transport [--calls 500] [--threads 8]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import requests
+
+from abacatepay_transport import PooledAbacatePay, PooledTransport, _h2_available
+from benchmarks.common import print_summary, summarize
+from benchmarks.fake_abacatepay import FakeAbacatePayServer
+
+
+class PerCallSessionTransport(PooledTransport):
+    """Reproduz o SDK: uma sessão (e portanto uma conexão) nova por requisição"""
+
+    def request(self, method: str, url: str, **kwargs: Any):
+        with requests.Session() as session:
+            return session.request(method, self.resolve(url), timeout=self.timeout, verify=self.verify, **kwargs)
+
+
+def make_certificate(workdir: str) -> Optional[Tuple[str, str]]:
+    """Certificado autoassinado para 127.0.0.1 (None se o openssl não estiver disponível)"""
+    if shutil.which("openssl") is None:
+        return None
+    certfile, keyfile = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+
+def run(client: PooledAbacatePay, calls: int, threads: int):
+    """`calls` checks divididos entre `threads` threads; retorna latências e duração"""
+    latencies, lock = [], threading.Lock()
+    per_thread = calls // threads
+
+    def worker(index: int):
+        local = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            client.pixQrCode.check(f"pix_transport_{index}_{i}")
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do transporte HTTP do AbacatePay")
+    parser.add_argument("--calls", type=int, default=500, help="Chamadas por cenário")
+    parser.add_argument("--threads", type=int, default=8, help="Threads no cenário concorrente")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pix_transport_bench_")
+    certificate = make_certificate(workdir)
+    if certificate is None:
+        print("⚠️ openssl não encontrado: usando HTTP sem TLS (mede só o custo de TCP)")
+    certfile, keyfile = certificate or (None, None)
+
+    print("🌵 PrescrevaMe Premium - Benchmark Transporte HTTP")
+    print("=" * 70)
+
+    with FakeAbacatePayServer(certfile=certfile, keyfile=keyfile) as server:
+        verify = certfile or True
+        transports = [
+            ("SDK (sessão por chamada)", PerCallSessionTransport(verify=verify, base_url=server.base_url)),
+            ("PooledTransport HTTP/1.1", PooledTransport(verify=verify, base_url=server.base_url)),
+        ]
+        if _h2_available():
+            # O servidor local só fala HTTP/1.1: mede o pool do httpx (ALPN volta para HTTP/1.1)
+            transports.append(("PooledTransport httpx", PooledTransport(verify=verify, base_url=server.base_url, http2=True)))
+
+        print(f"   {server.base_url}  {args.calls} checks por cenário")
+        for threads in (1, args.threads):
+            print(f"\n   🔁 {threads} thread(s)")
+            for label, transport in transports:
+                client = PooledAbacatePay("bench_key", transport=transport)
+                before = server.connections
+                latencies, duration = run(client, args.calls, threads)
+                print_summary(label, summarize(latencies))
+                print(f"   {'':<28} {len(latencies) / duration:8.0f} chamadas/s  "
+                      f"{server.connections - before} conexões (handshakes)")
+
+        for _, transport in transports:
+            transport.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Benchmark do Pool de PIX Pré-criados
+Simula clientes chegando ao checkout (processo de Poisson) e mede o tempo
+de `create_pix_payment` sem pool e com o pool mantido pelo WarmPoolRefiller,
+contra o AbacatePay falso com latência. Mostra também a taxa de acerto e
+quantas cobranças foram criadas e descartadas sem uso (o custo do pool).
+
+Uso:
+    python3 -m benchmarks.bench_warm_pool [--rate 5] [--duration 20] [--size 3] [--latency 0.3] [--max-age 10]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.common import print_summary, quiet, summarize
+from benchmarks.fake_abacatepay import FakeAbacatePayServer
+
+AMOUNT, EXPIRES_IN = 34700, 900
+
+
+def _arrivals(manager, rate: float, duration: float, seed: int) -> List[float]:
+    """Dispara create_pix_payment em instantes de Poisson por `duration` segundos"""
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def checkout(i: int) -> None:
+        start = time.perf_counter()
+        result = manager.create_pix_payment(
+            f"Cliente {i}", f"cliente{i}@exemplo.com", "+55 11 99999-9999", f"{i:011d}",
+            amount=AMOUNT, expires_in=EXPIRES_IN
+        )
+        if result.get("success"):
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        i = 0
+        while time.monotonic() < deadline:
+            pool.submit(checkout, i)
+            i += 1
+            time.sleep(rng.expovariate(rate))
+    return latencies
+
+
+def run(args) -> Dict[str, Any]:
+    from abacatepay_transport import PooledAbacatePay, PooledTransport
+    from pix_manager import PrescrevaMePixManager
+    from pix_warm_pool import WarmPixPool, WarmPoolRefiller, WarmTarget
+    from rate_limiter import TokenBucket
+
+    results: Dict[str, Any] = {}
+    pool_dir = tempfile.mkdtemp(prefix="pix_warm_pool_bench_")
+    with FakeAbacatePayServer(latency=args.latency) as server:
+        transport = PooledTransport(pool_size=64, base_url=server.base_url)
+        client = PooledAbacatePay("bench_key", transport)
+        try:
+            cold = PrescrevaMePixManager(client=client, rate_limiter=TokenBucket(0), warm_pool=WarmPixPool(""))
+            with quiet():
+                results["sem pool"] = summarize(_arrivals(cold, args.rate, args.duration, args.seed))
+
+            pool = WarmPixPool(pool_dir)
+            manager = PrescrevaMePixManager(client=client, rate_limiter=TokenBucket(0), warm_pool=pool)
+            target = WarmTarget(AMOUNT, EXPIRES_IN, args.size, "Benchmark")
+            refiller = WarmPoolRefiller(manager, [target], pool=pool, max_age=args.max_age, workers=args.refill_workers)
+            stop = threading.Event()
+            worker = threading.Thread(target=refiller.run, args=(stop, args.interval), daemon=True)
+            with quiet():
+                worker.start()
+                # Pool cheio antes de abrir o checkout
+                deadline = time.monotonic() + 30
+                while pool.available(target.sku) < args.size and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                results["com pool"] = summarize(_arrivals(manager, args.rate, args.duration, args.seed))
+                stop.set()
+                worker.join()
+                refiller.close()
+                pool.ingest()
+            results["pool"] = pool.stats()
+        finally:
+            transport.close()
+            shutil.rmtree(pool_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de PIX pré-criados")
+    parser.add_argument("--rate", type=float, default=5.0, help="Clientes por segundo no checkout")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de chegadas por configuração")
+    parser.add_argument("--size", type=int, default=3, help="Cobranças mantidas no pool")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latência simulada do pixQrCode.create (s)")
+    parser.add_argument("--max-age", type=float, default=10.0, help="Segundos em que uma cobrança fica no pool")
+    parser.add_argument("--interval", type=float, default=0.2, help="Intervalo do WarmPoolRefiller (s)")
+    parser.add_argument("--refill-workers", type=int, default=4, help="Criações simultâneas de reposição")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("🌵 PrescrevaMe Premium - Benchmark Pool de PIX Pré-criados")
+    print("=" * 70)
+    print(f"   {args.rate:g} clientes/s por {args.duration:g}s, API com {args.latency * 1000:.0f} ms, "
+          f"pool de {args.size} (até {args.max_age:g}s)")
+    results = run(args)
+    print_summary("sem pool", results["sem pool"])
+    print_summary("com pool", results["com pool"])
+    stats = results["pool"]
+    hit_rate = stats["hit_rate"] or 0.0
+    print(f"   Acerto do pool: {hit_rate:.0%} ({stats['hits']} entregues, {stats['misses']} criadas na hora)")
+    print(f"   Reposição: {stats['refilled']} cobranças criadas, {stats['retired']} descartadas sem uso")
+
+
+if __name__ == "__main__":
+    main()
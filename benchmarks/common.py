@@ -0,0 +1,61 @@
+"""
+PrescrevaMe Premium - Utilitários de Benchmark
+Funções compartilhadas para medir e resumir latências
+"""
+
+import contextlib
+import io
+import logging
+import math
+from typing import Dict, Iterator, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """
+    Calcula o percentil (nearest-rank) de uma amostra
+
+    Args:
+        samples: Valores medidos
+        pct: Percentil desejado (0-100)
+
+    Returns:
+        Valor do percentil, ou 0.0 para amostra vazia
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Resume latências (em segundos) em milissegundos"""
+    if not latencies:
+        return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def print_summary(label: str, stats: Dict[str, float]) -> None:
+    """Imprime uma linha de resumo de latências"""
+    print(
+        f"   {label:<28} n={stats['count']:<6} "
+        f"p50={stats['p50_ms']:8.2f}ms  p99={stats['p99_ms']:8.2f}ms  "
+        f"média={stats['mean_ms']:8.2f}ms"
+    )
+
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """Silencia prints e logs do código medido (erros esperados, p.ex. na simulação de falhas)"""
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
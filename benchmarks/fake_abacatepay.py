@@ -0,0 +1,358 @@
+"""
+PrescrevaMe Premium - AbacatePay Falso
+Cliente em memória com a mesma interface do SDK (client.pixQrCode.create/check/simulate)
+e um servidor HTTP local que imita os endpoints REST, para benchmarks repetíveis
+sem tocar na API real
+"""
+
+import http.client
+import itertools
+import json
+import socket
+import ssl
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from rate_limiter import TokenBucket
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    """Lê um campo de um modelo pydantic ou de um dict"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class FakePixQrCodeClient:
+    """Implementação em memória de client.pixQrCode"""
+
+    def __init__(self, latency: float = 0.0, auto_create: bool = True):
+        """
+        Args:
+            latency: Atraso artificial por chamada em segundos
+            auto_create: Se True, check/simulate de IDs desconhecidos criam um PIX PENDING
+        """
+        self.latency = latency
+        self.auto_create = auto_create
+        self._store: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.calls = {"create": 0, "check": 0, "simulate": 0}
+
+    def _sleep(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _new_record(self, pix_id: str, amount: int = 34700, expires_in: int = 900) -> Dict[str, Any]:
+        now = datetime.now()
+        return {
+            "id": pix_id,
+            "amount": amount,
+            "status": "PENDING",
+            "brcode": f"00020101021226fake{pix_id}",
+            "brcode_base64": "data:image/png;base64,ZmFrZQ==",
+            "expires_at": (now + timedelta(seconds=expires_in)).isoformat(),
+            "created_at": now.isoformat(),
+            "dev_mode": True,
+        }
+
+    def _get(self, pix_id: str) -> Dict[str, Any]:
+        with self._lock:
+            record = self._store.get(pix_id)
+            if record is None:
+                if not self.auto_create:
+                    raise ValueError(f"PIX não encontrado: {pix_id}")
+                record = self._store[pix_id] = self._new_record(pix_id)
+            return record
+
+    def create(self, data: Any) -> SimpleNamespace:
+        self._sleep()
+        with self._lock:
+            self.calls["create"] += 1
+            pix_id = f"pix_char_fake{next(self._ids):08d}"
+            record = self._new_record(
+                pix_id,
+                amount=_field(data, "amount", 34700),
+                expires_in=_field(data, "expires_in", 900),
+            )
+            customer = _field(data, "customer")
+            if customer is not None:
+                record["customer_email"] = _field(customer, "email")
+            self._store[pix_id] = record
+        return SimpleNamespace(**record)
+
+    def check(self, pix_id: str) -> SimpleNamespace:
+        self._sleep()
+        record = self._get(pix_id)
+        with self._lock:
+            self.calls["check"] += 1
+        return SimpleNamespace(status=record["status"], expires_at=record["expires_at"])
+
+    def simulate(self, pix_id: str, metadata: Optional[Dict] = None) -> SimpleNamespace:
+        self._sleep()
+        record = self._get(pix_id)
+        with self._lock:
+            self.calls["simulate"] += 1
+            record["status"] = "PAID"
+        return SimpleNamespace(**record)
+
+    def set_status(self, pix_id: str, status: str) -> None:
+        """Força o status de um PIX (para simular pagamento/expiração)"""
+        self._get(pix_id)["status"] = status
+
+
+class FakeAbacatePay:
+    """Substituto de abacatepay.AbacatePay para benchmarks"""
+
+    def __init__(self, latency: float = 0.0, auto_create: bool = True):
+        self.pixQrCode = FakePixQrCodeClient(latency=latency, auto_create=auto_create)
+
+
+# Campos da resposta REST (camelCase) -> atributos do SDK (snake_case)
+_REST_FIELDS = {
+    "id": "id",
+    "amount": "amount",
+    "status": "status",
+    "brCode": "brcode",
+    "brCodeBase64": "brcode_base64",
+    "expiresAt": "expires_at",
+    "createdAt": "created_at",
+    "devMode": "dev_mode",
+}
+
+
+def _to_rest(record: Dict[str, Any]) -> Dict[str, Any]:
+    rest = {rest: record[attr] for rest, attr in _REST_FIELDS.items() if attr in record}
+    # Campos exigidos pelos modelos do SDK (PixQrCode.model_validate)
+    rest.setdefault("platformFee", 80)
+    rest.setdefault("updatedAt", record.get("created_at"))
+    return rest
+
+
+def _from_rest(data: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(**{_REST_FIELDS.get(key, key): value for key, value in data.items()})
+
+
+class _FakeApiHandler(BaseHTTPRequestHandler):
+    """Endpoints /v1/pixQrCode/* no formato {"data": ..., "error": null}"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Cabeçalhos e corpo saem em writes separados; sem NODELAY o ACK atrasado soma ~40ms
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.connections_lock:
+            self.server.connections += 1
+
+    def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _dispatch(self, method: str) -> None:
+        store: FakePixQrCodeClient = self.server.store
+        url = urlparse(self.path)
+        pix_id = parse_qs(url.query).get("id", [""])[0]
+        try:
+            if self.server.outage:
+                # Upstream degradado: responde 503 só depois de `outage` segundos
+                self._read_json()
+                with self.server.connections_lock:
+                    self.server.outage_hits += 1
+                time.sleep(self.server.outage)
+                self._reply(503, {"data": None, "error": "Service unavailable"})
+                return
+            limiter = self.server.limiter
+            if limiter is not None and not limiter.try_acquire():
+                self._read_json()
+                with self.server.connections_lock:
+                    self.server.rate_limited += 1
+                self._reply(429, {"data": None, "error": "Too many requests"}, {"Retry-After": "1"})
+                return
+            if method == "POST" and url.path.endswith("/pixQrCode/create"):
+                body = self._read_json()
+                created = store.create({
+                    "amount": body.get("amount", 34700),
+                    # O SDK serializa o PixQrCodeIn sem alias (expires_in); a API documenta expiresIn
+                    "expires_in": body.get("expiresIn", body.get("expires_in", 900)),
+                    "customer": body.get("customer")
+                })
+                self._reply(200, {"data": _to_rest(vars(created)), "error": None})
+            elif method == "GET" and url.path.endswith("/pixQrCode/check"):
+                checked = store.check(pix_id)
+                self._reply(200, {"data": {"status": checked.status, "expiresAt": checked.expires_at}, "error": None})
+            elif method == "POST" and url.path.endswith("/pixQrCode/simulate-payment"):
+                self._read_json()
+                simulated = store.simulate(pix_id)
+                self._reply(200, {"data": _to_rest(vars(simulated)), "error": None})
+            else:
+                self._reply(404, {"data": None, "error": "Not found"})
+        except ValueError as e:
+            self._reply(404, {"data": None, "error": str(e)})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # o padrão (5) descarta conexões em rajadas de centenas de clientes
+
+    def handle_error(self, request, client_address):
+        # Clientes que caem no meio da resposta (timeouts, SIGKILL nos testes) não são erro do servidor
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeAbacatePayServer:
+    """Servidor HTTP local que imita a API REST do AbacatePay"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        auto_create: bool = True,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        rate_limit: Optional[float] = None
+    ):
+        """
+        Args:
+            host: Interface de escuta
+            port: Porta (0 = escolher uma livre)
+            latency: Atraso artificial por requisição em segundos
+            auto_create: Se True, IDs desconhecidos são tratados como PIX PENDING
+            certfile: Certificado para servir HTTPS (TLS) em vez de HTTP
+            keyfile: Chave privada do certificado
+            rate_limit: Requisições por segundo aceitas; acima disso responde 429 com Retry-After
+        """
+        self.store = FakePixQrCodeClient(latency=latency, auto_create=auto_create)
+        self._server = _FakeHTTPServer((host, port), _FakeApiHandler)
+        self._server.store = self.store
+        self._server.connections = 0
+        self._server.connections_lock = threading.Lock()
+        self._server.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._server.rate_limited = 0
+        self._server.outage = 0.0
+        self._server.outage_hits = 0
+        self.tls = certfile is not None
+        if self.tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}/v1"
+
+    @property
+    def rate_limited(self) -> int:
+        """Requisições recusadas com 429"""
+        return self._server.rate_limited
+
+    @property
+    def outage(self) -> float:
+        """Segundos até cada requisição receber 503 (0 = API saudável)"""
+        return self._server.outage
+
+    @outage.setter
+    def outage(self, seconds: float) -> None:
+        self._server.outage = seconds
+
+    @property
+    def outage_hits(self) -> int:
+        """Requisições que chegaram durante a indisponibilidade simulada"""
+        return self._server.outage_hits
+
+    @property
+    def connections(self) -> int:
+        """Conexões aceitas (com TLS, cada uma é um handshake completo)"""
+        return self._server.connections
+
+    def start(self) -> "FakeAbacatePayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeAbacatePayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakeHTTPPixQrCodeClient:
+    """client.pixQrCode que fala HTTP com o FakeAbacatePayServer (uma conexão keep-alive por thread)"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parsed = urlparse(base_url)
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._prefix = parsed.path.rstrip("/")
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            conn.request(method, self._prefix + path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = json.loads(response.read())
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        if response.status >= 400:
+            raise ValueError(data.get("error") or f"HTTP {response.status}")
+        return data["data"]
+
+    def create(self, data: Any) -> SimpleNamespace:
+        payload = {"amount": _field(data, "amount", 34700), "expiresIn": _field(data, "expires_in", 900)}
+        return _from_rest(self._request("POST", "/pixQrCode/create", payload))
+
+    def check(self, pix_id: str) -> SimpleNamespace:
+        return _from_rest(self._request("GET", f"/pixQrCode/check?id={pix_id}"))
+
+    def simulate(self, pix_id: str, metadata: Optional[Dict] = None) -> SimpleNamespace:
+        return _from_rest(self._request("POST", f"/pixQrCode/simulate-payment?id={pix_id}", {"metadata": metadata or {}}))
+
+
+class FakeAbacatePayHTTP:
+    """Substituto de abacatepay.AbacatePay que usa o FakeAbacatePayServer via HTTP"""
+
+    def __init__(self, base_url: str):
+        self.pixQrCode = FakeHTTPPixQrCodeClient(base_url)
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Teste de Carga do Webhook
+Dispara notificações contra /webhook/abacatepay com conexões keep-alive
+concorrentes e reporta requisições/s, erros e latência de cauda. As
+notificações são sintetizadas (mistura de pix.paid/pix.expired/pix.cancelled)
+ou reproduzidas de um payment_logs.json, com assinatura HMAC-SHA256 no
+esquema de WebhookHandler.verify_signature e uma fração de reenvios
+(duplicatas) configurável.
+
+Sem --rate cada conexão envia a próxima requisição assim que recebe a
+resposta (vazão máxima). Com --rate as requisições têm horário marcado
+(carga aberta): se o servidor não acompanha, a latência medida a partir do
+horário marcado mostra a fila que se formou.
+
+Uso:
+    python3 -m benchmarks.load_webhook --url http://127.0.0.1:5000 [--requests 20000] [--concurrency 32]
+    python3 -m benchmarks.load_webhook --spawn --workers 4   # sobe o webhook_handler.py em um diretório temporário
+    python3 -m benchmarks.load_webhook --spawn --rate 500 --mix paid=0.6,expired=0.3,cancelled=0.1 --duplicates 0.1
+    python3 -m benchmarks.load_webhook --url http://127.0.0.1:5000 --replay payment_logs.json --secret "$WEBHOOK_SECRET"
+"""
+
+import argparse
+import hashlib
+import hmac
+import http.client
+import itertools
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.common import percentile
+
+WEBHOOK_PATH = "/webhook/abacatepay"
+SIGNATURE_HEADER = "X-AbacatePay-Signature"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EVENT_TYPES = {"paid": "pix.paid", "expired": "pix.expired", "cancelled": "pix.cancelled"}
+STATUS_EVENT_TYPES = {"PAID": "pix.paid", "EXPIRED": "pix.expired", "CANCELLED": "pix.cancelled"}
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def notification(i: int, event_type: str = "pix.paid") -> bytes:
+    return json.dumps({
+        "type": event_type,
+        "data": {
+            "id": f"pix_load_{i:010d}",
+            "amount": 34700,
+            "customer": {"name": f"Cliente {i}", "email": f"cliente{i}@exemplo.com"},
+            "created_at": "2025-01-01T00:00:00"
+        }
+    }).encode("utf-8")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Interpreta --mix
+
+    Args:
+        spec: "paid=0.7,expired=0.25,cancelled=0.05" (pesos relativos)
+
+    Returns:
+        {tipo do evento: peso}
+    """
+    mix: Dict[str, float] = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, weight = part.partition("=")
+        event_type = EVENT_TYPES.get(name.strip().lower(), name.strip())
+        if event_type not in EVENT_TYPES.values():
+            raise ValueError(f"tipo de evento desconhecido: {name}")
+        mix[event_type] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("mistura vazia")
+    return mix
+
+
+def synthetic_notifications(mix: Dict[str, float], seed: int = 42) -> Iterator[Tuple[str, bytes]]:
+    """Notificações sintéticas com tipos sorteados pela mistura"""
+    rng = random.Random(seed)
+    types, weights = list(mix), list(mix.values())
+    for i in itertools.count():
+        event_type = rng.choices(types, weights)[0]
+        yield event_type, notification(i, event_type)
+
+
+def replay_notifications(log_file: str) -> Iterator[Tuple[str, bytes]]:
+    """Notificações reconstruídas das linhas do payment_logs.json (formato de _save_payment_log)"""
+    with open(log_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            event_type = STATUS_EVENT_TYPES.get(entry.get("status"))
+            if event_type is None:
+                continue
+            data = entry.get("data") or {
+                "id": entry.get("pix_id"),
+                "amount": entry.get("amount", 0),
+                "customer": entry.get("customer", {})
+            }
+            yield event_type, json.dumps({"type": event_type, "data": data}, ensure_ascii=False).encode("utf-8")
+
+
+def sign(body: bytes, secret: str) -> str:
+    """Assinatura do corpo como em WebhookHandler.verify_signature (HMAC-SHA256 em hex)"""
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def build_plan(
+    source: Iterator[Tuple[str, bytes]],
+    requests: int,
+    duplicates: float = 0.0,
+    secret: Optional[str] = None,
+    seed: int = 42
+) -> List[Tuple[str, bytes, Dict[str, str]]]:
+    """
+    Monta as requisições antes da carga (serialização e HMAC fora da medição)
+
+    Args:
+        source: (tipo, corpo) das notificações
+        requests: Total de requisições
+        duplicates: Fração de requisições que reenviam uma notificação já enviada
+        secret: Segredo do webhook para assinar (None = sem assinatura)
+
+    Returns:
+        Lista de (rótulo, corpo, headers); reenvios têm o rótulo "duplicate"
+    """
+    rng = random.Random(seed)
+    plan: List[Tuple[str, bytes, Dict[str, str]]] = []
+    sent: List[Tuple[bytes, Dict[str, str]]] = []
+    for _ in range(requests):
+        if sent and rng.random() < duplicates:
+            body, headers = rng.choice(sent)
+            plan.append(("duplicate", body, headers))
+            continue
+        try:
+            event_type, body = next(source)
+        except StopIteration:
+            break
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers[SIGNATURE_HEADER] = sign(body, secret)
+        sent.append((body, headers))
+        plan.append((event_type, body, headers))
+    return plan
+
+
+def run_plan(url: str, plan: List[Tuple[str, bytes, Dict[str, str]]], concurrency: int, rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Executa as requisições do plano
+
+    Args:
+        url: URL base do webhook_handler
+        plan: Saída de build_plan
+        concurrency: Conexões simultâneas
+        rate: Requisições/s marcadas (0 = o mais rápido possível)
+
+    Returns:
+        Latências (s) por rótulo, latências desde o horário marcado, respostas por código e duração
+    """
+    target = urllib.parse.urlsplit(url)
+    counter = itertools.count()
+    latencies: Dict[str, List[float]] = {}
+    scheduled_latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local: Dict[str, List[float]] = {}
+        local_scheduled: List[float] = []
+        local_statuses: Dict[str, int] = {}
+        while True:
+            i = next(counter)
+            if i >= len(plan):
+                break
+            label, body, headers = plan[i]
+            due = start + i / rate if rate > 0 else None
+            if due is not None:
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            began = time.perf_counter()
+            try:
+                conn.request("POST", WEBHOOK_PATH, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                code = str(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                code = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            finished = time.perf_counter()
+            local_statuses[code] = local_statuses.get(code, 0) + 1
+            local.setdefault(label, []).append(finished - began)
+            if due is not None:
+                local_scheduled.append(finished - due)
+        conn.close()
+        with lock:
+            for label, samples in local.items():
+                latencies.setdefault(label, []).extend(samples)
+            scheduled_latencies.extend(local_scheduled)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "latencies": latencies,
+        "scheduled_latencies": scheduled_latencies,
+        "statuses": statuses,
+        "duration": time.perf_counter() - start
+    }
+
+
+def run_load(url: str, requests: int, concurrency: int) -> Tuple[List[float], int, float]:
+    """
+    Executa a carga padrão (pix.paid distintos, sem assinatura, vazão máxima)
+
+    Returns:
+        (latências em segundos, erros, duração total)
+    """
+    plan = build_plan(synthetic_notifications({"pix.paid": 1.0}), requests)
+    result = run_plan(url, plan, concurrency)
+    errors = sum(count for code, count in result["statuses"].items() if code != "200")
+    return [sample for samples in result["latencies"].values() for sample in samples], errors, result["duration"]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    summary = {f"p{pct:g}_ms": percentile(samples, pct) * 1000 for pct in PERCENTILES}
+    summary["max_ms"] = max(samples, default=0) * 1000
+    return summary
+
+
+def summarize_run(result: Dict[str, Any], rate: float = 0.0) -> Dict[str, Any]:
+    """Resumo legível por máquina de um run_plan"""
+    all_samples = [sample for samples in result["latencies"].values() for sample in samples]
+    sent = len(all_samples)
+    errors = sum(count for code, count in result["statuses"].items() if code != "200")
+    summary = {
+        "requests": sent,
+        "duration_s": result["duration"],
+        "target_rps": rate or None,
+        "achieved_rps": sent / result["duration"] if result["duration"] > 0 else 0.0,
+        "errors": errors,
+        "error_rate": errors / sent if sent else 0.0,
+        "statuses": dict(sorted(result["statuses"].items())),
+        "latency": _latency_summary(all_samples),
+        "by_type": {
+            label: {"requests": len(samples), **_latency_summary(samples)}
+            for label, samples in sorted(result["latencies"].items())
+        }
+    }
+    if result["scheduled_latencies"]:
+        summary["latency_from_schedule"] = _latency_summary(result["scheduled_latencies"])
+    return summary
+
+
+def _format_latency(summary: Dict[str, float]) -> str:
+    return "  ".join(f"p{pct:g}={summary[f'p{pct:g}_ms']:.2f}ms" for pct in PERCENTILES) + \
+        f"  max={summary['max_ms']:.2f}ms"
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    target = f" (alvo {summary['target_rps']:.0f} req/s)" if summary["target_rps"] else ""
+    print(f"   Requisições:   {summary['requests']} em {summary['duration_s']:.2f}s "
+          f"({summary['errors']} erros, {summary['error_rate']:.2%})")
+    print(f"   Vazão:         {summary['achieved_rps']:.0f} req/s{target}")
+    print(f"   Respostas:     {', '.join(f'{code}={count}' for code, count in summary['statuses'].items())}")
+    print(f"   Latência:      {_format_latency(summary['latency'])}")
+    if "latency_from_schedule" in summary:
+        print(f"   Desde o horário marcado: {_format_latency(summary['latency_from_schedule'])}")
+    for label, stats in summary["by_type"].items():
+        print(f"   {label:<14} n={stats['requests']:<7} p50={stats['p50_ms']:.2f}ms  p99={stats['p99_ms']:.2f}ms")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers: int, threads: int, env: Optional[Dict[str, str]] = None) -> Tuple[subprocess.Popen, str]:
+    """Sobe o webhook_handler.py em um diretório temporário (bancos e logs descartáveis)"""
+    port = _free_port()
+    workdir = tempfile.mkdtemp(prefix="pix_webhook_load_")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "webhook_handler.py"),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--threads", str(threads)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env={**os.environ, **(env or {})}
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/webhook/status")
+            if conn.getresponse().status == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("webhook_handler.py não respondeu em 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga e reprodução de webhooks")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="URL base do webhook_handler")
+    parser.add_argument("--requests", type=int, default=20000, help="Total de requisições (no --replay, o máximo)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Conexões simultâneas")
+    parser.add_argument("--rate", type=float, default=0.0, help="Requisições/s marcadas (0 = vazão máxima)")
+    parser.add_argument("--mix", default="paid=1", help="Pesos dos tipos sintetizados: paid=0.7,expired=0.25,cancelled=0.05")
+    parser.add_argument("--replay", default=None, help="Reproduzir eventos de um payment_logs.json em vez de sintetizar")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Fração de reenvios de notificações já enviadas")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET"), help="Segredo HMAC (padrão: WEBHOOK_SECRET)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente dos sorteios (tipos e duplicatas)")
+    parser.add_argument("--output", default=None, help="Gravar o resumo em JSON")
+    parser.add_argument("--spawn", action="store_true", help="Subir um webhook_handler.py local para o teste")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos do servidor (--spawn)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por processo (--spawn)")
+    args = parser.parse_args()
+
+    try:
+        source = replay_notifications(args.replay) if args.replay else synthetic_notifications(parse_mix(args.mix), args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    plan = build_plan(source, args.requests, args.duplicates, args.secret, args.seed)
+    if not plan:
+        parser.error("nenhuma notificação para enviar")
+
+    process = None
+    url = args.url
+    if args.spawn:
+        process, url = spawn_server(args.workers, args.threads, {"WEBHOOK_SECRET": args.secret} if args.secret else None)
+
+    print("🌵 PrescrevaMe Premium - Teste de Carga do Webhook")
+    print("=" * 70)
+    origin = f"replay de {args.replay}" if args.replay else f"sintético ({args.mix})"
+    print(f"   Alvo: {url}{WEBHOOK_PATH}  concorrência={args.concurrency}")
+    print(f"   Notificações: {origin}, {args.duplicates:.0%} reenvios, "
+          f"{'assinadas (HMAC-SHA256)' if args.secret else 'sem assinatura'}")
+    try:
+        summary = summarize_run(run_plan(url, plan, args.concurrency, args.rate), args.rate)
+        print_report(summary)
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"📄 Resumo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Simulação de Políticas de Polling
+Simulação de eventos discretos (sem esperar em tempo real) que compara
+quantas chamadas à API cada política gasta por pagamento finalizado e
+quanto atraso de detecção ela introduz
+
+Uso:
+    python3 -m benchmarks.sim_polling [--payments 10000] [--pay-rate 0.6]
+"""
+
+import argparse
+import random
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import percentile
+from polling_policy import AdaptivePollingPolicy, FixedIntervalPolicy, PollingPolicy
+
+
+def generate_payments(count: int, expires_in: float, pay_rate: float, mean_pay: float,
+                      webhook_rate: float, rng: random.Random) -> List[Tuple[Optional[float], Optional[float]]]:
+    """
+    Gera (instante do pagamento, instante de chegada do webhook) por PIX
+
+    A maioria dos pagamentos acontece nos primeiros minutos (distribuição exponencial);
+    PIX não pagos expiram em `expires_in`.
+    """
+    payments = []
+    for _ in range(count):
+        paid_at = rng.expovariate(1 / mean_pay) if rng.random() < pay_rate else None
+        if paid_at is not None and paid_at >= expires_in:
+            paid_at = None
+        webhook_at = None
+        if paid_at is not None and rng.random() < webhook_rate:
+            webhook_at = paid_at + rng.uniform(0.5, 3.0)
+        payments.append((paid_at, webhook_at))
+    return payments
+
+
+def simulate(policy: PollingPolicy, payments, expires_in: float, skip_settled: bool) -> Dict[str, float]:
+    """Executa a política sobre os pagamentos gerados e contabiliza chamadas e atrasos"""
+    api_calls = 0
+    paid = 0
+    detection_delays = []
+
+    for paid_at, webhook_at in payments:
+        attempt = 0
+        now = policy.next_check_at(attempt, 0.0, 0.0, expires_in)
+        while now is not None:
+            if skip_settled and webhook_at is not None and now >= webhook_at:
+                # Webhook já finalizou o PIX: o monitor responde sem chamar a API
+                detection_delays.append(webhook_at - paid_at)
+                paid += 1
+                break
+            api_calls += 1
+            attempt += 1
+            if paid_at is not None and now >= paid_at:
+                detection_delays.append(now - paid_at)
+                paid += 1
+                break
+            now = policy.next_check_at(attempt, 0.0, now, expires_in)
+
+    settled = len(payments)
+    return {
+        "api_calls": api_calls,
+        "calls_per_settled": api_calls / settled if settled else 0.0,
+        "paid": paid,
+        "detect_p50_s": percentile(detection_delays, 50),
+        "detect_p99_s": percentile(detection_delays, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação de políticas de polling de PIX")
+    parser.add_argument("--payments", type=int, default=10000, help="PIX simulados")
+    parser.add_argument("--expires-in", type=float, default=900, help="Expiração do PIX (s)")
+    parser.add_argument("--pay-rate", type=float, default=0.6, help="Fração de PIX pagos")
+    parser.add_argument("--mean-pay", type=float, default=90, help="Tempo médio até o pagamento (s)")
+    parser.add_argument("--webhook-rate", type=float, default=0.95, help="Fração de pagamentos com webhook entregue")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payments = generate_payments(args.payments, args.expires_in, args.pay_rate, args.mean_pay, args.webhook_rate, rng)
+
+    scenarios = [
+        ("fixo 5s (atual)", FixedIntervalPolicy(5.0), False),
+        ("fixo 5s + webhook", FixedIntervalPolicy(5.0), True),
+        ("adaptativo", AdaptivePollingPolicy(rng=random.Random(args.seed)), False),
+        ("adaptativo + webhook", AdaptivePollingPolicy(rng=random.Random(args.seed)), True),
+    ]
+
+    print("🌵 PrescrevaMe Premium - Simulação de Polling")
+    print("=" * 86)
+    print(f"   {'cenário':<24}{'chamadas':>10}{'por PIX':>10}{'economia':>10}{'detecção p50':>15}{'p99':>10}")
+
+    baseline = None
+    for label, policy, skip in scenarios:
+        result = simulate(policy, payments, args.expires_in, skip)
+        if baseline is None:
+            baseline = result["calls_per_settled"]
+        saved = baseline - result["calls_per_settled"]
+        print(
+            f"   {label:<24}{result['api_calls']:>10}{result['calls_per_settled']:>10.1f}"
+            f"{saved:>10.1f}{result['detect_p50_s']:>14.1f}s{result['detect_p99_s']:>9.1f}s"
+        )
+
+    print("\n   economia = chamadas à API poupadas por PIX finalizado em relação ao fixo de 5s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Suíte de Benchmarks
+Roda os cenários de desempenho dos componentes Python contra o AbacatePay
+falso local e grava os resultados em JSON, para comparar commits:
+
+    pix_api         criação e consulta de PIX (vazão e latência, HTTP keep-alive)
+    monitor         fan-out do monitoramento de PIX pendentes (PaymentMonitor)
+    webhook_ingest  requisições/s no /webhook/abacatepay (webhook_handler.py em subprocesso)
+    payment_log     gravações/s de WebhookHandler._save_payment_log (SQLite e JSONL)
+    reports         TransactionReporter.run_reports sobre 10k/1M (e 10M com --full) eventos
+    startup         importação do pix_manager e `pix_manager.py check` respondido pelo cache
+
+Uso:
+    python3 -m benchmarks.suite --output resultados.json
+    python3 -m benchmarks.suite --only pix_api,payment_log --compare base.json [--threshold 0.15]
+
+Com --compare, métricas piores que a base além do limite são listadas e o
+processo sai com código 1. Métricas terminadas em `_per_s` são melhores
+quanto maiores; `_ms`, `_s` e `_mb`, quanto menores; as demais são
+informativas.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import percentile, quiet
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_SIZES = (10_000, 1_000_000)
+FULL_REPORT_SIZES = REPORT_SIZES + (10_000_000,)
+
+
+def fan_out(call: Callable[[int], Any], count: int, concurrency: int) -> Tuple[List[float], List[Any], float]:
+    """
+    Executa call(0..count-1) com `concurrency` threads
+
+    Returns:
+        (latências em segundos, resultados na ordem, duração total)
+    """
+    def timed(i: int) -> Tuple[float, Any]:
+        start = time.perf_counter()
+        result = call(i)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, range(count)))
+    duration = time.perf_counter() - start
+    return [latency for latency, _ in outcomes], [result for _, result in outcomes], duration
+
+
+def latency_metrics(prefix: str, latencies: List[float], duration: float) -> Dict[str, float]:
+    return {
+        f"{prefix}_per_s": len(latencies) / duration if duration > 0 else 0.0,
+        f"{prefix}_p50_ms": percentile(latencies, 50) * 1000,
+        f"{prefix}_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def scenario_pix_api(args) -> Dict[str, Any]:
+    from abacatepay_transport import PooledAbacatePay, PooledTransport
+    from benchmarks.fake_abacatepay import FakeAbacatePayServer
+    from pix_manager import PrescrevaMePixManager
+    from rate_limiter import TokenBucket
+    from status_cache import PixStatusCache
+
+    with FakeAbacatePayServer(latency=args.latency) as server:
+        transport = PooledTransport(pool_size=args.concurrency, base_url=server.base_url)
+        manager = PrescrevaMePixManager(
+            client=PooledAbacatePay("bench_key", transport),
+            status_cache=PixStatusCache(ttl=0),
+            rate_limiter=TokenBucket(0)
+        )
+        with quiet():
+            create_latencies, created, create_duration = fan_out(
+                lambda i: manager.create_pix_payment(
+                    f"Cliente {i}", f"cliente{i}@exemplo.com", "+55 11 99999-9999", "11144477735"
+                ),
+                args.calls, args.concurrency
+            )
+            pix_ids = [result["pix_id"] for result in created if result["success"]]
+            check_latencies, checked, check_duration = fan_out(
+                lambda i: manager.check_payment_status(pix_ids[i % len(pix_ids)], use_cache=False),
+                args.calls if pix_ids else 0, args.concurrency
+            )
+        transport.close()
+
+    return {
+        **latency_metrics("create", create_latencies, create_duration),
+        **latency_metrics("check", check_latencies, check_duration),
+        "errors": (len(created) - len(pix_ids)) + sum(1 for result in checked if not result["success"]),
+        "connections": server.connections
+    }
+
+
+def scenario_monitor(args) -> Dict[str, Any]:
+    from benchmarks.bench_monitor import run
+
+    stats, outcomes = run(args.monitor_pix, args.concurrency, interval=0.2, window=args.monitor_window,
+                          latency=args.latency)
+    return {
+        "checks_per_s": stats["checks_per_sec"],
+        "lag_p50_ms": stats["lag_p50_ms"],
+        "lag_p99_ms": stats["lag_p99_ms"],
+        "checks": stats["checks"],
+        "check_errors": stats["check_errors"],
+        "outcomes": outcomes
+    }
+
+
+def scenario_webhook_ingest(args) -> Dict[str, Any]:
+    from benchmarks.load_webhook import run_load, spawn_server
+
+    process, url = spawn_server(args.webhook_workers, threads=8)
+    try:
+        latencies, errors, duration = run_load(url, args.webhook_requests, args.concurrency)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return {
+        **latency_metrics("requests", latencies, duration),
+        "errors": errors,
+        "server_workers": args.webhook_workers
+    }
+
+
+def scenario_payment_log(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="pix_suite_log_")
+    cwd = os.getcwd()
+    # webhook_handler abre fila, dedup e webhook.log no diretório atual ao ser importado
+    os.chdir(workdir)
+    try:
+        with quiet():
+            from payment_store import PaymentEventStore
+            from webhook_handler import WebhookHandler
+
+            results: Dict[str, Any] = {}
+            for backend, store in (("sqlite", PaymentEventStore(os.path.join(workdir, "events.db"))), ("jsonl", None)):
+                handler = WebhookHandler("bench_secret", event_store=store)
+                latencies = []
+                start = time.perf_counter()
+                for i in range(args.appends):
+                    pix_data = {"id": f"pix_log_{i:08d}", "amount": 34700, "customer": {"name": f"Cliente {i}"}}
+                    began = time.perf_counter()
+                    handler._save_payment_log(pix_data, "PAID")
+                    latencies.append(time.perf_counter() - began)
+                results.update(latency_metrics(f"{backend}_append", latencies, time.perf_counter() - start))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def scenario_reports(args) -> Dict[str, Any]:
+    from benchmarks.bench_reports import spawn
+    from benchmarks.synthetic import write_jsonl
+
+    workdir = tempfile.mkdtemp(prefix="pix_suite_reports_")
+    results: Dict[str, Any] = {}
+    try:
+        for size in (FULL_REPORT_SIZES if args.full else REPORT_SIZES):
+            log_file = os.path.join(workdir, f"payment_logs_{size}.json")
+            write_jsonl(log_file, size)
+            # Subprocesso: o pico de RSS de um tamanho não contamina o próximo
+            run = spawn("streaming", log_file, os.path.join(workdir, f"report_{size}.csv"))
+            label = f"{size // 1_000_000}m" if size >= 1_000_000 else f"{size // 1000}k"
+            results[f"events_{label}_wall_s"] = run["wall_s"]
+            results[f"events_{label}_max_rss_mb"] = run["max_rss_mb"]
+            results[f"events_{label}_events_per_s"] = size / run["wall_s"] if run["wall_s"] > 0 else 0.0
+            os.remove(log_file)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def scenario_startup(args) -> Dict[str, Any]:
+    from benchmarks.bench_startup import measure
+
+    result = measure(args.startup_runs)
+    return {
+        "import_pix_manager_ms": result["import_pix_manager_ms"],
+        "check_wall_ms": result["check_wall_ms"],
+        "check_over_interpreter_ms": result["check_over_interpreter_ms"],
+        "forbidden_imports": result["forbidden_imports"]
+    }
+
+
+SCENARIOS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "pix_api": scenario_pix_api,
+    "monitor": scenario_monitor,
+    "webhook_ingest": scenario_webhook_ingest,
+    "payment_log": scenario_payment_log,
+    "reports": scenario_reports,
+    "startup": scenario_startup,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metric_direction(name: str) -> int:
+    """+1 se maior é melhor, -1 se menor é melhor, 0 para métricas informativas"""
+    if name.endswith("_per_s"):
+        return 1
+    if name.endswith(("_ms", "_s", "_mb")):
+        return -1
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Lista as regressões de `current` em relação a `baseline`
+
+    Args:
+        baseline: Resultado anterior da suíte
+        current: Resultado atual
+        threshold: Piora relativa tolerada (0.15 = 15%)
+
+    Returns:
+        Uma linha por métrica que piorou além do limite
+    """
+    regressions = []
+    for scenario, metrics in current["scenarios"].items():
+        base_metrics = baseline.get("scenarios", {}).get(scenario) or {}
+        for name, value in metrics.items():
+            direction = metric_direction(name)
+            base = base_metrics.get(name)
+            if not direction or not isinstance(value, (int, float)) or not isinstance(base, (int, float)) or base <= 0:
+                continue
+            change = (value - base) / base
+            if -direction * change > threshold:
+                regressions.append(f"{scenario}.{name}: {base:.4g} -> {value:.4g} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks com saída em JSON")
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="Cenários separados por vírgula")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument("--compare", default=None, help="Resultado anterior para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Piora relativa tolerada no --compare")
+    parser.add_argument("--full", action="store_true", help="Inclui o relatório de 10M eventos (~3 GB temporários)")
+    parser.add_argument("--calls", type=int, default=2000, help="Criações e consultas no pix_api")
+    parser.add_argument("--concurrency", type=int, default=32, help="Threads/conexões simultâneas")
+    parser.add_argument("--latency", type=float, default=0.002, help="Latência simulada da API (s)")
+    parser.add_argument("--monitor-pix", type=int, default=2000, help="PIX pendentes no monitor")
+    parser.add_argument("--monitor-window", type=float, default=5.0, help="Janela até expirar no monitor (s)")
+    parser.add_argument("--webhook-requests", type=int, default=5000, help="Requisições no webhook_ingest")
+    parser.add_argument("--webhook-workers", type=int, default=os.cpu_count() or 1, help="Processos do webhook")
+    parser.add_argument("--appends", type=int, default=5000, help="Gravações por backend no payment_log")
+    parser.add_argument("--startup-runs", type=int, default=15, help="Execuções medidas no startup")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(SCENARIOS)})")
+
+    result: Dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("only", "output", "compare")},
+        "scenarios": {}
+    }
+    for name in selected:
+        print(f"⏱️ {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        result["scenarios"][name] = SCENARIOS[name](args)
+        print(f"   {name} concluído em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"📄 Resultados em {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.threshold)
+        base_commit = baseline.get("commit") or "base"
+        if regressions:
+            print(f"❌ {len(regressions)} regressões em relação a {base_commit} (limite {args.threshold:.0%}):",
+                  file=sys.stderr)
+            for line in regressions:
+                print(f"   {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ Sem regressões em relação a {base_commit} (limite {args.threshold:.0%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
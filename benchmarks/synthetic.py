@@ -0,0 +1,71 @@
+"""
+PrescrevaMe Premium - Eventos Sintéticos
+Gera eventos no formato gravado por WebhookHandler._save_payment_log
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator
+
+STATUS_WEIGHTS = (("PAID", 0.55), ("EXPIRED", 0.35), ("CANCELLED", 0.10))
+AMOUNTS = (34700, 34700, 34700, 22700)  # maioria no preço cheio, parte em renovação
+
+
+def synthetic_events(
+    count: int,
+    seed: int = 42,
+    customers: int = 5000,
+    start: datetime = datetime(2025, 1, 1)
+) -> Iterator[Dict[str, Any]]:
+    """
+    Gera `count` eventos em ordem cronológica
+
+    Args:
+        count: Quantidade de eventos
+        seed: Semente para resultados reprodutíveis
+        customers: Quantidade de clientes distintos
+        start: Timestamp do primeiro evento
+    """
+    rng = random.Random(seed)
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    step = timedelta(seconds=30)
+    timestamp = start
+
+    for i in range(count):
+        timestamp += step * rng.random() * 2
+        customer_index = rng.randrange(customers)
+        amount = rng.choice(AMOUNTS)
+        pix_id = f"pix_char_{i:010d}"
+        customer = {
+            "name": f"Cliente {customer_index}",
+            "email": f"cliente{customer_index}@exemplo.com",
+            "cellphone": "+55 11 99999-9999",
+            "tax_id": f"{customer_index:011d}"
+        }
+        yield {
+            "timestamp": timestamp.isoformat(),
+            "pix_id": pix_id,
+            "status": rng.choices(statuses, weights)[0],
+            "amount": amount,
+            "customer": customer,
+            "data": {
+                "id": pix_id,
+                "amount": amount,
+                "customer": customer,
+                "created_at": (timestamp - timedelta(minutes=5)).isoformat(),
+                "expires_at": (timestamp + timedelta(minutes=10)).isoformat(),
+                "dev_mode": False
+            }
+        }
+
+
+def write_jsonl(path: str, count: int, seed: int = 42) -> int:
+    """Grava eventos sintéticos em um arquivo JSONL (formato do payment_logs.json)"""
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for event in synthetic_events(count, seed=seed):
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            written += 1
+    return written
@@ -18,12 +18,22 @@ function makeApiRequest($endpoint, $method = 'GET', $data = null) {
         'Accept: application/json'
     ];
     
-    $ch = curl_init();
+    // Handle reaproveitado: curl_reset mantém o cache de conexões (keep-alive, sem novo handshake TLS)
+    static $ch = null;
+    if ($ch === null) {
+        $ch = curl_init();
+    } else {
+        curl_reset($ch);
+    }
     curl_setopt($ch, CURLOPT_URL, $url);
     curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
     curl_setopt($ch, CURLOPT_HTTPHEADER, $headers);
     curl_setopt($ch, CURLOPT_TIMEOUT, 30);
     curl_setopt($ch, CURLOPT_SSL_VERIFYPEER, true);
+    curl_setopt($ch, CURLOPT_TCP_KEEPALIVE, 1);
+    if (defined('CURL_HTTP_VERSION_2TLS')) {
+        curl_setopt($ch, CURLOPT_HTTP_VERSION, CURL_HTTP_VERSION_2TLS);
+    }
     
     if ($method === 'POST' && $data) {
         curl_setopt($ch, CURLOPT_POST, true);
@@ -33,7 +43,6 @@ function makeApiRequest($endpoint, $method = 'GET', $data = null) {
     $response = curl_exec($ch);
     $httpCode = curl_getinfo($ch, CURLINFO_HTTP_CODE);
     $error = curl_error($ch);
-    curl_close($ch);
     
     if ($error) {
         throw new Exception("Erro de conexão: " . $error);
@@ -181,8 +190,9 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST' && isset($_POST['action'])) {
                     ]
                 ];
                 
-                // Chamar API para criar PIX
-                $response = makeApiRequest('/pixQrCode/create', 'POST', $apiData);
+                // Cobrança pronta do pool pré-criado; sem ela, criar o PIX na API
+                $warmPix = claimWarmPix($apiData['amount'], $apiData['expiresIn'], $apiData['customer']);
+                $response = $warmPix !== null ? ['data' => $warmPix] : makeApiRequest('/pixQrCode/create', 'POST', $apiData);
                 
                 if (isset($response['data'])) {
                     $pixData = $response['data'];
@@ -223,11 +233,28 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST' && isset($_POST['action'])) {
     if ($_POST['action'] === 'check_payment') {
         try {
             if (isset($_SESSION['pix_data']['id'])) {
-                $response = makeApiRequest('/pixQrCode/check?id=' . $_SESSION['pix_data']['id']);
+                $pixId = $_SESSION['pix_data']['id'];
+                
+                // Responder do cache compartilhado (alimentado pelo webhook e por outros polls)
+                $cached = getCachedPixStatus($pixId);
+                if ($cached !== null) {
+                    $_SESSION['pix_data']['status'] = $cached['status'];
+                    
+                    header('Content-Type: application/json');
+                    echo json_encode([
+                        'status' => $cached['status'],
+                        'id' => $pixId,
+                        'expiresAt' => $cached['expires_at'] ?? ($_SESSION['pix_data']['expiresAt'] ?? null)
+                    ]);
+                    exit;
+                }
+                
+                $response = makeApiRequest('/pixQrCode/check?id=' . $pixId);
                 
                 if (isset($response['data'])) {
                     $pixData = $response['data'];
                     $_SESSION['pix_data'] = $pixData;
+                    cachePixStatus($pixId, $pixData['status'], $pixData['expiresAt'] ?? null);
                     
                     // Retornar JSON para AJAX
                     header('Content-Type: application/json');
@@ -609,9 +636,67 @@ if (isset($_SESSION['pix_data']['status']) && $_SESSION['pix_data']['status'] ==
 
         // Verificação de status do pagamento
         <?php if ($success && isset($pixData['id'])): ?>
-        let paymentCheckInterval = null;
+        let paymentCheckTimer = null;
+        let paymentCheckAttempt = 0;
+        let paymentChecksStopped = false;
+        let paymentPushActive = false;  // com o push aberto, o polling segue só como reserva esparsa
+        const paymentCheckStartedAt = Date.now();
+        const paymentExpiresAt = <?php echo isset($pixData['expiresAt']) ? "new Date('" . $pixData['expiresAt'] . "').getTime()" : 'null'; ?>;
+        const PAYMENT_CHECK_BASE_MS = <?php echo PAYMENT_CHECK_INTERVAL * 1000; ?>;
+        const PAYMENT_DENSE_WINDOW_MS = 120000;  // polling denso nos 2 primeiros minutos
+        const PAYMENT_MAX_INTERVAL_MS = 30000;
+        
+        // Agenda adaptativa: denso logo após gerar o PIX, backoff com jitter depois e parada no expiresAt;
+        // com push ativo, um check a cada PAYMENT_MAX_INTERVAL_MS cobre aviso perdido (webhook ou datagrama)
+        function nextPaymentCheckDelay() {
+            let delay = PAYMENT_CHECK_BASE_MS;
+            if (paymentPushActive) {
+                delay = PAYMENT_MAX_INTERVAL_MS;
+            } else if (Date.now() - paymentCheckStartedAt >= PAYMENT_DENSE_WINDOW_MS) {
+                const denseChecks = Math.ceil(PAYMENT_DENSE_WINDOW_MS / PAYMENT_CHECK_BASE_MS);
+                const step = Math.max(1, paymentCheckAttempt - denseChecks);
+                delay = Math.min(PAYMENT_MAX_INTERVAL_MS, PAYMENT_CHECK_BASE_MS * Math.pow(1.5, step));
+            }
+            delay *= 0.8 + Math.random() * 0.4;
+            
+            if (paymentExpiresAt) {
+                const remaining = paymentExpiresAt - Date.now();
+                if (remaining <= 0) {
+                    return null;
+                }
+                delay = Math.min(delay, remaining);
+            }
+            return delay;
+        }
+        
+        function scheduleNextPaymentCheck() {
+            if (paymentChecksStopped) {
+                return;
+            }
+            if (paymentCheckTimer) {
+                clearTimeout(paymentCheckTimer);
+                paymentCheckTimer = null;
+            }
+            const delay = nextPaymentCheckDelay();
+            if (delay !== null) {
+                paymentCheckTimer = setTimeout(checkPaymentStatus, delay);
+            }
+        }
+        
+        function stopPaymentChecks() {
+            paymentChecksStopped = true;
+            if (paymentCheckTimer) {
+                clearTimeout(paymentCheckTimer);
+            }
+        }
         
         function checkPaymentStatus() {
+            // Check antecipado (aviso do push): o da reserva é reagendado no finally
+            if (paymentCheckTimer) {
+                clearTimeout(paymentCheckTimer);
+                paymentCheckTimer = null;
+            }
+            paymentCheckAttempt++;
             fetch('checkout.php', {
                 method: 'POST',
                 headers: {
@@ -625,9 +710,7 @@ if (isset($_SESSION['pix_data']['status']) && $_SESSION['pix_data']['status'] ==
                     document.getElementById('payment-status').innerHTML = 
                         '✅ Pagamento confirmado! Redirecionando...';
                     document.getElementById('payment-status').className = 'status-message status-success';
-                    if (paymentCheckInterval) {
-                        clearInterval(paymentCheckInterval);
-                    }
+                    stopPaymentChecks();
                     if (countdownInterval) {
                         clearInterval(countdownInterval);
                     }
@@ -638,9 +721,7 @@ if (isset($_SESSION['pix_data']['status']) && $_SESSION['pix_data']['status'] ==
                     document.getElementById('payment-status').innerHTML = 
                         '❌ PIX expirado. <a href="checkout.php" style="color: var(--primary-green); font-weight: 600;">Clique aqui para gerar um novo código</a>';
                     document.getElementById('payment-status').className = 'status-message status-error';
-                    if (paymentCheckInterval) {
-                        clearInterval(paymentCheckInterval);
-                    }
+                    stopPaymentChecks();
                     if (countdownInterval) {
                         clearInterval(countdownInterval);
                     }
@@ -648,11 +729,72 @@ if (isset($_SESSION['pix_data']['status']) && $_SESSION['pix_data']['status'] ==
             })
             .catch(error => {
                 console.error('Erro ao verificar status:', error);
+            })
+            .finally(scheduleNextPaymentCheck);
+        }
+        
+        // Status por push (status_push.py): SSE, long-poll se o SSE não abrir; o polling acima continua
+        // esparso enquanto o push está ativo e volta ao ritmo normal se o push cair.
+        // O aviso só dispara um check_payment (que confirma pelo cache do webhook e atualiza a sessão)
+        const PUSH_STATUS_URL = <?php echo json_encode(rtrim(PUSH_STATUS_URL, '/')); ?>;
+        const paymentPixId = <?php echo json_encode($pixData['id']); ?>;
+        
+        function waitPaymentLongPoll() {
+            if (paymentChecksStopped || (paymentExpiresAt && Date.now() >= paymentExpiresAt)) {
+                return;
+            }
+            fetch(PUSH_STATUS_URL + '/poll/' + encodeURIComponent(paymentPixId) + '?timeout=25')
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (data.final) {
+                    paymentPushActive = false;
+                    checkPaymentStatus();
+                } else {
+                    waitPaymentLongPoll();
+                }
+            })
+            .catch(error => {
+                console.error('Push indisponível, usando polling:', error);
+                paymentPushActive = false;
+                scheduleNextPaymentCheck();
             });
         }
         
-        // Verificar status a cada <?php echo PAYMENT_CHECK_INTERVAL; ?> segundos
-        paymentCheckInterval = setInterval(checkPaymentStatus, <?php echo PAYMENT_CHECK_INTERVAL * 1000; ?>);
+        function startPaymentPush() {
+            if (!PUSH_STATUS_URL) {
+                return false;
+            }
+            paymentPushActive = true;
+            if (!window.EventSource) {
+                waitPaymentLongPoll();
+                return true;
+            }
+            const source = new EventSource(PUSH_STATUS_URL + '/events/' + encodeURIComponent(paymentPixId));
+            let opened = false;
+            source.onopen = () => { opened = true; };
+            source.addEventListener('status', () => {
+                source.close();
+                paymentPushActive = false;
+                checkPaymentStatus();
+            });
+            source.onerror = () => {
+                // Depois de aberto, o EventSource reconecta sozinho; se nunca abriu (proxy sem SSE), long-poll
+                if (!opened) {
+                    source.close();
+                    waitPaymentLongPoll();
+                }
+            };
+            return true;
+        }
+        
+        startPaymentPush();
+        // Primeira verificação após <?php echo PAYMENT_CHECK_INTERVAL; ?> segundos (ou o intervalo de reserva, com push)
+        scheduleNextPaymentCheck();
         <?php endif; ?>
     </script>
 
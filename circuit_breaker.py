@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Circuit Breaker
+Corta as chamadas ao AbacatePay quando o provedor está falhando, em vez de
+acumular requisições em um upstream lento:
+
+    closed     chamadas passam; N falhas seguidas abrem o circuito
+    open       chamadas falham na hora até `reset_timeout` segundos
+    half_open  até `half_open_calls` chamadas de teste; sucesso fecha, falha reabre
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+ABACATE_BREAKER_FAILURES = int(os.getenv('ABACATE_BREAKER_FAILURES', '5'))  # falhas seguidas para abrir
+ABACATE_BREAKER_RESET = float(os.getenv('ABACATE_BREAKER_RESET', '30'))  # segundos aberto antes do teste
+ABACATE_BREAKER_HALF_OPEN_CALLS = int(os.getenv('ABACATE_BREAKER_HALF_OPEN_CALLS', '1'))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem tocar na API porque o circuito está aberto"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito {name} aberto: AbacatePay indisponível, nova tentativa em {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Circuit breaker seguro entre threads (closed / open / half_open)"""
+
+    def __init__(
+        self,
+        name: str = "abacatepay",
+        failure_threshold: int = ABACATE_BREAKER_FAILURES,
+        reset_timeout: float = ABACATE_BREAKER_RESET,
+        half_open_calls: int = ABACATE_BREAKER_HALF_OPEN_CALLS
+    ):
+        """
+        Args:
+            name: Nome do circuito (mensagens e métricas)
+            failure_threshold: Falhas seguidas que abrem o circuito
+            reset_timeout: Segundos em "open" antes de liberar chamadas de teste
+            half_open_calls: Chamadas de teste simultâneas em "half_open"
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.log_prefix = "🔌 PrescrevaMe Circuit Breaker"
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+
+        self._calls = 0
+        self._successes = 0
+        self._failures_total = 0
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_calls = 0
+        return self._state
+
+    def _open(self, now: float) -> None:
+        if self._state != OPEN:
+            self._opened += 1
+            logger.warning("🔴 Circuito %s aberto após %d falhas seguidas", self.name, self._failures)
+        self._state = OPEN
+        self._opened_at = now
+
+    def before_call(self) -> None:
+        """
+        Reserva uma chamada
+
+        Raises:
+            CircuitOpenError: Circuito aberto (ou half_open sem vaga para teste)
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == HALF_OPEN and self._trial_calls < self.half_open_calls:
+                self._trial_calls += 1
+            elif state != CLOSED:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, max(0.0, self._opened_at + self.reset_timeout - now))
+            self._calls += 1
+
+    def record_success(self) -> None:
+        """A API respondeu (inclusive com erro de validação 4xx): o upstream está saudável"""
+        with self._lock:
+            self._successes += 1
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                logger.info("🟢 Circuito %s fechado", self.name)
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        """Timeout, erro de conexão ou 5xx (429 não conta: é tratado pelo limite de taxa)"""
+        with self._lock:
+            now = time.monotonic()
+            self._failures_total += 1
+            self._failures += 1
+            if self._current_state(now) == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open(now)
+
+    def reset(self) -> None:
+        """Volta para "closed" (ex.: depois de trocar a chave da API)"""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "calls": self._calls,
+                "successes": self._successes,
+                "failures": self._failures_total,
+                "rejected": self._rejected,
+                "times_opened": self._opened,
+                "retry_in_s": max(0.0, self._opened_at + self.reset_timeout - now) if state == OPEN else 0.0
+            }
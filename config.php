@@ -110,6 +110,140 @@ function debug($message, $data = null) {
     }
 }
 
+// Cache de status de PIX compartilhado com o Python (status_cache.py)
+define('PIX_STATUS_CACHE_DIR', env('PIX_STATUS_CACHE_DIR', '')); // vazio = desabilitado
+define('PIX_STATUS_CACHE_TTL', env('PIX_STATUS_CACHE_TTL', 2)); // segundos para estados pendentes
+
+// Caminho do arquivo de cache de um PIX
+function pixStatusCachePath($pixId) {
+    if (PIX_STATUS_CACHE_DIR === '') {
+        return null;
+    }
+    return rtrim(PIX_STATUS_CACHE_DIR, '/') . '/' . preg_replace('/[^A-Za-z0-9_-]/', '_', $pixId) . '.json';
+}
+
+// Status em cache: estados finais sempre valem, pendentes apenas dentro do TTL
+function getCachedPixStatus($pixId) {
+    $path = pixStatusCachePath($pixId);
+    if ($path === null || !is_file($path)) {
+        return null;
+    }
+    
+    $entry = json_decode(@file_get_contents($path), true);
+    if (!is_array($entry) || !isset($entry['status'], $entry['cached_at'])) {
+        return null;
+    }
+    
+    $isFinal = in_array($entry['status'], ['PAID', 'EXPIRED', 'CANCELLED'], true);
+    if (!$isFinal && microtime(true) - $entry['cached_at'] >= PIX_STATUS_CACHE_TTL) {
+        return null;
+    }
+    return $entry;
+}
+
+// Grava o status no cache (escrita atômica via rename)
+function cachePixStatus($pixId, $status, $expiresAt = null) {
+    $path = pixStatusCachePath($pixId);
+    if ($path === null) {
+        return false;
+    }
+    
+    $dir = dirname($path);
+    if (!is_dir($dir) && !@mkdir($dir, 0770, true)) {
+        return false;
+    }
+    
+    $tmpPath = $path . '.' . getmypid() . '.tmp';
+    $entry = ['status' => $status, 'expires_at' => $expiresAt, 'cached_at' => microtime(true)];
+    if (@file_put_contents($tmpPath, json_encode($entry)) === false) {
+        return false;
+    }
+    return @rename($tmpPath, $path);
+}
+
+// Pool de PIX pré-criados compartilhado com o Python (pix_warm_pool.py)
+define('PIX_WARM_POOL_DIR', env('PIX_WARM_POOL_DIR', '')); // vazio = desabilitado
+
+// Pega uma cobrança pronta do pool (a nominal do cliente primeiro, senão uma anônima); null se não houver
+function claimWarmPix($amount, $expiresIn, $customer) {
+    if (PIX_WARM_POOL_DIR === '') {
+        return null;
+    }
+    
+    $root = rtrim(PIX_WARM_POOL_DIR, '/');
+    $sku = (int) $amount . '-' . (int) $expiresIn;
+    $taxId = preg_replace('/[^0-9]/', '', $customer['taxId'] ?? '');
+    $dirs = $taxId !== '' ? [$root . '/' . $sku . '-' . $taxId, $root . '/' . $sku] : [$root . '/' . $sku];
+    $now = time();
+    
+    foreach ($dirs as $dir) {
+        // Ordem crescente do prefixo: primeiro a cobrança que sairia do pool antes
+        $files = @scandir($dir);
+        if ($files === false) {
+            continue;
+        }
+        foreach ($files as $file) {
+            if ($file[0] === '.' || substr($file, -5) !== '.json' || (int) $file <= $now) {
+                continue;
+            }
+            // rename atômico: se outro processo pegou antes, tenta a próxima
+            $claiming = $root . '/claimed/.' . $file . '.' . getmypid();
+            if (!@rename($dir . '/' . $file, $claiming)) {
+                continue;
+            }
+            $entry = json_decode(@file_get_contents($claiming), true);
+            if (!is_array($entry) || !isset($entry['pix']['id'])) {
+                // Arquivo ilegível: separado para conferência, a cobrança continua aberta no AbacatePay
+                quarantineWarmPix($root, $claiming, $file, 'arquivo da cobrança ilegível');
+                continue;
+            }
+            
+            // Quem pegou a cobrança (o webhook completa o cliente das cobranças anônimas por aqui)
+            $pixId = $entry['pix']['id'];
+            $record = [
+                'pix_id' => $pixId,
+                'sku' => $sku,
+                'source' => 'php',
+                'claimed_at' => microtime(true),
+                'pooled_at' => $entry['pooled_at'] ?? null,
+                'expires_at' => $entry['expires_at'] ?? null,
+                'customer' => [
+                    'name' => $customer['name'] ?? '',
+                    'email' => $customer['email'] ?? '',
+                    'cellphone' => $customer['cellphone'] ?? '',
+                    'tax_id' => $taxId
+                ]
+            ];
+            $tmpPath = $root . '/claimed/.' . $pixId . '.' . getmypid() . '.tmp';
+            if (@file_put_contents($tmpPath, json_encode($record)) === false
+                || !@rename($tmpPath, $root . '/claimed/' . $pixId . '.json')) {
+                // Sem o registro o webhook não saberia de quem é o pagamento: não entrega
+                @unlink($tmpPath);
+                quarantineWarmPix($root, $claiming, $file, 'registro do cliente não gravado');
+                continue;
+            }
+            @unlink($claiming);
+            return $entry['pix'];
+        }
+    }
+    
+    @touch($root . '/missed/' . $sku . '.' . getmypid() . '.' . bin2hex(random_bytes(4)));
+    return null;
+}
+
+// Separa em quarantine/ uma cobrança pega mas não entregue (mesma regra do pix_warm_pool.py)
+function quarantineWarmPix($root, $claiming, $file, $reason) {
+    @mkdir($root . '/quarantine', 0775, true);
+    if (!@rename($claiming, $root . '/quarantine/' . $file)) {
+        logError('Cobrança do pool não entregue e fora da quarentena: ' . $reason, ['file' => $claiming]);
+        return;
+    }
+    logError('Cobrança do pool em quarentena: ' . $reason, ['file' => $file]);
+}
+
+// Status por push (status_push.py): as páginas assinam o pix_id por SSE/long-poll em vez do polling de check_payment
+define('PUSH_STATUS_URL', env('PUSH_STATUS_URL', '')); // ex.: https://seu-dominio.com/push (vazio = apenas polling)
+
 // Configurações de timezone
 date_default_timezone_set('America/Sao_Paulo');
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Carregamento do .env com Cache
+Todos os módulos chamavam load_dotenv() ao serem importados: cada chamada
+procurava e interpretava o .env de novo, e o python-dotenv era importado
+em toda execução, mesmo sem nada novo no arquivo. load_env() carrega o
+.env uma vez por processo e guarda os valores já interpretados em
+__pycache__/dotenv.json (validado por caminho, mtime e tamanho do .env,
+como o bytecode em .pyc); as próximas execuções só leem esse JSON.
+
+Mesma semântica do load_dotenv(): o .env é procurado a partir deste
+diretório para cima, variáveis já definidas no ambiente não são
+sobrescritas e chaves sem valor são ignoradas. Arquivos com interpolação
+(${VAR}) dependem do ambiente de cada processo e não vão para o cache.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "dotenv.json")
+_CACHE_VERSION = 1
+
+_state = {"loaded": False}
+
+
+def find_env_file(start: Optional[str] = None) -> Optional[str]:
+    """Caminho do .env mais próximo, de `start` (padrão: este diretório) para cima"""
+    directory = start or os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _read_cache(path: str, stat: os.stat_result) -> Optional[Dict[str, str]]:
+    try:
+        with open(_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict):
+        return None
+    if (cached.get("version"), cached.get("path"), cached.get("mtime_ns"), cached.get("size")) != (
+        _CACHE_VERSION, path, stat.st_mtime_ns, stat.st_size
+    ):
+        return None
+    values = cached.get("values")
+    return values if isinstance(values, dict) else None
+
+
+def _write_cache(path: str, stat: os.stat_result, values: Dict[str, str]) -> None:
+    tmp_path = f"{_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": _CACHE_VERSION, "path": path, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                "values": values
+            }, f)
+        os.replace(tmp_path, _CACHE_FILE)
+    except OSError:
+        # Diretório somente leitura: segue sem cache
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _parse_env(path: str, stat: os.stat_result) -> Optional[Dict[str, str]]:
+    """Valores do .env (interpretados pelo python-dotenv), ou None se o arquivo usar interpolação"""
+    from dotenv import dotenv_values
+
+    values = {key: value for key, value in dotenv_values(path, interpolate=False).items() if value is not None}
+    if any("${" in value for value in values.values()):
+        return None
+    _write_cache(path, stat, values)
+    return values
+
+
+def load_env() -> None:
+    """Aplica o .env ao os.environ (uma vez por processo; variáveis já definidas prevalecem)"""
+    if _state["loaded"]:
+        return
+    _state["loaded"] = True
+
+    path = find_env_file()
+    if path is None:
+        return
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+
+    values = _read_cache(path, stat)
+    if values is None:
+        values = _parse_env(path, stat)
+    if values is None:
+        from dotenv import load_dotenv
+        load_dotenv(path)
+        return
+    for key, value in values.items():
+        os.environ.setdefault(key, value)
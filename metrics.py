@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Métricas
+Registro de métricas no formato de texto do Prometheus (sem dependências):
+contadores, histogramas e gauges calculados na hora da coleta.
+
+Com vários processos (workers do gunicorn, daemon PIX, lote), cada um grava
+um instantâneo em METRICS_DIR a cada METRICS_FLUSH_INTERVAL segundos e o
+/metrics de qualquer um deles soma todos. Contadores de processos que já
+terminaram continuam somados (arquivados em METRICS_DIR/archive.json); gauges
+aparecem só para processos vivos, com o rótulo `pid`.
+
+    registry.histogram("abacatepay_request_duration_seconds", "...", ("operation", "outcome"))
+    API_REQUEST_SECONDS.labels(operation="create", outcome="success").observe(0.12)
+"""
+
+import atexit
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+METRICS_DIR = os.getenv('METRICS_DIR', '')  # instantâneos compartilhados entre processos ('' = só este processo)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # /metrics próprio para processos sem Flask (0 = desligado)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAYMENT_BUCKETS = (30, 60, 120, 300, 600, 900, 1800, 2700, 3600, 7200)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    """Base: nome, ajuda, rótulos e valores por combinação de rótulos"""
+
+    type = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._lock = registry._lock
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def labels(self, **labels: Any) -> "_Bound":
+        return _Bound(self, self._key(labels))
+
+    def _reset(self) -> None:
+        self._values.clear()
+
+
+class _Bound:
+    """Métrica com rótulos já resolvidos (evita montar a tupla a cada chamada)"""
+
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: _Metric, key: LabelValues):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self._registry._touch()
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Contagens por faixa (não acumuladas; +Inf na última posição), soma e total
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+        self._registry._touch()
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+
+class CallbackGauge(_Metric):
+    """Gauge calculado na coleta: fn() -> {valores dos rótulos: valor}"""
+
+    type = "gauge"
+
+    def __init__(self, registry, name, documentation, labelnames, fn: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(registry, name, documentation, labelnames)
+        self._fn = fn
+
+    def collect(self) -> Dict[LabelValues, float]:
+        try:
+            return {tuple(str(value) for value in key): float(value) for key, value in self._fn().items()}
+        except Exception:
+            return {}
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo, com agregação opcional entre processos via METRICS_DIR"""
+
+    def __init__(self, multiprocess_dir: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        """
+        Args:
+            multiprocess_dir: Diretório compartilhado dos instantâneos ('' = só este processo)
+            flush_interval: Segundos entre gravações do instantâneo deste processo
+        """
+        self._lock = threading.Lock()
+        self._metrics: "OrderedDict[str, _Metric]" = OrderedDict()
+        self.flush_interval = flush_interval
+        self.multiprocess_dir = ""
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        if multiprocess_dir:
+            self.set_multiprocess_dir(multiprocess_dir)
+
+    # Definição -----------------------------------------------------------------
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        fn: Callable[[], Dict[LabelValues, float]]
+    ) -> CallbackGauge:
+        return self._register(CallbackGauge(self, name, documentation, labelnames, fn))
+
+    # Instantâneo / agregação ----------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado atual serializável: definições e valores (gauges calculados agora)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data: Dict[str, Any] = {}
+        for metric in metrics:
+            if isinstance(metric, CallbackGauge):
+                values = metric.collect()
+            else:
+                with self._lock:
+                    values = {key: ([list(v[0]), v[1], v[2]] if isinstance(v, list) else v)
+                              for key, v in metric._values.items()}
+            data[metric.name] = {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(key), value] for key, value in values.items()]
+            }
+        return data
+
+    def set_multiprocess_dir(self, path: str) -> None:
+        """Passa a gravar instantâneos em `path` e a somar os dos outros processos na coleta"""
+        os.makedirs(path, exist_ok=True)
+        self.multiprocess_dir = path
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiprocess_dir, f"metrics-{pid}.json")
+
+    def _touch(self) -> None:
+        """Garante a thread de gravação periódica neste processo (ela não sobrevive ao fork)"""
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Grava o instantâneo deste processo (troca atômica do arquivo)"""
+        if not self.multiprocess_dir:
+            return
+        path = self._snapshot_path(os.getpid())
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump({"pid": os.getpid(), "time": time.time(), "metrics": self.snapshot()}, file)
+            os.replace(temp_path, path)
+        except OSError:
+            pass
+
+    def _after_fork_in_child(self) -> None:
+        # O filho começa do zero: os valores herdados são do pai, que continua exportando os seus
+        with self._lock:
+            for metric in self._metrics.values():
+                metric._reset()
+            self._flusher_pid = None
+
+    def _load_others(self) -> List[Dict[str, Any]]:
+        """Instantâneos dos outros processos; arquiva os de processos que já terminaram"""
+        snapshots: List[Dict[str, Any]] = []
+        archive_path = os.path.join(self.multiprocess_dir, "archive.json")
+        with open(os.path.join(self.multiprocess_dir, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            archive = _read_json(archive_path) or {"metrics": {}}
+            archived = False
+            for entry in os.listdir(self.multiprocess_dir):
+                if not (entry.startswith("metrics-") and entry.endswith(".json")):
+                    continue
+                pid = int(entry[len("metrics-"):-len(".json")])
+                if pid == os.getpid():
+                    continue
+                path = os.path.join(self.multiprocess_dir, entry)
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                if _pid_alive(pid):
+                    snapshots.append(snapshot)
+                    continue
+                # Processo encerrado: contadores e histogramas seguem somados, gauges somem
+                archive["metrics"] = merge_snapshots([archive["metrics"], _without_gauges(snapshot["metrics"])])
+                os.remove(path)
+                archived = True
+            if archived:
+                temp_path = f"{archive_path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(archive, file)
+                os.replace(temp_path, archive_path)
+        if archive["metrics"]:
+            snapshots.append({"pid": None, "metrics": archive["metrics"]})
+        return snapshots
+
+    def collect(self) -> Dict[str, Any]:
+        """Métricas deste processo somadas às dos outros processos do METRICS_DIR"""
+        own = {"pid": os.getpid(), "metrics": self.snapshot()}
+        if not self.multiprocess_dir:
+            return own["metrics"]
+        snapshots = [own] + self._load_others()
+        return merge_snapshots([_with_pid_label(s["metrics"], s["pid"]) for s in snapshots])
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (0.0.4)"""
+        return render_text(self.collect())
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _without_gauges(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: metric for name, metric in metrics.items() if metric["type"] != "gauge"}
+
+
+def _with_pid_label(metrics: Dict[str, Any], pid: Optional[int]) -> Dict[str, Any]:
+    """Gauges de processos diferentes não se somam: ganham o rótulo pid"""
+    if pid is None:
+        return metrics
+    result = {}
+    for name, metric in metrics.items():
+        if metric["type"] == "gauge":
+            metric = dict(metric, labelnames=metric["labelnames"] + ["pid"],
+                          samples=[[labels + [str(pid)], value] for labels, value in metric["samples"]])
+        result[name] = metric
+    return result
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Soma instantâneos: contadores e histogramas por rótulo (gauges devem ter rótulos distintos)"""
+    merged: Dict[str, Any] = {}
+    for metrics in snapshots:
+        for name, metric in metrics.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = [list(value[0]), value[1], value[2]] if metric["type"] == "histogram" else value
+                elif metric["type"] == "histogram":
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    target["samples"][key] = current + value
+    for metric in merged.values():
+        metric["samples"] = [[list(key), value] for key, value in metric["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_text(metrics: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for name, metric in metrics.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["samples"], key=lambda sample: sample[0]):
+            if metric["type"] == "histogram":
+                cumulative = 0
+                for bound, count in zip(list(metric["buckets"]) + [float("inf")], value[0]):
+                    cumulative += count
+                    le = _format_labels(labelnames, labels, ("le", _format_value(bound)))
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value[1])}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {value[2]}")
+            else:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Registro do processo e métricas do fluxo de pagamento ---------------------------
+
+registry = MetricsRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry._after_fork_in_child)
+atexit.register(registry.flush)
+
+API_REQUEST_SECONDS = registry.histogram(
+    "abacatepay_request_duration_seconds",
+    "Duração de cada chamada ao SDK do AbacatePay (por tentativa)",
+    ("operation", "outcome")
+)
+API_REJECTED = registry.counter(
+    "abacatepay_rejected_total",
+    "Chamadas recusadas sem tocar na API (circuito aberto ou limite de taxa)",
+    ("operation", "reason")
+)
+API_RETRIES = registry.counter(
+    "abacatepay_retries_total",
+    "Novas tentativas de chamadas ao AbacatePay",
+    ("operation",)
+)
+WEBHOOK_SECONDS = registry.histogram(
+    "webhook_processing_duration_seconds",
+    "Tempo de processamento de uma notificação de webhook",
+    ("event_type", "outcome")
+)
+PIX_FINAL_STATUS = registry.counter(
+    "pix_final_status_total",
+    "PIX que chegaram a um estado final (a mesma cobrança pode ser vista por webhook e por polling)",
+    ("status", "source")
+)
+PIX_TIME_TO_PAYMENT = registry.histogram(
+    "pix_time_to_payment_seconds",
+    "Tempo entre a criação do PIX e a confirmação do pagamento",
+    ("source",),
+    buckets=PAYMENT_BUCKETS
+)
+
+# Criações feitas neste processo, para medir o tempo até o pagamento sem createdAt no evento
+_created_at: "OrderedDict[str, float]" = OrderedDict()
+_created_lock = threading.Lock()
+_CREATED_MAX = 50000
+
+
+def note_pix_created(pix_id: str, created_at: Optional[float] = None) -> None:
+    """Registra a criação de um PIX (para o histograma de tempo até o pagamento)"""
+    if not pix_id:
+        return
+    with _created_lock:
+        _created_at[pix_id] = created_at or time.time()
+        _created_at.move_to_end(pix_id)
+        while len(_created_at) > _CREATED_MAX:
+            _created_at.popitem(last=False)
+
+
+def observe_final_status(pix_id: str, status: str, source: str, created_at: Optional[float] = None) -> None:
+    """
+    Conta um PIX que chegou a PAID/EXPIRED/CANCELLED
+
+    Args:
+        pix_id: ID do PIX
+        status: Estado final
+        source: "webhook" ou "polling"
+        created_at: Criação do PIX em timestamp Unix (padrão: a registrada por note_pix_created)
+    """
+    PIX_FINAL_STATUS.inc(status=status, source=source)
+    with _created_lock:
+        noted = _created_at.pop(pix_id, None)
+    created = created_at or noted
+    if status == "PAID" and created is not None:
+        PIX_TIME_TO_PAYMENT.observe(max(0.0, time.time() - created), source=source)
+
+
+def _metrics_handler() -> type:
+    """Handler HTTP de /metrics (http.server só é importado quando o servidor sobe)"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _MetricsHandler
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "127.0.0.1") -> Optional[Any]:
+    """
+    Serve /metrics em uma thread (processos sem Flask: daemon PIX, lote)
+
+    Returns:
+        O servidor iniciado, ou None com port=0
+    """
+    if not port:
+        return None
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _metrics_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
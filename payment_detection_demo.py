@@ -4,13 +4,13 @@ PrescrevaMe Premium - Demonstração de Detecção de Pagamentos
 Mostra como o sistema detecta quando um PIX foi pago
 """
 
-import abacatepay
 import time
 import os
 from datetime import datetime
 from abacatepay.customers import CustomerMetadata
 from abacatepay.pixQrCode import PixQrCodeIn
 from dotenv import load_dotenv
+from abacatepay_transport import create_client
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -26,7 +26,7 @@ def demonstrate_payment_detection():
         print("❌ Erro: ABACATE_API_KEY não encontrada no arquivo .env")
         return
     
-    client = abacatepay.AbacatePay(api_key)
+    client = create_client(api_key)
     
     # Criar PIX
     print("1️⃣ Criando PIX...")
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Monitor de Pagamentos em Lote
+Acompanha muitos PIX pendentes ao mesmo tempo com uma fila de prioridade
+ordenada pelo próximo check e pelo expires_at, executando pixQrCode.check
+com concorrência limitada em um pool de threads. O intervalo entre checks vem
+de uma PollingPolicy (polling_policy.py)
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from metrics import observe_final_status
+from polling_policy import FixedIntervalPolicy, PollingPolicy
+
+TERMINAL_STATUSES = ("PAID", "EXPIRED", "CANCELLED")
+
+logger = logging.getLogger(__name__)
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """Converte expires_at (datetime, ISO 8601 ou epoch) em timestamp Unix"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass
+class MonitoredPix:
+    """Estado de um PIX acompanhado pelo monitor"""
+    pix_id: str
+    created_at: float
+    expires_at: Optional[float] = None
+    max_attempts: Optional[int] = None
+    attempts: int = 0
+    errors: int = 0
+    added_at: float = field(default_factory=time.time)
+
+
+class PaymentMonitor:
+    """Monitor de muitos PIX pendentes com agenda por prazo e checks concorrentes"""
+
+    def __init__(
+        self,
+        manager: Any,
+        max_workers: int = 16,
+        interval: float = 5.0,
+        default_max_attempts: int = 100,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        policy: Optional[PollingPolicy] = None,
+        settled_lookup: Optional[Callable[[str], Optional[str]]] = None
+    ):
+        """
+        Args:
+            manager: Objeto com check_payment_status(pix_id) (ex.: PrescrevaMePixManager)
+            max_workers: Máximo de checks simultâneos
+            interval: Intervalo entre checks (usado só sem `policy`)
+            default_max_attempts: Limite de checks para PIX sem expires_at conhecido
+            on_result: Callback chamado quando um PIX chega a um estado final
+                (com callback, os resultados não são guardados para results())
+            policy: Política de polling (padrão: intervalo fixo)
+            settled_lookup: Função pix_id -> status final já conhecido (ex.: via webhook);
+                quando retorna um status final, o check na API é pulado
+        """
+        self.manager = manager
+        self.max_workers = max_workers
+        self.interval = interval
+        self.policy = policy or FixedIntervalPolicy(interval)
+        self.settled_lookup = settled_lookup
+        self.default_max_attempts = default_max_attempts
+        self.on_result = on_result
+        self.log_prefix = "👀 PrescrevaMe Monitor"
+
+        self._heap: List[tuple] = []
+        self._entries: Dict[str, MonitoredPix] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler: Optional[threading.Thread] = None
+        self._running = False
+        self._in_flight = 0
+        self._results: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+
+        self._started_at: Optional[float] = None
+        self._checks = 0
+        self._check_errors = 0
+        self._skipped_checks = 0
+        self._settled = 0
+        self._lags: Deque[float] = deque(maxlen=10000)  # janela dos atrasos mais recentes
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        pix_id: str,
+        expires_at: Any = None,
+        max_attempts: Optional[int] = None,
+        first_check_in: float = 0.0,
+        created_at: Any = None
+    ) -> None:
+        """
+        Passa a acompanhar um PIX
+
+        Args:
+            pix_id: ID do PIX
+            expires_at: Expiração (datetime, ISO 8601 ou epoch); após ela o PIX é dado como EXPIRED
+            max_attempts: Limite de checks (padrão: default_max_attempts se não houver expires_at)
+            first_check_in: Atraso do primeiro check em segundos
+            created_at: Criação do PIX (padrão: agora); define a janela densa da política
+        """
+        entry = MonitoredPix(
+            pix_id=pix_id,
+            created_at=to_timestamp(created_at) or time.time(),
+            expires_at=to_timestamp(expires_at),
+            max_attempts=max_attempts
+        )
+        if entry.expires_at is None and entry.max_attempts is None:
+            entry.max_attempts = self.default_max_attempts
+
+        with self._cond:
+            if pix_id in self._entries:
+                return
+            self._entries[pix_id] = entry
+            self._push(entry, time.time() + first_check_in)
+            self._cond.notify()
+
+    def remove(self, pix_id: str) -> bool:
+        """Deixa de acompanhar um PIX (entradas antigas na fila são descartadas ao sair)"""
+        with self._cond:
+            return self._entries.pop(pix_id, None) is not None
+
+    def pending(self) -> int:
+        """Quantidade de PIX ainda acompanhados"""
+        with self._cond:
+            return len(self._entries)
+
+    def start(self) -> "PaymentMonitor":
+        """Inicia o agendador e o pool de checks em segundo plano"""
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+            self._started_at = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pix-check")
+        self._scheduler = threading.Thread(target=self._schedule_loop, name="pix-monitor", daemon=True)
+        self._scheduler.start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        """Para o agendador; com wait=True aguarda os checks em andamento"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._scheduler is not None:
+            self._scheduler.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._results.put(None)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloqueia até não restar PIX acompanhado nem check em andamento
+
+        Returns:
+            True se ficou ocioso, False se o timeout foi atingido
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._entries or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        return True
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """Itera sobre os resultados finais conforme chegam (termina após stop(); vazio com on_result)"""
+        while True:
+            result = self._results.get()
+            if result is None:
+                return
+            yield result
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de vazão (checks/s) e atraso de agendamento"""
+        with self._cond:
+            elapsed = (time.time() - self._started_at) if self._started_at else 0.0
+            lags = sorted(self._lags)
+            checks = self._checks
+            return {
+                "pending": len(self._entries),
+                "in_flight": self._in_flight,
+                "checks": checks,
+                "check_errors": self._check_errors,
+                "skipped_checks": self._skipped_checks,
+                "settled": self._settled,
+                "elapsed": elapsed,
+                "checks_per_sec": checks / elapsed if elapsed > 0 else 0.0,
+                "lag_p50_ms": lags[len(lags) // 2] * 1000 if lags else 0.0,
+                "lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000 if lags else 0.0,
+                "lag_max_ms": lags[-1] * 1000 if lags else 0.0
+            }
+
+    # ------------------------------------------------------------------
+    # Agendamento
+    # ------------------------------------------------------------------
+
+    def _push(self, entry: MonitoredPix, due: float) -> None:
+        """Enfileira o próximo check; empates saem pelo expires_at mais próximo"""
+        if entry.expires_at is not None:
+            due = min(due, entry.expires_at)
+        tiebreak = entry.expires_at if entry.expires_at is not None else float("inf")
+        heapq.heappush(self._heap, (due, tiebreak, next(self._seq), entry.pix_id))
+
+    def _schedule_loop(self) -> None:
+        while True:
+            # Reserva um slot antes de retirar da fila para não acumular trabalho no executor
+            self._slots.acquire()
+            with self._cond:
+                entry, due = self._next_due()
+                if entry is None:
+                    self._slots.release()
+                    return
+                self._in_flight += 1
+                self._lags.append(max(0.0, time.time() - due))
+            self._executor.submit(self._run_check, entry)
+
+    def _next_due(self):
+        """Aguarda o próximo item vencido (deve ser chamado com o lock)"""
+        while self._running:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            due, _, _, pix_id = self._heap[0]
+            delay = due - time.time()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+            heapq.heappop(self._heap)
+            entry = self._entries.get(pix_id)
+            if entry is None:
+                continue  # removido enquanto aguardava
+            return entry, due
+        return None, None
+
+    def _run_check(self, entry: MonitoredPix) -> None:
+        try:
+            settled = self.settled_lookup(entry.pix_id) if self.settled_lookup else None
+            if settled in TERMINAL_STATUSES:
+                self._settle_from_webhook(entry, settled)
+                return
+            try:
+                result = self.manager.check_payment_status(entry.pix_id)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            self._handle_check_result(entry, result)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+            self._slots.release()
+
+    def _settle_from_webhook(self, entry: MonitoredPix, status: str) -> None:
+        """Finaliza um PIX cujo estado já chegou por webhook, sem chamar a API"""
+        with self._cond:
+            self._skipped_checks += 1
+            if self._entries.pop(entry.pix_id, None) is None:
+                return
+            self._settled += 1
+            final = self._final(entry, success=True, status=status)
+            final["source"] = "webhook"
+        self._emit(final)
+
+    def _handle_check_result(self, entry: MonitoredPix, result: Dict[str, Any]) -> None:
+        now = time.time()
+        final: Optional[Dict[str, Any]] = None
+        observed: Optional[str] = None
+
+        with self._cond:
+            self._checks += 1
+            entry.attempts += 1
+            if entry.pix_id not in self._entries:
+                return
+
+            if result.get("success"):
+                status = result.get("status")
+                if entry.expires_at is None:
+                    entry.expires_at = to_timestamp(result.get("expires_at"))
+                if status in TERMINAL_STATUSES:
+                    final = self._final(entry, success=True, status=status)
+                    observed = status
+            else:
+                self._check_errors += 1
+                entry.errors += 1
+
+            next_check = None
+            if final is None:
+                next_check = self.policy.next_check_at(entry.attempts, entry.created_at, now, entry.expires_at)
+                retry_after = None if result.get("success") else result.get("retry_after")
+                if next_check is not None and retry_after:
+                    next_check = max(next_check, now + retry_after)
+                if next_check is None:
+                    final = self._final(entry, success=True, status="EXPIRED")
+            if final is None and entry.max_attempts is not None and entry.attempts >= entry.max_attempts:
+                final = self._final(entry, success=False, status=None, error="Tempo limite atingido")
+
+            if final is None:
+                self._push(entry, next_check)
+                self._cond.notify()
+            else:
+                del self._entries[entry.pix_id]
+                self._settled += 1
+
+        if observed is not None:
+            observe_final_status(entry.pix_id, observed, "polling")
+        if final is not None:
+            self._emit(final)
+
+    def _final(self, entry: MonitoredPix, success: bool, status: Optional[str], error: Optional[str] = None) -> Dict[str, Any]:
+        result = {
+            "pix_id": entry.pix_id,
+            "success": success,
+            "attempts": entry.attempts,
+            "errors": entry.errors
+        }
+        if status is not None:
+            result["status"] = status
+            result["final_status"] = status
+        if error is not None:
+            result["error"] = error
+        return result
+
+    def _emit(self, result: Dict[str, Any]) -> None:
+        # Com callback ninguém consome a fila: enfileirar só acumularia resultados
+        if self.on_result is None:
+            self._results.put(result)
+            return
+        try:
+            self.on_result(result)
+        except Exception as e:
+            logger.exception("❌ Erro no callback de resultado: %s", e)
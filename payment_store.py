@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Armazenamento de Eventos de Pagamento
+Log append-only em SQLite (modo WAL) com índices por pix_id, status,
+timestamp e CPF do cliente, substituindo o payment_logs.json. Inclui
+ferramenta de importação dos arquivos JSONL existentes (retomável: rodar
+de novo só importa as linhas novas)
+
+Uso:
+    python3 payment_store.py import payment_logs.json [--db payment_events.db] [--force]
+    python3 payment_store.py stats [--db payment_events.db]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+PAYMENT_DB_PATH = os.getenv('PAYMENT_DB_PATH', 'payment_events.db')
+PAYMENT_LOG_FILE = os.getenv('PAYMENT_LOG_FILE', 'payment_logs.json')
+PAYMENT_LOG_BACKEND = os.getenv('PAYMENT_LOG_BACKEND', 'sqlite')  # sqlite | jsonl
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payment_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    pix_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    amount INTEGER NOT NULL DEFAULT 0,
+    customer_tax_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payment_events_pix_id ON payment_events (pix_id);
+CREATE INDEX IF NOT EXISTS idx_payment_events_status ON payment_events (status);
+CREATE INDEX IF NOT EXISTS idx_payment_events_timestamp ON payment_events (timestamp);
+CREATE INDEX IF NOT EXISTS idx_payment_events_tax_id ON payment_events (customer_tax_id);
+CREATE TABLE IF NOT EXISTS payment_imports (
+    source TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+def _customer_tax_id(log_entry: Dict[str, Any]) -> Optional[str]:
+    customer = log_entry.get("customer") or {}
+    return customer.get("tax_id") or customer.get("taxId") or None
+
+
+def _row(log_entry: Dict[str, Any]) -> tuple:
+    return (
+        log_entry.get("timestamp", ""),
+        log_entry.get("pix_id", ""),
+        log_entry.get("status", "UNKNOWN"),
+        log_entry.get("amount", 0) or 0,
+        _customer_tax_id(log_entry),
+        json.dumps(log_entry, ensure_ascii=False, default=str)
+    )
+
+
+class PaymentEventStore:
+    """Log de eventos de pagamento em SQLite com índices para relatórios"""
+
+    def __init__(self, path: str = PAYMENT_DB_PATH):
+        """
+        Args:
+            path: Caminho do banco SQLite (criado se não existir)
+        """
+        self.path = path
+        self.log_prefix = "🗄️ PrescrevaMe Event Store"
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, "conn", None)
+        # Após um fork (workers do servidor) a conexão herdada não é reutilizada
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self) -> None:
+        """Fecha a conexão da thread atual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def append(self, log_entry: Dict[str, Any]) -> int:
+        """
+        Acrescenta um evento
+
+        Returns:
+            ID sequencial do evento
+        """
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO payment_events (timestamp, pix_id, status, amount, customer_tax_id, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                _row(log_entry)
+            )
+        return cursor.lastrowid
+
+    def append_many(self, log_entries: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """
+        Acrescenta eventos em transações de até `batch_size` linhas
+
+        Returns:
+            Quantidade de eventos gravados
+        """
+        conn = self._connection()
+        total = 0
+        batch: List[tuple] = []
+        for log_entry in log_entries:
+            batch.append(_row(log_entry))
+            if len(batch) >= batch_size:
+                total += self._insert_batch(conn, batch)
+                batch = []
+        if batch:
+            total += self._insert_batch(conn, batch)
+        return total
+
+    def _insert_batch(self, conn: sqlite3.Connection, batch: List[tuple], checkpoint: Optional[tuple] = None) -> int:
+        """Grava um lote; `checkpoint` (source, byte_offset, fingerprint) avança a importação na mesma transação"""
+        with conn:
+            if batch:
+                conn.executemany(
+                    "INSERT INTO payment_events (timestamp, pix_id, status, amount, customer_tax_id, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+            if checkpoint is not None:
+                conn.execute(
+                    "INSERT INTO payment_imports (source, byte_offset, fingerprint, imported_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(source) DO UPDATE SET byte_offset = excluded.byte_offset, "
+                    "fingerprint = excluded.fingerprint, imported_at = excluded.imported_at",
+                    checkpoint + (time.time(),)
+                )
+        return len(batch)
+
+    def import_jsonl(
+        self,
+        log_file: str = PAYMENT_LOG_FILE,
+        batch_size: int = 10000,
+        force: bool = False
+    ) -> Dict[str, int]:
+        """
+        Importa um payment_logs.json (JSON por linha) existente
+
+        A posição lida é gravada em payment_imports junto com cada lote:
+        importar o mesmo arquivo de novo (ou depois de uma interrupção) só
+        acrescenta as linhas seguintes, sem duplicar eventos. Apenas linhas
+        completas (terminadas em \\n) são consumidas: uma linha sendo gravada
+        pelo webhook fica para a próxima importação.
+
+        Args:
+            log_file: Arquivo JSONL
+            batch_size: Linhas por transação
+            force: Importar do início mesmo que o arquivo já tenha sido importado
+
+        Returns:
+            Dict com eventos importados, linhas inválidas ignoradas e byte de onde a leitura começou
+
+        Raises:
+            ValueError: Outro arquivo no mesmo caminho (menor ou com outra primeira linha) sem force
+        """
+        source = os.path.realpath(log_file)
+        conn = self._connection()
+        with open(log_file, "rb") as f:
+            fingerprint = hashlib.sha256(f.readline()).hexdigest()
+            size = os.fstat(f.fileno()).st_size
+            start = 0
+            row = conn.execute(
+                "SELECT byte_offset, fingerprint FROM payment_imports WHERE source = ?", (source,)
+            ).fetchone()
+            if row is not None and not force:
+                if row[0] > size or (row[0] and row[1] != fingerprint):
+                    raise ValueError(f"{log_file} mudou desde a última importação (use force para importar do início)")
+                start = row[0]
+
+            f.seek(start)
+            position, imported, skipped = start, 0, 0
+            batch: List[tuple] = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                position += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(_row(json.loads(line)))
+                except ValueError:
+                    skipped += 1
+                if len(batch) >= batch_size:
+                    imported += self._insert_batch(conn, batch, (source, position, fingerprint))
+                    batch = []
+            imported += self._insert_batch(conn, batch, (source, position, fingerprint))
+        return {"imported": imported, "skipped": skipped, "resumed_at": start}
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def iter_events(
+        self,
+        pix_id: Optional[str] = None,
+        status: Optional[str] = None,
+        tax_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after_id: Optional[int] = None,
+        batch_size: int = 5000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Itera sobre os eventos em ordem de gravação, usando os índices disponíveis
+
+        Args:
+            pix_id: Filtrar por PIX
+            status: Filtrar por status
+            tax_id: Filtrar por CPF do cliente
+            since: Timestamp ISO mínimo (inclusive)
+            until: Timestamp ISO máximo (exclusivo)
+            after_id: Apenas eventos com ID maior (leitura incremental)
+            batch_size: Linhas buscadas por vez
+
+        Yields:
+            Evento no mesmo formato gravado pelo webhook, com "event_id"
+        """
+        clauses, params = [], []
+        for column, value in (("pix_id", pix_id), ("status", status), ("customer_tax_id", tax_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self._connection().execute(f"SELECT id, payload FROM payment_events{where} ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for event_id, payload in rows:
+                event = json.loads(payload)
+                event["event_id"] = event_id
+                yield event
+
+    def count_by_status(self, since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, int]:
+        """Contagem de eventos por status (opcionalmente em um intervalo de tempo)"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT status, COUNT(*) FROM payment_events{where} GROUP BY status", params
+        ).fetchall()
+        return dict(rows)
+
+    def revenue(self, since: Optional[str] = None, until: Optional[str] = None) -> int:
+        """Soma dos valores de eventos PAID em centavos"""
+        clauses, params = ["status = 'PAID'"], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        row = self._connection().execute(
+            f"SELECT COALESCE(SUM(amount), 0) FROM payment_events WHERE {' AND '.join(clauses)}", params
+        ).fetchone()
+        return row[0]
+
+    def latest_status(self, pix_id: str) -> Optional[str]:
+        """Último status registrado para um PIX"""
+        row = self._connection().execute(
+            "SELECT status FROM payment_events WHERE pix_id = ? ORDER BY id DESC LIMIT 1", (pix_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def last_event_id(self) -> int:
+        """Maior ID gravado (0 se vazio)"""
+        row = self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM payment_events").fetchone()
+        return row[0]
+
+    def count(self) -> int:
+        """Total de eventos"""
+        return self._connection().execute("SELECT COUNT(*) FROM payment_events").fetchone()[0]
+
+
+def main():
+    """Ferramenta de linha de comando do armazenamento de eventos"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Armazenamento de eventos de pagamento")
+    parser.add_argument("--db", default=PAYMENT_DB_PATH, help="Caminho do banco SQLite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Importar payment_logs.json (JSONL)")
+    import_parser.add_argument("log_file", nargs="?", default=PAYMENT_LOG_FILE)
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+    import_parser.add_argument("--force", action="store_true", help="Importar do início, mesmo se já importado")
+
+    subparsers.add_parser("stats", help="Resumo do banco")
+    args = parser.parse_args()
+
+    store = PaymentEventStore(args.db)
+
+    if args.command == "import":
+        print(f"{store.log_prefix} 📥 Importando {args.log_file} para {args.db}...")
+        try:
+            result = store.import_jsonl(args.log_file, batch_size=args.batch_size, force=args.force)
+        except FileNotFoundError:
+            print(f"{store.log_prefix} ❌ Arquivo não encontrado: {args.log_file}")
+            return
+        except ValueError as e:
+            print(f"{store.log_prefix} ❌ {e}")
+            return
+        resumed = f", continuando do byte {result['resumed_at']}" if result["resumed_at"] else ""
+        print(f"{store.log_prefix} ✅ {result['imported']} eventos importados "
+              f"({result['skipped']} linhas inválidas{resumed})")
+    elif args.command == "stats":
+        print(f"{store.log_prefix} 📊 {store.count()} eventos em {args.db}")
+        for status, count in sorted(store.count_by_status().items()):
+            print(f"   {status}: {count}")
+        print(f"   Receita: R$ {store.revenue()/100:.2f}")
+
+
+if __name__ == "__main__":
+    main()
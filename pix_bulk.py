@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Criação de PIX em Lote
+Cria cobranças para campanhas e renovações a partir de um CSV (ou de qualquer
+iterável de clientes) com paralelismo limitado, limite de taxa e pausa em
+respostas 429. Cada item é registrado em um diário SQLite antes da chamada à
+API, então uma execução interrompida pode ser retomada sem cobrar ninguém duas
+vezes; os resultados são gravados no arquivo de saída à medida que saem
+
+Uso:
+    python3 pix_bulk.py clientes.csv --output resultados.jsonl [--workers 8] [--rate 10]
+    python3 pix_bulk.py clientes.csv --output resultados.jsonl --retry-uncertain
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from dotenv_cache import load_env
+from metrics import start_metrics_server
+from rate_limiter import TokenBucket
+from structured_logging import setup_logging
+from tracing import add_profile_argument, profiling
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+BULK_PIX_WORKERS = int(os.getenv('BULK_PIX_WORKERS', '8'))
+BULK_PIX_RATE = float(os.getenv('BULK_PIX_RATE', '10'))  # criações por segundo
+BULK_PIX_MAX_RETRIES = int(os.getenv('BULK_PIX_MAX_RETRIES', '5'))  # novas tentativas após 429
+BULK_PIX_MAX_UNCERTAIN = int(os.getenv('BULK_PIX_MAX_UNCERTAIN', '20'))  # incertos seguidos antes de abortar
+
+# Recusas locais do PrescrevaMePixManager (circuito aberto / limite de taxa): a chamada nem saiu
+NOT_SENT_ERRORS = ("CircuitOpenError", "RateLimitExceeded")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulk_pix (
+    item_key TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    pix_id TEXT,
+    result TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+# started: chamada enviada sem resposta registrada (o PIX pode ou não existir)
+STARTED, CREATED, FAILED = "started", "created", "failed"
+
+# Colunas aceitas no CSV -> parâmetros de create_pix_payment
+_CSV_COLUMNS = {
+    "customer_name": ("customer_name", "name", "nome"),
+    "customer_email": ("customer_email", "email"),
+    "customer_phone": ("customer_phone", "phone", "cellphone", "telefone"),
+    "customer_cpf": ("customer_cpf", "cpf", "tax_id"),
+    "amount": ("amount", "valor"),
+    "description": ("description", "descricao"),
+    "key": ("key", "chave")
+}
+
+_OUTPUT_FIELDS = ("key", "status", "pix_id", "amount", "expires_at", "brcode", "customer_email", "error")
+
+
+def read_customers_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê clientes de um CSV com cabeçalho, uma linha por vez
+
+    Colunas: nome, email, telefone, cpf e, opcionalmente, amount (centavos),
+    description e key (identificador do item; padrão: derivado do cliente)
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            row = {(name or "").strip().lower(): (value or "").strip() for name, value in row.items()}
+            customer = {}
+            for field, aliases in _CSV_COLUMNS.items():
+                value = next((row[alias] for alias in aliases if row.get(alias)), None)
+                if value is not None:
+                    customer[field] = int(value) if field == "amount" else value
+            yield customer
+
+
+def item_key(customer: Dict[str, Any], amount: int, description: str) -> str:
+    """Identificador estável de um item: a mesma cobrança para o mesmo cliente gera a mesma chave"""
+    if customer.get("key"):
+        return str(customer["key"])
+    cpf = "".join(ch for ch in str(customer.get("customer_cpf", "")) if ch.isdigit())
+    email = str(customer.get("customer_email", "")).lower()
+    raw = f"{cpf}|{email}|{amount}|{description}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class BulkJournal:
+    """Diário SQLite dos itens de um lote (gravado com fsync antes de cada chamada)"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Caminho do banco SQLite do diário
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread; synchronous=FULL garante o registro em disco antes da chamada"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def begin(self, key: str, retry_uncertain: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Reserva um item antes da chamada à API
+
+        Args:
+            key: Identificador do item
+            retry_uncertain: Reenviar itens que ficaram sem resposta em uma execução anterior
+
+        Returns:
+            None se o item deve ser criado agora; senão o registro existente
+            (state "created" = já feito, "started" = resultado incerto)
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, attempts, pix_id, result FROM bulk_pix WHERE item_key = ?", (key,)
+            ).fetchone()
+            proceed = row is None or row[0] == FAILED or (row[0] == STARTED and retry_uncertain)
+            if row is None:
+                conn.execute(
+                    "INSERT INTO bulk_pix (item_key, state, updated_at) VALUES (?, ?, ?)",
+                    (key, STARTED, time.time())
+                )
+            elif proceed:
+                conn.execute(
+                    "UPDATE bulk_pix SET state = ?, attempts = attempts + 1, updated_at = ? WHERE item_key = ?",
+                    (STARTED, time.time(), key)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if proceed:
+            return None
+        return {
+            "state": row[0],
+            "attempts": row[1],
+            "pix_id": row[2],
+            "result": json.loads(row[3]) if row[3] else None
+        }
+
+    def _finish(self, key: str, state: str, pix_id: Optional[str], result: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "UPDATE bulk_pix SET state = ?, pix_id = ?, result = ?, updated_at = ? WHERE item_key = ?",
+            (state, pix_id, json.dumps(result, ensure_ascii=False, default=str), time.time(), key)
+        )
+
+    def created(self, key: str, result: Dict[str, Any]) -> None:
+        self._finish(key, CREATED, result.get("pix_id"), result)
+
+    def failed(self, key: str, result: Dict[str, Any]) -> None:
+        """Falha definitiva: a API recusou a cobrança (pode ser tentada de novo em outra execução)"""
+        self._finish(key, FAILED, None, result)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM bulk_pix GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+
+class _ResultWriter:
+    """Saída em streaming: JSONL, ou CSV se o arquivo terminar em .csv (uma linha por item, com flush)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._csv = path.lower().endswith(".csv")
+        needs_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        if self._csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=_OUTPUT_FIELDS, extrasaction="ignore")
+            if needs_header:
+                self._writer.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._csv:
+                self._writer.writerow(record)
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BulkPixCreator:
+    """Executa um lote de criações de PIX com diário, limite de taxa e paralelismo limitado"""
+
+    def __init__(
+        self,
+        manager: Any,
+        output_file: str,
+        journal_file: Optional[str] = None,
+        max_workers: int = BULK_PIX_WORKERS,
+        rate: float = BULK_PIX_RATE,
+        max_retries: int = BULK_PIX_MAX_RETRIES,
+        retry_uncertain: bool = False,
+        max_uncertain: int = BULK_PIX_MAX_UNCERTAIN,
+        limiter: Optional[TokenBucket] = None
+    ):
+        """
+        Args:
+            manager: Objeto com create_pix_payment (ex.: PrescrevaMePixManager)
+            output_file: Arquivo de resultados (JSONL, ou CSV pela extensão), aberto em modo append
+            journal_file: Diário SQLite do lote (padrão: output_file + ".journal.db")
+            max_workers: Criações simultâneas
+            rate: Criações por segundo (0 = sem limite)
+            max_retries: Novas tentativas de um item após 429 (Too Many Requests)
+            retry_uncertain: Reenviar itens sem resposta registrada em execuções anteriores
+                (timeout, queda de conexão ou do processo): pode duplicar a cobrança
+            max_uncertain: Resultados incertos seguidos que interrompem o lote (API fora do ar)
+            limiter: Token bucket compartilhado (padrão: um novo com `rate`)
+        """
+        self.manager = manager
+        self.output_file = output_file
+        self.journal_file = journal_file or f"{output_file}.journal.db"
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_uncertain = retry_uncertain
+        self.max_uncertain = max_uncertain
+        self.limiter = limiter or TokenBucket(rate, capacity=max(1.0, min(rate, max_workers)))
+        self.log_prefix = "📦 PrescrevaMe PIX em Lote"
+
+        self.journal = BulkJournal(self.journal_file)
+        self._lock = threading.Lock()
+        self._seen: set = set()
+        self._aborted = threading.Event()
+        self._consecutive_uncertain = 0
+        self._counts = {
+            "processed": 0, "created": 0, "failed": 0, "uncertain": 0,
+            "skipped": 0, "duplicates": 0, "retries": 0, "rate_limited": 0
+        }
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+    def _record(self, writer: _ResultWriter, key: str, customer: Dict[str, Any], status: str, **fields: Any) -> None:
+        with self._lock:
+            self._counts["processed"] += 1
+            self._counts[status] += 1
+            self._consecutive_uncertain = self._consecutive_uncertain + 1 if status == "uncertain" else 0
+            if self._consecutive_uncertain >= self.max_uncertain and not self._aborted.is_set():
+                self._aborted.set()
+                logger.error("🛑 %d resultados incertos seguidos: interrompendo o lote", self._consecutive_uncertain)
+        if status != "skipped":
+            writer.write({"key": key, "status": status, "customer_email": customer.get("customer_email"), **fields})
+
+    def _process(
+        self,
+        writer: _ResultWriter,
+        customer: Dict[str, Any],
+        amount: int,
+        description: str,
+        expires_in: int
+    ) -> None:
+        amount = int(customer.get("amount") or amount)
+        description = customer.get("description") or description
+        key = item_key(customer, amount, description)
+
+        with self._lock:
+            duplicate = key in self._seen
+            self._seen.add(key)
+        if duplicate:
+            self._count("duplicates")
+            writer.write({"key": key, "status": "duplicate", "customer_email": customer.get("customer_email")})
+            return
+
+        existing = self.journal.begin(key, self.retry_uncertain)
+        if existing is not None:
+            if existing["state"] == CREATED:
+                self._record(writer, key, customer, "skipped")
+            else:
+                self._record(writer, key, customer, "uncertain",
+                             error="Sem resposta registrada em execução anterior (use --retry-uncertain após conferir)")
+            return
+
+        result: Dict[str, Any] = {}
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            result = self.manager.create_pix_payment(
+                customer_name=customer.get("customer_name", ""),
+                customer_email=customer.get("customer_email", ""),
+                customer_phone=customer.get("customer_phone", ""),
+                customer_cpf=customer.get("customer_cpf", ""),
+                amount=amount,
+                description=description,
+                expires_in=expires_in,
+                # Cobranças do lote são nominais e novas: não consomem o pool pré-criado do checkout
+                use_warm_pool=False
+            )
+            if result.get("success") or not self._not_processed(result):
+                break
+            # 429 ou recusa local: a API não processou a criação; pausa todos os workers e tenta de novo
+            self._count("rate_limited")
+            if attempt < self.max_retries:
+                self._count("retries")
+                self.limiter.pause(result.get("retry_after") or min(2 ** attempt, 30))
+
+        if result.get("success"):
+            self.journal.created(key, result)
+            self._record(writer, key, customer, "created", pix_id=result["pix_id"], amount=result.get("amount"),
+                         expires_at=result.get("expires_at"), brcode=result.get("brcode"))
+            return
+
+        status_code = result.get("status_code")
+        if (status_code is not None and 400 <= status_code < 500) or result.get("error_type") in NOT_SENT_ERRORS:
+            # Recusa da API (dados inválidos, 429 persistente...) ou chamada não enviada: nada foi criado
+            self.journal.failed(key, result)
+            self._record(writer, key, customer, "failed", error=result.get("error"), status_code=status_code)
+        else:
+            # Timeout, conexão ou 5xx: a cobrança pode ter sido criada; o item fica "started"
+            self._record(writer, key, customer, "uncertain", error=result.get("error"),
+                         error_type=result.get("error_type"))
+
+    @staticmethod
+    def _not_processed(result: Dict[str, Any]) -> bool:
+        """429 ou chamada recusada antes de sair (circuito aberto, limite de taxa)"""
+        return result.get("status_code") == 429 or result.get("error_type") in NOT_SENT_ERRORS
+
+    def run(
+        self,
+        customers: Iterable[Dict[str, Any]],
+        amount: int,
+        description: str,
+        expires_in: int
+    ) -> Dict[str, Any]:
+        """
+        Processa os clientes (o iterável é consumido aos poucos, sem carregar tudo em memória)
+
+        Args:
+            customers: Dicts com customer_name, customer_email, customer_phone, customer_cpf
+                e, opcionalmente, amount, description e key
+            amount: Valor padrão em centavos
+            description: Descrição padrão
+            expires_in: Expiração de cada PIX em segundos
+
+        Returns:
+            Dict com contadores do lote (created, failed, uncertain, skipped, ...)
+        """
+        start = time.time()
+        writer = _ResultWriter(self.output_file)
+        slots = threading.BoundedSemaphore(self.max_workers * 2)  # itens lidos à frente dos workers
+        logger.info("🚀 Iniciando lote", extra={"workers": self.max_workers, "rate": self.limiter.rate})
+
+        def task(customer: Dict[str, Any]) -> None:
+            try:
+                if not self._aborted.is_set():
+                    self._process(writer, customer, amount, description, expires_in)
+            except Exception as e:
+                logger.exception("❌ Erro inesperado no item: %s", e)
+                self._count("failed")
+            finally:
+                slots.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for customer in customers:
+                    slots.acquire()
+                    if self._aborted.is_set():
+                        slots.release()
+                        break
+                    executor.submit(task, customer)
+        finally:
+            writer.close()
+
+        summary = {
+            "success": not self._aborted.is_set(),
+            **self._counts,
+            "aborted": self._aborted.is_set(),
+            "duration_s": time.time() - start,
+            "output_file": self.output_file,
+            "journal_file": self.journal_file,
+            "journal": self.journal.counts(),
+            "rate_limiter": self.limiter.stats()
+        }
+        logger.info("🏁 Lote finalizado", extra={
+            key: summary[key] for key in ("created", "failed", "uncertain", "skipped", "duration_s")
+        })
+        return summary
+
+
+def main():
+    """Cria PIX em lote a partir de um CSV"""
+    # Import tardio: pix_manager importa este módulo
+    from pix_manager import PIX_EXPIRATION, PRODUCT_NAME, PRODUCT_PRICE, PrescrevaMePixManager
+
+    parser = argparse.ArgumentParser(description="Criação de PIX em lote")
+    parser.add_argument("csv_file", help="CSV de clientes (nome, email, telefone, cpf[, amount, description, key])")
+    parser.add_argument("--output", required=True, help="Arquivo de resultados (.jsonl ou .csv)")
+    parser.add_argument("--journal", help="Diário do lote (padrão: <output>.journal.db)")
+    parser.add_argument("--workers", type=int, default=BULK_PIX_WORKERS, help="Criações simultâneas")
+    parser.add_argument("--rate", type=float, default=BULK_PIX_RATE, help="Criações por segundo (0 = sem limite)")
+    parser.add_argument("--amount", type=int, default=PRODUCT_PRICE, help="Valor padrão em centavos")
+    parser.add_argument("--description", default=PRODUCT_NAME, help="Descrição padrão")
+    parser.add_argument("--expires-in", type=int, default=PIX_EXPIRATION, help="Expiração em segundos")
+    parser.add_argument("--retry-uncertain", action="store_true",
+                        help="Reenviar itens sem resposta registrada (pode duplicar cobranças)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    setup_logging()
+    start_metrics_server()
+    print("🌵 PrescrevaMe Premium - PIX em Lote")
+    print("=" * 50)
+    # O lote já espaça as criações com --rate; o limite por processo do gerenciador ficaria redundante
+    with profiling(args.profile):
+        summary = PrescrevaMePixManager(rate_limiter=TokenBucket(0)).create_pix_payments_bulk(
+            args.csv_file,
+            output_file=args.output,
+            journal_file=args.journal,
+            max_workers=args.workers,
+            rate=args.rate,
+            amount=args.amount,
+            description=args.description,
+            expires_in=args.expires_in,
+            retry_uncertain=args.retry_uncertain
+        )
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
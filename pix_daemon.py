@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Daemon PIX
+Serviço local persistente que mantém um PrescrevaMePixManager aquecido e atende
+create/check/simulate por um protocolo JSON enquadrado, evitando um novo
+interpretador Python a cada chamada do PHP
+
+Protocolo: cada mensagem é um cabeçalho de 4 bytes (big-endian, tamanho do corpo)
+seguido do corpo JSON em UTF-8.
+    Requisição: {"id": 1, "op": "check", "params": {"pix_id": "..."}}
+    Resposta:   {"id": 1, "ok": true, "result": {...}}
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from metrics import start_metrics_server
+from pix_manager import PrescrevaMePixManager
+from structured_logging import setup_logging
+from tracing import add_profile_argument, profiling, tracer
+
+# Configurações
+DAEMON_SOCKET = os.getenv('PIX_DAEMON_SOCKET', '/tmp/prescrevame-pix.sock')
+DAEMON_HOST = os.getenv('PIX_DAEMON_HOST', '127.0.0.1')
+# Conexões aguardando accept (o padrão do socketserver, 5, recusa rajadas do PHP-FPM com EAGAIN)
+DAEMON_BACKLOG = int(os.getenv('PIX_DAEMON_BACKLOG', '1024'))
+MAX_FRAME_SIZE = 1024 * 1024  # 1 MiB por mensagem
+
+_HEADER = struct.Struct('!I')
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Lê exatamente `size` bytes; retorna None se a conexão fechar antes do primeiro byte"""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if not buffer:
+                return None
+            raise ConnectionError("Conexão encerrada no meio de um frame")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Envia uma mensagem JSON enquadrada"""
+    body = json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """
+    Recebe uma mensagem JSON enquadrada
+
+    Returns:
+        Mensagem decodificada, ou None se o par fechou a conexão
+    """
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame muito grande: {length} bytes")
+
+    body = _recv_exact(sock, length) if length else b''
+    if body is None:
+        raise ConnectionError("Conexão encerrada antes do corpo do frame")
+    return json.loads(body.decode('utf-8'))
+
+
+class PixDaemon:
+    """Despacha requisições do protocolo para um PrescrevaMePixManager aquecido"""
+
+    def __init__(self, manager: Optional[PrescrevaMePixManager] = None):
+        self.manager = manager or PrescrevaMePixManager()
+        self.log_prefix = "🛰️ PrescrevaMe PIX Daemon"
+        self.started_at = time.time()
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "ping": self._op_ping,
+            "stats": self._op_stats,
+            "create": self._op_create,
+            "check": self._op_check,
+            "simulate": self._op_simulate,
+            "monitor": self._op_monitor,
+        }
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Executa uma requisição do protocolo
+
+        Args:
+            request: Mensagem com "op", "params" e opcionalmente "id"
+
+        Returns:
+            Mensagem de resposta com o mesmo "id"
+        """
+        request_id = request.get("id")
+        op = request.get("op", "")
+        params = request.get("params") or {}
+
+        handler = self._operations.get(op)
+        if handler is None:
+            return {"id": request_id, "ok": False, "error": f"Operação desconhecida: {op}"}
+
+        try:
+            with tracer.trace(f"daemon.{op}"):
+                result = handler(params)
+        except TypeError as e:
+            return {"id": request_id, "ok": False, "error": f"Parâmetros inválidos: {e}"}
+        except Exception as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+
+        with self._lock:
+            self.requests_served += 1
+        return {"id": request_id, "ok": True, "result": result}
+
+    def _op_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "requests_served": self.requests_served
+        }
+
+    def _op_stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "requests_served": self.requests_served,
+            "status_cache": self.manager.status_cache.stats(),
+            "api": self.manager.api_stats(),
+            "tracing": tracer.stats()
+        }
+
+    def _op_create(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.manager.create_pix_payment(**params)
+
+    def _op_check(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.manager.check_payment_status(params["pix_id"])
+
+    def _op_simulate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.manager.simulate_payment(params["pix_id"], params.get("metadata"))
+
+    def _op_monitor(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.manager.monitor_payment(**params)
+
+
+def serve_connection(sock: socket.socket, app: PixDaemon) -> int:
+    """
+    Atende várias requisições enquadradas na mesma conexão, até o cliente fechá-la
+
+    Args:
+        sock: Conexão aceita (com timeout, a conexão ociosa é encerrada ao expirar)
+        app: Despachante de requisições
+
+    Returns:
+        Requisições respondidas
+    """
+    served = 0
+    while True:
+        try:
+            request = recv_frame(sock)
+        except (ValueError, ConnectionError) as e:
+            try:
+                send_frame(sock, {"id": None, "ok": False, "error": str(e)})
+            except OSError:
+                pass
+            return served
+        except socket.timeout:
+            return served
+
+        if request is None:
+            return served
+
+        send_frame(sock, app.handle_request(request))
+        served += 1
+
+
+class _DaemonRequestHandler(socketserver.BaseRequestHandler):
+    """Atende várias requisições enquadradas na mesma conexão"""
+
+    def handle(self) -> None:
+        serve_connection(self.request, self.server.app)
+
+
+class _UnixDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = DAEMON_BACKLOG
+
+
+class _TCPDaemonServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = DAEMON_BACKLOG
+
+
+def create_server(
+    app: PixDaemon,
+    socket_path: Optional[str] = DAEMON_SOCKET,
+    host: str = DAEMON_HOST,
+    port: Optional[int] = None
+) -> socketserver.BaseServer:
+    """
+    Cria o servidor do daemon (socket Unix por padrão, TCP em localhost se `port` for informado)
+
+    Args:
+        app: Despachante de requisições
+        socket_path: Caminho do socket Unix
+        host: Host TCP (apenas com `port`)
+        port: Porta TCP; quando informada, o socket Unix não é usado
+
+    Returns:
+        Servidor pronto para serve_forever()
+    """
+    if port is not None:
+        server = _TCPDaemonServer((host, port), _DaemonRequestHandler)
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixDaemonServer(socket_path, _DaemonRequestHandler)
+        os.chmod(socket_path, 0o660)
+    server.app = app
+    return server
+
+
+class PixDaemonClient:
+    """Cliente do daemon PIX com conexão persistente"""
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = DAEMON_SOCKET,
+        host: str = DAEMON_HOST,
+        port: Optional[int] = None,
+        timeout: float = 30.0
+    ):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def connect(self) -> None:
+        """Abre a conexão com o daemon (chamado automaticamente no primeiro uso)"""
+        if self.port is not None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        self._sock = sock
+
+    def close(self) -> None:
+        """Fecha a conexão"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "PixDaemonClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def call(self, op: str, **params) -> Dict[str, Any]:
+        """
+        Envia uma requisição e aguarda a resposta
+
+        Returns:
+            Resultado da operação no mesmo formato do PrescrevaMePixManager
+        """
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+            self._next_id += 1
+            try:
+                send_frame(self._sock, {"id": self._next_id, "op": op, "params": params})
+                response = recv_frame(self._sock)
+            except (OSError, ValueError):
+                self.close()
+                raise
+
+        if response is None:
+            self.close()
+            raise ConnectionError("Daemon encerrou a conexão")
+        if not response.get("ok"):
+            return {"success": False, "error": response.get("error", "Erro desconhecido")}
+        return response["result"]
+
+    def ping(self) -> Dict[str, Any]:
+        return self.call("ping")
+
+    def create_pix_payment(self, **customer_data) -> Dict[str, Any]:
+        return self.call("create", **customer_data)
+
+    def check_payment_status(self, pix_id: str) -> Dict[str, Any]:
+        return self.call("check", pix_id=pix_id)
+
+    def simulate_payment(self, pix_id: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        return self.call("simulate", pix_id=pix_id, metadata=metadata)
+
+    def monitor_payment(self, pix_id: str, **options) -> Dict[str, Any]:
+        return self.call("monitor", pix_id=pix_id, **options)
+
+
+def main():
+    """Inicia o daemon PIX"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Daemon PIX")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Caminho do socket Unix")
+    parser.add_argument("--host", default=DAEMON_HOST, help="Host TCP (com --port)")
+    parser.add_argument("--port", type=int, default=None, help="Usar TCP em vez de socket Unix")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    setup_logging()
+    start_metrics_server()
+    app = PixDaemon()
+    server = create_server(app, socket_path=args.socket, host=args.host, port=args.port)
+    address = f"{args.host}:{args.port}" if args.port is not None else args.socket
+
+    def _shutdown(signum, frame):
+        print(f"{app.log_prefix} 🛑 Sinal {signum} recebido, encerrando...")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    print("🌵 PrescrevaMe Premium - Daemon PIX")
+    print("=" * 50)
+    print(f"{app.log_prefix} 🚀 Escutando em {address} (pid {os.getpid()})")
+
+    try:
+        with profiling(args.profile):
+            server.serve_forever()
+    finally:
+        server.server_close()
+        if args.port is None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print(f"{app.log_prefix} 👋 Daemon encerrado ({app.requests_served} requisições atendidas)")
+
+
+if __name__ == "__main__":
+    main()
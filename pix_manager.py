@@ -4,18 +4,32 @@ PrescrevaMe Premium - Gerenciador de PIX com AbacatePay SDK
 Script para gerenciar pagamentos PIX usando o SDK oficial do AbacatePay
 """
 
-import abacatepay
-from abacatepay.customers import CustomerMetadata
-from abacatepay.pixQrCode import PixQrCodeIn
+import argparse
 import json
+import logging
+import random
+import sys
+import threading
 import time
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
+from typing import Optional, Dict, Any, Callable, Iterable, Union
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from dotenv_cache import load_env
+from metrics import (
+    API_REJECTED, API_REQUEST_SECONDS, API_RETRIES, note_pix_created, observe_final_status, registry as metrics_registry
+)
+from payment_monitor import PaymentMonitor, TERMINAL_STATUSES, to_timestamp
+from pix_warm_pool import WarmPixPool, sku_name, warm_pool as shared_warm_pool
+from polling_policy import FixedIntervalPolicy, PollingPolicy
+from rate_limiter import RateLimitExceeded, TokenBucket
+from status_cache import PixStatusCache, status_cache as shared_status_cache
+from structured_logging import setup_logging
+from tracing import add_profile_argument, exec_start_time, profiling, tracer
 
 # Carregar variáveis de ambiente
-load_dotenv()
+load_env()
 
 # Configurações
 API_KEY = os.getenv('ABACATE_API_KEY', '')  # Chave de desenvolvimento
@@ -23,13 +37,201 @@ PRODUCT_PRICE = int(os.getenv('PRODUCT_PRICE', 34700))  # R$ 347,00 em centavos
 PRODUCT_NAME = os.getenv('PRODUCT_NAME', 'PrescrevaMe Premium - Assinatura Anual')
 PIX_EXPIRATION = int(os.getenv('PIX_EXPIRATION_MINUTES', 15)) * 60  # Converter minutos para segundos
 
+# Proteção das chamadas ao SDK (limite de taxa + novas tentativas; circuit breaker em circuit_breaker.py)
+ABACATE_RATE_LIMIT = float(os.getenv('ABACATE_RATE_LIMIT', '20'))  # chamadas/s por processo (0 = sem limite)
+ABACATE_RATE_BURST = float(os.getenv('ABACATE_RATE_BURST', str(max(1.0, ABACATE_RATE_LIMIT))))
+ABACATE_RATE_MAX_WAIT = float(os.getenv('ABACATE_RATE_MAX_WAIT', '2'))  # espera máxima por token antes de descartar
+ABACATE_RETRY_MAX = int(os.getenv('ABACATE_RETRY_MAX', '2'))
+ABACATE_RETRY_BASE_DELAY = float(os.getenv('ABACATE_RETRY_BASE_DELAY', '0.2'))
+ABACATE_RETRY_MAX_DELAY = float(os.getenv('ABACATE_RETRY_MAX_DELAY', '2'))
+
+# Compartilhados por todos os gerenciadores do processo: a saúde do upstream é uma só
+api_breaker = CircuitBreaker("abacatepay")
+api_rate_limiter = TokenBucket(ABACATE_RATE_LIMIT, ABACATE_RATE_BURST)
+
+_BREAKER_STATE_CODES = {"closed": 0, "half_open": 1, "open": 2}
+metrics_registry.gauge_callback(
+    "abacatepay_circuit_state", "Estado do circuit breaker (0 closed, 1 half_open, 2 open)", ("name",),
+    lambda: {(api_breaker.name,): _BREAKER_STATE_CODES[api_breaker.state]}
+)
+metrics_registry.gauge_callback(
+    "abacatepay_circuit_consecutive_failures", "Falhas seguidas registradas pelo circuit breaker", ("name",),
+    lambda: {(api_breaker.name,): api_breaker.stats()["consecutive_failures"]}
+)
+metrics_registry.gauge_callback(
+    "abacatepay_rate_limiter_paused_seconds", "Segundos restantes de pausa do limite de taxa (Retry-After)", (),
+    lambda: {(): api_rate_limiter.stats()["paused_for_s"]}
+)
+
+logger = logging.getLogger(__name__)
+
+
+def api_error_details(error: Exception) -> Dict[str, Any]:
+    """
+    Classifica uma exceção do SDK para quem precisa decidir sobre novas tentativas
+
+    Returns:
+        Dict com error_type, status_code (None sem resposta HTTP) e retry_after
+        (segundos do cabeçalho Retry-After, do circuito aberto ou do limite de taxa)
+    """
+    response = getattr(error, "response", None)
+    retry_after = getattr(error, "retry_after", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = None
+    status_code = getattr(error, "status_code", None)
+    return {
+        "error_type": type(error).__name__,
+        "status_code": int(status_code) if status_code is not None else None,
+        "retry_after": retry_after
+    }
+
+
+def call_outcome(error: Exception) -> str:
+    """Rótulo `outcome` de uma chamada que falhou: rate_limited, upstream_error ou client_error"""
+    if getattr(error, "status_code", None) == 429:
+        return "rate_limited"
+    return "upstream_error" if is_upstream_failure(error) else "client_error"
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Timeout, falha de conexão ou 5xx: sinais de upstream fora do ar (contam para o circuit breaker)"""
+    # SDK ainda não importado (ex.: cliente falso): a exceção não pode ser dele
+    sdk_exceptions = sys.modules.get("abacatepay.utils.exceptions")
+    if sdk_exceptions is not None and isinstance(error, sdk_exceptions.APIConnectionError):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and int(status_code) >= 500
+
+
 class PrescrevaMePixManager:
     """Gerenciador de pagamentos PIX para PrescrevaMe Premium"""
     
-    def __init__(self, api_key: str = API_KEY):
-        """Inicializa o cliente AbacatePay"""
-        self.client = abacatepay.AbacatePay(api_key)
+    def __init__(
+        self,
+        api_key: str = API_KEY,
+        client: Optional[Any] = None,
+        status_cache: Optional[PixStatusCache] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = ABACATE_RETRY_MAX,
+        warm_pool: Optional[WarmPixPool] = None
+    ):
+        """
+        Inicializa o cliente AbacatePay
+
+        Args:
+            api_key: Chave da API AbacatePay
+            client: Cliente já construído (ex.: fake local para benchmarks; padrão: criado no primeiro uso)
+            status_cache: Cache de status (padrão: cache compartilhado do processo)
+            breaker: Circuit breaker das chamadas (padrão: api_breaker do processo)
+            rate_limiter: Token bucket das chamadas (padrão: api_rate_limiter do processo)
+            max_retries: Novas tentativas após falha do upstream (com backoff limitado)
+            warm_pool: Pool de PIX pré-criados (padrão: pool do processo, ativo com PIX_WARM_POOL_DIR)
+        """
+        self._api_key = api_key
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.status_cache = status_cache if status_cache is not None else shared_status_cache
+        self.breaker = breaker if breaker is not None else api_breaker
+        self.rate_limiter = rate_limiter if rate_limiter is not None else api_rate_limiter
+        self.max_retries = max_retries
+        self.warm_pool = warm_pool if warm_pool is not None else shared_warm_pool
         self.log_prefix = "🌵 PrescrevaMe PIX Manager"
+        self._stats_lock = threading.Lock()
+        self._retries = 0
+        self._shed = 0
+
+    @property
+    def client(self) -> Any:
+        """
+        Cliente do SDK, construído no primeiro uso
+
+        Importar o SDK (pydantic, httpx, requests) domina a inicialização do
+        processo; consultas respondidas pelo cache de status não precisam dele
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from abacatepay_transport import create_client
+                    self._client = create_client(self._api_key)
+        return self._client
+
+    def _call_api(self, operation: str, call: Callable[[], Any], retry_unanswered: bool = True) -> Any:
+        """
+        Executa uma chamada ao SDK com limite de taxa, circuit breaker e novas tentativas
+
+        Args:
+            operation: Nome da operação nas métricas (create, check, simulate)
+            call: Função sem argumentos que faz a chamada
+            retry_unanswered: Repetir também timeouts, quedas de conexão e 5xx. Falso para
+                criação de PIX, que só repete 429 (nos outros casos a cobrança pode ter sido criada)
+
+        Raises:
+            RateLimitExceeded: Sem token dentro de ABACATE_RATE_MAX_WAIT (chamada descartada)
+            CircuitOpenError: Circuito aberto (chamada não enviada)
+        """
+        attempt = 0
+        while True:
+            with tracer.span("rate_limit.acquire"):
+                acquired = self.rate_limiter.acquire(timeout=ABACATE_RATE_MAX_WAIT)
+            if not acquired:
+                with self._stats_lock:
+                    self._shed += 1
+                API_REJECTED.inc(operation=operation, reason="rate_limit")
+                wait = self.rate_limiter.stats()["paused_for_s"]
+                raise RateLimitExceeded(max(wait, 1.0 / self.rate_limiter.rate if self.rate_limiter.rate > 0 else 0.0))
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                API_REJECTED.inc(operation=operation, reason="circuit_open")
+                raise
+            start = time.perf_counter()
+            try:
+                with tracer.span(f"abacatepay.{operation}", attempt=attempt):
+                    result = call()
+            except Exception as e:
+                details = api_error_details(e)
+                API_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome=call_outcome(e))
+                if details["status_code"] == 429:
+                    # O provedor respondeu (está saudável), só pediu calma: pausa o bucket do processo
+                    self.breaker.record_success()
+                    self.rate_limiter.pause(details["retry_after"] or ABACATE_RETRY_BASE_DELAY * 2 ** attempt)
+                    retry, delay = True, 0.0
+                elif is_upstream_failure(e):
+                    self.breaker.record_failure()
+                    retry = retry_unanswered
+                    delay = min(ABACATE_RETRY_MAX_DELAY, ABACATE_RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+                else:
+                    # Erro de validação (4xx) ou local: o upstream respondeu normalmente
+                    self.breaker.record_success()
+                    retry, delay = False, 0.0
+                if not retry or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                with self._stats_lock:
+                    self._retries += 1
+                API_RETRIES.inc(operation=operation)
+                logger.debug("🔁 Nova tentativa %d/%d: %s", attempt, self.max_retries, e,
+                             extra={"error_type": type(e).__name__, "delay_s": delay})
+                time.sleep(delay)
+                continue
+            API_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome="success")
+            self.breaker.record_success()
+            return result
+
+    def api_stats(self) -> Dict[str, Any]:
+        """Estado do circuit breaker, do limite de taxa e contadores de novas tentativas"""
+        with self._stats_lock:
+            retries, shed = self._retries, self._shed
+        return {
+            "circuit_breaker": self.breaker.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "retries": retries,
+            "shed": shed
+        }
     
     def create_pix_payment(
         self,
@@ -39,7 +241,8 @@ class PrescrevaMePixManager:
         customer_cpf: str,
         amount: int = PRODUCT_PRICE,
         description: str = PRODUCT_NAME,
-        expires_in: int = PIX_EXPIRATION
+        expires_in: int = PIX_EXPIRATION,
+        use_warm_pool: bool = True
     ) -> Dict[str, Any]:
         """
         Cria um novo pagamento PIX
@@ -52,87 +255,131 @@ class PrescrevaMePixManager:
             amount: Valor em centavos (padrão: R$ 347,00)
             description: Descrição do pagamento
             expires_in: Tempo de expiração em segundos
+            use_warm_pool: Entregar uma cobrança pré-criada do pool, se houver
         
+        Returns:
+            Dict com informações do PIX criado ("warm": True se veio do pool)
+        """
+        customer = {"name": customer_name, "email": customer_email, "cellphone": customer_phone, "tax_id": customer_cpf}
+        if use_warm_pool and self.warm_pool.enabled:
+            with tracer.trace("pix.claim_warm", amount=amount) as span:
+                try:
+                    claimed = self.warm_pool.claim(amount, expires_in, customer)
+                except (OSError, KeyError, ValueError) as e:
+                    # Pool indisponível (disco, permissão, arquivo estranho): o checkout segue pela API
+                    logger.error("❌ Erro ao pegar PIX do pool: %s", e, extra={"amount": amount})
+                    self.warm_pool.record_miss(sku_name(amount, expires_in))
+                    claimed = None
+                span.set(hit=claimed is not None)
+            if claimed is not None:
+                return claimed
+        return self.create_pix_charge(amount, description, expires_in, customer)
+
+    def create_pix_charge(
+        self,
+        amount: int = PRODUCT_PRICE,
+        description: str = PRODUCT_NAME,
+        expires_in: int = PIX_EXPIRATION,
+        customer: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Cria a cobrança PIX na API (sem passar pelo pool)
+
+        Args:
+            amount: Valor em centavos
+            description: Descrição do pagamento
+            expires_in: Tempo de expiração em segundos
+            customer: name, email, cellphone e tax_id (None = cobrança anônima, usada pelo pool)
+
         Returns:
             Dict com informações do PIX criado
         """
-        try:
-            print(f"{self.log_prefix} 💳 Criando pagamento PIX...")
-            
-            # Criar dados do cliente
-            customer = CustomerMetadata(
-                name=customer_name,
-                email=customer_email,
-                cellphone=customer_phone,
-                tax_id=customer_cpf
-            )
-            
-            # Criar dados do PIX
-            pix_data = PixQrCodeIn(
-                amount=amount,
-                expires_in=expires_in,
-                description=description,
-                customer=customer
-            )
-            
-            # Criar PIX via API
-            pix_result = self.client.pixQrCode.create(pix_data)
-            
-            print(f"{self.log_prefix} ✅ PIX criado com sucesso!")
-            print(f"   ID: {pix_result.id}")
-            print(f"   Valor: R$ {amount/100:.2f}")
-            print(f"   Expira em: {pix_result.expires_at}")
-            print(f"   Status: {pix_result.status}")
-            
-            return {
-                "success": True,
-                "pix_id": pix_result.id,
-                "amount": pix_result.amount,
-                "status": pix_result.status,
-                "brcode": pix_result.brcode,
-                "brcode_base64": pix_result.brcode_base64,
-                "expires_at": pix_result.expires_at,
-                "created_at": pix_result.created_at,
-                "dev_mode": pix_result.dev_mode
-            }
-            
-        except Exception as e:
-            print(f"{self.log_prefix} ❌ Erro ao criar PIX: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        with tracer.trace("pix.create", amount=amount) as span:
+            try:
+                with tracer.span("sdk.build_request"):
+                    from abacatepay.customers import CustomerMetadata
+                    from abacatepay.pixQrCode import PixQrCodeIn
+                    
+                    # Criar dados do PIX
+                    pix_data = PixQrCodeIn(
+                        amount=amount,
+                        expires_in=expires_in,
+                        description=description,
+                        customer=CustomerMetadata(**customer) if customer else {}
+                    )
+                
+                # Criar PIX via API
+                pix_result = self._call_api("create", lambda: self.client.pixQrCode.create(pix_data), retry_unanswered=False)
+                span.set(pix_id=pix_result.id)
+                
+                note_pix_created(pix_result.id, to_timestamp(pix_result.created_at))
+                with tracer.span("log"):
+                    logger.info("✅ PIX criado", extra={
+                        "pix_id": pix_result.id,
+                        "amount": amount,
+                        "expires_at": pix_result.expires_at,
+                        "status": pix_result.status
+                    })
+                
+                return {
+                    "success": True,
+                    "pix_id": pix_result.id,
+                    "amount": pix_result.amount,
+                    "status": pix_result.status,
+                    "brcode": pix_result.brcode,
+                    "brcode_base64": pix_result.brcode_base64,
+                    "expires_at": pix_result.expires_at,
+                    "created_at": pix_result.created_at,
+                    "dev_mode": pix_result.dev_mode
+                }
+                
+            except Exception as e:
+                span.set(error=type(e).__name__)
+                logger.error("❌ Erro ao criar PIX: %s", e, extra={"error_type": type(e).__name__})
+                return {
+                    "success": False,
+                    "error": str(e),
+                    **api_error_details(e)
+                }
     
-    def check_payment_status(self, pix_id: str) -> Dict[str, Any]:
+    def check_payment_status(self, pix_id: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Verifica o status de um pagamento PIX
         
         Args:
             pix_id: ID do PIX a ser verificado
+            use_cache: Se True, responde do cache quando houver entrada válida
         
         Returns:
-            Dict com status do pagamento
+            Dict com status do pagamento ("cached": True quando veio do cache)
         """
+        if use_cache:
+            cached = self.status_cache.get(pix_id)
+            if cached is not None:
+                return cached
+        
         try:
-            print(f"{self.log_prefix} 🔍 Verificando status do PIX {pix_id}...")
             
-            status_result = self.client.pixQrCode.check(pix_id)
+            status_result = self._call_api("check", lambda: self.client.pixQrCode.check(pix_id))
             
-            print(f"{self.log_prefix} 📊 Status: {status_result.status}")
+            logger.debug("📊 Status consultado", extra={"pix_id": pix_id, "status": status_result.status})
             
-            return {
+            result = {
                 "success": True,
                 "status": status_result.status,
                 "expires_at": status_result.expires_at,
                 "is_paid": status_result.status == "PAID",
                 "is_expired": status_result.status == "EXPIRED"
             }
+            self.status_cache.put(pix_id, result)
+            return result
             
         except Exception as e:
-            print(f"{self.log_prefix} ❌ Erro ao verificar status: {str(e)}")
+            logger.warning("❌ Erro ao verificar status: %s", e, extra={"pix_id": pix_id, "error_type": type(e).__name__})
             return {
                 "success": False,
-                "error": str(e)
+                "error": str(e),
+                **api_error_details(e)
             }
     
     def simulate_payment(self, pix_id: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
@@ -147,12 +394,10 @@ class PrescrevaMePixManager:
             Dict com resultado da simulação
         """
         try:
-            print(f"{self.log_prefix} 🧪 Simulando pagamento do PIX {pix_id}...")
             
-            simulation_result = self.client.pixQrCode.simulate(pix_id, metadata or {})
+            simulation_result = self._call_api("simulate", lambda: self.client.pixQrCode.simulate(pix_id, metadata or {}))
             
-            print(f"{self.log_prefix} ✅ Simulação concluída!")
-            print(f"   Status: {simulation_result.status}")
+            logger.info("🧪 Pagamento simulado", extra={"pix_id": pix_id, "status": simulation_result.status})
             
             return {
                 "success": True,
@@ -161,41 +406,72 @@ class PrescrevaMePixManager:
             }
             
         except Exception as e:
-            print(f"{self.log_prefix} ❌ Erro na simulação: {str(e)}")
+            logger.error("❌ Erro na simulação: %s", e, extra={"pix_id": pix_id, "error_type": type(e).__name__})
             return {
                 "success": False,
-                "error": str(e)
+                "error": str(e),
+                **api_error_details(e)
             }
     
-    def monitor_payment(self, pix_id: str, max_attempts: int = 100, interval: int = 5) -> Dict[str, Any]:
+    def monitor_payment(
+        self,
+        pix_id: str,
+        max_attempts: int = 100,
+        interval: int = 5,
+        policy: Optional[PollingPolicy] = None,
+        expires_at: Any = None,
+        settled_lookup: Optional[Callable[[str], Optional[str]]] = None
+    ) -> Dict[str, Any]:
         """
         Monitora um pagamento até ser confirmado ou expirado
         
         Args:
             pix_id: ID do PIX a ser monitorado
             max_attempts: Número máximo de tentativas
-            interval: Intervalo entre verificações em segundos
+            interval: Intervalo entre verificações em segundos (usado só sem `policy`)
+            policy: Política de polling (ex.: AdaptivePollingPolicy)
+            expires_at: Expiração do PIX; se omitida, usa a informada pela API
+            settled_lookup: Função pix_id -> status final já recebido por webhook
         
         Returns:
             Dict com resultado final do monitoramento
         """
-        print(f"{self.log_prefix} 👀 Iniciando monitoramento do PIX {pix_id}...")
-        print(f"   Tentativas máximas: {max_attempts}")
-        print(f"   Intervalo: {interval}s")
+        policy = policy or FixedIntervalPolicy(interval)
+        created_at = time.time()
+        deadline = to_timestamp(expires_at)
+        
+        logger.info("👀 Iniciando monitoramento", extra={
+            "pix_id": pix_id,
+            "max_attempts": max_attempts,
+            "policy": type(policy).__name__
+        })
         
         for attempt in range(1, max_attempts + 1):
-            print(f"{self.log_prefix} 🔄 Tentativa {attempt}/{max_attempts}")
+            logger.debug("🔄 Tentativa %d/%d", attempt, max_attempts, extra={"pix_id": pix_id})
+            
+            settled = settled_lookup(pix_id) if settled_lookup else None
+            if settled in TERMINAL_STATUSES:
+                logger.info("🔔 Status já recebido via webhook", extra={"pix_id": pix_id, "status": settled})
+                return {
+                    "success": True,
+                    "status": settled,
+                    "attempts": attempt - 1,
+                    "final_status": settled,
+                    "source": "webhook"
+                }
             
             status_result = self.check_payment_status(pix_id)
             
+            status = status_result.get("status")
+            if status in TERMINAL_STATUSES:
+                observe_final_status(pix_id, status, "polling")
+            retry_after = None
             if not status_result["success"]:
-                print(f"{self.log_prefix} ❌ Erro na verificação: {status_result['error']}")
-                continue
-            
-            status = status_result["status"]
+                # Sem `continue` imediato: a nova tentativa segue a política (e o Retry-After)
+                retry_after = status_result.get("retry_after")
             
             if status == "PAID":
-                print(f"{self.log_prefix} 🎉 Pagamento confirmado!")
+                logger.info("🎉 Pagamento confirmado", extra={"pix_id": pix_id, "attempts": attempt})
                 return {
                     "success": True,
                     "status": "PAID",
@@ -203,7 +479,7 @@ class PrescrevaMePixManager:
                     "final_status": status
                 }
             elif status == "EXPIRED":
-                print(f"{self.log_prefix} ⏰ PIX expirado!")
+                logger.info("⏰ PIX expirado", extra={"pix_id": pix_id, "attempts": attempt})
                 return {
                     "success": True,
                     "status": "EXPIRED",
@@ -211,7 +487,7 @@ class PrescrevaMePixManager:
                     "final_status": status
                 }
             elif status == "CANCELLED":
-                print(f"{self.log_prefix} ❌ PIX cancelado!")
+                logger.info("❌ PIX cancelado", extra={"pix_id": pix_id, "attempts": attempt})
                 return {
                     "success": True,
                     "status": "CANCELLED",
@@ -219,19 +495,302 @@ class PrescrevaMePixManager:
                     "final_status": status
                 }
             
-            print(f"{self.log_prefix} ⏳ Aguardando... Status atual: {status}")
-            time.sleep(interval)
+            if deadline is None:
+                deadline = to_timestamp(status_result.get("expires_at"))
+            
+            now = time.time()
+            next_check = policy.next_check_at(attempt, created_at, now, deadline)
+            if next_check is not None and retry_after:
+                next_check = max(next_check, now + retry_after)
+            if next_check is None:
+                logger.info("⏰ PIX expirado", extra={"pix_id": pix_id, "attempts": attempt})
+                return {
+                    "success": True,
+                    "status": "EXPIRED",
+                    "attempts": attempt,
+                    "final_status": "EXPIRED"
+                }
+            
+            logger.debug("⏳ Aguardando próxima verificação", extra={"pix_id": pix_id, "status": status})
+            time.sleep(max(0.0, next_check - now))
         
-        print(f"{self.log_prefix} ⏰ Tempo limite atingido após {max_attempts} tentativas")
+        logger.warning("⏰ Tempo limite do monitoramento", extra={"pix_id": pix_id, "attempts": max_attempts})
         return {
             "success": False,
             "error": "Tempo limite atingido",
             "attempts": max_attempts
         }
 
+    def monitor_payments(
+        self,
+        pix_ids: Union[Iterable[str], Dict[str, Any]],
+        interval: float = 5,
+        max_workers: int = 16,
+        timeout: Optional[float] = None,
+        policy: Optional[PollingPolicy] = None,
+        settled_lookup: Optional[Callable[[str], Optional[str]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Monitora vários pagamentos ao mesmo tempo até todos chegarem a um estado final
+
+        Args:
+            pix_ids: IDs dos PIX, ou dict {pix_id: expires_at}
+            interval: Intervalo entre verificações do mesmo PIX em segundos
+            max_workers: Máximo de verificações simultâneas
+            timeout: Tempo máximo total em segundos (None = até todos finalizarem)
+            policy: Política de polling (padrão: intervalo fixo de `interval`)
+            settled_lookup: Função pix_id -> status final já recebido por webhook
+                (padrão: estados finais do status_cache)
+
+        Returns:
+            Dict {pix_id: resultado} no mesmo formato de monitor_payment
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        monitor = PaymentMonitor(
+            self,
+            max_workers=max_workers,
+            interval=interval,
+            on_result=lambda result: results.__setitem__(result["pix_id"], result),
+            policy=policy,
+            settled_lookup=settled_lookup or self.status_cache.settled_status
+        )
+
+        expirations = pix_ids if isinstance(pix_ids, dict) else dict.fromkeys(pix_ids)
+        logger.info("👀 Monitorando %d PIX em lote", len(expirations))
+        for pix_id, expires_at in expirations.items():
+            monitor.add(pix_id, expires_at=expires_at)
+
+        monitor.start()
+        try:
+            monitor.wait_idle(timeout)
+        finally:
+            monitor.stop()
+
+        for pix_id in expirations:
+            results.setdefault(pix_id, {
+                "pix_id": pix_id,
+                "success": False,
+                "error": "Tempo limite atingido"
+            })
+        return results
+
+
+    def create_pix_payments_bulk(
+        self,
+        customers: Union[str, Iterable[Dict[str, Any]]],
+        output_file: str,
+        journal_file: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        rate: Optional[float] = None,
+        amount: int = PRODUCT_PRICE,
+        description: str = PRODUCT_NAME,
+        expires_in: int = PIX_EXPIRATION,
+        retry_uncertain: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Cria PIX para muitos clientes (campanhas e renovações)
+
+        O lote pode ser retomado: itens já criados são pulados e itens sem
+        resposta registrada (timeout, queda do processo) não são reenviados
+        sem `retry_uncertain`, para não cobrar o mesmo cliente duas vezes.
+
+        Args:
+            customers: Caminho de um CSV ou iterável de dicts com customer_name,
+                customer_email, customer_phone, customer_cpf (e, opcionais, amount,
+                description, key)
+            output_file: Arquivo de resultados (.jsonl ou .csv), gravado à medida que os itens terminam
+            journal_file: Diário do lote (padrão: output_file + ".journal.db")
+            max_workers: Criações simultâneas (padrão: BULK_PIX_WORKERS)
+            rate: Criações por segundo (0 = sem limite; padrão: BULK_PIX_RATE)
+            amount: Valor padrão em centavos
+            description: Descrição padrão
+            expires_in: Expiração de cada PIX em segundos
+            retry_uncertain: Reenviar itens incertos de execuções anteriores
+
+        Returns:
+            Dict com contadores do lote (created, failed, uncertain, skipped, ...)
+        """
+        # Import tardio: o lote (sqlite3, pool de threads) não entra na inicialização das consultas
+        from pix_bulk import BULK_PIX_RATE, BULK_PIX_WORKERS, BulkPixCreator, read_customers_csv
+
+        if isinstance(customers, str):
+            customers = read_customers_csv(customers)
+        creator = BulkPixCreator(
+            self,
+            output_file=output_file,
+            journal_file=journal_file,
+            max_workers=max_workers if max_workers is not None else BULK_PIX_WORKERS,
+            rate=rate if rate is not None else BULK_PIX_RATE,
+            retry_uncertain=retry_uncertain
+        )
+        return creator.run(customers, amount=amount, description=description, expires_in=expires_in)
+
+
+def _emit(result: Dict[str, Any], stream=None) -> None:
+    """Escreve o resultado como uma linha de JSON compacto"""
+    stream = stream or sys.stdout
+    stream.write(json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+    stream.flush()
+
+
+def _create_params(args: argparse.Namespace, data_file: Optional[str]) -> Dict[str, Any]:
+    """
+    Parâmetros de create_pix_payment a partir de --data-file e das opções
+
+    O arquivo é o JSON gravado pelo PHP (name/email/phone/cpf, ou com o
+    prefixo customer_); opções da linha de comando têm precedência.
+    """
+    data: Dict[str, Any] = {}
+    if data_file:
+        with open(data_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    params = {}
+    for key in ("name", "email", "phone", "cpf"):
+        value = getattr(args, key, None)
+        if value is None:
+            value = data.get(f"customer_{key}", data.get(key))
+        if value is not None:
+            params[f"customer_{key}"] = value
+    for key in ("amount", "description", "expires_in"):
+        value = getattr(args, key, None)
+        if value is None:
+            value = data.get(key)
+        if value is not None:
+            params[key] = value
+    return params
+
+
+def run_command(manager: PrescrevaMePixManager, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Executa um subcomando do CLI
+
+    Returns:
+        Resultado no mesmo formato dos métodos do PrescrevaMePixManager
+    """
+    if args.command == "create":
+        params = _create_params(args, args.data_file)
+        missing = [f"customer_{key}" for key in ("name", "email", "phone", "cpf") if f"customer_{key}" not in params]
+        if missing:
+            return {"success": False, "error": f"Dados do cliente incompletos: {', '.join(missing)}"}
+        return manager.create_pix_payment(**params)
+    if args.command == "check":
+        return manager.check_payment_status(args.pix_id, use_cache=not args.no_cache)
+    if args.command == "simulate":
+        return manager.simulate_payment(args.pix_id)
+    if args.command == "monitor":
+        return manager.monitor_payment(args.pix_id, max_attempts=args.max_attempts, interval=args.interval)
+    return {"success": False, "error": f"Comando desconhecido: {args.command}"}
+
+
+def run_batch(manager: PrescrevaMePixManager, stdin=None, stdout=None) -> int:
+    """
+    Atende requisições em JSON por linha (NDJSON) até o fim da entrada
+
+    Cada linha é uma requisição no protocolo do daemon PIX
+    ({"id": 1, "op": "check", "params": {"pix_id": "..."}}) e recebe uma
+    linha de resposta ({"id": 1, "ok": true, "result": {...}}), na ordem.
+
+    Returns:
+        Quantidade de requisições atendidas
+    """
+    # Import tardio: pix_daemon importa este módulo
+    from pix_daemon import PixDaemon
+
+    stdin = stdin or sys.stdin
+    daemon = PixDaemon(manager)
+    served = 0
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            _emit({"id": None, "ok": False, "error": f"JSON inválido: {e}"}, stdout)
+            continue
+        if not isinstance(request, dict):
+            _emit({"id": None, "ok": False, "error": "Requisição deve ser um objeto JSON"}, stdout)
+            continue
+        _emit(daemon.handle_request(request), stdout)
+        served += 1
+    return served
+
 
 def main():
-    """Função principal para demonstração"""
+    """
+    CLI não interativo com saída em JSON (usado pelo python_integration.php)
+
+        pix_manager.py create --data-file dados.json   {"success": true, "pix_id": ...}
+        pix_manager.py check <pix_id>                  {"success": true, "status": "PENDING", ...}
+        pix_manager.py simulate <pix_id>
+        pix_manager.py monitor <pix_id> [--max-attempts 100] [--interval 5]
+        pix_manager.py batch < requisicoes.ndjson      uma resposta JSON por linha
+
+    Sem subcomando, roda a demonstração interativa. Código de saída 1 quando
+    o resultado tem "success": false.
+    """
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Gerenciador de PIX")
+    add_profile_argument(parser)
+    # Formas antigas enviadas pelo PHP: equivalem a `create --data-file` e `check <pix_id>`
+    parser.add_argument("--data-file", dest="legacy_data_file", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--check", dest="legacy_check", default=None, help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest="command", metavar="COMANDO")
+
+    create = subparsers.add_parser("create", help="Criar PIX")
+    create.add_argument("--data-file", default=None, help="JSON com name, email, phone e cpf")
+    create.add_argument("--name", default=None, help="Nome do cliente")
+    create.add_argument("--email", default=None, help="E-mail do cliente")
+    create.add_argument("--phone", default=None, help="Telefone (+55 11 99999-9999)")
+    create.add_argument("--cpf", default=None, help="CPF (apenas números)")
+    create.add_argument("--amount", type=int, default=None, help="Valor em centavos (padrão: PRODUCT_PRICE)")
+    create.add_argument("--description", default=None, help="Descrição do pagamento")
+    create.add_argument("--expires-in", type=int, default=None, help="Expiração em segundos")
+
+    check = subparsers.add_parser("check", help="Consultar status")
+    check.add_argument("pix_id", help="ID do PIX")
+    check.add_argument("--no-cache", action="store_true", help="Consultar a API mesmo com status em cache")
+
+    simulate = subparsers.add_parser("simulate", help="Simular pagamento (modo desenvolvimento)")
+    simulate.add_argument("pix_id", help="ID do PIX")
+
+    monitor = subparsers.add_parser("monitor", help="Aguardar o status final")
+    monitor.add_argument("pix_id", help="ID do PIX")
+    monitor.add_argument("--max-attempts", type=int, default=100, help="Máximo de verificações")
+    monitor.add_argument("--interval", type=float, default=5, help="Segundos entre verificações")
+
+    subparsers.add_parser("batch", help="Requisições NDJSON no stdin, respostas NDJSON no stdout")
+
+    args = parser.parse_args()
+    if args.command is None and args.legacy_data_file:
+        args.command, args.data_file = "create", args.legacy_data_file
+    elif args.command is None and args.legacy_check:
+        args.command, args.pix_id, args.no_cache = "check", args.legacy_check, False
+    
+    setup_logging()
+    with profiling(args.profile), tracer.trace("cli.pix_manager", command=args.command or "demo"):
+        exec_start = exec_start_time()
+        if exec_start is not None:
+            # Do exec no PHP até aqui: inicialização do interpretador e imports
+            tracer.record("exec.startup", exec_start, time.time())
+        if args.command is None:
+            run_demo()
+            return
+        manager = PrescrevaMePixManager()
+        if args.command == "batch":
+            run_batch(manager)
+            return
+        try:
+            result = run_command(manager, args)
+        except (OSError, ValueError) as e:
+            # --data-file ausente ou com JSON inválido
+            result = {"success": False, "error": str(e)}
+        _emit(result)
+    if not result.get("success"):
+        sys.exit(1)
+
+
+def run_demo():
+    """Demonstração interativa: cria um PIX, simula e monitora o pagamento"""
     print("🌵 PrescrevaMe Premium - Gerenciador de PIX")
     print("=" * 50)
     
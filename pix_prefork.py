@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Pool Pré-fork do Daemon PIX
+Um único processo do daemon executa o Python de todas as chamadas do
+PHP-FPM sob o mesmo GIL. Aqui um supervisor importa o SDK, monta o
+PrescrevaMePixManager (com o cliente HTTP ainda sem conexões) e só então
+cria N workers com fork(): o código e os objetos já carregados são
+compartilhados por copy-on-write, e cada worker começa aquecido.
+
+Todos os workers aceitam conexões do mesmo socket do daemon
+(PIX_DAEMON_SOCKET), com o mesmo protocolo enquadrado: o PythonIntegration
+não muda, e o kernel entrega cada conexão a um worker livre. Cada worker
+atende até PIX_POOL_THREADS conexões em threads (esperas pela API) e só
+aceita outra quando tem thread livre; os processos levam a parte de CPU
+(SDK, pydantic, JSON) a núcleos diferentes.
+
+O supervisor recria workers que caem (com espera crescente se caírem logo
+ao subir) e recicla cada worker após PIX_POOL_MAX_REQUESTS requisições
+(com variação aleatória, para não reciclarem todos juntos), sempre entre
+conexões: a conexão em andamento é atendida até o cliente fechá-la ou ficar
+PIX_POOL_IDLE_TIMEOUT segundos ociosa. SIGHUP recicla todos; SIGTERM/SIGINT
+encerram o pool do mesmo jeito.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from dotenv_cache import load_env
+from metrics import registry as metrics_registry, start_metrics_server
+from pix_daemon import DAEMON_BACKLOG, DAEMON_HOST, DAEMON_SOCKET, PixDaemon, serve_connection
+from pix_manager import PrescrevaMePixManager
+from structured_logging import setup_logging, shutdown_logging
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+PIX_POOL_WORKERS = int(os.getenv('PIX_POOL_WORKERS', '0'))  # 0 = PIX_POOL_WORKERS_PER_CORE x núcleos disponíveis
+PIX_POOL_WORKERS_PER_CORE = float(os.getenv('PIX_POOL_WORKERS_PER_CORE', '1'))
+PIX_POOL_THREADS = int(os.getenv('PIX_POOL_THREADS', '16'))  # conexões simultâneas por worker (esperas de rede)
+PIX_POOL_MAX_REQUESTS = int(os.getenv('PIX_POOL_MAX_REQUESTS', '1000'))  # reciclar o worker (0 = nunca)
+PIX_POOL_MAX_REQUESTS_JITTER = int(os.getenv('PIX_POOL_MAX_REQUESTS_JITTER', '100'))
+PIX_POOL_IDLE_TIMEOUT = float(os.getenv('PIX_POOL_IDLE_TIMEOUT', '10'))  # conexão ociosa prende um worker
+PIX_POOL_GRACEFUL_TIMEOUT = float(os.getenv('PIX_POOL_GRACEFUL_TIMEOUT', '30'))  # espera no encerramento
+
+POOL_WORKER_EXITS = metrics_registry.counter(
+    "pix_pool_worker_exits_total", "Workers do pool pré-fork encerrados, por motivo", ("reason",)
+)
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de verificação do worker (sinal de parada e supervisor vivo) enquanto espera conexões
+_ACCEPT_POLL_INTERVAL = 1.0
+_CRASH_BACKOFF_MAX = 10.0
+
+
+def available_cores() -> int:
+    """Núcleos que este processo pode usar (respeita cpuset/afinidade de contêineres)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def default_workers(per_core: float = PIX_POOL_WORKERS_PER_CORE) -> int:
+    """Workers para os núcleos disponíveis (mínimo 2: um worker sozinho serializa as chamadas)"""
+    return max(2, int(round(per_core * available_cores())))
+
+
+def open_listener(
+    socket_path: Optional[str] = DAEMON_SOCKET,
+    host: str = DAEMON_HOST,
+    port: Optional[int] = None,
+    backlog: int = DAEMON_BACKLOG
+) -> socket.socket:
+    """Socket de escuta compartilhado pelos workers (Unix por padrão, TCP com `port`)"""
+    if port is not None:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        os.chmod(socket_path, 0o660)
+    listener.listen(backlog)
+    return listener
+
+
+class PreforkSupervisor:
+    """Mantém N workers aquecidos atendendo o protocolo do daemon PIX"""
+
+    def __init__(
+        self,
+        workers: int = PIX_POOL_WORKERS,
+        threads: int = PIX_POOL_THREADS,
+        max_requests: int = PIX_POOL_MAX_REQUESTS,
+        max_requests_jitter: int = PIX_POOL_MAX_REQUESTS_JITTER,
+        idle_timeout: float = PIX_POOL_IDLE_TIMEOUT,
+        graceful_timeout: float = PIX_POOL_GRACEFUL_TIMEOUT,
+        manager: Optional[PrescrevaMePixManager] = None
+    ):
+        """
+        Args:
+            workers: Processos worker (0 = default_workers())
+            threads: Conexões atendidas ao mesmo tempo por worker
+            max_requests: Requisições até reciclar um worker (0 = nunca)
+            max_requests_jitter: Variação aleatória somada a max_requests em cada worker
+            idle_timeout: Segundos até encerrar uma conexão sem requisições (0 = sem limite)
+            graceful_timeout: Espera pelas requisições em andamento ao encerrar/reciclar
+            manager: Gerenciador já construído (padrão: PrescrevaMePixManager com o SDK)
+        """
+        self.workers = workers or default_workers()
+        self.threads = max(1, threads)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.idle_timeout = idle_timeout
+        self.graceful_timeout = graceful_timeout
+        self.manager = manager
+        self.log_prefix = "🍴 PrescrevaMe PIX Pool"
+        self.listener: Optional[socket.socket] = None
+        self.app: Optional[PixDaemon] = None
+        self._children: Dict[int, float] = {}  # pid -> momento em que subiu
+        self._stopping = False
+        self._reload = False
+        self._crash_backoff = 0.0
+        self._stats = {"spawned": 0, "recycled": 0, "crashed": 0}
+
+    def warm_up(self) -> None:
+        """Importa o SDK e monta o gerenciador antes do fork, para todos os workers herdarem"""
+        if self.manager is None:
+            self.manager = PrescrevaMePixManager()
+        # Cliente construído aqui (SDK, pydantic e transporte importados); nenhuma conexão é aberta antes do fork
+        self.manager.client
+        self.app = PixDaemon(self.manager)
+        # Objetos já carregados saem da coleta de lixo: o GC dos workers não toca (e não copia) essas páginas
+        gc.collect()
+        gc.freeze()
+
+    def start(self, listener: socket.socket) -> None:
+        """Aquece e cria os workers sobre um socket de escuta já aberto"""
+        self.listener = listener
+        if self.app is None:
+            self.warm_up()
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self) -> int:
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_loop(max_requests)
+            except BaseException:
+                logger.exception("💥 Worker do pool encerrado por erro")
+                code = 1
+            finally:
+                # os._exit não roda o atexit: grava métricas e logs pendentes antes de sair
+                metrics_registry.flush()
+                shutdown_logging()
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+        self._stats["spawned"] += 1
+        return pid
+
+    def _worker_loop(self, max_requests: int) -> None:
+        """Aceita e atende conexões até reciclar, receber SIGTERM ou o supervisor sumir"""
+        supervisor_pid = os.getppid()
+        stop = {"requested": False}
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.update(requested=True))
+        # Ctrl+C e hangup chegam ao grupo inteiro: quem encerra os workers é o supervisor
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        self.listener.settimeout(_ACCEPT_POLL_INTERVAL)
+
+        # Só aceita com uma thread livre: conexões esperam no backlog, onde qualquer worker livre as pega
+        free_threads = threading.BoundedSemaphore(self.threads)
+        served = {"requests": 0}
+        served_lock = threading.Lock()
+
+        def handle(conn: socket.socket) -> None:
+            count = 0
+            try:
+                # A conexão é atendida até o cliente fechá-la: reciclagem e parada só acontecem entre conexões
+                with conn:
+                    conn.settimeout(self.idle_timeout or None)
+                    count = serve_connection(conn, self.app)
+            except OSError:
+                # Cliente desistiu no meio da resposta
+                pass
+            finally:
+                with served_lock:
+                    served["requests"] += count
+                free_threads.release()
+
+        # Ao sair do bloco, espera as conexões em andamento
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="pix-pool") as executor:
+            while not stop["requested"] and (not max_requests or served["requests"] < max_requests):
+                if os.getppid() != supervisor_pid:
+                    break
+                if not free_threads.acquire(timeout=_ACCEPT_POLL_INTERVAL):
+                    continue
+                try:
+                    conn, _ = self.listener.accept()
+                except (socket.timeout, InterruptedError):
+                    free_threads.release()
+                    continue
+                executor.submit(handle, conn)
+
+    def run(self) -> None:
+        """Supervisiona os workers até SIGTERM/SIGINT (SIGHUP recicla todos)"""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        while not self._stopping:
+            if self._reload:
+                self._reload = False
+                logger.info("🔄 Reciclando todos os workers")
+                for pid in list(self._children):
+                    self._signal(pid, signal.SIGTERM)
+            self._reap()
+            deficit = self.workers - len(self._children)
+            if deficit > 0 and self._crash_backoff:
+                time.sleep(self._crash_backoff)
+            for _ in range(deficit):
+                if not self._stopping:
+                    self._spawn()
+            time.sleep(0.1)
+        self.stop()
+
+    def _reap(self) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            started = self._children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping:
+                continue
+            if code in (0, -signal.SIGTERM):
+                self._stats["recycled"] += 1
+                self._crash_backoff = 0.0
+                POOL_WORKER_EXITS.inc(reason="recycled")
+                continue
+            self._stats["crashed"] += 1
+            POOL_WORKER_EXITS.inc(reason="crashed")
+            # Worker que cai logo ao subir (erro de configuração, recurso indisponível): espera crescente
+            if time.monotonic() - started < 1.0:
+                self._crash_backoff = min(_CRASH_BACKOFF_MAX, (self._crash_backoff or 0.1) * 2)
+            logger.error("💥 Worker do pool caiu", extra={"pid": pid, "exit_code": code})
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _on_reload(self, signum, frame) -> None:
+        self._reload = True
+
+    def stop(self) -> None:
+        """Encerra os workers (SIGTERM, depois SIGKILL após graceful_timeout)"""
+        self._stopping = True
+        for pid in list(self._children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self._children):
+            self._signal(pid, signal.SIGKILL)
+        while self._children:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            self._children.pop(pid, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Workers vivos e contadores de criação, reciclagem e quedas"""
+        return {"workers": len(self._children), "pids": sorted(self._children), **self._stats}
+
+
+def main():
+    """Inicia o pool pré-fork do daemon PIX"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Pool pré-fork do daemon PIX")
+    parser.add_argument("--workers", type=int, default=PIX_POOL_WORKERS,
+                        help=f"Processos worker (0 = {PIX_POOL_WORKERS_PER_CORE:g} x núcleos = {default_workers()})")
+    parser.add_argument("--threads", type=int, default=PIX_POOL_THREADS, help="Conexões simultâneas por worker")
+    parser.add_argument("--max-requests", type=int, default=PIX_POOL_MAX_REQUESTS,
+                        help="Requisições até reciclar um worker (0 = nunca)")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Caminho do socket Unix")
+    parser.add_argument("--host", default=DAEMON_HOST, help="Host TCP (com --port)")
+    parser.add_argument("--port", type=int, default=None, help="Usar TCP em vez de socket Unix")
+    args = parser.parse_args()
+
+    setup_logging()
+    supervisor = PreforkSupervisor(workers=args.workers, threads=args.threads, max_requests=args.max_requests)
+    listener = open_listener(args.socket, args.host, args.port)
+    address = f"{args.host}:{args.port}" if args.port is not None else args.socket
+
+    print("🌵 PrescrevaMe Premium - Pool Pré-fork do Daemon PIX")
+    print("=" * 50)
+    try:
+        supervisor.start(listener)
+        # Depois do fork: a thread do /metrics fica só no supervisor
+        start_metrics_server()
+        print(f"{supervisor.log_prefix} 🚀 {supervisor.workers} workers x {supervisor.threads} threads em {address} "
+              f"(supervisor pid {os.getpid()})")
+        supervisor.run()
+    finally:
+        supervisor.stop()
+        listener.close()
+        if args.port is None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        stats = supervisor.stats()
+        print(f"{supervisor.log_prefix} 👋 Pool encerrado "
+              f"({stats['spawned']} workers criados, {stats['recycled']} reciclados, {stats['crashed']} quedas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,785 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Pool de PIX Pré-criados
+Criar o PIX (pixQrCode.create) fica entre o envio do formulário e o QR Code
+na tela. O pool mantém cobranças já criadas no AbacatePay para os preços
+fixos do checkout (PRODUCT_PRICE e os descontos PIX/renovação), e o checkout
+só precisa pegar uma pronta: uma leitura de diretório e um rename().
+
+Cada cobrança é um arquivo JSON em PIX_WARM_POOL_DIR/<valor>-<expiração>/,
+com o nome prefixado pelo instante até o qual ela ainda dá ao cliente a
+janela completa de pagamento. Pegar uma cobrança é renomeá-la para claimed/:
+o rename é atômico, então PHP (config.php) e Python disputam o mesmo pool
+sem lock e sem servidor. Cobranças de clientes conhecidos (renovações)
+ficam em <valor>-<expiração>-<cpf>/ e só são entregues ao próprio cliente.
+
+O serviço (`run`) repõe o pool em segundo plano, descarta cobranças antes
+do vencimento e exporta taxa de acerto e idade das cobranças entregues.
+O SDK não cancela PIX: as descartadas ficam em retired/ até vencerem no
+AbacatePay. Cobranças anônimas não levam os dados do cliente para o
+AbacatePay: quem pegou fica registrado em claimed/, o webhook completa o
+cliente por lá e apaga o registro no status final (ou o serviço, após
+PIX_WARM_POOL_CLAIM_RETENTION).
+
+Uso:
+    python3 pix_warm_pool.py run [--targets "34700:900:3,34700:2700:3,22700:900:3"]
+    python3 pix_warm_pool.py prewarm renovacoes.csv --amount 22700 --expires-in 900 --max-age 86400
+    python3 pix_warm_pool.py stats
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from dotenv_cache import load_env
+from metrics import registry as metrics_registry, start_metrics_server
+from payment_monitor import to_timestamp
+from structured_logging import setup_logging
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+PIX_WARM_POOL_DIR = os.getenv('PIX_WARM_POOL_DIR', '')  # vazio = desabilitado
+PIX_WARM_POOL_TARGETS = os.getenv('PIX_WARM_POOL_TARGETS', '34700:900:3,34700:2700:3,22700:900:3')  # valor:expiração:tamanho[:descrição]
+PIX_WARM_POOL_MAX_AGE = float(os.getenv('PIX_WARM_POOL_MAX_AGE', '600'))  # segundos em que uma cobrança pode ser entregue
+PIX_WARM_POOL_REFRESH_AHEAD = float(os.getenv('PIX_WARM_POOL_REFRESH_AHEAD', '60'))  # repor antes de a cobrança sair do pool
+PIX_WARM_POOL_INTERVAL = float(os.getenv('PIX_WARM_POOL_INTERVAL', '1'))
+PIX_WARM_POOL_REFILL_WORKERS = int(os.getenv('PIX_WARM_POOL_REFILL_WORKERS', '2'))
+PIX_WARM_POOL_CLAIM_RETENTION = float(os.getenv('PIX_WARM_POOL_CLAIM_RETENTION', '3600'))  # registros após o vencimento
+
+# Subdiretórios de controle (os demais são cobranças disponíveis)
+CLAIMED, ASSIGNED, MISSED, QUARANTINE, RETIRED = "claimed", "assigned", "missed", "quarantine", "retired"
+_CONTROL_DIRS = (CLAIMED, ASSIGNED, MISSED, QUARANTINE, RETIRED)
+
+AGE_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 86400)
+
+WARM_POOL_CLAIMS = metrics_registry.counter(
+    "pix_warm_pool_claims_total", "Pedidos de PIX ao pool pré-criado, por resultado (hit/miss)", ("sku", "result")
+)
+WARM_POOL_CLAIM_AGE = metrics_registry.histogram(
+    "pix_warm_pool_claim_age_seconds", "Tempo entre criar a cobrança do pool e entregá-la ao cliente", ("sku",),
+    buckets=AGE_BUCKETS
+)
+WARM_POOL_RETIRED = metrics_registry.counter(
+    "pix_warm_pool_retired_total", "Cobranças do pool descartadas sem uso antes do vencimento", ("sku",)
+)
+WARM_POOL_QUARANTINED = metrics_registry.counter(
+    "pix_warm_pool_quarantined_total", "Cobranças do pool separadas em quarantine/ sem serem entregues", ("sku",)
+)
+WARM_POOL_REFILLS = metrics_registry.counter(
+    "pix_warm_pool_refills_total", "Cobranças criadas para o pool, por resultado", ("sku", "outcome")
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmTarget:
+    """Preço mantido no pool: `size` cobranças anônimas de `amount` com `expires_in` de janela"""
+    amount: int
+    expires_in: int
+    size: int
+    description: str
+
+    @property
+    def sku(self) -> str:
+        return sku_name(self.amount, self.expires_in)
+
+
+def sku_name(amount: int, expires_in: int) -> str:
+    """Nome do diretório (e rótulo das métricas) de um preço"""
+    return f"{int(amount)}-{int(expires_in)}"
+
+
+def parse_targets(spec: str, description: str) -> List[WarmTarget]:
+    """
+    Interpreta PIX_WARM_POOL_TARGETS
+
+    Args:
+        spec: "valor:expiração:tamanho[:descrição]" separados por vírgula
+        description: Descrição das cobranças sem descrição própria
+
+    Returns:
+        Lista de alvos (tamanho 0 é ignorado)
+    """
+    targets = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        fields = item.strip().split(":", 3)
+        if len(fields) < 3:
+            raise ValueError(f"Alvo do pool inválido (esperado valor:expiração:tamanho): {item!r}")
+        target = WarmTarget(
+            amount=int(fields[0]),
+            expires_in=int(fields[1]),
+            size=int(fields[2]),
+            description=fields[3].strip() if len(fields) > 3 and fields[3].strip() else description
+        )
+        if target.size > 0:
+            targets.append(target)
+    return targets
+
+
+def _digits(value: Any) -> str:
+    return "".join(ch for ch in str(value or "") if ch.isdigit())
+
+
+def _claimable_until(filename: str) -> Optional[float]:
+    """Prefixo numérico do arquivo de uma cobrança (None para arquivos que não são cobranças)"""
+    if filename.startswith(".") or not filename.endswith(".json"):
+        return None
+    try:
+        return float(filename.split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Gravação atômica: o arquivo só aparece completo no diretório"""
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+def to_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Cobrança do pool no formato de PrescrevaMePixManager.create_pix_payment"""
+    pix = entry.get("pix") or {}
+    return {
+        "success": True,
+        "pix_id": pix.get("id"),
+        "amount": pix.get("amount"),
+        "status": pix.get("status"),
+        "brcode": pix.get("brCode"),
+        "brcode_base64": pix.get("brCodeBase64"),
+        "expires_at": pix.get("expiresAt"),
+        "created_at": pix.get("createdAt"),
+        "dev_mode": pix.get("devMode"),
+        "warm": True
+    }
+
+
+class WarmPixPool:
+    """Cobranças pré-criadas em um diretório compartilhado entre processos (e com o PHP)"""
+
+    def __init__(self, root: str = PIX_WARM_POOL_DIR):
+        """
+        Args:
+            root: Diretório do pool (vazio = desabilitado: claim sempre devolve None)
+        """
+        self.root = root
+        self.log_prefix = "⚡ PrescrevaMe Warm Pool"
+        self._ready = False
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _ensure_dirs(self) -> None:
+        if not self._ready:
+            for name in _CONTROL_DIRS:
+                os.makedirs(self._path(name), exist_ok=True)
+            self._ready = True
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += amount
+
+    # ------------------------------------------------------------------
+    # Entrada e saída de cobranças
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        result: Dict[str, Any],
+        expires_in: int,
+        description: str,
+        customer_tax_id: str = ""
+    ) -> Optional[str]:
+        """
+        Coloca no pool uma cobrança recém-criada
+
+        Args:
+            result: Retorno de PrescrevaMePixManager.create_pix_charge
+            expires_in: Janela de pagamento garantida ao cliente que pegar a cobrança
+            description: Descrição usada na criação
+            customer_tax_id: CPF do cliente dono da cobrança (vazio = anônima)
+
+        Returns:
+            Caminho do arquivo, ou None se a cobrança já não garante a janela
+        """
+        self._ensure_dirs()
+        pooled_at = time.time()
+        expires_at = to_timestamp(result.get("expires_at"))
+        if expires_at is None:
+            return None
+        claimable_until = expires_at - expires_in
+        if claimable_until <= pooled_at:
+            return None
+
+        amount = int(result.get("amount") or 0)
+        tax_id = _digits(customer_tax_id)
+        directory = self._path(sku_name(amount, expires_in) + (f"-{tax_id}" if tax_id else ""))
+        os.makedirs(directory, exist_ok=True)
+        entry = {
+            "pix": {
+                "id": result["pix_id"],
+                "amount": amount,
+                "status": result.get("status"),
+                "brCode": result.get("brcode"),
+                "brCodeBase64": result.get("brcode_base64"),
+                "expiresAt": result.get("expires_at"),
+                "createdAt": result.get("created_at"),
+                "devMode": result.get("dev_mode")
+            },
+            "sku": sku_name(amount, expires_in),
+            "description": description,
+            "customer_tax_id": tax_id,
+            "pooled_at": pooled_at,
+            "claimable_until": claimable_until,
+            "expires_at": expires_at
+        }
+        path = os.path.join(directory, f"{int(claimable_until):010d}-{result['pix_id']}.json")
+        _write_json(path, entry)
+        return path
+
+    def claim(
+        self,
+        amount: int,
+        expires_in: int,
+        customer: Optional[Dict[str, Any]] = None,
+        source: str = "python"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pega uma cobrança pronta (a do próprio cliente primeiro, senão uma anônima)
+
+        Entre as válidas, entrega a que sairia do pool primeiro. Acertos e
+        falhas ficam registrados em claimed/ e missed/ para o serviço contar.
+
+        Args:
+            amount: Valor em centavos
+            expires_in: Janela de pagamento mínima em segundos
+            customer: Dados do cliente (name, email, cellphone, tax_id)
+            source: Quem pegou (python, php), para o registro
+
+        Returns:
+            Resultado no formato de create_pix_payment (com "warm": True), ou None
+        """
+        if not self.enabled:
+            return None
+        self._ensure_dirs()
+        sku = sku_name(amount, expires_in)
+        tax_id = _digits((customer or {}).get("tax_id"))
+        now = time.time()
+        for name in ([f"{sku}-{tax_id}"] if tax_id else []) + [sku]:
+            directory = self._path(name)
+            try:
+                filenames = sorted(os.listdir(directory))
+            except FileNotFoundError:
+                continue
+            for filename in filenames:
+                claimable_until = _claimable_until(filename)
+                if claimable_until is None or claimable_until <= now:
+                    continue
+                claiming = self._path(CLAIMED, f".{filename}.{os.getpid()}.{threading.get_ident()}")
+                try:
+                    os.rename(os.path.join(directory, filename), claiming)
+                except FileNotFoundError:
+                    # Outro processo pegou (ou o serviço descartou) esta cobrança
+                    continue
+                entry = _read_json(claiming)
+                pix = (entry or {}).get("pix")
+                if not isinstance(pix, dict) or not pix.get("id"):
+                    self._quarantine(claiming, filename, sku, "arquivo da cobrança ilegível")
+                    continue
+                pix_id = pix["id"]
+                try:
+                    _write_json(self._path(CLAIMED, f"{pix_id}.json"), {
+                        "pix_id": pix_id,
+                        "sku": sku,
+                        "source": source,
+                        "claimed_at": time.time(),
+                        "pooled_at": entry.get("pooled_at"),
+                        "expires_at": entry.get("expires_at"),
+                        "customer": customer or {}
+                    })
+                except OSError as e:
+                    # Sem o registro o webhook não saberia de quem é o pagamento: não entrega
+                    self._quarantine(claiming, filename, sku, e)
+                    continue
+                try:
+                    os.unlink(claiming)
+                except OSError:
+                    pass  # o registro já foi gravado; ingest() recolhe a sobra
+                logger.info("⚡ PIX entregue do pool", extra={"pix_id": pix_id, "sku": sku, "source": source})
+                return to_result(entry)
+
+        self.record_miss(sku)
+        return None
+
+    def record_miss(self, sku: str) -> None:
+        """Registra em missed/ um pedido que não saiu do pool (o serviço conta em ingest)"""
+        try:
+            self._ensure_dirs()
+            open(self._path(MISSED, f"{sku}.{os.getpid()}.{os.urandom(4).hex()}"), "x").close()
+        except OSError:
+            pass
+
+    def _quarantine(self, path: str, filename: str, sku: str, reason: Any) -> None:
+        """
+        Separa em quarantine/ uma cobrança pega mas não entregue
+
+        A cobrança continua aberta no AbacatePay; o arquivo fica para conferência
+        em vez de sumir junto com o PIX.
+        """
+        target = self._path(QUARANTINE, filename)
+        try:
+            os.makedirs(self._path(QUARANTINE), exist_ok=True)
+            os.replace(path, target)
+        except OSError as e:
+            logger.error("❌ Cobrança do pool não entregue e fora da quarentena: %s (%s)", reason, e,
+                         extra={"file": path, "sku": sku})
+            return
+        WARM_POOL_QUARANTINED.inc(sku=sku)
+        self._count("quarantined")
+        logger.error("⚠️ Cobrança do pool em quarentena: %s", reason, extra={"file": target, "sku": sku})
+
+    def forget(self, pix_id: str) -> None:
+        """
+        Apaga os dados do cliente de uma cobrança do pool (webhook, após o status final)
+
+        O registro em claimed/ ainda não contado por ingest() fica, sem o cliente.
+        """
+        if not self.enabled or not pix_id:
+            return
+        filename = f"{os.path.basename(pix_id)}.json"
+        try:
+            os.unlink(self._path(ASSIGNED, filename))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error("❌ Erro ao apagar o registro da cobrança do pool: %s", e, extra={"pix_id": pix_id})
+        path = self._path(CLAIMED, filename)
+        record = _read_json(path)
+        if record is not None and record.get("customer"):
+            try:
+                _write_json(path, {**record, "customer": {}})
+            except OSError as e:
+                logger.error("❌ Erro ao apagar o registro da cobrança do pool: %s", e, extra={"pix_id": pix_id})
+
+    def claimed_customer(self, pix_id: str) -> Optional[Dict[str, Any]]:
+        """Cliente que pegou uma cobrança anônima do pool (para o webhook)"""
+        if not self.enabled or not pix_id:
+            return None
+        for name in (CLAIMED, ASSIGNED):
+            record = _read_json(self._path(name, f"{os.path.basename(pix_id)}.json"))
+            if record is not None:
+                return record.get("customer") or None
+        return None
+
+    # ------------------------------------------------------------------
+    # Manutenção (serviço)
+    # ------------------------------------------------------------------
+
+    def _listdir(self, name: str) -> List[str]:
+        if not self.enabled:
+            return []
+        try:
+            return [filename for filename in os.listdir(self._path(name)) if not filename.startswith(".")]
+        except FileNotFoundError:
+            return []
+
+    def _pool_dirs(self) -> List[str]:
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return [name for name in names if name not in _CONTROL_DIRS and not name.startswith(".")]
+
+    def available(self, sku: str, ahead: float = 0.0) -> int:
+        """Cobranças anônimas de `sku` que continuam válidas por mais `ahead` segundos"""
+        limit = time.time() + ahead
+        try:
+            filenames = os.listdir(self._path(sku))
+        except FileNotFoundError:
+            return 0
+        return sum(1 for filename in filenames if (_claimable_until(filename) or 0) > limit)
+
+    def ingest(self) -> Dict[str, int]:
+        """
+        Conta os acertos (claimed/) e as falhas (missed/) registrados desde a última chamada
+
+        Returns:
+            Dict com hits e misses desta chamada
+        """
+        self._ensure_dirs()
+        hits = misses = 0
+        now = time.time()
+        for filename in os.listdir(self._path(CLAIMED)):
+            path = self._path(CLAIMED, filename)
+            if filename.startswith("."):
+                # Claim interrompido (processo morreu entre o rename e o registro)
+                try:
+                    if now - os.stat(path).st_mtime <= PIX_WARM_POOL_CLAIM_RETENTION:
+                        continue
+                    if filename.endswith(".tmp"):
+                        os.unlink(path)
+                    else:
+                        original = filename[1:].split(".json", 1)[0] + ".json"
+                        self._quarantine(path, original, (_read_json(path) or {}).get("sku", ""), "claim interrompido")
+                except FileNotFoundError:
+                    pass
+                continue
+            record = _read_json(path)
+            if record is None:
+                continue
+            sku = record.get("sku", "")
+            WARM_POOL_CLAIMS.inc(sku=sku, result="hit")
+            if record.get("pooled_at"):
+                WARM_POOL_CLAIM_AGE.observe(max(0.0, record["claimed_at"] - record["pooled_at"]), sku=sku)
+            os.replace(path, self._path(ASSIGNED, filename))
+            hits += 1
+        for filename in os.listdir(self._path(MISSED)):
+            WARM_POOL_CLAIMS.inc(sku=filename.split(".", 1)[0], result="miss")
+            try:
+                os.unlink(self._path(MISSED, filename))
+            except FileNotFoundError:
+                pass
+            misses += 1
+        self._count("hits", hits)
+        self._count("misses", misses)
+        return {"hits": hits, "misses": misses}
+
+    def retire(self) -> int:
+        """
+        Descarta cobranças que já não garantem a janela de pagamento
+
+        A cobrança nunca foi mostrada a ninguém, mas continua aberta no
+        AbacatePay até expirar (o SDK não cancela PIX): o arquivo vai para
+        retired/ e conta em `retired_open` até o vencimento.
+
+        Returns:
+            Quantidade descartada
+        """
+        self._ensure_dirs()
+        now = time.time()
+        retired = 0
+        for name in self._pool_dirs():
+            sku = "-".join(name.split("-", 2)[:2])
+            try:
+                filenames = os.listdir(self._path(name))
+            except FileNotFoundError:
+                continue
+            for filename in filenames:
+                claimable_until = _claimable_until(filename)
+                if claimable_until is None or claimable_until > now:
+                    continue
+                try:
+                    os.replace(self._path(name, filename), self._path(RETIRED, filename))
+                except FileNotFoundError:
+                    # Pego por um cliente no último instante
+                    continue
+                logger.info("🗑️ Cobrança do pool descartada (aberta no AbacatePay até vencer)",
+                            extra={"pix_id": filename[:-5].split("-", 1)[-1], "sku": sku})
+                WARM_POOL_RETIRED.inc(sku=sku)
+                retired += 1
+        self._count("retired", retired)
+        return retired
+
+    def prune(self) -> int:
+        """
+        Apaga registros de cobranças já vencidas no AbacatePay
+
+        Entregas (claimed/ e assigned/, com os dados do cliente) saem
+        PIX_WARM_POOL_CLAIM_RETENTION segundos após o vencimento, mesmo que o
+        webhook nunca tenha chegado; descartadas (retired/), no vencimento.
+
+        Returns:
+            Quantidade de registros apagados
+        """
+        self._ensure_dirs()
+        now = time.time()
+        pruned = 0
+        for name, retention in ((CLAIMED, PIX_WARM_POOL_CLAIM_RETENTION), (ASSIGNED, PIX_WARM_POOL_CLAIM_RETENTION),
+                                (RETIRED, 0.0)):
+            for filename in self._listdir(name):
+                path = self._path(name, filename)
+                record = _read_json(path)
+                if record is not None and (record.get("expires_at") or 0) + retention >= now:
+                    continue
+                try:
+                    os.unlink(path)
+                    pruned += 1
+                except FileNotFoundError:
+                    pass
+        return pruned
+
+    def stats(self) -> Dict[str, Any]:
+        """Cobranças disponíveis por diretório e contadores deste processo"""
+        with self._lock:
+            counts = dict(self._counts)
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        return {
+            "enabled": self.enabled,
+            "available": {name: self.available(name) for name in sorted(self._pool_dirs())},
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+            "retired": counts.get("retired", 0),
+            "retired_open": len(self._listdir(RETIRED)),
+            "refilled": counts.get("refilled", 0),
+            "refill_failed": counts.get("refill_failed", 0),
+            "quarantined": len(self._listdir(QUARANTINE))
+        }
+
+
+class WarmPoolRefiller:
+    """Mantém os alvos do pool cheios, criando cobranças em segundo plano"""
+
+    def __init__(
+        self,
+        manager: Any,
+        targets: List[WarmTarget],
+        pool: Optional[WarmPixPool] = None,
+        max_age: float = PIX_WARM_POOL_MAX_AGE,
+        refresh_ahead: float = PIX_WARM_POOL_REFRESH_AHEAD,
+        workers: int = PIX_WARM_POOL_REFILL_WORKERS
+    ):
+        """
+        Args:
+            manager: Objeto com create_pix_charge (ex.: PrescrevaMePixManager)
+            targets: Preços mantidos no pool
+            pool: Pool de destino (padrão: warm_pool do processo)
+            max_age: Segundos em que cada cobrança pode ser entregue (criada com expires_in + max_age)
+            refresh_ahead: Cobranças a menos disso do descarte já são repostas
+            workers: Criações simultâneas
+        """
+        self.manager = manager
+        self.targets = targets
+        self.pool = pool if pool is not None else warm_pool
+        self.max_age = max_age
+        self.refresh_ahead = min(refresh_ahead, max_age / 2)
+        self.log_prefix = "⚡ PrescrevaMe Warm Pool"
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warm-pool")
+        self._in_flight: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _create(self, target: WarmTarget) -> None:
+        try:
+            result = self.manager.create_pix_charge(
+                amount=target.amount,
+                description=target.description,
+                expires_in=int(target.expires_in + self.max_age)
+            )
+            if result.get("success") and self.pool.add(result, target.expires_in, target.description):
+                WARM_POOL_REFILLS.inc(sku=target.sku, outcome="created")
+                self.pool._count("refilled")
+            else:
+                WARM_POOL_REFILLS.inc(sku=target.sku, outcome="failed")
+                self.pool._count("refill_failed")
+        except Exception as e:
+            WARM_POOL_REFILLS.inc(sku=target.sku, outcome="failed")
+            self.pool._count("refill_failed")
+            logger.error("❌ Erro ao repor o pool: %s", e, extra={"sku": target.sku})
+        finally:
+            with self._lock:
+                self._in_flight[target.sku] -= 1
+
+    def tick(self) -> int:
+        """
+        Uma rodada: contabiliza entregas, descarta o que venceu e agenda a reposição
+
+        Returns:
+            Criações agendadas nesta rodada
+        """
+        self.pool.ingest()
+        self.pool.retire()
+        scheduled = 0
+        for target in self.targets:
+            available = self.pool.available(target.sku, self.refresh_ahead)
+            with self._lock:
+                deficit = target.size - available - self._in_flight[target.sku]
+                if deficit > 0:
+                    self._in_flight[target.sku] += deficit
+            for _ in range(max(0, deficit)):
+                self._executor.submit(self._create, target)
+                scheduled += 1
+        return scheduled
+
+    def run(self, stop: threading.Event, interval: float = PIX_WARM_POOL_INTERVAL) -> None:
+        """Roda tick() a cada `interval` segundos até `stop`"""
+        last_prune = 0.0
+        while not stop.is_set():
+            try:
+                self.tick()
+                if time.monotonic() - last_prune > 60:
+                    self.pool.prune()
+                    last_prune = time.monotonic()
+            except OSError as e:
+                logger.error("❌ Erro na manutenção do pool: %s", e)
+            stop.wait(interval)
+
+    def close(self) -> None:
+        """Espera as criações em andamento (elas ainda entram no pool)"""
+        self._executor.shutdown(wait=True)
+
+
+def prewarm_customers(
+    manager: Any,
+    customers,
+    amount: int,
+    expires_in: int,
+    description: str,
+    max_age: float,
+    pool: Optional[WarmPixPool] = None
+) -> Dict[str, int]:
+    """
+    Cria cobranças nominais para clientes conhecidos (ex.: lista de renovação)
+
+    Clientes que já têm cobrança válida no pool são pulados, então a lista
+    pode ser reenviada. Cada cobrança fica disponível por `max_age` segundos
+    e só é entregue ao cliente com o mesmo CPF.
+
+    Args:
+        manager: Objeto com create_pix_charge (ex.: PrescrevaMePixManager)
+        customers: Iterável de dicts no formato de pix_bulk.read_customers_csv
+        amount: Valor padrão em centavos
+        expires_in: Janela de pagamento garantida
+        description: Descrição padrão
+        max_age: Segundos em que a cobrança pode ser entregue
+        pool: Pool de destino (padrão: warm_pool do processo)
+
+    Returns:
+        Dict com created, skipped e failed
+    """
+    pool = pool if pool is not None else warm_pool
+    counts = {"created": 0, "skipped": 0, "failed": 0}
+    for customer in customers:
+        tax_id = _digits(customer.get("customer_cpf"))
+        item_amount = int(customer.get("amount") or amount)
+        if not tax_id or pool.available(f"{sku_name(item_amount, expires_in)}-{tax_id}"):
+            counts["skipped"] += 1
+            continue
+        item_description = customer.get("description") or description
+        result = manager.create_pix_charge(
+            amount=item_amount,
+            description=item_description,
+            expires_in=int(expires_in + max_age),
+            customer={
+                "name": customer.get("customer_name", ""),
+                "email": customer.get("customer_email", ""),
+                "cellphone": customer.get("customer_phone", ""),
+                "tax_id": tax_id
+            }
+        )
+        if result.get("success") and pool.add(result, expires_in, item_description, customer_tax_id=tax_id):
+            counts["created"] += 1
+        else:
+            counts["failed"] += 1
+    return counts
+
+
+# Pool compartilhado pelo processo (PrescrevaMePixManager, webhook)
+warm_pool = WarmPixPool()
+
+
+def main():
+    """Serviço de reposição, pré-criação para clientes conhecidos e estatísticas do pool"""
+    # Import tardio: pix_manager importa este módulo
+    from pix_manager import PRODUCT_NAME, PrescrevaMePixManager
+
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Pool de PIX pré-criados")
+    parser.add_argument("--dir", default=PIX_WARM_POOL_DIR, help="Diretório do pool (PIX_WARM_POOL_DIR)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Mantém o pool cheio (serviço)")
+    run_parser.add_argument("--targets", default=PIX_WARM_POOL_TARGETS, help="valor:expiração:tamanho[:descrição],...")
+    run_parser.add_argument("--max-age", type=float, default=PIX_WARM_POOL_MAX_AGE, help="Segundos no pool")
+
+    prewarm_parser = subparsers.add_parser("prewarm", help="Cria cobranças nominais a partir de um CSV")
+    prewarm_parser.add_argument("csv_file", help="CSV de clientes (nome, email, telefone, cpf[, amount, description])")
+    prewarm_parser.add_argument("--amount", type=int, required=True, help="Valor padrão em centavos")
+    prewarm_parser.add_argument("--expires-in", type=int, required=True, help="Janela de pagamento em segundos")
+    prewarm_parser.add_argument("--description", default=PRODUCT_NAME, help="Descrição padrão")
+    prewarm_parser.add_argument("--max-age", type=float, default=86400, help="Segundos no pool")
+
+    subparsers.add_parser("stats", help="Cobranças disponíveis por preço")
+    args = parser.parse_args()
+
+    if not args.dir:
+        parser.error("Defina PIX_WARM_POOL_DIR ou --dir")
+    pool = warm_pool if args.dir == warm_pool.root else WarmPixPool(args.dir)
+
+    if args.command == "stats":
+        print(json.dumps(pool.stats(), indent=2, ensure_ascii=False))
+        return
+
+    setup_logging()
+    start_metrics_server()
+    manager = PrescrevaMePixManager(warm_pool=pool)
+
+    if args.command == "prewarm":
+        # Import tardio: o leitor de CSV do lote (sqlite3, pool de threads) só é usado aqui
+        from pix_bulk import read_customers_csv
+
+        summary = prewarm_customers(
+            manager, read_customers_csv(args.csv_file), args.amount, args.expires_in, args.description, args.max_age,
+            pool=pool
+        )
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    targets = parse_targets(args.targets, PRODUCT_NAME)
+    refiller = WarmPoolRefiller(manager, targets, pool=pool, max_age=args.max_age)
+    metrics_registry.gauge_callback(
+        "pix_warm_pool_available", "Cobranças anônimas prontas no pool, por preço", ("sku",),
+        lambda: {(target.sku,): pool.available(target.sku) for target in targets}
+    )
+    metrics_registry.gauge_callback(
+        "pix_warm_pool_retired_open", "Cobranças descartadas do pool ainda abertas no AbacatePay", (),
+        lambda: {(): len(pool._listdir(RETIRED))}
+    )
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    print("🌵 PrescrevaMe Premium - Pool de PIX Pré-criados")
+    print("=" * 50)
+    print(f"{refiller.log_prefix} 🚀 {', '.join(f'{t.sku} x{t.size}' for t in targets)} em {args.dir} "
+          f"(até {args.max_age:.0f}s no pool)")
+    try:
+        refiller.run(stop)
+    finally:
+        refiller.close()
+        stats = pool.stats()
+        print(f"{refiller.log_prefix} 👋 Encerrado ({stats['hits']} entregues, {stats['misses']} sem cobrança pronta, "
+              f"{stats['refilled']} criadas, {stats['retired']} descartadas, "
+              f"{stats['retired_open']} descartadas ainda abertas no AbacatePay)")
+
+
+if __name__ == "__main__":
+    main()
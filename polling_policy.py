@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Políticas de Polling
+Decide quando verificar de novo um PIX pendente: polling denso logo após a
+criação, backoff exponencial com jitter depois, e parada no expires_at
+"""
+
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class PollingPolicy(ABC):
+    """Política base: subclasses definem next_delay"""
+
+    @abstractmethod
+    def next_delay(self, attempt: int, age: float) -> float:
+        """
+        Atraso até o próximo check
+
+        Args:
+            attempt: Checks já realizados para este PIX
+            age: Segundos desde a criação do PIX
+
+        Returns:
+            Atraso em segundos
+        """
+
+    def next_check_at(
+        self,
+        attempt: int,
+        created_at: float,
+        now: float,
+        expires_at: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Instante do próximo check, com parada rígida no expires_at
+
+        Returns:
+            Timestamp do próximo check, ou None se não há mais o que verificar
+        """
+        if expires_at is not None and now >= expires_at:
+            return None
+        due = now + max(0.0, self.next_delay(attempt, now - created_at))
+        if expires_at is not None:
+            # Último check exatamente na expiração, para confirmar o estado final
+            due = min(due, expires_at)
+        return due
+
+
+class FixedIntervalPolicy(PollingPolicy):
+    """Intervalo fixo (comportamento original de monitor_payment)"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+
+    def next_delay(self, attempt: int, age: float) -> float:
+        return self.interval
+
+
+class AdaptivePollingPolicy(PollingPolicy):
+    """Polling denso no início e backoff exponencial com jitter depois"""
+
+    def __init__(
+        self,
+        dense_interval: float = 2.0,
+        dense_window: float = 120.0,
+        backoff_factor: float = 1.5,
+        max_interval: float = 60.0,
+        jitter: float = 0.2,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Args:
+            dense_interval: Intervalo durante a janela densa (s)
+            dense_window: Duração da janela densa após a criação (s)
+            backoff_factor: Multiplicador do intervalo a cada check após a janela densa
+            max_interval: Teto do intervalo (s)
+            jitter: Variação aleatória relativa (0.2 = ±20%)
+            rng: Gerador aleatório (para simulações reprodutíveis)
+        """
+        self.dense_interval = dense_interval
+        self.dense_window = dense_window
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self._dense_attempts = math.ceil(dense_window / dense_interval) if dense_interval > 0 else 0
+
+    def next_delay(self, attempt: int, age: float) -> float:
+        if age < self.dense_window:
+            delay = self.dense_interval
+        else:
+            backoff_step = max(1, attempt - self._dense_attempts)
+            delay = min(self.max_interval, self.dense_interval * self.backoff_factor ** backoff_step)
+
+        if self.jitter:
+            delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
@@ -10,17 +10,201 @@ class PythonIntegration {
     
     private $pythonPath;
     private $scriptsPath;
+    private $daemonSocket;
+    private $daemonTimeout;
+    private $batchTimeout;
+    private $batchProcess = null;
+    private $batchPipes = [];
+    private $batchNextId = 0;
     
     public function __construct() {
         $this->pythonPath = 'python3'; // Ajuste conforme necessário
         $this->scriptsPath = __DIR__;
+        $this->daemonSocket = getenv('PIX_DAEMON_SOCKET') ?: '/tmp/prescrevame-pix.sock';
+        $this->daemonTimeout = (float) (getenv('PIX_DAEMON_TIMEOUT') ?: 30);
+        $this->batchTimeout = (float) (getenv('PIX_BATCH_TIMEOUT') ?: 30);
+    }
+    
+    /**
+     * Envia requisição ao daemon PIX (pix_daemon.py)
+     * Retorna null só se o daemon não estiver disponível (socket ausente ou conexão recusada),
+     * para cair no modo batch. Depois do envio, timeout ou queda viram erro: a requisição
+     * pode ter sido executada (ex.: PIX criado no AbacatePay) e não deve ser repetida
+     */
+    private function callDaemon($op, $params = []) {
+        if (!file_exists($this->daemonSocket)) {
+            return null;
+        }
+        
+        $conn = @stream_socket_client('unix://' . $this->daemonSocket, $errno, $errstr, 1.0);
+        if (!$conn) {
+            return null;
+        }
+        
+        stream_set_timeout($conn, (int) ceil($this->daemonTimeout));
+        
+        // Frame: 4 bytes com o tamanho (big-endian) + corpo JSON
+        $body = json_encode(['id' => 1, 'op' => $op, 'params' => $params]);
+        @fwrite($conn, pack('N', strlen($body)) . $body);
+        
+        $header = $this->readExact($conn, 4);
+        $response = null;
+        if ($header !== null) {
+            $length = unpack('N', $header)[1];
+            $payload = $this->readExact($conn, $length);
+            if ($payload !== null) {
+                $response = json_decode($payload, true);
+            }
+        }
+        
+        $timedOut = !empty(stream_get_meta_data($conn)['timed_out']);
+        fclose($conn);
+        if (!is_array($response)) {
+            return [
+                'id' => 1,
+                'ok' => false,
+                'error' => $timedOut ? 'Tempo esgotado aguardando o daemon PIX' : 'Daemon PIX encerrou sem responder'
+            ];
+        }
+        return $response;
+    }
+    
+    /**
+     * Lê exatamente $length bytes do stream
+     */
+    private function readExact($conn, $length) {
+        $buffer = '';
+        while (strlen($buffer) < $length) {
+            $chunk = fread($conn, $length - strlen($buffer));
+            if ($chunk === false || $chunk === '') {
+                return null;
+            }
+            $buffer .= $chunk;
+        }
+        return $buffer;
+    }
+    
+    /**
+     * Converte a resposta do daemon para o formato usado por esta classe
+     */
+    private function daemonResult($response, $key) {
+        if (!empty($response['ok']) && !empty($response['result']['success'])) {
+            return [
+                'success' => true,
+                $key => $response['result']
+            ];
+        }
+        
+        return [
+            'success' => false,
+            'error' => $response['result']['error'] ?? $response['error'] ?? 'Erro no daemon PIX'
+        ];
+    }
+    
+    /**
+     * Envia requisição ao pix_manager.py em modo batch (JSON por linha)
+     * O processo é aberto no primeiro uso e reaproveitado só pelas chamadas seguintes desta
+     * instância: no php-fpm cada requisição cria uma instância nova e paga a inicialização
+     * do Python (use o daemon PIX para evitar isso). A resposta tem o mesmo formato do daemon;
+     * sem resposta em PIX_BATCH_TIMEOUT segundos o processo é encerrado e a chamada falha
+     */
+    private function callBatch($op, $params = []) {
+        if ($this->batchProcess === null) {
+            // Momento do exec: com TRACE_SAMPLE_RATE > 0 o Python mede a própria inicialização (tracing.py)
+            $command = 'PRESCREVAME_EXEC_START=' . sprintf('%.6f', microtime(true)) . ' exec '
+                . $this->pythonPath . ' ' . escapeshellarg($this->scriptsPath . '/pix_manager.py') . ' batch';
+            // stderr (logs) fora do stdout: cada linha do stdout é uma resposta JSON
+            $descriptors = [0 => ['pipe', 'r'], 1 => ['pipe', 'w'], 2 => ['file', '/dev/null', 'a']];
+            $process = proc_open($command, $descriptors, $pipes, $this->scriptsPath);
+            if (!is_resource($process)) {
+                return ['id' => null, 'ok' => false, 'error' => 'Não foi possível iniciar o pix_manager.py'];
+            }
+            $this->batchProcess = $process;
+            $this->batchPipes = $pipes;
+        }
+        
+        $id = ++$this->batchNextId;
+        fwrite($this->batchPipes[0], json_encode(['id' => $id, 'op' => $op, 'params' => $params]) . "\n");
+        fflush($this->batchPipes[0]);
+        
+        $line = $this->readBatchLine($this->batchTimeout);
+        if ($line === null) {
+            // Processo travado (ex.: API presa em novas tentativas): encerrado para não prender o worker PHP
+            proc_terminate($this->batchProcess);
+            $this->closeBatch();
+            return ['id' => $id, 'ok' => false, 'error' => 'Tempo esgotado aguardando o pix_manager.py'];
+        }
+        
+        $response = $line !== '' ? json_decode($line, true) : null;
+        if (!is_array($response) || ($response['id'] ?? null) !== $id) {
+            // Processo encerrado ou fora de sincronia: o próximo uso abre outro
+            $this->closeBatch();
+            return ['id' => $id, 'ok' => false, 'error' => 'Resposta inválida do pix_manager.py'];
+        }
+        return $response;
+    }
+    
+    /**
+     * Lê uma linha do stdout do processo batch
+     * Retorna null no timeout (ou erro no select) e '' se o processo fechou o stdout antes do fim da linha
+     */
+    private function readBatchLine($timeout) {
+        $pipe = $this->batchPipes[1];
+        stream_set_blocking($pipe, false);
+        $deadline = microtime(true) + $timeout;
+        $line = '';
+        while (substr($line, -1) !== "\n") {
+            $remaining = $deadline - microtime(true);
+            if ($remaining <= 0) {
+                return null;
+            }
+            $read = [$pipe];
+            $write = $except = null;
+            $ready = @stream_select($read, $write, $except, (int) $remaining, (int) (($remaining - floor($remaining)) * 1000000));
+            if ($ready === false) {
+                return null;
+            }
+            if ($ready === 0) {
+                continue;
+            }
+            $chunk = fgets($pipe);
+            if ($chunk === false || $chunk === '') {
+                if (feof($pipe)) {
+                    return '';
+                }
+                continue;
+            }
+            $line .= $chunk;
+        }
+        return $line;
+    }
+    
+    /**
+     * Encerra o processo batch (fim da entrada: o Python sai sozinho)
+     */
+    private function closeBatch() {
+        if ($this->batchProcess === null) {
+            return;
+        }
+        foreach ($this->batchPipes as $pipe) {
+            fclose($pipe);
+        }
+        proc_close($this->batchProcess);
+        $this->batchProcess = null;
+        $this->batchPipes = [];
+    }
+    
+    public function __destruct() {
+        $this->closeBatch();
     }
     
     /**
      * Executa comando Python e retorna resultado
      */
     private function executePython($script, $args = []) {
-        $command = $this->pythonPath . ' ' . escapeshellarg($this->scriptsPath . '/' . $script);
+        // Momento do exec: com TRACE_SAMPLE_RATE > 0 o Python mede a própria inicialização (tracing.py)
+        $command = 'PRESCREVAME_EXEC_START=' . sprintf('%.6f', microtime(true)) . ' '
+            . $this->pythonPath . ' ' . escapeshellarg($this->scriptsPath . '/' . $script);
         
         if (!empty($args)) {
             foreach ($args as $arg) {
@@ -45,38 +229,27 @@ class PythonIntegration {
      */
     public function createPixWithPython($customerData) {
         try {
-            // Preparar dados para o script Python
-            $data = [
-                'name' => $customerData['name'],
-                'email' => $customerData['email'],
-                'phone' => $customerData['phone'],
-                'cpf' => $customerData['cpf']
-            ];
-            
-            // Criar arquivo temporário com dados
-            $tempFile = tempnam(sys_get_temp_dir(), 'pix_data_');
-            file_put_contents($tempFile, json_encode($data));
-            
-            // Executar script Python
-            $result = $this->executePython('pix_manager.py', ['--data-file', $tempFile]);
-            
-            // Limpar arquivo temporário
-            unlink($tempFile);
-            
-            if ($result['success']) {
-                // Tentar extrair dados do PIX do output
-                $pixData = $this->parsePixOutput($result['output']);
-                return [
-                    'success' => true,
-                    'pix_data' => $pixData
-                ];
-            } else {
-                return [
-                    'success' => false,
-                    'error' => $result['output']
-                ];
+            // Caminho rápido: daemon PIX aquecido
+            $response = $this->callDaemon('create', [
+                'customer_name' => $customerData['name'],
+                'customer_email' => $customerData['email'],
+                'customer_phone' => $customerData['phone'],
+                'customer_cpf' => $customerData['cpf']
+            ]);
+            if ($response !== null) {
+                // Inclui falhas depois do envio: repetir em outro caminho poderia criar um segundo PIX
+                return $this->daemonResult($response, 'pix_data');
             }
             
+            // Sem daemon: pix_manager.py em modo batch (JSON, sem raspar a saída)
+            $response = $this->callBatch('create', [
+                'customer_name' => $customerData['name'],
+                'customer_email' => $customerData['email'],
+                'customer_phone' => $customerData['phone'],
+                'customer_cpf' => $customerData['cpf']
+            ]);
+            return $this->daemonResult($response, 'pix_data');
+            
         } catch (Exception $e) {
             return [
                 'success' => false,
@@ -90,20 +263,16 @@ class PythonIntegration {
      */
     public function checkPixStatusWithPython($pixId) {
         try {
-            $result = $this->executePython('pix_manager.py', ['--check', $pixId]);
-            
+            // Caminho rápido: daemon PIX aquecido; sem ele, pix_manager.py em modo batch
+            $response = $this->callDaemon('check', ['pix_id' => $pixId]);
+            if ($response === null) {
+                $response = $this->callBatch('check', ['pix_id' => $pixId]);
+            }
+            $result = $this->daemonResult($response, 'status');
             if ($result['success']) {
-                $status = $this->parseStatusOutput($result['output']);
-                return [
-                    'success' => true,
-                    'status' => $status
-                ];
-            } else {
-                return [
-                    'success' => false,
-                    'error' => $result['output']
-                ];
+                $result['status'] = $result['status']['status'];
             }
+            return $result;
             
         } catch (Exception $e) {
             return [
@@ -178,11 +347,14 @@ class PythonIntegration {
     /**
      * Inicia servidor webhook Python
      */
-    public function startWebhookServer($port = 5000) {
+    public function startWebhookServer($port = 5000, $workers = null) {
         try {
-            // Executar em background
+            // Executar em background (gunicorn multi-processo quando instalado)
             $command = $this->pythonPath . ' ' . escapeshellarg($this->scriptsPath . '/webhook_handler.py') . 
-                      ' --port ' . $port . ' > /dev/null 2>&1 &';
+                      ' --port ' . intval($port) .
+                      ' --pid-file ' . escapeshellarg($this->webhookPidFile($port)) .
+                      ($workers ? ' --workers ' . intval($workers) : '') .
+                      ' > /dev/null 2>&1 &';
             
             exec($command, $output, $returnCode);
             
@@ -200,14 +372,27 @@ class PythonIntegration {
         }
     }
     
+    /**
+     * Arquivo com o PID do processo principal do servidor webhook
+     */
+    private function webhookPidFile($port) {
+        return sys_get_temp_dir() . '/prescrevame-webhook-' . intval($port) . '.pid';
+    }
+    
     /**
      * Para servidor webhook Python
      */
     public function stopWebhookServer($port = 5000) {
         try {
-            // Encontrar processo Python na porta específica
-            $command = "lsof -ti:$port | xargs kill -9 2>/dev/null";
-            exec($command, $output, $returnCode);
+            // SIGTERM: o servidor conclui os webhooks em andamento antes de sair
+            $pidFile = $this->webhookPidFile($port);
+            if (is_file($pidFile) && ($pid = intval(trim(file_get_contents($pidFile)))) > 0) {
+                exec('kill -TERM ' . $pid . ' 2>/dev/null', $output, $returnCode);
+            } else {
+                // Sem arquivo de PID: encontrar processo Python na porta específica
+                $command = 'lsof -ti:' . intval($port) . ' | xargs kill -TERM 2>/dev/null';
+                exec($command, $output, $returnCode);
+            }
             
             return [
                 'success' => true,
@@ -262,32 +447,6 @@ class PythonIntegration {
         }
     }
     
-    /**
-     * Extrai dados do PIX do output do Python
-     */
-    private function parsePixOutput($output) {
-        // Implementar parsing específico baseado no formato do output
-        // Por enquanto, retorna estrutura básica
-        return [
-            'pix_id' => 'python_generated_' . time(),
-            'brcode' => 'python_generated_brcode',
-            'status' => 'PENDING'
-        ];
-    }
-    
-    /**
-     * Extrai status do output do Python
-     */
-    private function parseStatusOutput($output) {
-        // Implementar parsing específico
-        if (strpos($output, 'PAID') !== false) {
-            return 'PAID';
-        } elseif (strpos($output, 'EXPIRED') !== false) {
-            return 'EXPIRED';
-        } else {
-            return 'PENDING';
-        }
-    }
 }
 
 // Função helper para uso direto
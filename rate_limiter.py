@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Limitador de Taxa
+Token bucket seguro entre threads para espaçar chamadas à API do AbacatePay,
+com pausa global quando o provedor responde 429 (Retry-After)
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Chamada descartada: o limite de taxa não liberou um token dentro da espera máxima"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Limite de chamadas à API atingido, tente novamente em {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens por segundo, acumulando até `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens repostos por segundo (0 ou negativo = sem limite)
+            capacity: Rajada máxima (padrão: max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._rejected = 0
+        self._pauses = 0
+        self._waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float, now: float) -> float:
+        """Tenta retirar tokens; retorna 0.0 em caso de sucesso ou a espera necessária"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Retira tokens sem esperar; False se não houver saldo (ou se estiver em pausa)"""
+        with self._lock:
+            if self._reserve(tokens, time.monotonic()) == 0.0:
+                self._acquired += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Espera até haver tokens
+
+        Args:
+            tokens: Tokens necessários
+            timeout: Espera máxima em segundos (None = sem limite)
+
+        Returns:
+            True se os tokens foram obtidos; False se o timeout venceu antes
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._reserve(tokens, now)
+                if wait == 0.0:
+                    self._acquired += 1
+                    self._waited += now - start
+                    return True
+            if timeout is not None and now + wait - start > timeout:
+                with self._lock:
+                    self._rejected += 1
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Suspende todas as retiradas por `seconds` (ex.: resposta 429 do provedor)"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._pauses += 1
+            # Sem rajada acumulada durante a pausa: a reposição recomeça quando ela termina
+            self._tokens = 0.0
+            self._updated = max(self._updated, self._paused_until)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "acquired": self._acquired,
+                "rejected": self._rejected,
+                "pauses": self._pauses,
+                "paused_for_s": max(0.0, self._paused_until - time.monotonic()),
+                "total_wait_s": self._waited
+            }
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Relatórios Colunares
+Backend opcional (pandas/Arrow) dos relatórios resumido e PrescrevaMe: os
+eventos viram colunas tipadas e as contagens por status, dia, mês e cliente
+são group-bys vetorizados, em vez de um incremento de dicionário por evento.
+
+O resultado é idêntico ao de SummaryAggregator/PrescrevaMeAggregator,
+inclusive na ordem das chaves (ordem de primeira aparição). Do
+payment_logs.json, o pyarrow lê só as colunas usadas; arquivos que ele não
+representa sem ambiguidade (JSON inválido, status nulo, valor não inteiro)
+são lidos linha a linha pelo chamador, com a mesma semântica do Python puro.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import pandas as pd
+except ImportError:  # pandas é opcional (requirements.txt)
+    pd = None
+
+from transaction_report import PRESCREVA_ME_PRICE
+
+# Tudo a partir do primeiro "T", como timestamp.split("T")[0]
+_TIME_PATTERN = r"(?s)T.*"
+
+
+def columnar_available() -> bool:
+    """True se o pandas estiver instalado"""
+    return pd is not None
+
+
+class EventColumns:
+    """Acumula as colunas usadas pelos relatórios, evento a evento (mesmos padrões de .get do caminho Python)"""
+
+    def __init__(self):
+        self.status: List[Any] = []
+        self.amount: List[Any] = []
+        self.timestamp: List[Any] = []
+        self.customer: List[Any] = []
+        self._integer_amounts = True
+
+    def add(self, log: Dict[str, Any]) -> None:
+        self.status.append(log.get("status", "UNKNOWN"))
+        amount = log.get("amount")
+        if amount is not None and type(amount) is not int:
+            self._integer_amounts = False
+        self.amount.append(amount)
+        self.timestamp.append(log.get("timestamp", ""))
+        self.customer.append((log.get("customer") or {}).get("name", "Desconhecido"))
+
+    def frame(self) -> "pd.DataFrame":
+        return pd.DataFrame({
+            "status": pd.Series(self.status, dtype=object),
+            # Valores não inteiros ficam como objetos Python: somas e comparações iguais às do caminho Python
+            "amount": pd.array(self.amount, dtype="Int64") if self._integer_amounts else pd.Series(self.amount, dtype=object),
+            "timestamp": pd.Series(self.timestamp, dtype=object),
+            "customer": pd.Series(self.customer, dtype=object)
+        })
+
+
+def events_frame(logs: Iterable[Dict[str, Any]]) -> "pd.DataFrame":
+    """DataFrame dos eventos (status, amount, timestamp, customer)"""
+    columns = EventColumns()
+    for log in logs:
+        columns.add(log)
+    return columns.frame()
+
+
+def arrow_jsonl_frame(log_file: str) -> Optional["pd.DataFrame"]:
+    """
+    Leitura vetorizada de um payment_logs.json com o pyarrow (só as colunas usadas)
+
+    Returns:
+        DataFrame dos eventos, ou None se o pyarrow não estiver instalado ou o
+        arquivo tiver algo que ele não representa sem ambiguidade (o chamador
+        então lê linha a linha)
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.json as pa_json
+    except ImportError:
+        return None
+
+    schema = pa.schema([
+        ("status", pa.string()),
+        ("amount", pa.int64()),
+        ("timestamp", pa.string()),
+        ("customer", pa.struct([("name", pa.string())]))
+    ])
+    try:
+        # Leitura em blocos: só as colunas do schema ficam em memória, não o texto inteiro do arquivo
+        table = pa_json.open_json(log_file, parse_options=pa_json.ParseOptions(
+            explicit_schema=schema, unexpected_field_behavior="ignore"
+        )).read_all()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, OSError):
+        return None
+
+    # Nulo no Arrow tanto pode ser chave ausente quanto null explícito, que o caminho Python trata diferente
+    customer = table.column("customer")
+    names = pc.struct_field(customer, [0])
+    if table.column("status").null_count or pc.any(pc.and_(customer.is_valid(), names.is_null())).as_py():
+        return None
+
+    return pd.DataFrame({
+        "status": table.column("status").to_pandas(),
+        "amount": pd.array(table.column("amount").to_pandas(), dtype="Int64"),
+        "timestamp": table.column("timestamp").to_pandas(),
+        # Cliente ausente ou null: "Desconhecido", como (log.get("customer") or {}).get("name", ...)
+        "customer": pc.fill_null(names, "Desconhecido").to_pandas()
+    })
+
+
+def _counts(keys: "pd.Series") -> Dict[Any, int]:
+    """Contagem por chave na ordem de primeira aparição (como um defaultdict(int) alimentado em ordem)"""
+    if keys.empty:
+        return {}
+    counts = keys.groupby(keys, sort=False, dropna=False).size()
+    return {(None if pd.isna(key) else key): int(count) for key, count in counts.items()}
+
+
+def _daily(frame: "pd.DataFrame") -> Dict[str, int]:
+    """Contagem por data (AAAA-MM-DD) dos eventos com timestamp preenchido"""
+    timestamps = frame["timestamp"]
+    dated = timestamps[timestamps.notna() & (timestamps != "")]
+    try:
+        # Strings Arrow: o corte do horário roda no pyarrow, sem laço Python por linha
+        dated = dated.astype("string[pyarrow]")
+    except ImportError:
+        dated = dated.astype(str)
+    return _counts(dated.str.replace(_TIME_PATTERN, "", n=1, regex=True))
+
+
+def _monthly(daily: Dict[str, int]) -> Dict[str, int]:
+    """Contagem por mês a partir da contagem por data (uma entrada por dia, não por evento)"""
+    months: Dict[str, int] = defaultdict(int)
+    for date, count in daily.items():
+        months["-".join(date.split("-")[:2])] += count
+    return dict(months)
+
+
+def _sum(values: "pd.Series") -> Any:
+    if values.dtype == object:
+        total = 0
+        for value in values:
+            total += value
+        return total
+    return int(values.sum())
+
+
+def summary_report(frame: "pd.DataFrame") -> Dict[str, Any]:
+    """Relatório resumido no formato de SummaryAggregator.result()"""
+    total = len(frame)
+    paid = frame["status"] == "PAID"
+    paid_amounts = frame.loc[paid, "amount"]
+    daily = _daily(frame)
+    return {
+        "total_transactions": total,
+        "total_amount": _sum(paid_amounts.fillna(0)) if paid.any() else 0,
+        "status_breakdown": _counts(frame["status"]),
+        "daily_breakdown": daily,
+        "monthly_breakdown": _monthly(daily),
+        "customer_breakdown": _counts(frame["customer"]),
+        "payment_methods": {"PIX": total} if total else {}
+    }
+
+
+def prescreva_me_report(frame: "pd.DataFrame", price: int = PRESCREVA_ME_PRICE) -> Dict[str, Any]:
+    """Relatório PrescrevaMe no formato de PrescrevaMeAggregator.result() ({} sem transações)"""
+    amounts = frame["amount"]
+    matches = (amounts == price).fillna(False).astype(bool) if amounts.dtype != object else amounts.map(lambda a: a == price).astype(bool)
+    product = frame[matches]
+    total = len(product)
+    if not total:
+        return {}
+    confirmed = product["status"] == "PAID"
+    confirmed_count = int(confirmed.sum())
+    return {
+        "product": "PrescrevaMe Premium",
+        "price": price,
+        "total_subscriptions": total,
+        "confirmed_subscriptions": confirmed_count,
+        "revenue": _sum(product.loc[confirmed, "amount"]) if confirmed_count else 0,
+        "conversion_rate": (confirmed_count / total) * 100,
+        "customer_analysis": _counts(product["customer"]),
+        "monthly_subscriptions": _monthly(_daily(product))
+    }
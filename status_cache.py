@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Cache de Status de PIX
+Responde verificações de status localmente: estados pendentes ficam em cache
+por um TTL curto, estados finais (PAID/EXPIRED/CANCELLED) não expiram, e o
+webhook escreve direto no cache. Opcionalmente espelha as entradas em um
+diretório compartilhado para que o PHP (checkout.php) também as leia
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv_cache import load_env
+from payment_monitor import TERMINAL_STATUSES
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+STATUS_CACHE_TTL = float(os.getenv('PIX_STATUS_CACHE_TTL', 2))  # segundos para estados pendentes
+STATUS_CACHE_MAX_ENTRIES = int(os.getenv('PIX_STATUS_CACHE_MAX_ENTRIES', 50000))
+STATUS_CACHE_DIR = os.getenv('PIX_STATUS_CACHE_DIR', '')  # vazio = apenas memória
+
+_UNSAFE_ID_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class PixStatusCache:
+    """Cache LRU de status por pix_id com TTL para pendentes e retenção de estados finais"""
+
+    def __init__(
+        self,
+        ttl: float = STATUS_CACHE_TTL,
+        max_entries: int = STATUS_CACHE_MAX_ENTRIES,
+        shared_dir: Optional[str] = STATUS_CACHE_DIR or None
+    ):
+        """
+        Args:
+            ttl: Validade de estados não finais em segundos
+            max_entries: Capacidade em memória (LRU; pendentes são removidos antes dos finais)
+            shared_dir: Diretório compartilhado com outros processos (um JSON por PIX)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared_dir = shared_dir
+        # Pendentes e finais em LRUs separadas: a capacidade remove pendentes primeiro
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._final: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def get(self, pix_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca o status em cache
+
+        Returns:
+            Dict no formato de check_payment_status (com "cached": True), ou None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._lookup(pix_id)
+            if entry is not None and self._is_fresh(entry, now):
+                self.hits += 1
+                return self._as_result(entry)
+
+        entry = self._read_shared(pix_id)
+        if entry is not None and self._is_fresh(entry, now):
+            with self._lock:
+                self._store(pix_id, entry)
+                self.hits += 1
+                self.shared_hits += 1
+            return self._as_result(entry)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def settled_status(self, pix_id: str) -> Optional[str]:
+        """Status final conhecido (para settled_lookup do monitor), sem contar hit/miss"""
+        with self._lock:
+            entry = self._lookup(pix_id)
+        if entry is None:
+            entry = self._read_shared(pix_id)
+        if entry is not None and entry["status"] in TERMINAL_STATUSES:
+            return entry["status"]
+        return None
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def put(self, pix_id: str, result: Dict[str, Any]) -> None:
+        """Armazena o resultado de check_payment_status bem-sucedido"""
+        if result.get("success") and result.get("status"):
+            self.set_status(pix_id, result["status"], result.get("expires_at"))
+
+    def set_status(self, pix_id: str, status: str, expires_at: Any = None) -> None:
+        """
+        Registra um status (chamado pelo polling e pelo webhook)
+
+        Args:
+            pix_id: ID do PIX
+            status: Status atual
+            expires_at: Expiração informada pela API, se conhecida
+        """
+        with self._lock:
+            current = self._lookup(pix_id)
+            # Um estado final nunca volta a pendente
+            if current is not None and current["status"] in TERMINAL_STATUSES and status not in TERMINAL_STATUSES:
+                return
+            if expires_at is None and current is not None:
+                expires_at = current.get("expires_at")
+            entry = {
+                "status": status,
+                "expires_at": str(expires_at) if expires_at is not None else None,
+                "cached_at": time.time()
+            }
+            self._store(pix_id, entry)
+        self._write_shared(pix_id, entry)
+
+    def invalidate(self, pix_id: str) -> None:
+        """Remove um PIX do cache"""
+        with self._lock:
+            self._pending.pop(pix_id, None)
+            self._final.pop(pix_id, None)
+        path = self._shared_path(pix_id)
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss e ocupação"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._pending) + len(self._final),
+                "final_entries": len(self._final),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+    def purge_shared(self, older_than: float = 86400) -> int:
+        """
+        Remove arquivos do diretório compartilhado mais antigos que `older_than` segundos
+
+        Returns:
+            Quantidade de arquivos removidos
+        """
+        if not self.shared_dir:
+            return 0
+        removed = 0
+        cutoff = time.time() - older_than
+        for name in os.listdir(self.shared_dir):
+            path = os.path.join(self.shared_dir, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self, entry: Dict[str, Any], now: float) -> bool:
+        return entry["status"] in TERMINAL_STATUSES or now - entry["cached_at"] < self.ttl
+
+    def _as_result(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "status": entry["status"],
+            "expires_at": entry.get("expires_at"),
+            "is_paid": entry["status"] == "PAID",
+            "is_expired": entry["status"] == "EXPIRED",
+            "cached": True
+        }
+
+    def _lookup(self, pix_id: str) -> Optional[Dict[str, Any]]:
+        """Busca com o lock já adquirido, marcando a entrada como recém-usada"""
+        for entries in (self._final, self._pending):
+            entry = entries.get(pix_id)
+            if entry is not None:
+                entries.move_to_end(pix_id)
+                return entry
+        return None
+
+    def _store(self, pix_id: str, entry: Dict[str, Any]) -> None:
+        """Insere com o lock já adquirido e aplica a capacidade"""
+        if entry["status"] in TERMINAL_STATUSES:
+            self._pending.pop(pix_id, None)
+            target = self._final
+        else:
+            self._final.pop(pix_id, None)
+            target = self._pending
+        target[pix_id] = entry
+        target.move_to_end(pix_id)
+
+        if len(self._pending) + len(self._final) > self.max_entries:
+            # Primeiro o pendente menos usado; finais só saem se não houver pendentes
+            (self._pending or self._final).popitem(last=False)
+            self.evictions += 1
+
+    def _shared_path(self, pix_id: str) -> Optional[str]:
+        if not self.shared_dir:
+            return None
+        return os.path.join(self.shared_dir, _UNSAFE_ID_CHARS.sub('_', pix_id) + ".json")
+
+    def _read_shared(self, pix_id: str) -> Optional[Dict[str, Any]]:
+        path = self._shared_path(pix_id)
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry if "status" in entry and "cached_at" in entry else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, pix_id: str, entry: Dict[str, Any]) -> None:
+        path = self._shared_path(pix_id)
+        if not path:
+            return
+        # Escrita atômica: leitores (PHP incluso) nunca veem um arquivo pela metade
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+# Cache compartilhado do processo
+status_cache = PixStatusCache()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Status por Push (SSE e long-poll)
+O navegador assina o pix_id e recebe o status final (PAID/EXPIRED/CANCELLED)
+assim que o webhook do AbacatePay chega, em vez de um check_payment por tick
+do JavaScript (e um /pixQrCode/check por tick no PHP).
+
+    GET /events/<pix_id>          Server-Sent Events: "event: status" e fim do stream
+    GET /poll/<pix_id>?timeout=25 long-poll: JSON com o status final ou PENDING no timeout
+    GET /stats                    conexões e eventos
+
+O servidor é um único loop asyncio com um Protocol por conexão (sem task nem
+timer por conexão ociosa; um único laço envia os heartbeats), então dezenas
+de milhares de conexões paradas custam só memória de socket. O pub/sub é em
+processo: o WebhookHandler chama publish_status(), que entrega direto se o
+servidor roda neste processo, ou envia um datagrama para PUSH_SOCKET (workers
+do gunicorn, fila de webhooks) ao processo que mantém as conexões.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import signal
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+from dotenv_cache import load_env
+from metrics import registry as metrics_registry, start_metrics_server
+from payment_monitor import TERMINAL_STATUSES
+from status_cache import status_cache
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+PUSH_HOST = os.getenv('PUSH_HOST', '0.0.0.0')
+PUSH_PORT = int(os.getenv('PUSH_PORT', '0'))  # 0 = desligado (páginas usam só o polling)
+PUSH_SOCKET = os.getenv('PUSH_SOCKET', '/tmp/prescrevame-push.sock')  # datagramas dos processos do webhook
+PUSH_HEARTBEAT = float(os.getenv('PUSH_HEARTBEAT', '15'))  # comentário SSE para proxies não fecharem a conexão
+PUSH_POLL_TIMEOUT = float(os.getenv('PUSH_POLL_TIMEOUT', '25'))
+PUSH_STREAM_MAX_AGE = float(os.getenv('PUSH_STREAM_MAX_AGE', '3600'))  # o EventSource reconecta sozinho
+PUSH_MAX_CONNECTIONS = int(os.getenv('PUSH_MAX_CONNECTIONS', '50000'))
+PUSH_ALLOW_ORIGIN = os.getenv('PUSH_ALLOW_ORIGIN', '*')
+PUSH_RECENT_MAX = int(os.getenv('PUSH_RECENT_MAX', '100000'))  # status finais lembrados para quem assina depois
+
+HEADER_TIMEOUT = 10.0
+MAX_HEADER_SIZE = 8192
+MAX_WRITE_BUFFER = 64 * 1024  # cliente que não lê os heartbeats é desconectado
+
+_PIX_ID = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            408: "Request Timeout", 431: "Request Header Fields Too Large", 503: "Service Unavailable"}
+
+
+class StatusBroker:
+    """
+    Pub/sub em processo por pix_id
+
+    Só deve ser usado na thread do loop do servidor (publish_threadsafe
+    encaminha de outras threads). Assinantes são callbacks chamados uma vez
+    com o evento final; status finais ficam numa LRU para quem assina depois
+    que o webhook já chegou.
+    """
+
+    def __init__(self, recent_max: int = PUSH_RECENT_MAX):
+        self.recent_max = recent_max
+        self._subscribers: Dict[str, Set[Callable[[Dict[str, Any]], None]]] = defaultdict(set)
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, pix_id: str, callback: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """
+        Registra `callback` para o próximo evento final do pix_id
+
+        Returns:
+            O evento final já conhecido (sem registrar), ou None
+        """
+        event = self.known(pix_id)
+        if event is None:
+            self._subscribers[pix_id].add(callback)
+        return event
+
+    def unsubscribe(self, pix_id: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+        callbacks = self._subscribers.get(pix_id)
+        if callbacks is None:
+            return
+        callbacks.discard(callback)
+        if not callbacks:
+            del self._subscribers[pix_id]
+
+    def known(self, pix_id: str) -> Optional[Dict[str, Any]]:
+        """Evento final já publicado ou, na falta dele, o status final do status_cache"""
+        event = self._recent.get(pix_id)
+        if event is not None:
+            return event
+        status = status_cache.settled_status(pix_id)
+        if status is not None:
+            return {"pix_id": pix_id, "status": status, "final": True}
+        return None
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """
+        Entrega o evento a todos os assinantes do pix_id
+
+        Returns:
+            Quantidade de assinantes notificados
+        """
+        pix_id = event.get("pix_id")
+        if not pix_id:
+            return 0
+        self.published += 1
+        if event.get("final"):
+            self._recent[pix_id] = event
+            self._recent.move_to_end(pix_id)
+            while len(self._recent) > self.recent_max:
+                self._recent.popitem(last=False)
+        callbacks = self._subscribers.pop(pix_id, ())
+        for callback in callbacks:
+            callback(event)
+        self.delivered += len(callbacks)
+        return len(callbacks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "watched_pix": len(self._subscribers),
+            "subscribers": sum(len(callbacks) for callbacks in self._subscribers.values()),
+            "recent_final": len(self._recent),
+            "published": self.published,
+            "delivered": self.delivered
+        }
+
+
+def _response_head(code: int, content_type: str, extra: str = "") -> bytes:
+    return (
+        f"HTTP/1.1 {code} {_REASONS.get(code, 'OK')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Access-Control-Allow-Origin: {PUSH_ALLOW_ORIGIN}\r\n"
+        f"Cache-Control: no-cache\r\n"
+        f"{extra}"
+    ).encode("ascii")
+
+
+def _json_response(code: int, body: Dict[str, Any]) -> bytes:
+    data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = _response_head(code, "application/json", f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n")
+    return head + data
+
+
+def _sse_event(event: Dict[str, Any]) -> bytes:
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    return f"event: status\ndata: {data}\n\n".encode("utf-8")
+
+
+class _PushConnection(asyncio.Protocol):
+    """Uma conexão HTTP: lê o cabeçalho, responde ou fica assinando o pix_id"""
+
+    __slots__ = ("server", "transport", "buffer", "mode", "pix_id", "timer", "opened_at")
+
+    def __init__(self, server: "PushServer"):
+        self.server = server
+        self.transport: Optional[asyncio.Transport] = None
+        self.buffer = bytearray()
+        self.mode: Optional[str] = None  # "events", "poll" ou "done"
+        self.pix_id: Optional[str] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.opened_at = time.monotonic()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+        if len(self.server.connections) >= self.server.max_connections:
+            self._finish(_json_response(503, {"error": "too many connections"}))
+            return
+        self.server.connections.add(self)
+        self.timer = self.server.loop.call_later(HEADER_TIMEOUT, self._header_timeout)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.server.connections.discard(self)
+        self.server.streams.discard(self)
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.pix_id is not None and self.mode in ("events", "poll"):
+            self.server.broker.unsubscribe(self.pix_id, self.deliver)
+        self.mode = "done"
+
+    def data_received(self, data: bytes) -> None:
+        if self.mode is not None:
+            return  # corpo ou pipelining: ignorados, a resposta fecha a conexão
+        self.buffer += data
+        end = self.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self.buffer) > MAX_HEADER_SIZE:
+                self._finish(_json_response(431, {"error": "headers too large"}))
+            return
+        head = bytes(self.buffer[:end]).decode("latin-1")
+        self.buffer = bytearray()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self._route(head)
+
+    def _header_timeout(self) -> None:
+        self.timer = None
+        if self.mode is None:
+            self._finish(_json_response(408, {"error": "request timeout"}))
+
+    def _route(self, head: str) -> None:
+        request_line = head.split("\r\n", 1)[0].split()
+        if len(request_line) != 3:
+            self._finish(_json_response(400, {"error": "bad request"}))
+            return
+        method, target, _ = request_line
+        if method == "OPTIONS":
+            self._finish(_response_head(204, "text/plain", "Access-Control-Allow-Methods: GET\r\n"
+                                        "Content-Length: 0\r\nConnection: close\r\n\r\n"))
+            return
+        if method != "GET":
+            self._finish(_json_response(405, {"error": "method not allowed"}))
+            return
+
+        url = urlsplit(target)
+        # Só os dois últimos segmentos importam: o proxy pode montar o serviço em /push/...
+        parts = [part for part in url.path.split("/") if part]
+        if parts and parts[-1] == "stats":
+            self._finish(_json_response(200, self.server.stats()))
+            return
+        if len(parts) < 2 or parts[-2] not in ("events", "poll") or not _PIX_ID.match(parts[-1]):
+            self._finish(_json_response(404, {"error": "not found"}))
+            return
+
+        kind, self.pix_id = parts[-2], parts[-1]
+        if kind == "events":
+            self._open_stream()
+        else:
+            try:
+                timeout = float(parse_qs(url.query).get("timeout", [PUSH_POLL_TIMEOUT])[0])
+            except ValueError:
+                timeout = PUSH_POLL_TIMEOUT
+            self._open_poll(min(max(timeout, 0.0), PUSH_POLL_TIMEOUT))
+
+    def _open_stream(self) -> None:
+        self.transport.write(_response_head(200, "text/event-stream", "Connection: keep-alive\r\n"
+                                            "X-Accel-Buffering: no\r\n\r\n") + b"retry: 3000\n\n")
+        self.mode = "events"
+        event = self.server.broker.subscribe(self.pix_id, self.deliver)
+        if event is not None:
+            self.deliver(event)
+            return
+        self.opened_at = time.monotonic()
+        self.server.streams.add(self)
+
+    def _open_poll(self, timeout: float) -> None:
+        self.mode = "poll"
+        event = self.server.broker.subscribe(self.pix_id, self.deliver)
+        if event is not None:
+            self.deliver(event)
+            return
+        self.timer = self.server.loop.call_later(timeout, self._poll_timeout)
+
+    def _poll_timeout(self) -> None:
+        self.timer = None
+        if self.mode == "poll":
+            self.server.broker.unsubscribe(self.pix_id, self.deliver)
+            self._finish(_json_response(200, {"pix_id": self.pix_id, "status": "PENDING", "final": False}))
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Callback do broker: envia o evento final e encerra"""
+        if self.mode == "events":
+            self.server.streams.discard(self)
+            self._finish(_sse_event(event))
+        elif self.mode == "poll":
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self._finish(_json_response(200, event))
+
+    def heartbeat(self, now: float) -> None:
+        if now - self.opened_at >= self.server.stream_max_age:
+            self.server.broker.unsubscribe(self.pix_id, self.deliver)
+            self.server.streams.discard(self)
+            self._finish(b"")
+        elif self.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.transport.abort()
+        else:
+            self.transport.write(b": ping\n\n")
+
+    def _finish(self, data: bytes) -> None:
+        self.mode = "done"
+        if self.transport.is_closing():
+            return
+        if data:
+            self.transport.write(data)
+        self.transport.close()
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    """Eventos publicados por outros processos (publish_status)"""
+
+    def __init__(self, broker: StatusBroker):
+        self.broker = broker
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        if isinstance(event, dict):
+            self.broker.publish(event)
+
+
+class PushServer:
+    """Servidor asyncio de SSE/long-poll com o StatusBroker do processo"""
+
+    def __init__(
+        self,
+        host: str = PUSH_HOST,
+        port: int = PUSH_PORT,
+        socket_path: Optional[str] = PUSH_SOCKET,
+        heartbeat: float = PUSH_HEARTBEAT,
+        stream_max_age: float = PUSH_STREAM_MAX_AGE,
+        max_connections: int = PUSH_MAX_CONNECTIONS
+    ):
+        """
+        Args:
+            host: Endereço de escuta HTTP
+            port: Porta HTTP
+            socket_path: Socket Unix de datagramas para eventos de outros processos (None = só deste)
+            heartbeat: Intervalo dos comentários SSE em segundos
+            stream_max_age: Idade máxima de um stream SSE (o navegador reconecta)
+            max_connections: Conexões simultâneas antes de responder 503
+        """
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.heartbeat = heartbeat
+        self.stream_max_age = stream_max_age
+        self.max_connections = max_connections
+        self.broker = StatusBroker()
+        self.connections: Set[_PushConnection] = set()
+        self.streams: Set[_PushConnection] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._datagrams: Optional[asyncio.DatagramTransport] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        """Abre o HTTP e o socket de datagramas no loop atual"""
+        self.loop = asyncio.get_running_loop()
+        _raise_open_files_limit()
+        self._server = await self.loop.create_server(
+            lambda: _PushConnection(self), self.host, self.port, backlog=4096, reuse_address=True
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._datagrams, _ = await self.loop.create_datagram_endpoint(
+                lambda: _DatagramReceiver(self.broker), local_addr=self.socket_path, family=socket.AF_UNIX
+            )
+        self._heartbeat_task = self.loop.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            now = time.monotonic()
+            for connection in list(self.streams):
+                connection.heartbeat(now)
+
+    def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        if self._server is not None:
+            self._server.close()
+        if self._datagrams is not None:
+            self._datagrams.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        for connection in list(self.connections):
+            connection.transport.close()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.close()
+
+    def start_in_thread(self) -> "PushServer":
+        """Roda o servidor em uma thread própria (servidor de webhooks de um processo)"""
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            self._ready.set()
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="status-push", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def publish_threadsafe(self, event: Dict[str, Any]) -> None:
+        """Publica a partir de qualquer thread"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.broker.publish, event)
+
+    def stats(self) -> Dict[str, Any]:
+        kinds = defaultdict(int)
+        for connection in self.connections:
+            kinds[connection.mode or "reading"] += 1
+        return {"port": self.port, "connections": len(self.connections), "by_mode": dict(kinds), **self.broker.stats()}
+
+
+def _raise_open_files_limit() -> None:
+    """Sobe o limite de arquivos abertos ao máximo permitido (uma conexão = um descritor)"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+# Servidor deste processo (se houver) e socket de envio para o servidor de outro processo
+_state: Dict[str, Any] = {"server": None, "socket": None, "pid": None, "sent": 0, "errors": 0}
+
+
+def start_push_server(host: str = PUSH_HOST, port: int = PUSH_PORT) -> Optional[PushServer]:
+    """
+    Inicia o servidor de push em uma thread deste processo
+
+    Returns:
+        O servidor, ou None com port=0
+    """
+    if not port:
+        return None
+    server = PushServer(host, port).start_in_thread()
+    _state["server"] = server
+    _register_gauges(server)
+    return server
+
+
+def _register_gauges(server: PushServer) -> None:
+    metrics_registry.gauge_callback(
+        "push_connections", "Conexões abertas no servidor de push por modo", ("mode",),
+        lambda: {(mode,): count for mode, count in server.stats()["by_mode"].items()}
+    )
+
+
+def publish_status(pix_id: str, status: str) -> None:
+    """
+    Avisa os navegadores que assinam o pix_id (melhor esforço: as páginas têm o polling como reserva)
+
+    Só o pix_id e o status são publicados: nada do cliente vai para o navegador.
+    """
+    if not PUSH_PORT or not pix_id:
+        return
+    event = {"pix_id": pix_id, "status": status, "final": status in TERMINAL_STATUSES, "timestamp": time.time()}
+    server = _state["server"]
+    if server is not None:
+        server.publish_threadsafe(event)
+        return
+    if not PUSH_SOCKET:
+        return
+    try:
+        if _state["pid"] != os.getpid():
+            # Socket próprio por processo (workers do gunicorn são criados por fork)
+            _state["socket"] = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            _state["socket"].setblocking(False)
+            _state["pid"] = os.getpid()
+        _state["socket"].sendto(json.dumps(event).encode("utf-8"), PUSH_SOCKET)
+        _state["sent"] += 1
+    except OSError:
+        _state["errors"] += 1
+
+
+def push_stats() -> Dict[str, Any]:
+    """Estado do push visto por este processo (para /webhook/status)"""
+    server = _state["server"]
+    return {
+        "enabled": bool(PUSH_PORT),
+        "server": server.stats() if server is not None else None,
+        "datagrams_sent": _state["sent"],
+        "datagram_errors": _state["errors"]
+    }
+
+
+def main():
+    """Servidor de push dedicado (um processo, ao lado dos workers do webhook)"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Status por push (SSE/long-poll)")
+    parser.add_argument("--host", default=PUSH_HOST, help="Endereço de escuta")
+    parser.add_argument("--port", type=int, default=PUSH_PORT or 5001, help="Porta HTTP")
+    parser.add_argument("--socket", default=PUSH_SOCKET, help="Socket Unix que recebe os eventos do webhook")
+    args = parser.parse_args()
+
+    start_metrics_server()
+    server = PushServer(args.host, args.port, args.socket)
+    _register_gauges(server)
+
+    async def run():
+        task = asyncio.ensure_future(server.serve_forever())
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, task.cancel)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    print(f"📡 Push de status em {args.host}:{args.port} (eventos via {args.socket})")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
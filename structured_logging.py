@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Logging Estruturado
+Um registro JSON por evento, gravado por uma thread de fundo
+(QueueHandler/QueueListener): quem loga só enfileira o registro, e a
+formatação da mensagem, a serialização e a escrita em disco acontecem fora
+do caminho da requisição.
+
+    LOG_LEVEL="INFO,webhook_handler=DEBUG,pix_manager=WARNING"
+
+Campos estruturados vão em `extra` e viram chaves do JSON:
+
+    logger.info("🎉 Pagamento confirmado", extra={"pix_id": pix_id, "amount": amount})
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # nível padrão, com exceções por módulo: "INFO,pix_manager=DEBUG"
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # json ou text
+LOG_STDERR = os.getenv('LOG_STDERR', 'true').lower() in ('1', 'true', 'yes')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # 0 = sem rotação por tamanho
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight').lower()  # midnight, hourly ou vazio
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '7'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # registros pendentes antes de descartar
+
+# Atributos que todo LogRecord tem; o resto veio de `extra` e vai para o JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_ROTATE_PERIODS = {"hourly": "%Y%m%d%H", "midnight": "%Y%m%d"}
+
+
+def parse_levels(spec: str) -> Tuple[int, Dict[str, int]]:
+    """
+    Interpreta LOG_LEVEL
+
+    Args:
+        spec: "NIVEL[,modulo=NIVEL...]", ex.: "WARNING,webhook_handler=INFO"
+
+    Returns:
+        Tupla (nível padrão, {logger: nível})
+    """
+    default = logging.INFO
+    per_module: Dict[str, int] = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, level = part.rpartition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            continue
+        if name:
+            per_module[name.strip()] = value
+        else:
+            default = value
+    return default, per_module
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """Campos estruturados (`extra`) de um registro"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, pid e os campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        entry.update(record_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para terminal, com os campos de `extra` em chave=valor"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que não formata na thread de quem loga
+
+    O QueueHandler padrão chama format() em prepare() (para poder serializar o
+    registro entre processos). Aqui a fila é do próprio processo: o registro
+    segue com msg/args intactos e a formatação fica para o QueueListener.
+    Fila cheia descarta o registro em vez de bloquear a requisição.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # O traceback segura os frames vivos; formata já (caminho de erro, raro)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RotatingLogFileHandler(logging.FileHandler):
+    """
+    Arquivo de log com rotação por tamanho e/ou período (webhook.log -> webhook.log.1 ...)
+
+    Seguro com vários processos gravando no mesmo arquivo (workers do gunicorn):
+    a rotação é feita sob flock em `<arquivo>.lock`, e cada processo reabre o
+    arquivo quando percebe que outro já o rotacionou.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = LOG_MAX_BYTES,
+        when: str = LOG_ROTATE_WHEN,
+        backup_count: int = LOG_BACKUP_COUNT
+    ):
+        """
+        Args:
+            filename: Caminho do arquivo de log
+            max_bytes: Tamanho que dispara a rotação (0 = sem limite)
+            when: "midnight", "hourly" ou "" (sem rotação por período)
+            backup_count: Arquivos antigos mantidos
+        """
+        super().__init__(filename, mode="a", encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.period_format = _ROTATE_PERIODS.get(when)
+        self.backup_count = backup_count
+        # Arquivo de um período anterior (processo reiniciado) gira na primeira escrita
+        try:
+            self._period = self._current_period(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self._period = self._current_period(time.time())
+        self._lock_path = self.baseFilename + ".lock"
+
+    def _current_period(self, now: float) -> Optional[str]:
+        return time.strftime(self.period_format, time.localtime(now)) if self.period_format else None
+
+    def _reopen_if_rotated(self) -> None:
+        """Outro processo rotacionou: o stream aponta para o arquivo antigo"""
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+            stale = current.st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            stale = True
+        if stale:
+            self.stream.close()
+            self.stream = None
+
+    def _should_rotate(self, now: float) -> bool:
+        if self.period_format and self._current_period(now) != self._period:
+            return True
+        if self.max_bytes > 0:
+            try:
+                return os.path.getsize(self.baseFilename) >= self.max_bytes
+            except FileNotFoundError:
+                return False
+        return False
+
+    def _rotate(self, now: float) -> None:
+        with open(self._lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # O lock guarda o último período rotacionado: outro processo pode ter
+            # rotacionado enquanto esperávamos, e o período não deve girar duas vezes
+            lock_file.seek(0)
+            rotated_period = lock_file.read().strip()
+            period = self._current_period(now)
+            due = period is not None and period != self._period and period != rotated_period
+            if not due and self.max_bytes > 0:
+                try:
+                    due = os.path.getsize(self.baseFilename) >= self.max_bytes
+                except FileNotFoundError:
+                    due = False
+            if due and os.path.exists(self.baseFilename):
+                for index in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.baseFilename}.{index}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.baseFilename}.{index + 1}")
+                if self.backup_count > 0:
+                    os.replace(self.baseFilename, f"{self.baseFilename}.1")
+                else:
+                    os.remove(self.baseFilename)
+            if period is not None:
+                lock_file.truncate(0)
+                lock_file.write(period)
+            self._period = period
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            now = time.time()
+            self._reopen_if_rotated()
+            if self._should_rotate(now):
+                self._rotate(now)
+        except OSError:
+            self.handleError(record)
+        super().emit(record)
+
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"pid": None, "listener": None, "handler": None, "targets": []}
+
+
+def _build_targets(log_file: Optional[str], fmt: str, stderr: bool) -> List[logging.Handler]:
+    formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    targets: List[logging.Handler] = []
+    if log_file:
+        targets.append(RotatingLogFileHandler(log_file))
+    if stderr:
+        targets.append(logging.StreamHandler(sys.stderr))
+    for target in targets:
+        target.setFormatter(formatter)
+    return targets
+
+
+def _start_listener() -> None:
+    log_queue: "queue.Queue" = queue.Queue(LOG_QUEUE_SIZE)
+    _state["handler"].queue = log_queue
+    listener = QueueListener(log_queue, *_state["targets"], respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+    _state["pid"] = os.getpid()
+
+
+def _after_fork_in_child() -> None:
+    # A thread de escrita não sobrevive ao fork (workers do gunicorn); a fila herdada
+    # ainda tem registros que o processo pai vai gravar: recomeça com uma fila nova
+    if _state["handler"] is not None and _state["pid"] != os.getpid():
+        _start_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def setup_logging(
+    log_file: Optional[str] = None,
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    stderr: bool = LOG_STDERR
+) -> logging.Handler:
+    """
+    Configura o logger raiz do processo (idempotente)
+
+    Args:
+        log_file: Arquivo de log com rotação (None = só stderr)
+        level: Especificação de níveis (ver parse_levels)
+        fmt: "json" (um objeto por linha) ou "text"
+        stderr: Também escrever em stderr
+
+    Returns:
+        O DeferredQueueHandler instalado no logger raiz
+    """
+    with _lock:
+        default, per_module = parse_levels(level)
+        root = logging.getLogger()
+        root.setLevel(default)
+        for name, module_level in per_module.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        if _state["handler"] is not None:
+            return _state["handler"]
+
+        _state["targets"] = _build_targets(log_file, fmt, stderr)
+        _state["handler"] = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_state["handler"])
+        _start_listener()
+        atexit.register(shutdown_logging)
+        return _state["handler"]
+
+
+def shutdown_logging() -> None:
+    """Grava os registros pendentes e para a thread de escrita"""
+    with _lock:
+        listener = _state["listener"]
+        if listener is not None and _state["pid"] == os.getpid():
+            listener.stop()
+            for target in _state["targets"]:
+                target.flush()
+        _state["listener"] = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Registros pendentes e descartados por fila cheia"""
+    handler = _state["handler"]
+    if handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "pending": handler.queue.qsize(),
+        "dropped": handler.dropped
+    }
@@ -0,0 +1,16 @@
+"""
+Testes do PrescrevaMe Premium
+
+Os módulos leem os caminhos dos bancos e logs na importação: durante os
+testes eles apontam para um diretório temporário, não para a raiz do projeto.
+"""
+
+import os
+import tempfile
+
+_TMP = tempfile.TemporaryDirectory(prefix="prescrevame_tests_")
+for _name, _file in (("PAYMENT_DB_PATH", "payment_events.db"), ("WEBHOOK_DEDUP_PATH", "webhook_dedup.db"),
+                     ("WEBHOOK_QUEUE_PATH", "webhook_queue.db"), ("WEBHOOK_LOG_FILE", "webhook.log"),
+                     ("PAYMENT_LOG_FILE", "payment_logs.json")):
+    os.environ.setdefault(_name, os.path.join(_TMP.name, _file))
+os.environ.setdefault("LOG_STDERR", "false")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes do Monitor de Pagamentos
+Resultados vão para o callback ou para results(), nunca acumulam nos dois
+
+Uso:
+    python3 -m unittest tests.test_payment_monitor
+"""
+
+import unittest
+
+from payment_monitor import PaymentMonitor
+
+
+class _PaidManager:
+    def check_payment_status(self, pix_id):
+        return {"success": True, "pix_id": pix_id, "status": "PAID"}
+
+
+class PaymentMonitorResultsTest(unittest.TestCase):
+    def _run(self, monitor: PaymentMonitor, count: int = 50) -> None:
+        monitor.start()
+        for i in range(count):
+            monitor.add(f"pix_{i}")
+        self.assertTrue(monitor.wait_idle(timeout=10))
+
+    def test_callback_results_are_not_queued(self):
+        received = []
+        monitor = PaymentMonitor(_PaidManager(), interval=0.01, on_result=received.append)
+        self._run(monitor)
+        self.assertEqual(len(received), 50)
+        self.assertEqual(monitor._results.qsize(), 0)
+        monitor.stop()
+        self.assertEqual(list(monitor.results()), [])
+
+    def test_results_are_queued_without_callback(self):
+        monitor = PaymentMonitor(_PaidManager(), interval=0.01)
+        self._run(monitor)
+        monitor.stop()
+        results = list(monitor.results())
+        self.assertEqual(sorted(result["pix_id"] for result in results), sorted(f"pix_{i}" for i in range(50)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes do Armazenamento de Eventos
+Importar o mesmo payment_logs.json mais de uma vez não duplica eventos
+
+Uso:
+    python3 -m unittest tests.test_payment_store
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from payment_store import PaymentEventStore
+
+
+def _event(i: int) -> dict:
+    return {"timestamp": f"2025-01-01T00:00:{i:02d}", "pix_id": f"pix_{i}", "status": "PAID", "amount": 100}
+
+
+class ImportJsonlTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PaymentEventStore(os.path.join(self.tmp.name, "events.db"))
+        self.log_file = os.path.join(self.tmp.name, "payment_logs.json")
+        self._write([_event(i) for i in range(5)])
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _write(self, events, mode: str = "w") -> None:
+        with open(self.log_file, mode, encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    def test_reimport_is_a_no_op(self):
+        self.assertEqual(self.store.import_jsonl(self.log_file)["imported"], 5)
+        result = self.store.import_jsonl(self.log_file)
+        self.assertEqual(result["imported"], 0)
+        self.assertEqual(self.store.count(), 5)
+        self.assertEqual(self.store.revenue(), 500)
+
+    def test_only_appended_lines_are_imported(self):
+        self.store.import_jsonl(self.log_file)
+        self._write([_event(5), _event(6)], mode="a")
+        result = self.store.import_jsonl(self.log_file)
+        self.assertEqual(result["imported"], 2)
+        self.assertGreater(result["resumed_at"], 0)
+        self.assertEqual(self.store.count(), 7)
+
+    def test_small_batches_resume_after_interruption(self):
+        self.store.import_jsonl(self.log_file, batch_size=2)
+        self.assertEqual(self.store.import_jsonl(self.log_file, batch_size=2)["imported"], 0)
+        self.assertEqual(self.store.count(), 5)
+
+    def test_replaced_file_is_refused_without_force(self):
+        self.store.import_jsonl(self.log_file)
+        self._write([_event(i) for i in range(10, 13)])
+        with self.assertRaises(ValueError):
+            self.store.import_jsonl(self.log_file)
+        self.assertEqual(self.store.import_jsonl(self.log_file, force=True)["imported"], 3)
+        self.assertEqual(self.store.count(), 8)
+
+    def test_partial_last_line_is_imported_once_complete(self):
+        line = json.dumps(_event(5)) + "\n"
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write(line[:20])
+        result = self.store.import_jsonl(self.log_file)
+        self.assertEqual((result["imported"], result["skipped"]), (5, 0))
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write(line[20:])
+        self.assertEqual(self.store.import_jsonl(self.log_file)["imported"], 1)
+        self.assertEqual(self.store.count(), 6)
+
+    def test_invalid_lines_are_skipped(self):
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            f.write("{inválido\n\n")
+        result = self.store.import_jsonl(self.log_file)
+        self.assertEqual((result["imported"], result["skipped"]), (5, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes do Pool de PIX Pré-criados
+Erros do pool nunca derrubam o checkout, e cobranças pegas mas não
+entregues vão para quarantine/ em vez de sumir
+
+Uso:
+    python3 -m unittest tests.test_pix_warm_pool
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pix_warm_pool
+from benchmarks.fake_abacatepay import FakeAbacatePay
+from pix_manager import PrescrevaMePixManager
+from pix_warm_pool import ASSIGNED, CLAIMED, QUARANTINE, RETIRED, WarmPixPool, sku_name
+from rate_limiter import TokenBucket
+
+AMOUNT, EXPIRES_IN = 34700, 900
+CUSTOMER = {"name": "Ana", "email": "ana@exemplo.com", "cellphone": "+55 11 99999-9999", "tax_id": "12345678901"}
+
+
+def _charge(pix_id: str, expires_in: float = EXPIRES_IN + 600) -> dict:
+    expires_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + expires_in))
+    return {"success": True, "pix_id": pix_id, "amount": AMOUNT, "status": "PENDING", "expires_at": expires_at}
+
+
+class WarmPixPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = WarmPixPool(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _listdir(self, name: str) -> list:
+        return sorted(f for f in os.listdir(os.path.join(self.tmp.name, name)) if not f.startswith("."))
+
+
+class ClaimQuarantineTest(WarmPixPoolTestCase):
+    def test_unreadable_charge_is_quarantined_and_next_one_is_delivered(self):
+        good = self.pool.add(_charge("pix_good"), EXPIRES_IN, "Teste")
+        # Arquivo corrompido que sairia do pool antes do bom
+        bad = os.path.join(os.path.dirname(good), f"{int(time.time()) + 120:010d}-pix_bad.json")
+        with open(bad, "w") as f:
+            f.write("{não é json")
+
+        result = self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER)
+        self.assertEqual(result["pix_id"], "pix_good")
+        self.assertEqual(self._listdir(QUARANTINE), [os.path.basename(bad)])
+        self.assertEqual(self.pool.stats()["quarantined"], 1)
+
+    def test_charge_is_quarantined_when_customer_record_cannot_be_written(self):
+        path = self.pool.add(_charge("pix_1"), EXPIRES_IN, "Teste")
+        with mock.patch.object(pix_warm_pool, "_write_json", side_effect=OSError("No space left on device")):
+            self.assertIsNone(self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER))
+        self.assertEqual(self._listdir(QUARANTINE), [os.path.basename(path)])
+        self.assertEqual(self._listdir(CLAIMED), [])
+
+
+class ManagerFallbackTest(WarmPixPoolTestCase):
+    def test_pool_error_falls_back_to_live_charge(self):
+        manager = PrescrevaMePixManager(client=FakeAbacatePay(), rate_limiter=TokenBucket(0), warm_pool=self.pool)
+        for error in (PermissionError("Permission denied"), KeyError("pix"), ValueError("bad")):
+            with mock.patch.object(self.pool, "claim", side_effect=error):
+                result = manager.create_pix_payment("Ana", "ana@exemplo.com", "+55 11 99999-9999", "12345678901",
+                                                    amount=AMOUNT, expires_in=EXPIRES_IN)
+            self.assertTrue(result["success"], error)
+            self.assertNotIn("warm", result)
+        self.assertEqual(self.pool.ingest()["misses"], 3)
+
+
+class CleanupTest(WarmPixPoolTestCase):
+    def _stale_charge(self, pix_id: str, expires_at: float) -> str:
+        """Cobrança que já saiu da janela de entrega (prefixo no passado)"""
+        directory = os.path.join(self.tmp.name, sku_name(AMOUNT, EXPIRES_IN))
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{int(time.time()) - 1:010d}-{pix_id}.json"
+        pix_warm_pool._write_json(os.path.join(directory, filename), {
+            "pix": {"id": pix_id, "amount": AMOUNT}, "sku": sku_name(AMOUNT, EXPIRES_IN), "expires_at": expires_at
+        })
+        return filename
+
+    def test_retired_charges_are_reported_until_they_expire(self):
+        filename = self._stale_charge("pix_open", time.time() + 600)
+        expired = self._stale_charge("pix_gone", time.time() - 1)
+        self.assertEqual(self.pool.retire(), 2)
+        self.assertEqual(self._listdir(RETIRED), sorted([filename, expired]))
+        self.assertEqual(self.pool.stats()["retired_open"], 2)
+
+        self.pool.prune()
+        self.assertEqual(self._listdir(RETIRED), [filename])
+        self.assertEqual(self.pool.stats()["retired_open"], 1)
+
+    def test_forget_removes_customer_data(self):
+        self.pool.add(_charge("pix_1"), EXPIRES_IN, "Teste")
+        self.pool.add(_charge("pix_2"), EXPIRES_IN, "Teste")
+        self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER)
+        self.pool.ingest()
+        self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER)
+        ids = sorted(name[:-5] for name in self._listdir(ASSIGNED) + self._listdir(CLAIMED))
+        self.assertEqual(ids, ["pix_1", "pix_2"])
+
+        for pix_id in ids:
+            self.assertEqual(self.pool.claimed_customer(pix_id), CUSTOMER)
+            self.pool.forget(pix_id)
+            self.assertIsNone(self.pool.claimed_customer(pix_id))
+        self.assertEqual(self._listdir(ASSIGNED), [])
+        # O registro ainda não contado continua, sem o cliente
+        self.assertEqual(self.pool.ingest()["hits"], 1)
+
+    def test_prune_removes_customer_records_after_retention(self):
+        self.pool.add(_charge("pix_1"), EXPIRES_IN, "Teste")
+        self.pool.add(_charge("pix_2"), EXPIRES_IN, "Teste")
+        self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER)
+        self.pool.ingest()
+        self.pool.claim(AMOUNT, EXPIRES_IN, CUSTOMER)
+        self.assertEqual(self.pool.prune(), 0)
+        # Webhook que nunca chegou: os registros saem após o vencimento + retenção
+        with mock.patch.object(pix_warm_pool, "PIX_WARM_POOL_CLAIM_RETENTION", -3600):
+            self.assertEqual(self.pool.prune(), 2)
+        self.assertEqual(self._listdir(CLAIMED) + self._listdir(ASSIGNED), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes do Relatório de Transações
+O checkpoint incremental guarda só os PIX ainda em aberto (ou finalizados
+há pouco), sem perder os totais do histórico, e o motor colunar produz os
+mesmos relatórios que o motor python
+
+Uso:
+    python3 -m unittest tests.test_transaction_report
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import report_columnar
+from transaction_report import PixStatusAggregator, ReportCheckpoint, TransactionReporter
+
+START = datetime(2025, 1, 1)
+
+
+def _event(pix_id: str, status: str, day: float, amount: int = 34700) -> dict:
+    return {"timestamp": (START + timedelta(days=day)).isoformat(), "pix_id": pix_id, "status": status, "amount": amount}
+
+
+class PixStatusSettleTest(unittest.TestCase):
+    def test_settled_pix_leave_the_state_but_keep_their_totals(self):
+        aggregator = PixStatusAggregator(settle_days=7)
+        for day in range(30):
+            aggregator.add(_event(f"pix_{day}", "PENDING", day))
+            aggregator.add(_event(f"pix_{day}", "PAID" if day % 2 else "EXPIRED", day + 0.01))
+        aggregator.add(_event("pix_open", "PENDING", 0))
+        before = aggregator.result()
+
+        state = json.loads(json.dumps(aggregator.to_state()))
+        # Últimos 7 dias + o PIX ainda pendente
+        self.assertEqual(sorted(state["latest"]), sorted([f"pix_{day}" for day in range(22, 30)] + ["pix_open"]))
+        restored = PixStatusAggregator.from_state(state)
+        self.assertEqual(restored.result(), before)
+        self.assertEqual(before["unique_pix"], 31)
+        self.assertEqual(before["paid_amount"], 15 * 34700)
+
+    def test_resent_webhook_within_the_window_is_not_double_counted(self):
+        aggregator = PixStatusAggregator(settle_days=7)
+        aggregator.add(_event("pix_1", "PAID", 0))
+        aggregator.add(_event("pix_2", "PENDING", 3))
+        aggregator.settle()
+        aggregator.add(_event("pix_1", "PAID", 3))
+        aggregator.settle()
+        result = aggregator.result()
+        self.assertEqual((result["unique_pix"], result["paid_amount"]), (2, 34700))
+
+
+class IncrementalCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp.name, "payment_logs.json")
+        self.checkpoint_file = os.path.join(self.tmp.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, events) -> None:
+        with open(self.log_file, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    def _run(self) -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return TransactionReporter().run_incremental(
+                self.checkpoint_file, backend="jsonl", log_file=self.log_file
+            )
+
+    def test_incremental_totals_match_a_full_rebuild(self):
+        self._append(_event(f"pix_{i}", "PAID", i / 10) for i in range(300))
+        self._run()
+        # Reenvio de um PAID recente (ainda no checkpoint) e um PIX novo
+        self._append([_event("pix_299", "PAID", 30), _event("pix_new", "PENDING", 30)])
+        incremental = self._run()
+
+        checkpoint = ReportCheckpoint.load(self.checkpoint_file)
+        self.assertLess(len(checkpoint.pix_status.latest), 100)
+        os.unlink(self.checkpoint_file)
+        rebuilt = self._run()
+        self.assertEqual(incremental["pix_status"]["paid_amount"], rebuilt["pix_status"]["paid_amount"])
+        self.assertEqual(incremental["pix_status"]["unique_pix"], 301)
+        self.assertEqual(incremental["pix_status"]["paid_amount"], 300 * 34700)
+
+
+class ColumnarParityTest(unittest.TestCase):
+    def setUp(self):
+        if not report_columnar.columnar_available():
+            self.skipTest("pandas não instalado")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp.name, "payment_logs.json")
+        statuses = ("PENDING", "PAID", "EXPIRED", "CANCELLED")
+        with open(self.log_file, "w", encoding="utf-8") as f:
+            for i in range(200):
+                event = _event(f"pix_{i % 70}", statuses[i % 4], i / 7, amount=34700 if i % 3 else 9900)
+                event["customer"] = {"name": f"Cliente {i % 11}"}
+                f.write(json.dumps(event) + "\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_columnar_reports_match_python_engine(self):
+        reporter = TransactionReporter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            python = reporter.run_reports(reporter.iter_payment_logs(self.log_file))
+            arrow = reporter.run_columnar_reports(backend="jsonl", log_file=self.log_file)
+            rows = reporter.run_columnar_reports(os.path.join(self.tmp.name, "detailed.csv"),
+                                                 backend="jsonl", log_file=self.log_file)
+            incremental = reporter.run_incremental(os.path.join(self.tmp.name, "checkpoint.json"),
+                                                   backend="jsonl", log_file=self.log_file)
+
+        # Leitura direta pelo pyarrow (sem CSV) e linha a linha (com CSV)
+        for columnar in (arrow, rows):
+            self.assertEqual(columnar["events"], python["events"])
+            self.assertEqual(columnar["summary"], python["summary"])
+            self.assertEqual(list(columnar["summary"]["status_breakdown"]),
+                             list(python["summary"]["status_breakdown"]))
+            self.assertEqual(columnar["prescreva_me"], python["prescreva_me"])
+        # O status por PIX só existe no modo incremental, que agrega os mesmos eventos
+        self.assertEqual(incremental["summary"], python["summary"])
+        self.assertEqual(incremental["prescreva_me"], python["prescreva_me"])
+        expected = PixStatusAggregator()
+        for log in reporter.iter_payment_logs(self.log_file):
+            expected.add(log)
+        self.assertEqual(incremental["pix_status"], expected.result())
+
+
+if __name__ == "__main__":
+    unittest.main()
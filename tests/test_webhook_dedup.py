@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes da Deduplicação de Webhooks
+Vários deduplicadores no mesmo banco SQLite, como os workers do gunicorn
+
+Uso:
+    python3 -m unittest tests.test_webhook_dedup
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from webhook_dedup import WebhookDeduplicator
+
+
+class WebhookDeduplicatorSharedDbTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "dedup.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_one_instance_claims_a_new_event(self):
+        first, second = WebhookDeduplicator(self.path), WebhookDeduplicator(self.path)
+        self.assertTrue(first.claim("evt-1"))
+        self.assertFalse(second.claim("evt-1"))
+        self.assertEqual(second.stats()["in_flight_hits"], 1)
+
+    def test_concurrent_claims_have_a_single_winner(self):
+        instances = [WebhookDeduplicator(self.path) for _ in range(8)]
+        barrier = threading.Barrier(len(instances))
+
+        def claim(instance):
+            barrier.wait()
+            return instance.claim("evt-race")
+
+        with ThreadPoolExecutor(max_workers=len(instances)) as pool:
+            results = list(pool.map(claim, instances))
+        self.assertEqual(results.count(True), 1)
+
+    def test_commit_makes_other_instances_see_a_duplicate(self):
+        first, second = WebhookDeduplicator(self.path), WebhookDeduplicator(self.path)
+        self.assertTrue(first.claim("evt-1"))
+        first.commit("evt-1")
+        self.assertFalse(second.claim("evt-1"))
+        self.assertTrue(second.seen("evt-1"))
+        self.assertEqual(second.stats()["store_hits"], 1)
+
+    def test_release_lets_another_instance_process_the_retry(self):
+        first, second = WebhookDeduplicator(self.path), WebhookDeduplicator(self.path)
+        self.assertTrue(first.claim("evt-1"))
+        first.release("evt-1")
+        self.assertFalse(second.seen("evt-1"))
+        self.assertTrue(second.claim("evt-1"))
+
+    def test_orphaned_reservation_expires(self):
+        crashed = WebhookDeduplicator(self.path, pending_ttl=0.05)
+        self.assertTrue(crashed.claim("evt-1"))
+        survivor = WebhookDeduplicator(self.path, pending_ttl=0.05)
+        self.assertFalse(survivor.claim("evt-1"))
+        time.sleep(0.1)
+        self.assertTrue(survivor.claim("evt-1"))
+
+    def test_failed_commit_does_not_leave_the_key_in_flight(self):
+        dedup = WebhookDeduplicator(self.path)
+        self.assertTrue(dedup.claim("evt-1"))
+        broken = mock.MagicMock()
+        broken.execute.side_effect = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(dedup, "_connection", return_value=broken):
+            with self.assertRaises(sqlite3.OperationalError):
+                dedup.commit("evt-1")
+        self.assertNotIn("evt-1", dedup._in_flight)
+
+    def test_index_without_state_column_is_migrated(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE webhook_events (event_key TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        conn.execute("INSERT INTO webhook_events VALUES ('evt-old', ?)", (time.time(),))
+        conn.commit()
+        conn.close()
+        dedup = WebhookDeduplicator(self.path)
+        self.assertTrue(dedup.seen("evt-old"))
+        self.assertFalse(dedup.claim("evt-old"))
+        self.assertTrue(dedup.claim("evt-new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
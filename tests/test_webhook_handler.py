@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes do Webhook Handler
+Falha ao gravar o evento não confirma a notificação, corpos JSON que não
+são objetos são recusados na entrada e, com WEBHOOK_SECRET configurado,
+notificações sem assinatura válida recebem 401
+
+Uso:
+    python3 -m unittest tests.test_webhook_handler
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pix_warm_pool
+import webhook_handler
+from payment_store import PaymentEventStore
+from pix_warm_pool import WarmPixPool
+from webhook_dedup import WebhookDeduplicator, event_key
+from webhook_queue import WebhookQueue, WebhookWorkerPool
+
+EVENT = {"id": "evt_1", "type": "pix.paid", "data": {"id": "pix_1", "amount": 34700, "customer": {"name": "Ana"}}}
+
+
+class SavePaymentLogFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PaymentEventStore(os.path.join(self.tmp.name, "events.db"))
+        self.dedup = WebhookDeduplicator(os.path.join(self.tmp.name, "dedup.db"))
+        self.handler = webhook_handler.WebhookHandler("secret", event_store=self.store, deduplicator=self.dedup)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_storage_error_is_not_reported_as_success(self):
+        with mock.patch.object(self.store, "append", side_effect=sqlite3.OperationalError("disk I/O error")):
+            result = self.handler.process_payment_notification(EVENT)
+        self.assertFalse(result["success"])
+        # A reserva foi liberada: a nova tentativa processa o evento
+        self.assertFalse(self.dedup.seen(event_key(EVENT)))
+        self.assertTrue(self.handler.process_payment_notification(EVENT)["success"])
+
+    def test_queue_retries_after_storage_error(self):
+        queue = WebhookQueue(os.path.join(self.tmp.name, "queue.db"))
+        pool = WebhookWorkerPool(self.handler.process_payment_notification, queue, workers=1)
+        queue.enqueue(EVENT)
+        item = queue.claim()
+        with mock.patch.object(self.store, "append", side_effect=sqlite3.OperationalError("disk I/O error")):
+            pool._run(item)
+        counts = queue.counts()
+        self.assertEqual((counts["depth"], counts["processing"]), (1, 0))
+        self.assertEqual(pool.stats()["failed_attempts"], 1)
+        queue.close()
+
+
+class WarmPoolCustomerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PaymentEventStore(os.path.join(self.tmp.name, "events.db"))
+        self.pool = WarmPixPool(os.path.join(self.tmp.name, "pool"))
+        self.handler = webhook_handler.WebhookHandler("secret", event_store=self.store)
+        self.handler.deduplicator = None  # o mesmo evento é enviado em mais de um teste
+        self.pool._ensure_dirs()
+        self.customer = {"name": "Ana", "email": "ana@exemplo.com", "cellphone": "", "tax_id": "12345678901"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _claimed(self, pix_id: str) -> None:
+        pix_warm_pool._write_json(os.path.join(self.pool.root, pix_warm_pool.CLAIMED, f"{pix_id}.json"), {
+            "pix_id": pix_id, "sku": "34700-900", "claimed_at": 0, "expires_at": 0, "customer": self.customer
+        })
+
+    def test_customer_record_is_forgotten_after_final_status(self):
+        self._claimed("pix_1")
+        event = {"type": "pix.paid", "data": {"id": "pix_1", "amount": 34700}}
+        with mock.patch.object(webhook_handler, "warm_pool", self.pool):
+            self.assertTrue(self.handler.process_payment_notification(event)["success"])
+        self.assertEqual(list(self.store.iter_events(pix_id="pix_1"))[-1]["customer"], self.customer)
+        self.assertIsNone(self.pool.claimed_customer("pix_1"))
+
+    def test_customer_record_is_kept_when_processing_fails(self):
+        self._claimed("pix_1")
+        event = {"type": "pix.paid", "data": {"id": "pix_1", "amount": 34700}}
+        with mock.patch.object(webhook_handler, "warm_pool", self.pool), \
+                mock.patch.object(self.store, "append", side_effect=sqlite3.OperationalError("disk I/O error")):
+            self.assertFalse(self.handler.process_payment_notification(event)["success"])
+        self.assertEqual(self.pool.claimed_customer("pix_1"), self.customer)
+
+
+class AsyncIngressTest(unittest.TestCase):
+    def setUp(self):
+        if webhook_handler.webhook_queue is None:
+            self.skipTest("WEBHOOK_ASYNC desligado")
+        try:
+            self.client = webhook_handler.get_app().test_client()
+        except ImportError:
+            self.skipTest("Flask não instalado")
+
+    def test_non_object_json_body_is_rejected(self):
+        for body in ("[]", '"x"', "42", "null"):
+            response = self.client.post("/webhook/abacatepay", data=body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_unknown_event_type_is_rejected(self):
+        response = self.client.post("/webhook/abacatepay", json={"type": "pix.unknown"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_signature_is_required_once_the_secret_is_configured(self):
+        body = json.dumps({"type": "pix.unknown"})
+        signature = hmac.new(b"segredo", body.encode("utf-8"), hashlib.sha256).hexdigest()
+        with mock.patch.object(webhook_handler.webhook_handler, "secret", "segredo"):
+            for headers in ({}, {"X-AbacatePay-Signature": "0" * 64}):
+                response = self.client.post("/webhook/abacatepay", data=body, content_type="application/json",
+                                            headers=headers)
+                self.assertEqual(response.status_code, 401, headers)
+            # Assinatura válida passa para a validação do evento
+            response = self.client.post("/webhook/abacatepay", data=body, content_type="application/json",
+                                        headers={"X-AbacatePay-Signature": signature})
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Testes da Fila Persistente de Webhooks
+Workers sobrevivem a erros do SQLite e itens parados voltam para a fila
+
+Uso:
+    python3 -m unittest tests.test_webhook_queue
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from webhook_queue import PENDING, PROCESSING, WebhookQueue, WebhookWorkerPool
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class WebhookWorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = WebhookQueue(os.path.join(self.tmp.name, "queue.db"))
+        self.processed = []
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def _pool(self, **kwargs) -> WebhookWorkerPool:
+        def process(data):
+            self.processed.append(data["n"])
+            return {"success": True}
+        return WebhookWorkerPool(process, self.queue, workers=1, poll_interval=0.01, **kwargs)
+
+    def test_worker_survives_sqlite_error_on_complete(self):
+        pool = self._pool()
+        complete, calls = self.queue.complete, []
+
+        def flaky_complete(item_id):
+            calls.append(item_id)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            complete(item_id)
+
+        with mock.patch.object(self.queue, "complete", side_effect=flaky_complete):
+            self.queue.enqueue({"n": 1})
+            pool.start()
+            self.assertTrue(_wait_for(lambda: self.processed == [1]))
+            self.queue.enqueue({"n": 2})
+            self.assertTrue(_wait_for(lambda: self.processed == [1, 2]))
+        pool.stop()
+        # O primeiro item ficou "processing" e será devolvido pelo requeue_stale
+        self.assertEqual(self.queue.counts()["processing"], 1)
+
+    def test_worker_survives_sqlite_error_on_fail(self):
+        pool = WebhookWorkerPool(lambda data: {"success": False, "error": "boom"}, self.queue,
+                                 workers=1, poll_interval=0.01)
+        with mock.patch.object(self.queue, "fail", side_effect=sqlite3.OperationalError("disk I/O error")):
+            self.queue.enqueue({"n": 1})
+            pool.start()
+            self.assertTrue(_wait_for(lambda: pool.stats()["failed_attempts"] == 1))
+            self.assertTrue(pool._threads[0].is_alive())
+        pool.stop()
+
+    def test_stale_items_are_requeued_while_running(self):
+        pool = self._pool(stale_after=0.05, requeue_interval=0.05)
+        pool.start()
+        # Item deixado em "processing" por um worker que caiu depois da inicialização
+        self.queue.enqueue({"n": 1})
+        self.queue._connection().execute(
+            "UPDATE webhook_queue SET state = ?, locked_at = ? WHERE state = ?",
+            (PROCESSING, time.time(), PENDING)
+        )
+        self.assertTrue(_wait_for(lambda: self.processed == [1]))
+        pool.stop()
+        self.assertEqual(self.queue.counts()["processing"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
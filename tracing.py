@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Rastreamento e Perfilamento
+Spans de tempo amostrados em torno das etapas dos caminhos quentes (criação
+de PIX, processamento de webhook, gravação do evento de pagamento),
+exportados localmente em JSON lines ou no formato de trace do Chrome
+(chrome://tracing, https://ui.perfetto.dev).
+
+    with tracer.trace("pix.create", amount=amount):      # raiz: decide a amostragem
+        with tracer.span("sdk.build_request"):            # etapas: só medidas se a raiz foi amostrada
+            ...
+
+Fora de uma raiz amostrada os spans não custam mais que uma consulta a uma
+ContextVar. `--profile` nos scripts usa profiling() (cProfile em todas as
+threads, ou pyinstrument para .html se instalado).
+"""
+
+import contextvars
+import cProfile
+import fcntl
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))  # fração das operações rastreadas (0 = desligado)
+TRACE_FILE = os.getenv('TRACE_FILE', 'traces.jsonl')
+TRACE_FORMAT = os.getenv('TRACE_FORMAT', 'jsonl').lower()  # jsonl ou chrome
+EXEC_START_ENV = 'PRESCREVAME_EXEC_START'  # epoch (s) em que o PHP disparou o exec, para o span de inicialização
+
+
+class _Trace:
+    """Spans já terminados de uma operação amostrada"""
+
+    __slots__ = ("trace_id", "spans", "next_id")
+
+    def __init__(self):
+        self.trace_id = os.urandom(8).hex()
+        self.spans: List[Dict[str, Any]] = []
+        self.next_id = 0
+
+
+# Raiz não amostrada: os spans internos sabem que não devem medir nem sortear de novo
+_UNSAMPLED = object()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """Um trecho medido; `set()` acrescenta atributos (ex.: resultado) antes do fim"""
+
+    __slots__ = ("tracer", "trace", "name", "attrs", "span_id", "parent_id", "start", "_start_perf", "_token", "_root")
+
+    def __init__(self, tracer: "Tracer", trace: Optional[_Trace], parent_id: Optional[int], name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self._root = trace is None
+        self.trace = trace or _Trace()
+        self.trace.next_id += 1
+        self.span_id = self.trace.next_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self._token = _current.set((self.trace, self.span_id))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._start_perf
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.trace.spans.append(self.tracer._record(self, duration))
+        if self._root:
+            self.tracer._export(self.trace)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("prescrevame_trace", default=None)
+
+
+class _UnsampledRoot:
+    """Raiz sorteada fora da amostra: marca o contexto para os spans internos"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> _NoopSpan:
+        self._token = _current.set(_UNSAMPLED)
+        return _NOOP
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+
+
+class Tracer:
+    """Amostragem e exportação de traces para um arquivo local (vários processos podem compartilhá-lo)"""
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, path: str = TRACE_FILE, fmt: str = TRACE_FORMAT):
+        """
+        Args:
+            sample_rate: Fração das raízes rastreadas (0 a 1)
+            path: Arquivo de saída
+            fmt: "jsonl" (um span por linha) ou "chrome" (Trace Event Format)
+        """
+        self.sample_rate = sample_rate
+        self.path = path
+        self.fmt = fmt
+        self._lock = threading.Lock()
+        self._sampled = 0
+        self._exported = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def trace(self, name: str, **attrs: Any):
+        """
+        Abre uma operação rastreável (raiz); dentro de outro trace vira um span comum
+
+        Args:
+            name: Nome da operação (ex.: "pix.create")
+            **attrs: Atributos gravados com o span
+        """
+        current = _current.get()
+        if current is _UNSAMPLED:
+            return _NOOP
+        if current is not None:
+            return Span(self, current[0], current[1], name, attrs)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return _UnsampledRoot()
+        with self._lock:
+            self._sampled += 1
+        return Span(self, None, None, name, attrs)
+
+    def span(self, name: str, **attrs: Any):
+        """Mede uma etapa dentro do trace atual (no-op fora de uma raiz amostrada)"""
+        current = _current.get()
+        if current is None or current is _UNSAMPLED:
+            return _NOOP
+        return Span(self, current[0], current[1], name, attrs)
+
+    def record(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Registra no trace atual um trecho já medido (ex.: inicialização antes do main)"""
+        current = _current.get()
+        if current is None or current is _UNSAMPLED:
+            return
+        trace, parent_id = current
+        trace.next_id += 1
+        span = Span.__new__(Span)
+        span.trace, span.span_id, span.parent_id = trace, trace.next_id, parent_id
+        span.name, span.attrs, span.start = name, attrs, start
+        trace.spans.append(self._record(span, end - start))
+
+    def _record(self, span: Span, duration: float) -> Dict[str, Any]:
+        if self.fmt == "chrome":
+            return {
+                "name": span.name,
+                "cat": "prescrevame",
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(duration * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": {"trace_id": span.trace.trace_id, **span.attrs}
+            }
+        return {
+            "trace_id": span.trace.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start,
+            "duration_ms": duration * 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            **span.attrs
+        }
+
+    def _export(self, trace: _Trace) -> None:
+        """Grava os spans de um trace em uma única escrita (O_APPEND: seguro entre processos)"""
+        # Pais terminam depois dos filhos: ordena pelo início para leitura humana
+        spans = sorted(trace.spans, key=lambda s: s.get("start", s.get("ts")))
+        if self.fmt == "chrome":
+            # Array JSON sem "]" final: formato aceito pelo chrome://tracing e pelo Perfetto
+            data = "".join(json.dumps(s, ensure_ascii=False, default=str) + ",\n" for s in spans)
+        else:
+            data = "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for s in spans)
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if self.fmt == "chrome":
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                    if os.fstat(fd).st_size == 0:
+                        data = "[\n" + data
+                os.write(fd, data.encode("utf-8"))
+            finally:
+                os.close(fd)
+        except OSError:
+            return
+        with self._lock:
+            self._exported += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "format": self.fmt,
+                "path": self.path if self.enabled else None,
+                "sampled": self._sampled,
+                "exported": self._exported
+            }
+
+
+def exec_start_time() -> Optional[float]:
+    """Momento em que o chamador (PHP) disparou este processo, se informado em PRESCREVAME_EXEC_START"""
+    try:
+        return float(os.environ[EXEC_START_ENV])
+    except (KeyError, ValueError):
+        return None
+
+
+# Tracer compartilhado do processo
+tracer = Tracer()
+
+
+def add_profile_argument(parser) -> None:
+    """Acrescenta --profile [ARQUIVO] a um ArgumentParser"""
+    parser.add_argument(
+        "--profile", nargs="?", const="profile.prof", default=None, metavar="ARQUIVO",
+        help="Perfilar a execução: cProfile em .prof (padrão profile.prof) ou pyinstrument em .html/.txt"
+    )
+
+
+class Profiler:
+    """
+    cProfile em todas as threads do processo
+
+    No Python < 3.12 cada thread tem seu perfilador (threading.setprofile liga
+    um em cada thread criada depois do start); os resultados são somados no dump.
+    """
+
+    def __init__(self):
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._active = False
+
+    def _thread_hook(self, frame, event, arg) -> None:
+        sys.setprofile(None)
+        if not self._active:
+            return
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def start(self) -> None:
+        self._active = True
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._thread_hook)
+        profile.enable()
+
+    def stop(self) -> Optional[pstats.Stats]:
+        """Para os perfiladores e retorna as estatísticas somadas"""
+        self._active = False
+        threading.setprofile(None)
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        stats = None
+        for profile in profiles:
+            profile.disable()
+            try:
+                profile.create_stats()
+            except Exception:
+                continue
+            if not getattr(profile, "stats", None):
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+    def dump(self, path: str, top: int = 25) -> None:
+        """Grava as estatísticas em `path` (pstats) e mostra as funções mais caras no stderr"""
+        stats = self.stop()
+        if stats is None:
+            return
+        stats.dump_stats(path)
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats("cumulative").print_stats(top)
+        print(f"⏱️ Perfil gravado em {path} (python3 -m pstats {path})", file=sys.stderr)
+        print(output.getvalue(), file=sys.stderr)
+
+
+@contextmanager
+def profiling(output: Optional[str]) -> Iterator[None]:
+    """
+    Perfila o bloco se `output` for informado (valor de --profile)
+
+    Args:
+        output: Arquivo de saída; .html/.txt usa pyinstrument (só a thread atual), o resto cProfile
+    """
+    if not output:
+        yield
+        return
+    if output.endswith((".html", ".txt")):
+        try:
+            from pyinstrument import Profiler as SamplingProfiler
+        except ImportError:
+            print("⚠️ pyinstrument não instalado: usando cProfile (pip install pyinstrument)", file=sys.stderr)
+            output = os.path.splitext(output)[0] + ".prof"
+        else:
+            sampler = SamplingProfiler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                with open(output, "w", encoding="utf-8") as f:
+                    f.write(sampler.output_html() if output.endswith(".html") else sampler.output_text())
+                print(f"⏱️ Perfil gravado em {output}", file=sys.stderr)
+            return
+    profiler = Profiler()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.dump(output)
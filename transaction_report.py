@@ -4,132 +4,496 @@ PrescrevaMe Premium - Relatório de Transações
 Gera relatórios detalhados de pagamentos e transações
 """
 
+import argparse
 import json
 import csv
 import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-import abacatepay
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from collections import defaultdict
-from dotenv import load_dotenv
+
+from dotenv_cache import load_env
+from payment_monitor import TERMINAL_STATUSES
+from payment_store import PAYMENT_DB_PATH, PAYMENT_LOG_BACKEND, PAYMENT_LOG_FILE, PaymentEventStore
 
 # Carregar variáveis de ambiente
-load_dotenv()
+load_env()
 
 # Configurações
 API_KEY = os.getenv('ABACATE_API_KEY', '')
+PRESCREVA_ME_PRICE = 34700  # R$ 347,00
+REPORT_CHECKPOINT_FILE = os.getenv('REPORT_CHECKPOINT_FILE', 'report_checkpoint.json')
+REPORT_ENGINE = os.getenv('REPORT_ENGINE', 'python').lower()  # python ou columnar (pandas/Arrow)
+REPORT_SETTLE_DAYS = float(os.getenv('REPORT_SETTLE_DAYS', '7'))  # PIX finalizado sem eventos há mais que isso sai do checkpoint
+CHECKPOINT_VERSION = 2
+
+_SUMMARY_BREAKDOWNS = ("status_breakdown", "daily_breakdown", "monthly_breakdown", "customer_breakdown", "payment_methods")
+
+
+def detailed_record(log: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha do relatório detalhado para um evento de pagamento"""
+    customer = log.get("customer") or {}
+    pix_data = log.get("data") or {}
+    return {
+        "timestamp": log.get("timestamp", ""),
+        "pix_id": log.get("pix_id", ""),
+        "status": log.get("status", ""),
+        "amount": log.get("amount", 0),
+        "amount_formatted": f"R$ {log.get('amount', 0)/100:.2f}",
+        "customer_name": customer.get("name", ""),
+        "customer_email": customer.get("email", ""),
+        "customer_phone": customer.get("cellphone", ""),
+        "customer_cpf": customer.get("tax_id", ""),
+        "created_at": pix_data.get("created_at", ""),
+        "expires_at": pix_data.get("expires_at", ""),
+        "dev_mode": pix_data.get("dev_mode", False)
+    }
+
+
+class SummaryAggregator:
+    """Agregação incremental do relatório resumido (memória proporcional a dias/clientes, não a eventos)"""
+
+    def __init__(self):
+        self.summary = {
+            "total_transactions": 0,
+            "total_amount": 0,
+            "status_breakdown": defaultdict(int),
+            "daily_breakdown": defaultdict(int),
+            "monthly_breakdown": defaultdict(int),
+            "customer_breakdown": defaultdict(int),
+            "payment_methods": defaultdict(int)
+        }
+
+    def add(self, log: Dict[str, Any]) -> None:
+        summary = self.summary
+        summary["total_transactions"] += 1
+
+        # Contar por status
+        status = log.get("status", "UNKNOWN")
+        summary["status_breakdown"][status] += 1
+
+        # Somar valores (apenas pagamentos confirmados)
+        if status == "PAID":
+            summary["total_amount"] += log.get("amount", 0)
+
+        # Contar por dia e por mês
+        timestamp = log.get("timestamp", "")
+        if timestamp:
+            date = timestamp.split("T")[0]
+            summary["daily_breakdown"][date] += 1
+            summary["monthly_breakdown"]["-".join(date.split("-")[:2])] += 1
+
+        # Contar por cliente
+        customer = log.get("customer") or {}
+        summary["customer_breakdown"][customer.get("name", "Desconhecido")] += 1
+
+        # Método de pagamento (PIX para todos no nosso caso)
+        summary["payment_methods"]["PIX"] += 1
+
+    def result(self) -> Dict[str, Any]:
+        return dict(self.summary)
+
+    def to_state(self) -> Dict[str, Any]:
+        return self.summary
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SummaryAggregator":
+        aggregator = cls()
+        aggregator.summary["total_transactions"] = state["total_transactions"]
+        aggregator.summary["total_amount"] = state["total_amount"]
+        for key in _SUMMARY_BREAKDOWNS:
+            aggregator.summary[key].update(state[key])
+        return aggregator
+
+
+class PrescrevaMeAggregator:
+    """Agregação incremental do relatório PrescrevaMe Premium (transações no preço do produto)"""
+
+    def __init__(self, price: int = PRESCREVA_ME_PRICE):
+        self.price = price
+        self.total = 0
+        self.confirmed = 0
+        self.revenue = 0
+        self.customer_analysis = defaultdict(int)
+        self.monthly_subscriptions = defaultdict(int)
+
+    def add(self, log: Dict[str, Any]) -> None:
+        if log.get("amount") != self.price:
+            return
+
+        self.total += 1
+        if log.get("status") == "PAID":
+            self.confirmed += 1
+            self.revenue += log.get("amount", 0)
+
+        customer = log.get("customer") or {}
+        self.customer_analysis[customer.get("name", "Desconhecido")] += 1
+
+        timestamp = log.get("timestamp", "")
+        if timestamp:
+            self.monthly_subscriptions["-".join(timestamp.split("T")[0].split("-")[:2])] += 1
+
+    def result(self) -> Dict[str, Any]:
+        """Relatório no formato de generate_prescreva_me_report ({} sem transações)"""
+        if not self.total:
+            return {}
+        return {
+            "product": "PrescrevaMe Premium",
+            "price": self.price,
+            "total_subscriptions": self.total,
+            "confirmed_subscriptions": self.confirmed,
+            "revenue": self.revenue,
+            "conversion_rate": (self.confirmed / self.total) * 100,
+            "customer_analysis": self.customer_analysis,
+            "monthly_subscriptions": self.monthly_subscriptions
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "price": self.price,
+            "total": self.total,
+            "confirmed": self.confirmed,
+            "revenue": self.revenue,
+            "customer_analysis": self.customer_analysis,
+            "monthly_subscriptions": self.monthly_subscriptions
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "PrescrevaMeAggregator":
+        aggregator = cls(state["price"])
+        aggregator.total = state["total"]
+        aggregator.confirmed = state["confirmed"]
+        aggregator.revenue = state["revenue"]
+        aggregator.customer_analysis.update(state["customer_analysis"])
+        aggregator.monthly_subscriptions.update(state["monthly_subscriptions"])
+        return aggregator
+
+
+class PixStatusAggregator:
+    """
+    Status atual de cada PIX
+
+    O relatório resumido conta eventos; aqui cada pix_id conta uma vez, no
+    último status recebido. Uma transição (ex.: PENDING -> PAID) move o PIX
+    de um status para o outro, e eventos repetidos (webhook reenviado) não
+    duplicam a receita. PAID é definitivo: um EXPIRED tardio não o desfaz.
+
+    Para o checkpoint não crescer com todo o histórico, PIX em status final
+    sem eventos há mais de `settle_days` (contados do evento mais recente
+    lido) saem de `latest` e passam a contar só nos totais; reenvios do
+    webhook dentro desse prazo continuam reconhecidos.
+    """
+
+    def __init__(self, settle_days: float = REPORT_SETTLE_DAYS):
+        self.settle_days = settle_days
+        self.latest: Dict[str, List[Any]] = {}  # pix_id -> [status, amount, timestamp do último evento]
+        self.transitions = defaultdict(int)
+        self.settled = defaultdict(int)  # status -> PIX finalizados que já saíram de latest
+        self.settled_paid_amount = 0
+        self.newest_timestamp = ""
+
+    def add(self, log: Dict[str, Any]) -> None:
+        pix_id = log.get("pix_id")
+        if not pix_id:
+            return
+
+        status = log.get("status", "UNKNOWN")
+        timestamp = log.get("timestamp", "") or ""
+        self.newest_timestamp = max(self.newest_timestamp, timestamp)
+        previous = self.latest.get(pix_id)
+        if previous is not None:
+            if previous[0] == status or previous[0] == "PAID":
+                previous[2] = max(previous[2], timestamp)
+                return
+            self.transitions[f"{previous[0]}->{status}"] += 1
+        self.latest[pix_id] = [status, log.get("amount", 0) or 0, timestamp]
+
+    def settle(self) -> int:
+        """
+        Move para os totais os PIX finalizados há mais de settle_days
+
+        Returns:
+            Quantidade de PIX removidos de latest
+        """
+        if not self.newest_timestamp:
+            return 0
+        try:
+            cutoff = (datetime.fromisoformat(self.newest_timestamp) - timedelta(days=self.settle_days)).isoformat()
+        except ValueError:
+            return 0
+        settled = [
+            pix_id for pix_id, (status, _, timestamp) in self.latest.items()
+            if status in TERMINAL_STATUSES and timestamp < cutoff
+        ]
+        for pix_id in settled:
+            status, amount, _ = self.latest.pop(pix_id)
+            self.settled[status] += 1
+            if status == "PAID":
+                self.settled_paid_amount += amount
+        return len(settled)
+
+    def result(self) -> Dict[str, Any]:
+        status_breakdown = defaultdict(int, self.settled)
+        paid_amount = self.settled_paid_amount
+        for status, amount, _ in self.latest.values():
+            status_breakdown[status] += 1
+            if status == "PAID":
+                paid_amount += amount
+        return {
+            "unique_pix": len(self.latest) + sum(self.settled.values()),
+            "status_breakdown": dict(status_breakdown),
+            "paid_amount": paid_amount,
+            "transitions": dict(self.transitions)
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        self.settle()
+        return {
+            "latest": self.latest,
+            "transitions": self.transitions,
+            "settled": self.settled,
+            "settled_paid_amount": self.settled_paid_amount,
+            "newest_timestamp": self.newest_timestamp
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "PixStatusAggregator":
+        aggregator = cls()
+        aggregator.latest = state["latest"]
+        aggregator.transitions.update(state["transitions"])
+        aggregator.settled.update(state["settled"])
+        aggregator.settled_paid_amount = state["settled_paid_amount"]
+        aggregator.newest_timestamp = state["newest_timestamp"]
+        return aggregator
+
+
+class ReportCheckpoint:
+    """
+    Estado agregado dos relatórios + posição da última leitura
+
+    A posição é o byte após a última linha completa do payment_logs.json
+    (backend jsonl) ou o último event_id lido do SQLite (backend sqlite).
+    """
+
+    def __init__(self, source: str, path: str):
+        self.source = source
+        self.path = path
+        self.position = 0
+        self.inode: Optional[int] = None
+        self.events = 0
+        self.updated_at: Optional[str] = None
+        self.summary = SummaryAggregator()
+        self.prescreva_me = PrescrevaMeAggregator()
+        self.pix_status = PixStatusAggregator()
+
+    def add(self, log: Dict[str, Any]) -> None:
+        self.events += 1
+        self.summary.add(log)
+        self.prescreva_me.add(log)
+        self.pix_status.add(log)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "source": self.source,
+            "path": self.path,
+            "position": self.position,
+            "inode": self.inode,
+            "events": self.events,
+            "updated_at": self.updated_at,
+            "summary": self.summary.to_state(),
+            "prescreva_me": self.prescreva_me.to_state(),
+            "pix_status": self.pix_status.to_state()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReportCheckpoint":
+        checkpoint = cls(data["source"], data["path"])
+        checkpoint.position = data["position"]
+        checkpoint.inode = data.get("inode")
+        checkpoint.events = data["events"]
+        checkpoint.updated_at = data.get("updated_at")
+        checkpoint.summary = SummaryAggregator.from_state(data["summary"])
+        checkpoint.prescreva_me = PrescrevaMeAggregator.from_state(data["prescreva_me"])
+        checkpoint.pix_status = PixStatusAggregator.from_state(data["pix_status"])
+        return checkpoint
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> Optional["ReportCheckpoint"]:
+        """Lê o checkpoint; None se não existir, estiver corrompido ou for de outra versão"""
+        try:
+            with open(checkpoint_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION:
+                return None
+            return cls.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, checkpoint_file: str) -> None:
+        """Grava o checkpoint de forma atômica (um crash mantém o anterior intacto)"""
+        self.updated_at = datetime.now().isoformat()
+        tmp_path = f"{checkpoint_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, checkpoint_file)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
 
 class TransactionReporter:
     """Gerador de relatórios de transações"""
     
     def __init__(self, api_key: str = API_KEY):
-        """Inicializa o cliente AbacatePay"""
-        self.client = abacatepay.AbacatePay(api_key)
+        """Inicializa o gerador (o cliente AbacatePay é criado no primeiro uso)"""
+        self._api_key = api_key
+        self._client = None
         self.log_prefix = "📊 PrescrevaMe Reports"
     
-    def load_payment_logs(self, log_file: str = "payment_logs.json") -> List[Dict[str, Any]]:
-        """Carrega logs de pagamento do arquivo"""
+    @property
+    def client(self):
+        """Cliente AbacatePay: os relatórios leem os logs locais e não pagam a importação do SDK"""
+        if self._client is None:
+            from abacatepay_transport import create_client
+            self._client = create_client(self._api_key)
+        return self._client
+    
+    def iter_payment_logs(self, log_file: str = PAYMENT_LOG_FILE) -> Iterator[Dict[str, Any]]:
+        """
+        Lê o arquivo de logs linha a linha, sem carregá-lo inteiro em memória
+
+        Linhas inválidas são ignoradas (e contadas no aviso final)
+        """
         try:
-            logs = []
-            with open(log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        logs.append(json.loads(line))
-            return logs
+            f = open(log_file, "r", encoding="utf-8")
         except FileNotFoundError:
             print(f"{self.log_prefix} ⚠️ Arquivo de logs não encontrado: {log_file}")
-            return []
+            return
+
+        invalid = 0
+        with f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    invalid += 1
+        if invalid:
+            print(f"{self.log_prefix} ⚠️ {invalid} linhas inválidas ignoradas em {log_file}")
+
+    def iter_payment_log_lines(self, log_file: str, offset: int = 0) -> Iterator[tuple]:
+        """
+        Lê o arquivo de logs a partir de um byte
+
+        Apenas linhas completas (terminadas em \\n) são consumidas: uma linha
+        sendo gravada pelo webhook fica para a próxima execução.
+
+        Yields:
+            (byte após a linha, evento)
+        """
+        invalid = 0
+        with open(log_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    log = json.loads(line)
+                except ValueError:
+                    invalid += 1
+                    continue
+                yield offset, log
+        if invalid:
+            print(f"{self.log_prefix} ⚠️ {invalid} linhas inválidas ignoradas em {log_file}")
+
+    def load_payment_logs(self, log_file: str = PAYMENT_LOG_FILE) -> List[Dict[str, Any]]:
+        """Carrega logs de pagamento do arquivo"""
+        try:
+            return list(self.iter_payment_logs(log_file))
         except Exception as e:
             print(f"{self.log_prefix} ❌ Erro ao carregar logs: {e}")
             return []
-    
-    def generate_summary_report(self, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+    def iter_payment_events(self, db_path: str = PAYMENT_DB_PATH, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Itera sobre os eventos do armazenamento SQLite em lotes
+
+        Args:
+            db_path: Caminho do banco de eventos
+            **filters: Filtros de PaymentEventStore.iter_events (pix_id, status, tax_id, since, until, after_id)
+        """
+        if not os.path.exists(db_path):
+            print(f"{self.log_prefix} ⚠️ Banco de eventos não encontrado: {db_path}")
+            return
+        yield from PaymentEventStore(db_path).iter_events(**filters)
+
+    def load_payment_events(self, db_path: str = PAYMENT_DB_PATH, **filters) -> List[Dict[str, Any]]:
+        """
+        Carrega eventos do armazenamento SQLite
+
+        Args:
+            db_path: Caminho do banco de eventos
+            **filters: Filtros de PaymentEventStore.iter_events (pix_id, status, tax_id, since, until)
+        """
+        try:
+            return list(self.iter_payment_events(db_path, **filters))
+        except Exception as e:
+            print(f"{self.log_prefix} ❌ Erro ao carregar eventos: {e}")
+            return []
+
+    def iter_logs(self) -> Iterator[Dict[str, Any]]:
+        """Eventos do backend configurado em PAYMENT_LOG_BACKEND"""
+        if PAYMENT_LOG_BACKEND == "sqlite":
+            return self.iter_payment_events()
+        return self.iter_payment_logs()
+
+    def generate_summary_report(self, logs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """Gera relatório resumido das transações"""
         print(f"{self.log_prefix} 📈 Gerando relatório resumido...")
-        
-        summary = {
-            "total_transactions": len(logs),
-            "total_amount": 0,
-            "status_breakdown": defaultdict(int),
-            "daily_breakdown": defaultdict(int),
-            "monthly_breakdown": defaultdict(int),
-            "customer_breakdown": defaultdict(int),
-            "payment_methods": defaultdict(int)
-        }
-        
+
+        aggregator = SummaryAggregator()
         for log in logs:
-            # Contar por status
-            status = log.get("status", "UNKNOWN")
-            summary["status_breakdown"][status] += 1
-            
-            # Somar valores (apenas pagamentos confirmados)
-            if status == "PAID":
-                amount = log.get("amount", 0)
-                summary["total_amount"] += amount
-            
-            # Contar por dia
-            timestamp = log.get("timestamp", "")
-            if timestamp:
-                date = timestamp.split("T")[0]
-                summary["daily_breakdown"][date] += 1
-                
-                # Contar por mês
-                month = "-".join(date.split("-")[:2])
-                summary["monthly_breakdown"][month] += 1
-            
-            # Contar por cliente
-            customer = log.get("customer", {})
-            customer_name = customer.get("name", "Desconhecido")
-            summary["customer_breakdown"][customer_name] += 1
-            
-            # Método de pagamento (PIX para todos no nosso caso)
-            summary["payment_methods"]["PIX"] += 1
-        
-        return dict(summary)
+            aggregator.add(log)
+        return aggregator.result()
     
-    def generate_detailed_report(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def iter_detailed_records(self, logs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Linhas do relatório detalhado, geradas sob demanda"""
+        for log in logs:
+            yield detailed_record(log)
+
+    def generate_detailed_report(self, logs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Gera relatório detalhado das transações"""
         print(f"{self.log_prefix} 📋 Gerando relatório detalhado...")
-        
-        detailed = []
-        
-        for log in logs:
-            customer = log.get("customer", {})
-            pix_data = log.get("data", {})
-            
-            record = {
-                "timestamp": log.get("timestamp", ""),
-                "pix_id": log.get("pix_id", ""),
-                "status": log.get("status", ""),
-                "amount": log.get("amount", 0),
-                "amount_formatted": f"R$ {log.get('amount', 0)/100:.2f}",
-                "customer_name": customer.get("name", ""),
-                "customer_email": customer.get("email", ""),
-                "customer_phone": customer.get("cellphone", ""),
-                "customer_cpf": customer.get("tax_id", ""),
-                "created_at": pix_data.get("created_at", ""),
-                "expires_at": pix_data.get("expires_at", ""),
-                "dev_mode": pix_data.get("dev_mode", False)
-            }
-            
-            detailed.append(record)
-        
-        return detailed
+        return list(self.iter_detailed_records(logs))
     
-    def export_to_csv(self, data: List[Dict[str, Any]], filename: str) -> bool:
-        """Exporta dados para arquivo CSV"""
+    def export_to_csv(self, data: Iterable[Dict[str, Any]], filename: str) -> bool:
+        """
+        Exporta dados para arquivo CSV
+
+        Args:
+            data: Lista ou gerador de linhas (gravadas à medida que são produzidas)
+            filename: Arquivo de destino
+        """
         try:
-            if not data:
+            rows = iter(data)
+            first = next(rows, None)
+            if first is None:
                 print(f"{self.log_prefix} ⚠️ Nenhum dado para exportar")
                 return False
             
             with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-                fieldnames = data[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.DictWriter(csvfile, fieldnames=first.keys())
                 
                 writer.writeheader()
-                for row in data:
-                    writer.writerow(row)
+                writer.writerow(first)
+                writer.writerows(rows)
             
             print(f"{self.log_prefix} ✅ Dados exportados para: {filename}")
             return True
@@ -172,48 +536,222 @@ class TransactionReporter:
         
         print("=" * 60)
     
-    def generate_prescreva_me_report(self, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_prescreva_me_report(self, logs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """Gera relatório específico para PrescrevaMe Premium"""
         print(f"{self.log_prefix} 🌵 Gerando relatório PrescrevaMe Premium...")
-        
-        # Filtrar apenas transações do PrescrevaMe (valor padrão)
-        prescreva_logs = [
-            log for log in logs 
-            if log.get("amount") == 34700  # R$ 347,00
-        ]
-        
-        if not prescreva_logs:
+
+        aggregator = PrescrevaMeAggregator()
+        for log in logs:
+            aggregator.add(log)
+
+        report = aggregator.result()
+        if not report:
             print(f"{self.log_prefix} ⚠️ Nenhuma transação do PrescrevaMe encontrada")
-            return {}
-        
-        # Análise específica
-        report = {
-            "product": "PrescrevaMe Premium",
-            "price": 34700,
-            "total_subscriptions": len(prescreva_logs),
-            "confirmed_subscriptions": len([l for l in prescreva_logs if l.get("status") == "PAID"]),
-            "revenue": sum(l.get("amount", 0) for l in prescreva_logs if l.get("status") == "PAID"),
-            "conversion_rate": 0,
-            "customer_analysis": defaultdict(int),
-            "monthly_subscriptions": defaultdict(int)
+        return report
+    
+    def run_reports(self, logs: Iterable[Dict[str, Any]], csv_filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Gera todos os relatórios em uma única passada sobre os eventos
+
+        Cada evento alimenta os agregadores e, se `csv_filename` for informado,
+        é gravado no CSV detalhado antes de ler o próximo: a memória não cresce
+        com o tamanho do histórico.
+
+        Args:
+            logs: Eventos (normalmente o gerador de iter_logs)
+            csv_filename: CSV detalhado a gravar (opcional)
+
+        Returns:
+            Dict com events, summary, prescreva_me e csv_exported
+        """
+        print(f"{self.log_prefix} 🔄 Processando eventos em passada única...")
+        summary = SummaryAggregator()
+        prescreva = PrescrevaMeAggregator()
+        events = 0
+
+        def records():
+            nonlocal events
+            for log in logs:
+                events += 1
+                summary.add(log)
+                prescreva.add(log)
+                yield detailed_record(log)
+
+        csv_exported = False
+        if csv_filename:
+            csv_exported = self.export_to_csv(records(), csv_filename)
+        else:
+            for _ in records():
+                pass
+
+        return {
+            "events": events,
+            "summary": summary.result(),
+            "prescreva_me": prescreva.result(),
+            "csv_exported": csv_exported
         }
-        
-        # Calcular taxa de conversão
-        if report["total_subscriptions"] > 0:
-            report["conversion_rate"] = (report["confirmed_subscriptions"] / report["total_subscriptions"]) * 100
-        
-        # Análise de clientes e meses
-        for log in prescreva_logs:
-            customer = log.get("customer", {})
-            customer_name = customer.get("name", "Desconhecido")
-            report["customer_analysis"][customer_name] += 1
-            
-            timestamp = log.get("timestamp", "")
-            if timestamp:
-                month = "-".join(timestamp.split("T")[0].split("-")[:2])
-                report["monthly_subscriptions"][month] += 1
-        
-        return dict(report)
+    
+    def run_columnar_reports(
+        self,
+        csv_filename: Optional[str] = None,
+        backend: str = PAYMENT_LOG_BACKEND,
+        log_file: str = PAYMENT_LOG_FILE,
+        db_path: str = PAYMENT_DB_PATH
+    ) -> Dict[str, Any]:
+        """
+        Mesmos relatórios de run_reports, calculados em colunas (pandas/Arrow)
+
+        Sem CSV, o payment_logs.json é lido direto pelo pyarrow; com CSV (ou
+        no backend sqlite) os eventos passam linha a linha uma única vez,
+        alimentando o CSV e as colunas. Sem pandas instalado, usa run_reports.
+
+        Args:
+            csv_filename: CSV detalhado a gravar (opcional)
+            backend: "sqlite" ou "jsonl"
+            log_file: payment_logs.json (backend jsonl)
+            db_path: Banco de eventos (backend sqlite)
+
+        Returns:
+            Dict com events, summary, prescreva_me e csv_exported
+        """
+        # Import tardio: report_columnar depende deste módulo
+        import report_columnar
+
+        logs = self.iter_payment_events(db_path) if backend == "sqlite" else self.iter_payment_logs(log_file)
+        if not report_columnar.columnar_available():
+            print(f"{self.log_prefix} ⚠️ pandas não instalado: usando o motor python (pip install pandas pyarrow)")
+            return self.run_reports(logs, csv_filename)
+
+        print(f"{self.log_prefix} 🔄 Processando eventos em colunas...")
+        frame = None
+        if backend != "sqlite" and not csv_filename and os.path.exists(log_file):
+            frame = report_columnar.arrow_jsonl_frame(log_file)
+
+        csv_exported = False
+        if frame is None:
+            columns = report_columnar.EventColumns()
+
+            def records():
+                for log in logs:
+                    columns.add(log)
+                    yield detailed_record(log)
+
+            if csv_filename:
+                csv_exported = self.export_to_csv(records(), csv_filename)
+            else:
+                for _ in records():
+                    pass
+            frame = columns.frame()
+
+        return {
+            "events": len(frame),
+            "summary": report_columnar.summary_report(frame),
+            "prescreva_me": report_columnar.prescreva_me_report(frame),
+            "csv_exported": csv_exported
+        }
+
+    def run_incremental(
+        self,
+        checkpoint_file: str = REPORT_CHECKPOINT_FILE,
+        backend: str = PAYMENT_LOG_BACKEND,
+        log_file: str = PAYMENT_LOG_FILE,
+        db_path: str = PAYMENT_DB_PATH,
+        csv_filename: Optional[str] = None,
+        rebuild: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Atualiza os relatórios lendo apenas os eventos novos desde o checkpoint
+
+        O checkpoint é descartado (recálculo completo) quando é de outra
+        origem, quando `rebuild` é pedido, ou quando o arquivo de logs foi
+        rotacionado/truncado.
+
+        Args:
+            checkpoint_file: Arquivo do checkpoint
+            backend: "sqlite" ou "jsonl"
+            log_file: payment_logs.json (backend jsonl)
+            db_path: Banco de eventos (backend sqlite)
+            csv_filename: CSV detalhado apenas com os eventos novos (opcional)
+            rebuild: Ignorar o checkpoint existente
+
+        Returns:
+            Dict com new_events, events, summary, prescreva_me, pix_status e csv_exported
+        """
+        path = db_path if backend == "sqlite" else log_file
+        checkpoint = None if rebuild else ReportCheckpoint.load(checkpoint_file)
+        if checkpoint is not None and (checkpoint.source != backend or checkpoint.path != path):
+            print(f"{self.log_prefix} ⚠️ Checkpoint de outra origem ({checkpoint.source}: {checkpoint.path}), recalculando")
+            checkpoint = None
+
+        if backend == "sqlite":
+            if checkpoint is None:
+                checkpoint = ReportCheckpoint(backend, path)
+            new_logs = self._new_store_events(checkpoint)
+        else:
+            try:
+                stat = os.stat(log_file)
+            except FileNotFoundError:
+                print(f"{self.log_prefix} ⚠️ Arquivo de logs não encontrado: {log_file}")
+                stat = None
+            if checkpoint is not None and stat is not None and (
+                stat.st_ino != checkpoint.inode or stat.st_size < checkpoint.position
+            ):
+                print(f"{self.log_prefix} ⚠️ {log_file} foi rotacionado ou truncado, recalculando")
+                checkpoint = None
+            if checkpoint is None:
+                checkpoint = ReportCheckpoint(backend, path)
+            if stat is not None:
+                checkpoint.inode = stat.st_ino
+            new_logs = self._new_log_lines(checkpoint) if stat is not None else iter(())
+
+        print(f"{self.log_prefix} 🔄 Processando eventos a partir de {checkpoint.position} ({checkpoint.events} já agregados)...")
+        events_before = checkpoint.events
+
+        def records():
+            for log in new_logs:
+                checkpoint.add(log)
+                yield detailed_record(log)
+
+        csv_exported = False
+        if csv_filename:
+            csv_exported = self.export_to_csv(records(), csv_filename)
+        else:
+            for _ in records():
+                pass
+
+        checkpoint.save(checkpoint_file)
+        return {
+            "new_events": checkpoint.events - events_before,
+            "events": checkpoint.events,
+            "summary": checkpoint.summary.result(),
+            "prescreva_me": checkpoint.prescreva_me.result(),
+            "pix_status": checkpoint.pix_status.result(),
+            "csv_exported": csv_exported
+        }
+
+    def _new_log_lines(self, checkpoint: ReportCheckpoint) -> Iterator[Dict[str, Any]]:
+        for offset, log in self.iter_payment_log_lines(checkpoint.path, checkpoint.position):
+            checkpoint.position = offset
+            yield log
+
+    def _new_store_events(self, checkpoint: ReportCheckpoint) -> Iterator[Dict[str, Any]]:
+        for event in self.iter_payment_events(checkpoint.path, after_id=checkpoint.position):
+            checkpoint.position = event["event_id"]
+            yield event
+
+    def print_pix_status_summary(self, pix_status: Dict[str, Any]) -> None:
+        """Imprime o status atual por PIX (modo incremental)"""
+        print(f"\n{self.log_prefix} 🔁 STATUS ATUAL POR PIX")
+        print("=" * 60)
+        print(f"🧾 PIX distintos: {pix_status['unique_pix']}")
+        print(f"💰 Recebido (sem duplicatas): R$ {pix_status['paid_amount']/100:.2f}")
+        for status, count in sorted(pix_status['status_breakdown'].items()):
+            print(f"   {status}: {count}")
+        if pix_status['transitions']:
+            print(f"\n🔀 Transições:")
+            for transition, count in sorted(pix_status['transitions'].items()):
+                print(f"   {transition}: {count}")
+        print("=" * 60)
     
     def print_prescreva_me_summary(self, report: Dict[str, Any]) -> None:
         """Imprime resumo do PrescrevaMe"""
@@ -239,37 +777,50 @@ class TransactionReporter:
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Relatório de Transações")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Agregar apenas eventos novos desde o checkpoint")
+    parser.add_argument("--checkpoint", default=REPORT_CHECKPOINT_FILE, help="Arquivo de checkpoint (modo incremental)")
+    parser.add_argument("--rebuild", action="store_true", help="Descartar o checkpoint e recalcular tudo")
+    parser.add_argument("--engine", choices=("python", "columnar"), default=REPORT_ENGINE,
+                        help="Motor de agregação do relatório completo: python ou columnar (pandas/Arrow)")
+    parser.add_argument("--no-csv", action="store_true", help="Não gravar o CSV detalhado")
+    args = parser.parse_args()
+
     print("🌵 PrescrevaMe Premium - Relatório de Transações")
     print("=" * 50)
     
     # Inicializar reporter
     reporter = TransactionReporter()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Carregar logs
-    print(f"📂 Carregando logs de pagamento...")
-    logs = reporter.load_payment_logs()
+    if args.incremental:
+        # Apenas eventos novos; o CSV detalhado contém só o que entrou desde a última execução
+        print(f"📂 Processando logs de pagamento (incremental)...")
+        csv_filename = None if args.no_csv else f"transactions_incremental_{timestamp}.csv"
+        reports = reporter.run_incremental(args.checkpoint, csv_filename=csv_filename, rebuild=args.rebuild)
+        print(f"✅ {reports['new_events']} eventos novos ({reports['events']} no total)")
+    else:
+        # Processar logs em passada única (CSV detalhado gravado durante a leitura)
+        print(f"📂 Processando logs de pagamento...")
+        csv_filename = None if args.no_csv else f"transactions_detailed_{timestamp}.csv"
+        if args.engine == "columnar":
+            reports = reporter.run_columnar_reports(csv_filename)
+        else:
+            reports = reporter.run_reports(reporter.iter_logs(), csv_filename)
+        print(f"✅ {reports['events']} logs processados")
     
-    if not logs:
+    if not reports["events"]:
         print(f"⚠️ Nenhum log encontrado. Execute o webhook_handler.py primeiro.")
         return
     
-    print(f"✅ {len(logs)} logs carregados")
-    
-    # Gerar relatórios
-    summary = reporter.generate_summary_report(logs)
-    detailed = reporter.generate_detailed_report(logs)
-    prescreva_report = reporter.generate_prescreva_me_report(logs)
+    summary = reports["summary"]
     
     # Exibir resumos
     reporter.print_summary(summary)
-    reporter.print_prescreva_me_summary(prescreva_report)
-    
-    # Exportar dados
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # CSV detalhado
-    csv_filename = f"transactions_detailed_{timestamp}.csv"
-    reporter.export_to_csv(detailed, csv_filename)
+    reporter.print_prescreva_me_summary(reports["prescreva_me"])
+    if "pix_status" in reports:
+        reporter.print_pix_status_summary(reports["pix_status"])
     
     # JSON do resumo
     summary_filename = f"summary_report_{timestamp}.json"
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Deduplicação de Webhooks
+Identifica notificações já processadas (reenvios do provedor, pix.paid
+duplicado) por ID do evento ou por (pix_id, tipo). Um LRU em memória responde
+as repetições recentes sem I/O; um índice SQLite com TTL cobre reinícios e
+vários processos: a reserva de um evento é uma linha "pending" gravada no
+SQLite, então dois workers nunca processam o mesmo evento ao mesmo tempo
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from dotenv_cache import load_env
+from webhook_queue import WEBHOOK_HANDLER_TIMEOUT, WEBHOOK_QUEUE_STALE_AFTER
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+WEBHOOK_DEDUP = os.getenv('WEBHOOK_DEDUP', 'true').lower() in ('1', 'true', 'yes')
+WEBHOOK_DEDUP_PATH = os.getenv('WEBHOOK_DEDUP_PATH', 'webhook_dedup.db')
+WEBHOOK_DEDUP_TTL = float(os.getenv('WEBHOOK_DEDUP_TTL', str(7 * 24 * 3600)))
+WEBHOOK_DEDUP_LRU_SIZE = int(os.getenv('WEBHOOK_DEDUP_LRU_SIZE', '100000'))
+# Reserva deixada por um worker que caiu. Precisa durar mais que WEBHOOK_QUEUE_STALE_AFTER +
+# WEBHOOK_HANDLER_TIMEOUT (webhook_queue.py): o item devolvido à fila enquanto o handler original
+# ainda roda encontra a reserva e não é processado duas vezes. Valores menores são elevados ao mínimo
+_MIN_PENDING_TTL = WEBHOOK_QUEUE_STALE_AFTER + WEBHOOK_HANDLER_TIMEOUT + 60
+WEBHOOK_DEDUP_PENDING_TTL = max(float(os.getenv('WEBHOOK_DEDUP_PENDING_TTL', '0')), _MIN_PENDING_TTL)
+
+# Estados de uma chave no índice
+PENDING, DONE = "pending", "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    event_key TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'done'
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_events_seen_at ON webhook_events (seen_at);
+"""
+
+
+def event_key(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Identidade de uma notificação
+
+    Usa o ID do evento quando o provedor envia; senão (tipo, pix_id), o que
+    trata pix.paid repetido para o mesmo PIX como duplicata.
+    """
+    event_id = data.get("id") or data.get("event_id")
+    if event_id:
+        return f"id:{event_id}"
+    pix_id = (data.get("data") or {}).get("id")
+    if not pix_id:
+        return None
+    return f"{data.get('type', '')}:{pix_id}"
+
+
+class WebhookDeduplicator:
+    """LRU em memória na frente de um índice SQLite de eventos processados"""
+
+    def __init__(
+        self,
+        path: str = WEBHOOK_DEDUP_PATH,
+        ttl: float = WEBHOOK_DEDUP_TTL,
+        lru_size: int = WEBHOOK_DEDUP_LRU_SIZE,
+        purge_interval: float = 300.0,
+        pending_ttl: float = WEBHOOK_DEDUP_PENDING_TTL
+    ):
+        """
+        Args:
+            path: Caminho do banco SQLite do índice
+            ttl: Tempo (s) em que um evento processado continua sendo considerado duplicata
+            lru_size: Máximo de chaves mantidas em memória
+            purge_interval: Intervalo mínimo (s) entre remoções de chaves expiradas do índice
+            pending_ttl: Tempo (s) após o qual uma reserva sem commit/release (processo que caiu) é descartada
+        """
+        self.path = path
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.purge_interval = purge_interval
+        self.pending_ttl = pending_ttl
+        self.log_prefix = "🧬 PrescrevaMe Webhook Dedup"
+
+        self._recent: "OrderedDict[str, float]" = OrderedDict()  # chave -> seen_at
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_purge = time.time()
+
+        self._checks = 0
+        self._lru_hits = 0
+        self._store_hits = 0
+        self._in_flight_hits = 0
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        # Índices criados antes das reservas no SQLite: toda chave gravada era um evento processado
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(webhook_events)")}
+        if "state" not in columns:
+            conn.execute("ALTER TABLE webhook_events ADD COLUMN state TEXT NOT NULL DEFAULT 'done'")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)"""
+        conn = getattr(self._local, "conn", None)
+        # Após um fork (workers do servidor) a conexão herdada não é reutilizada
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key: str, seen_at: float) -> None:
+        self._recent[key] = seen_at
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def _recent_hit(self, key: str, now: float) -> bool:
+        seen_at = self._recent.get(key)
+        if seen_at is None:
+            return False
+        if now - seen_at >= self.ttl:
+            del self._recent[key]
+            return False
+        self._recent.move_to_end(key)
+        return True
+
+    def _stored_seen_at(self, key: str, now: float) -> Optional[float]:
+        row = self._connection().execute(
+            "SELECT seen_at FROM webhook_events WHERE event_key = ? AND state = ? AND seen_at > ?",
+            (key, DONE, now - self.ttl)
+        ).fetchone()
+        return row[0] if row else None
+
+    def seen(self, key: Optional[str]) -> bool:
+        """Consulta sem reservar: True se o evento já foi processado"""
+        if key is None:
+            return False
+        now = time.time()
+        with self._lock:
+            self._checks += 1
+            if self._recent_hit(key, now):
+                self._lru_hits += 1
+                return True
+        seen_at = self._stored_seen_at(key, now)
+        with self._lock:
+            if seen_at is None:
+                return False
+            self._store_hits += 1
+            self._remember(key, seen_at)
+            return True
+
+    def claim(self, key: Optional[str]) -> bool:
+        """
+        Reserva um evento para processamento
+
+        A reserva é uma linha "pending" inserida com INSERT OR IGNORE: entre
+        processos que disputam a mesma chave, só um insere.
+
+        Returns:
+            True se o evento é novo e deve ser processado; False se é duplicata
+            (já processado ou em processamento neste ou em outro processo)
+        """
+        if key is None:
+            return True
+        now = time.time()
+        with self._lock:
+            self._checks += 1
+            if self._recent_hit(key, now):
+                self._lru_hits += 1
+                return False
+            if key in self._in_flight:
+                self._in_flight_hits += 1
+                return False
+            self._in_flight.add(key)
+
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Processado há mais que o TTL ou reserva órfã: a chave volta a valer como nova
+                conn.execute(
+                    "DELETE FROM webhook_events WHERE event_key = ? AND "
+                    "((state = ? AND seen_at <= ?) OR (state = ? AND seen_at <= ?))",
+                    (key, DONE, now - self.ttl, PENDING, now - self.pending_ttl)
+                )
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO webhook_events (event_key, seen_at, state) VALUES (?, ?, ?)",
+                    (key, now, PENDING)
+                ).rowcount
+                row = None if inserted else conn.execute(
+                    "SELECT seen_at, state FROM webhook_events WHERE event_key = ?", (key,)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except BaseException:
+            with self._lock:
+                self._in_flight.discard(key)
+            raise
+
+        if inserted:
+            return True
+        with self._lock:
+            self._in_flight.discard(key)
+            if row is not None and row[1] == DONE:
+                self._store_hits += 1
+                self._remember(key, row[0])
+            else:
+                self._in_flight_hits += 1
+        return False
+
+    def commit(self, key: Optional[str]) -> None:
+        """Marca um evento reservado como processado"""
+        if key is None:
+            return
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT INTO webhook_events (event_key, seen_at, state) VALUES (?, ?, ?) "
+                "ON CONFLICT(event_key) DO UPDATE SET seen_at = excluded.seen_at, state = excluded.state",
+                (key, now, DONE)
+            )
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+        with self._lock:
+            self._remember(key, now)
+            purge = now - self._last_purge >= self.purge_interval
+            if purge:
+                self._last_purge = now
+        if purge:
+            self.purge_expired()
+
+    def release(self, key: Optional[str]) -> None:
+        """Libera um evento reservado cujo processamento falhou (um reenvio será processado)"""
+        if key is None:
+            return
+        try:
+            self._connection().execute(
+                "DELETE FROM webhook_events WHERE event_key = ? AND state = ?", (key, PENDING)
+            )
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def purge_expired(self) -> int:
+        """
+        Remove do índice as chaves mais antigas que o TTL e as reservas órfãs
+
+        Returns:
+            Quantidade de chaves removidas
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "DELETE FROM webhook_events WHERE (state = ? AND seen_at <= ?) OR (state = ? AND seen_at <= ?)",
+            (DONE, now - self.ttl, PENDING, now - self.pending_ttl)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Taxa de duplicatas e origem dos acertos"""
+        with self._lock:
+            duplicates = self._lru_hits + self._store_hits + self._in_flight_hits
+            return {
+                "checks": self._checks,
+                "duplicates": duplicates,
+                "duplicate_rate": duplicates / self._checks if self._checks else 0.0,
+                "lru_hits": self._lru_hits,
+                "store_hits": self._store_hits,
+                "in_flight_hits": self._in_flight_hits,
+                "lru_entries": len(self._recent)
+            }
@@ -4,47 +4,88 @@ PrescrevaMe Premium - Webhook Handler para AbacatePay
 Processa notificações de pagamento da API AbacatePay
 """
 
+import argparse
 import json
 import logging
 import hashlib
 import hmac
 import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 from datetime import datetime
 from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify
-import abacatepay
-from dotenv import load_dotenv
+
+from dotenv_cache import load_env
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, WEBHOOK_SECONDS, observe_final_status, registry as metrics_registry
+from payment_monitor import to_timestamp
+from payment_store import PAYMENT_LOG_BACKEND, PAYMENT_LOG_FILE, PaymentEventStore
+from pix_warm_pool import warm_pool
+from status_cache import status_cache
+from status_push import PUSH_PORT, publish_status, push_stats, start_push_server
+from structured_logging import logging_stats, setup_logging, shutdown_logging
+from tracing import Profiler, add_profile_argument, profiling, tracer
+from webhook_dedup import WEBHOOK_DEDUP, WebhookDeduplicator, event_key
+from webhook_queue import WEBHOOK_QUEUE_PATH, WEBHOOK_QUEUE_WORKERS, WebhookQueue, WebhookWorkerPool
 
 # Carregar variáveis de ambiente
-load_dotenv()
+load_env()
 
 # Configurações
 API_KEY = os.getenv('ABACATE_API_KEY', '')
-WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', 'seu_webhook_secret_aqui')  # Configure no painel AbacatePay
-LOG_FILE = "webhook.log"
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+WEBHOOK_SECRET_PLACEHOLDER = 'seu_webhook_secret_aqui'
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', WEBHOOK_SECRET_PLACEHOLDER)  # Configure no painel AbacatePay
+LOG_FILE = os.getenv('WEBHOOK_LOG_FILE', 'webhook.log')
+WEBHOOK_ASYNC = os.getenv('WEBHOOK_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '5000'))
+WEBHOOK_SERVER_WORKERS = int(os.getenv('WEBHOOK_SERVER_WORKERS', str(os.cpu_count() or 1)))
+WEBHOOK_SERVER_THREADS = int(os.getenv('WEBHOOK_SERVER_THREADS', '8'))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '30'))
+
+# Configurar logging (JSON por evento, gravado em thread de fundo, com rotação de LOG_FILE)
+setup_logging(log_file=LOG_FILE)
 
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-client = abacatepay.AbacatePay(API_KEY)
+# Aplicação Flask e cliente AbacatePay são criados no primeiro uso (get_app/get_client):
+# importar o módulo (ex.: só para usar o WebhookHandler) não carrega o Flask nem o SDK
+_state: Dict[str, Any] = {"app": None, "client": None}
 
 class WebhookHandler:
     """Handler para processar webhooks do AbacatePay"""
     
-    def __init__(self, secret: str):
+    EVENT_TYPES = ("pix.paid", "pix.expired", "pix.cancelled")
+    
+    def __init__(
+        self,
+        secret: str,
+        event_store: Optional[PaymentEventStore] = None,
+        deduplicator: Optional[WebhookDeduplicator] = None
+    ):
+        """
+        Args:
+            secret: Segredo do webhook para verificar assinaturas
+            event_store: Armazenamento de eventos (padrão: SQLite, salvo se PAYMENT_LOG_BACKEND=jsonl)
+            deduplicator: Índice de eventos já processados (padrão: SQLite, salvo se WEBHOOK_DEDUP=false)
+        """
         self.secret = secret
         self.log_prefix = "🔔 PrescrevaMe Webhook"
+        if event_store is None and PAYMENT_LOG_BACKEND == "sqlite":
+            event_store = PaymentEventStore()
+        self.event_store = event_store
+        if deduplicator is None and WEBHOOK_DEDUP:
+            deduplicator = WebhookDeduplicator()
+        self.deduplicator = deduplicator
     
+    @property
+    def signature_required(self) -> bool:
+        """Assinatura exigida quando um segredo real foi configurado (não o exemplo do .env)"""
+        return bool(self.secret) and self.secret != WEBHOOK_SECRET_PLACEHOLDER
+
     def verify_signature(self, payload: str, signature: str) -> bool:
         """
         Verifica a assinatura do webhook para garantir autenticidade
@@ -65,37 +106,84 @@ class WebhookHandler:
             
             return hmac.compare_digest(signature, expected_signature)
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro na verificação de assinatura: {e}")
+            logger.error("❌ Erro na verificação de assinatura: %s", e)
             return False
     
+    def is_duplicate(self, data: Dict[str, Any]) -> bool:
+        """Verifica (sem reservar) se a notificação já foi processada"""
+        return self.deduplicator is not None and self.deduplicator.seen(event_key(data))
+    
     def process_payment_notification(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Processa notificação de pagamento
         
+        Notificações repetidas (mesmo ID de evento, ou mesmo tipo e pix_id)
+        retornam sucesso sem executar os handlers de novo.
+        
         Args:
             data: Dados da notificação
         
         Returns:
             Dict com resultado do processamento
         """
+        event_type = data.get("type", "") if isinstance(data, dict) else ""
+        event_type = event_type if event_type in self.EVENT_TYPES else "unknown"
+        start = time.perf_counter()
+        with tracer.trace("webhook.process", event_type=event_type) as span:
+            result = self._process_deduplicated(data)
+            outcome = "duplicate" if result.get("duplicate") else "processed" if result.get("success") else "error"
+            span.set(outcome=outcome)
+        WEBHOOK_SECONDS.observe(time.perf_counter() - start, event_type=event_type, outcome=outcome)
+        return result
+    
+    def _process_deduplicated(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.deduplicator is None:
+            return self._process_payment_notification(data)
+        
+        key = event_key(data)
+        with tracer.span("dedup.claim"):
+            claimed = self.deduplicator.claim(key)
+        if not claimed:
+            return {"success": True, "action": "duplicate", "duplicate": True}
+        
+        result = self._process_payment_notification(data)
+        with tracer.span("dedup.commit"):
+            if result.get("success"):
+                self.deduplicator.commit(key)
+            else:
+                self.deduplicator.release(key)
+        return result
+    
+    def _process_payment_notification(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Despacha a notificação para o handler do tipo de evento"""
         try:
             event_type = data.get("type", "")
             pix_data = data.get("data", {})
+            if not pix_data.get("customer") and warm_pool.enabled:
+                # Cobrança anônima do pool pré-criado: o cliente foi registrado por quem a pegou
+                customer = warm_pool.claimed_customer(pix_data.get("id", ""))
+                if customer:
+                    pix_data = {**pix_data, "customer": customer}
             
-            logger.info(f"{self.log_prefix} 📨 Processando notificação: {event_type}")
+            logger.debug("📨 Processando notificação %s", event_type, extra={"event_type": event_type})
             
             if event_type == "pix.paid":
-                return self._handle_payment_confirmed(pix_data)
+                result = self._handle_payment_confirmed(pix_data)
             elif event_type == "pix.expired":
-                return self._handle_payment_expired(pix_data)
+                result = self._handle_payment_expired(pix_data)
             elif event_type == "pix.cancelled":
-                return self._handle_payment_cancelled(pix_data)
+                result = self._handle_payment_cancelled(pix_data)
             else:
-                logger.warning(f"{self.log_prefix} ⚠️ Tipo de evento não reconhecido: {event_type}")
+                logger.warning("⚠️ Tipo de evento não reconhecido", extra={"event_type": event_type})
                 return {"success": False, "error": "Event type not recognized"}
+            
+            if result.get("success") and warm_pool.enabled:
+                # Status final gravado (com o cliente): o registro do pool não é mais necessário
+                warm_pool.forget(pix_data.get("id", ""))
+            return result
                 
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao processar notificação: {e}")
+            logger.error("❌ Erro ao processar notificação: %s", e, extra={"event_type": data.get("type")})
             return {"success": False, "error": str(e)}
     
     def _handle_payment_confirmed(self, pix_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -105,10 +193,12 @@ class WebhookHandler:
             amount = pix_data.get("amount", 0)
             customer = pix_data.get("customer", {})
             
-            logger.info(f"{self.log_prefix} 🎉 Pagamento confirmado!")
-            logger.info(f"   PIX ID: {pix_id}")
-            logger.info(f"   Valor: R$ {amount/100:.2f}")
-            logger.info(f"   Cliente: {customer.get('name', 'N/A')}")
+            with tracer.span("log"):
+                logger.info("🎉 Pagamento confirmado", extra={
+                    "pix_id": pix_id,
+                    "amount": amount,
+                    "customer": customer.get("name", "N/A")
+                })
             
             # Aqui você pode adicionar lógica específica:
             # - Ativar acesso ao PrescrevaMe
@@ -118,6 +208,11 @@ class WebhookHandler:
             
             # Exemplo: Salvar log de pagamento confirmado
             self._save_payment_log(pix_data, "PAID")
+            with tracer.span("status_cache.set"):
+                status_cache.set_status(pix_id, "PAID", pix_data.get("expires_at"))
+            with tracer.span("push.publish"):
+                publish_status(pix_id, "PAID")
+            observe_final_status(pix_id, "PAID", "webhook", self._created_at(pix_data))
             
             # Exemplo: Enviar notificação para WhatsApp (se configurado)
             # self._send_whatsapp_confirmation(customer, pix_data)
@@ -130,7 +225,7 @@ class WebhookHandler:
             }
             
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao processar pagamento confirmado: {e}")
+            logger.error("❌ Erro ao processar pagamento confirmado: %s", e, extra={"pix_id": pix_data.get("id")})
             return {"success": False, "error": str(e)}
     
     def _handle_payment_expired(self, pix_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -138,7 +233,7 @@ class WebhookHandler:
         try:
             pix_id = pix_data.get("id", "")
             
-            logger.info(f"{self.log_prefix} ⏰ Pagamento expirado: {pix_id}")
+            logger.info("⏰ Pagamento expirado", extra={"pix_id": pix_id})
             
             # Lógica para pagamento expirado:
             # - Limpar dados temporários
@@ -146,6 +241,9 @@ class WebhookHandler:
             # - Oferecer nova tentativa de pagamento
             
             self._save_payment_log(pix_data, "EXPIRED")
+            status_cache.set_status(pix_id, "EXPIRED", pix_data.get("expires_at"))
+            publish_status(pix_id, "EXPIRED")
+            observe_final_status(pix_id, "EXPIRED", "webhook")
             
             return {
                 "success": True,
@@ -154,7 +252,7 @@ class WebhookHandler:
             }
             
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao processar pagamento expirado: {e}")
+            logger.error("❌ Erro ao processar pagamento expirado: %s", e, extra={"pix_id": pix_data.get("id")})
             return {"success": False, "error": str(e)}
     
     def _handle_payment_cancelled(self, pix_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -162,13 +260,16 @@ class WebhookHandler:
         try:
             pix_id = pix_data.get("id", "")
             
-            logger.info(f"{self.log_prefix} ❌ Pagamento cancelado: {pix_id}")
+            logger.info("❌ Pagamento cancelado", extra={"pix_id": pix_id})
             
             # Lógica para pagamento cancelado:
             # - Limpar dados temporários
             # - Registrar motivo do cancelamento
             
             self._save_payment_log(pix_data, "CANCELLED")
+            status_cache.set_status(pix_id, "CANCELLED", pix_data.get("expires_at"))
+            publish_status(pix_id, "CANCELLED")
+            observe_final_status(pix_id, "CANCELLED", "webhook")
             
             return {
                 "success": True,
@@ -177,11 +278,21 @@ class WebhookHandler:
             }
             
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao processar pagamento cancelado: {e}")
+            logger.error("❌ Erro ao processar pagamento cancelado: %s", e, extra={"pix_id": pix_data.get("id")})
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def _created_at(pix_data: Dict[str, Any]) -> Optional[float]:
+        """Criação do PIX informada no evento (para o tempo até o pagamento)"""
+        return to_timestamp(pix_data.get("createdAt") or pix_data.get("created_at"))
+    
     def _save_payment_log(self, pix_data: Dict[str, Any], status: str) -> None:
-        """Salva log do pagamento"""
+        """
+        Salva log do pagamento
+
+        Falhas de escrita são propagadas: o handler responde success False,
+        a reserva de deduplicação é liberada e a fila tenta de novo.
+        """
         try:
             log_entry = {
                 "timestamp": datetime.now().isoformat(),
@@ -192,12 +303,17 @@ class WebhookHandler:
                 "data": pix_data
             }
             
-            with open("payment_logs.json", "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+            with tracer.span("payment_log.save", backend="sqlite" if self.event_store is not None else "jsonl"):
+                if self.event_store is not None:
+                    self.event_store.append(log_entry)
+                else:
+                    with open(PAYMENT_LOG_FILE, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
                 
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao salvar log: {e}")
-    
+            logger.error("❌ Erro ao salvar log: %s", e, extra={"pix_id": pix_data.get("id")})
+            raise
+
     def _send_whatsapp_confirmation(self, customer: Dict[str, Any], pix_data: Dict[str, Any]) -> None:
         """Envia confirmação via WhatsApp (exemplo)"""
         try:
@@ -221,61 +337,120 @@ Seu pagamento de R$ {amount/100:.2f} foi confirmado com sucesso!
 Obrigado por escolher o PrescrevaMe! 🌵
                 """
                 
-                logger.info(f"{self.log_prefix} 📱 WhatsApp preparado para {phone}")
+                logger.info("📱 WhatsApp preparado", extra={"phone": phone})
+                logger.debug("📱 Texto do WhatsApp", extra={"phone": phone, "text": message.strip()})
                 # Aqui você implementaria o envio real
                 
         except Exception as e:
-            logger.error(f"{self.log_prefix} ❌ Erro ao enviar WhatsApp: {e}")
+            logger.error("❌ Erro ao enviar WhatsApp: %s", e)
 
 
 # Inicializar handler
 webhook_handler = WebhookHandler(WEBHOOK_SECRET)
 
-@app.route('/webhook/abacatepay', methods=['POST'])
+# Fila persistente + workers (modo assíncrono): o endpoint só valida e enfileira
+webhook_queue = WebhookQueue(WEBHOOK_QUEUE_PATH) if WEBHOOK_ASYNC else None
+webhook_workers = (
+    WebhookWorkerPool(webhook_handler.process_payment_notification, webhook_queue, workers=WEBHOOK_QUEUE_WORKERS)
+    if webhook_queue is not None else None
+)
+
+if webhook_queue is not None:
+    metrics_registry.gauge_callback(
+        "webhook_queue_items", "Itens na fila persistente de webhooks por estado", ("state",),
+        lambda: {(state,): count for state, count in webhook_queue.counts().items() if state != "oldest_pending_age_s"}
+    )
+    metrics_registry.gauge_callback(
+        "webhook_queue_oldest_pending_seconds", "Idade do webhook pendente mais antigo", (),
+        lambda: {(): webhook_queue.counts()["oldest_pending_age_s"]}
+    )
+
 def handle_webhook():
     """Endpoint para receber webhooks do AbacatePay"""
+    with tracer.trace("webhook.http"):
+        return _handle_webhook()
+
+
+def _handle_webhook():
+    from flask import jsonify, request
+    
     try:
         # Obter dados da requisição
         payload = request.get_data(as_text=True)
         signature = request.headers.get('X-AbacatePay-Signature', '')
         
-        logger.info(f"🔔 Webhook recebido de {request.remote_addr}")
+        logger.debug("🔔 Webhook recebido", extra={"remote_addr": request.remote_addr})
         
-        # Verificar assinatura (descomente quando configurar o secret)
-        # if not webhook_handler.verify_signature(payload, signature):
-        #     logger.warning("❌ Assinatura inválida")
-        #     return jsonify({"error": "Invalid signature"}), 401
+        # Verificar assinatura (só com WEBHOOK_SECRET configurado)
+        if webhook_handler.signature_required and not webhook_handler.verify_signature(payload, signature):
+            logger.warning("❌ Assinatura inválida", extra={"remote_addr": request.remote_addr})
+            return jsonify({"error": "Invalid signature"}), 401
         
-        # Processar dados
         data = json.loads(payload)
+        if not isinstance(data, dict):
+            logger.error("❌ Corpo do webhook não é um objeto JSON")
+            return jsonify({"error": "Invalid JSON"}), 400
+
+        if webhook_queue is not None:
+            # Tipos desconhecidos são rejeitados já na entrada, como no modo síncrono
+            if data.get("type") not in WebhookHandler.EVENT_TYPES:
+                logger.warning("⚠️ Tipo de evento não reconhecido", extra={"event_type": data.get("type")})
+                return jsonify({"status": "error", "message": "Event type not recognized"}), 400
+            
+            # Reenvio de evento já processado: nada a enfileirar
+            with tracer.span("dedup.check"):
+                duplicate = webhook_handler.is_duplicate(data)
+            if duplicate:
+                return jsonify({"status": "success", "message": "Duplicate webhook ignored"}), 200
+            
+            with tracer.span("queue.enqueue"):
+                queue_id = webhook_queue.enqueue(data)
+            webhook_workers.start()
+            return jsonify({"status": "accepted", "message": "Webhook queued", "queue_id": queue_id}), 200
+        
+        # Processar dados (modo síncrono, WEBHOOK_ASYNC=false)
         result = webhook_handler.process_payment_notification(data)
         
         if result["success"]:
-            logger.info(f"✅ Webhook processado com sucesso: {result.get('action', 'unknown')}")
+            logger.debug("✅ Webhook processado", extra={"action": result.get("action", "unknown")})
             return jsonify({"status": "success", "message": "Webhook processed"}), 200
         else:
-            logger.error(f"❌ Erro ao processar webhook: {result.get('error', 'unknown')}")
+            logger.error("❌ Erro ao processar webhook", extra={"error": result.get("error", "unknown")})
             return jsonify({"status": "error", "message": result.get("error")}), 400
             
     except json.JSONDecodeError:
         logger.error("❌ JSON inválido no webhook")
         return jsonify({"error": "Invalid JSON"}), 400
     except Exception as e:
-        logger.error(f"❌ Erro geral no webhook: {e}")
+        logger.exception("❌ Erro geral no webhook: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/webhook/status', methods=['GET'])
 def webhook_status():
     """Endpoint para verificar status do webhook"""
+    from flask import jsonify
+    
     return jsonify({
         "status": "active",
         "service": "PrescrevaMe Premium Webhook",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "status_cache": status_cache.stats(),
+        "logging": logging_stats(),
+        "tracing": tracer.stats(),
+        "push": push_stats(),
+        "webhook_queue": webhook_workers.stats() if webhook_workers is not None else None,
+        "dedup": webhook_handler.deduplicator.stats() if webhook_handler.deduplicator is not None else None
     })
 
-@app.route('/webhook/test', methods=['POST'])
+def metrics():
+    """Métricas no formato texto do Prometheus (todos os processos do servidor)"""
+    from flask import Response
+    
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 def test_webhook():
     """Endpoint para testar webhook localmente"""
+    from flask import jsonify
+    
     try:
         test_data = {
             "type": "pix.paid",
@@ -301,7 +476,184 @@ def test_webhook():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-if __name__ == '__main__':
+def get_app() -> Any:
+    """Aplicação Flask do webhook (criada e com as rotas registradas na primeira chamada)"""
+    if _state["app"] is None:
+        from flask import Flask
+        
+        app = Flask(__name__)
+        app.add_url_rule('/webhook/abacatepay', view_func=handle_webhook, methods=['POST'])
+        app.add_url_rule('/webhook/status', view_func=webhook_status, methods=['GET'])
+        app.add_url_rule('/metrics', view_func=metrics, methods=['GET'])
+        app.add_url_rule('/webhook/test', view_func=test_webhook, methods=['POST'])
+        _state["app"] = app
+    return _state["app"]
+
+
+def get_client() -> Any:
+    """Cliente AbacatePay do processo (criado na primeira chamada)"""
+    if _state["client"] is None:
+        from abacatepay_transport import create_client
+        _state["client"] = create_client(API_KEY)
+    return _state["client"]
+
+
+def __getattr__(name: str) -> Any:
+    """`webhook_handler:app` (entrada WSGI) e `webhook_handler.client` continuam disponíveis, criados sob demanda"""
+    if name == "app":
+        return get_app()
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _start_queue_workers() -> None:
+    """Cada processo do servidor drena a fila com seus próprios workers"""
+    if webhook_workers is not None:
+        webhook_workers.start()
+
+
+def _drain_queue_workers() -> None:
+    """Termina os itens já disponíveis na fila antes de encerrar"""
+    if webhook_workers is not None:
+        webhook_workers.stop(drain=True, timeout=WEBHOOK_DRAIN_TIMEOUT)
+
+
+# --profile com gunicorn: cada processo perfila as próprias threads e grava <arquivo>.<pid>
+_profiling: Dict[str, Any] = {"output": None, "profiler": None}
+
+
+def _post_worker_init(worker) -> None:
+    """Hook do gunicorn após o fork de cada processo"""
+    if _profiling["output"]:
+        _profiling["profiler"] = Profiler()
+        _profiling["profiler"].start()
+    _start_queue_workers()
+
+
+def _worker_exit(server, worker) -> None:
+    """Hook do gunicorn na saída de cada processo"""
+    _drain_queue_workers()
+    if _profiling["profiler"] is not None:
+        _profiling["profiler"].dump(f"{_profiling['output']}.{os.getpid()}")
+    metrics_registry.flush()
+    shutdown_logging()
+
+
+def run_production_server(
+    host: str = WEBHOOK_HOST,
+    port: int = WEBHOOK_PORT,
+    workers: int = WEBHOOK_SERVER_WORKERS,
+    threads: int = WEBHOOK_SERVER_THREADS,
+    pid_file: Optional[str] = None,
+    profile: Optional[str] = None
+) -> bool:
+    """
+    Serve o app com gunicorn (pré-fork, `workers` processos x `threads` threads)
+    
+    SIGTERM encerra de forma graciosa: os processos param de aceitar conexões,
+    concluem as requisições em andamento (até WEBHOOK_DRAIN_TIMEOUT) e drenam
+    a fila de webhooks. Com `profile`, cada processo grava seu perfil
+    (cProfile) em `<profile>.<pid>` ao sair. Com PUSH_PORT, o servidor de
+    push (status_push.py) roda em um processo filho durante o serviço.
+    
+    Returns:
+        False se o gunicorn não estiver instalado
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+    
+    class WebhookApplication(BaseApplication):
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            super().__init__()
+        
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return get_app()
+    
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread",
+        "keepalive": 5,
+        "timeout": 60,
+        "graceful_timeout": int(WEBHOOK_DRAIN_TIMEOUT),
+        "post_worker_init": _post_worker_init,
+        "worker_exit": _worker_exit,
+    }
+    if pid_file:
+        options["pidfile"] = pid_file
+    _profiling["output"] = profile
+    if workers > 1 and not metrics_registry.multiprocess_dir:
+        # /metrics é atendido por um processo qualquer: os workers publicam instantâneos
+        metrics_registry.set_multiprocess_dir(tempfile.mkdtemp(prefix="prescrevame_metrics_"))
+    
+    push_process = None
+    if PUSH_PORT:
+        # Conexões de push ficam em um processo só (status_push.py); os workers publicam por datagrama
+        push_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "status_push.py")
+        push_process = subprocess.Popen([sys.executable, push_script])
+    try:
+        WebhookApplication(options).run()
+    finally:
+        if push_process is not None:
+            push_process.terminate()
+            push_process.wait(timeout=5)
+    return True
+
+
+def run_threaded_server(host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT, pid_file: Optional[str] = None) -> None:
+    """
+    Servidor de um processo com threads (sem gunicorn), com encerramento gracioso
+    
+    SIGTERM/SIGINT param de aceitar conexões, aguardam as requisições em
+    andamento e drenam a fila de webhooks. Com PUSH_PORT, o servidor de push
+    roda em uma thread deste processo.
+    """
+    from werkzeug.serving import make_server
+    
+    server = make_server(host, port, get_app(), threaded=True)
+    
+    def _shutdown(signum, frame):
+        logger.info("🛑 Sinal %s recebido, encerrando...", signum)
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    
+    if pid_file:
+        with open(pid_file, "w") as f:
+            f.write(str(os.getpid()))
+    
+    _start_queue_workers()
+    start_push_server()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        _drain_queue_workers()
+        if pid_file and os.path.exists(pid_file):
+            os.unlink(pid_file)
+
+
+def main():
+    """Inicia o servidor de webhooks"""
+    parser = argparse.ArgumentParser(description="PrescrevaMe Premium - Webhook Handler")
+    parser.add_argument("--host", default=WEBHOOK_HOST, help="Endereço de escuta")
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT, help="Porta HTTP")
+    parser.add_argument("--workers", type=int, default=WEBHOOK_SERVER_WORKERS, help="Processos do servidor")
+    parser.add_argument("--threads", type=int, default=WEBHOOK_SERVER_THREADS, help="Threads por processo")
+    parser.add_argument("--pid-file", default=None, help="Arquivo com o PID do processo principal")
+    parser.add_argument("--dev", action="store_true", help="Servidor de desenvolvimento do Flask (debug + reloader)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
     print("🌵 PrescrevaMe Premium - Webhook Handler")
     print("=" * 50)
     print("🚀 Iniciando servidor webhook...")
@@ -309,11 +661,22 @@ if __name__ == '__main__':
     print("   POST /webhook/abacatepay - Webhook principal")
     print("   GET  /webhook/status - Status do serviço")
     print("   POST /webhook/test - Teste local")
+    if PUSH_PORT:
+        print(f"   GET  :{PUSH_PORT}/events/<pix_id> - Status por push (SSE; /poll/<pix_id> long-poll)")
     print("=" * 50)
     
-    # Executar servidor
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True
-    )
+    if args.dev:
+        # Drenar itens que ficaram na fila da execução anterior
+        _start_queue_workers()
+        get_app().run(host=args.host, port=args.port, debug=True)
+        return
+    
+    print(f"⚙️ {args.workers} processos x {args.threads} threads em {args.host}:{args.port}")
+    if not run_production_server(args.host, args.port, args.workers, args.threads, args.pid_file, args.profile):
+        print("⚠️ gunicorn não instalado: usando servidor de um processo (pip install gunicorn)")
+        with profiling(args.profile):
+            run_threaded_server(args.host, args.port, args.pid_file)
+
+
+if __name__ == '__main__':
+    main()
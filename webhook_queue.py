@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+PrescrevaMe Premium - Fila Persistente de Webhooks
+O endpoint do webhook grava a notificação nesta fila (SQLite, WAL com fsync)
+e responde 200 imediatamente; um pool de workers consome a fila e executa os
+handlers do WebhookHandler, com novas tentativas e backoff em caso de erro.
+Itens que estavam em processamento quando o processo caiu voltam para a fila
+na próxima inicialização
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from dotenv_cache import load_env
+
+# Carregar variáveis de ambiente
+load_env()
+
+# Configurações
+WEBHOOK_QUEUE_PATH = os.getenv('WEBHOOK_QUEUE_PATH', 'webhook_queue.db')
+WEBHOOK_QUEUE_WORKERS = int(os.getenv('WEBHOOK_QUEUE_WORKERS', '4'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '5'))
+# Item "processing" há mais que isso volta para a fila (worker que caiu). Um handler ainda rodando
+# nesse momento é executado de novo: WEBHOOK_DEDUP_PENDING_TTL (webhook_dedup.py) precisa ser maior
+# que WEBHOOK_QUEUE_STALE_AFTER + WEBHOOK_HANDLER_TIMEOUT para a reserva barrar essa segunda execução
+WEBHOOK_QUEUE_STALE_AFTER = float(os.getenv('WEBHOOK_QUEUE_STALE_AFTER', '300'))
+WEBHOOK_HANDLER_TIMEOUT = float(os.getenv('WEBHOOK_HANDLER_TIMEOUT', '60'))  # duração máxima esperada de um handler
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    received_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    locked_at REAL,
+    last_error TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_queue_ready ON webhook_queue (state, available_at);
+"""
+
+PENDING, PROCESSING, DEAD = "pending", "processing", "dead"
+
+
+class WebhookQueue:
+    """Fila de notificações em SQLite, segura entre threads e processos"""
+
+    def __init__(self, path: str = WEBHOOK_QUEUE_PATH, max_attempts: int = WEBHOOK_MAX_ATTEMPTS):
+        """
+        Args:
+            path: Caminho do banco SQLite da fila
+            max_attempts: Tentativas antes de mover o item para "dead"
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.log_prefix = "📥 PrescrevaMe Webhook Queue"
+        self._local = threading.local()
+        self._ready = threading.Condition()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão por thread; synchronous=FULL garante o item em disco antes do 200"""
+        conn = getattr(self._local, "conn", None)
+        # Após um fork (workers do servidor) a conexão herdada não é reutilizada
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self) -> None:
+        """Fecha a conexão da thread atual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, data: Dict[str, Any]) -> int:
+        """
+        Grava uma notificação na fila
+
+        Returns:
+            ID do item
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO webhook_queue (received_at, available_at, payload) VALUES (?, ?, ?)",
+            (now, now, json.dumps(data, ensure_ascii=False, default=str))
+        )
+        with self._ready:
+            self._ready.notify()
+        return cursor.lastrowid
+
+    def wait_ready(self, timeout: float) -> None:
+        """Aguarda um enqueue deste processo (ou o timeout, para itens de outros processos)"""
+        with self._ready:
+            self._ready.wait(timeout)
+
+    def wake_all(self) -> None:
+        """Acorda todos os workers bloqueados em wait_ready"""
+        with self._ready:
+            self._ready.notify_all()
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Reserva o próximo item disponível
+
+        Returns:
+            Dict com id, received_at, attempts e data, ou None se a fila estiver vazia
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, received_at, attempts, payload FROM webhook_queue "
+                "WHERE state = ? AND available_at <= ? ORDER BY available_at, id LIMIT 1",
+                (PENDING, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE webhook_queue SET state = ?, locked_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (PROCESSING, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        item_id, received_at, attempts, payload = row
+        return {"id": item_id, "received_at": received_at, "attempts": attempts + 1, "data": json.loads(payload)}
+
+    def complete(self, item_id: int) -> None:
+        """Remove um item processado (o registro permanente fica no PaymentEventStore)"""
+        self._connection().execute("DELETE FROM webhook_queue WHERE id = ?", (item_id,))
+
+    def fail(self, item_id: int, attempts: int, error: str) -> bool:
+        """
+        Devolve um item à fila com backoff exponencial, ou o move para "dead"
+
+        Returns:
+            True se o item ainda será tentado novamente
+        """
+        if attempts >= self.max_attempts:
+            self._connection().execute(
+                "UPDATE webhook_queue SET state = ?, locked_at = NULL, last_error = ? WHERE id = ?",
+                (DEAD, error, item_id)
+            )
+            return False
+
+        retry_at = time.time() + min(2 ** attempts, 300)
+        self._connection().execute(
+            "UPDATE webhook_queue SET state = ?, locked_at = NULL, available_at = ?, last_error = ? WHERE id = ?",
+            (PENDING, retry_at, error, item_id)
+        )
+        return True
+
+    def requeue_stale(self, stale_after: float = WEBHOOK_QUEUE_STALE_AFTER) -> int:
+        """
+        Devolve à fila itens em processamento há mais de `stale_after` segundos
+        (worker que caiu no meio do processamento)
+
+        Returns:
+            Quantidade de itens devolvidos
+        """
+        cursor = self._connection().execute(
+            "UPDATE webhook_queue SET state = ?, locked_at = NULL WHERE state = ? AND locked_at < ?",
+            (PENDING, PROCESSING, time.time() - stale_after)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, Any]:
+        """Profundidade da fila por estado e idade do item pendente mais antigo"""
+        conn = self._connection()
+        counts = dict(conn.execute("SELECT state, COUNT(*) FROM webhook_queue GROUP BY state").fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(received_at) FROM webhook_queue WHERE state = ?", (PENDING,)
+        ).fetchone()[0]
+        return {
+            "depth": counts.get(PENDING, 0),
+            "processing": counts.get(PROCESSING, 0),
+            "dead": counts.get(DEAD, 0),
+            "oldest_pending_age_s": (time.time() - oldest) if oldest else 0.0
+        }
+
+
+class WebhookWorkerPool:
+    """Workers que drenam a WebhookQueue executando um processador de notificações"""
+
+    def __init__(
+        self,
+        process: Callable[[Dict[str, Any]], Dict[str, Any]],
+        webhook_queue: WebhookQueue,
+        workers: int = WEBHOOK_QUEUE_WORKERS,
+        poll_interval: float = 0.5,
+        stale_after: float = WEBHOOK_QUEUE_STALE_AFTER,
+        requeue_interval: float = 60.0
+    ):
+        """
+        Args:
+            process: Função data -> {"success": ...} (ex.: WebhookHandler.process_payment_notification)
+            webhook_queue: Fila de onde os itens são consumidos
+            workers: Quantidade de threads
+            poll_interval: Espera máxima entre buscas quando a fila está vazia
+            stale_after: Idade a partir da qual itens "processing" voltam para a fila
+            requeue_interval: Intervalo entre varreduras de itens "processing" parados
+        """
+        self.process = process
+        self.queue = webhook_queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.requeue_interval = requeue_interval
+        self.log_prefix = "⚙️ PrescrevaMe Webhook Workers"
+
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._drain = False
+        self._busy = 0
+        self._next_requeue = 0.0
+
+        self._processed = 0
+        self._failed_attempts = 0
+        self._dead = 0
+        self._lags: Deque[float] = deque(maxlen=10000)  # recebimento -> fim do processamento
+        self._durations: Deque[float] = deque(maxlen=10000)
+
+    def start(self) -> None:
+        """Inicia os workers (idempotente)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            self._next_requeue = 0.0
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"webhook-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stopping.is_set()
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = 30.0) -> None:
+        """
+        Para os workers
+
+        Args:
+            drain: Processar os itens já disponíveis na fila antes de parar
+            timeout: Espera máxima pelos workers
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._drain = drain
+            self._stopping.set()
+        self.queue.wake_all()
+
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.time()))
+
+    def _worker_loop(self) -> None:
+        while True:
+            if self._stopping.is_set() and not self._drain:
+                return
+            self._requeue_stale()
+            try:
+                item = self.queue.claim()
+            except sqlite3.Error as e:
+                logger.error("❌ Erro ao ler a fila: %s", e)
+                item = None
+            if item is None:
+                if self._stopping.is_set():
+                    return
+                self.queue.wait_ready(self.poll_interval)
+                continue
+            self._run(item)
+
+    def _requeue_stale(self) -> None:
+        """
+        Devolve à fila itens "processing" parados há mais de stale_after
+        (worker que caiu, ou complete/fail que falhou no SQLite); roda na
+        primeira volta e depois a cada requeue_interval, em um worker só
+        """
+        now = time.time()
+        with self._lock:
+            if now < self._next_requeue:
+                return
+            self._next_requeue = now + self.requeue_interval
+        try:
+            requeued = self.queue.requeue_stale(self.stale_after)
+        except sqlite3.Error as e:
+            logger.error("❌ Erro ao devolver itens parados à fila: %s", e)
+            return
+        if requeued:
+            logger.warning("♻️ %d itens interrompidos devolvidos à fila", requeued)
+
+    def _run(self, item: Dict[str, Any]) -> None:
+        with self._lock:
+            self._busy += 1
+        started = time.time()
+        try:
+            result = self.process(item["data"])
+            error = None if result.get("success") else result.get("error", "unknown")
+        except Exception as e:
+            error = str(e)
+        finished = time.time()
+
+        try:
+            if error is None:
+                self.queue.complete(item["id"])
+            elif not self.queue.fail(item["id"], item["attempts"], error):
+                logger.error("☠️ Item descartado após %d tentativas: %s", item["attempts"], error,
+                             extra={"queue_id": item["id"]})
+        except sqlite3.Error as e:
+            # O item continua "processing" e volta para a fila no próximo _requeue_stale
+            logger.error("❌ Erro ao atualizar a fila: %s", e, extra={"queue_id": item["id"]})
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self._durations.append(finished - started)
+                if error is None:
+                    self._processed += 1
+                    self._lags.append(finished - item["received_at"])
+                else:
+                    self._failed_attempts += 1
+                    if item["attempts"] >= self.queue.max_attempts:
+                        self._dead += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila, atraso de processamento e contadores dos workers"""
+        stats = self.queue.counts()
+        with self._lock:
+            lags = sorted(self._lags)
+            durations = sorted(self._durations)
+            stats.update({
+                "workers": len(self._threads),
+                "busy": self._busy,
+                "processed": self._processed,
+                "failed_attempts": self._failed_attempts,
+                "dead_letters": self._dead,
+                "lag_p50_ms": lags[len(lags) // 2] * 1000 if lags else 0.0,
+                "lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000 if lags else 0.0,
+                "lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+                "processing_p50_ms": durations[len(durations) // 2] * 1000 if durations else 0.0,
+                "processing_p99_ms": durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000 if durations else 0.0
+            })
+        return stats